@@ -147,4 +147,13 @@ SPECIAL_KEYWORD_PROMPT = """
 - 元数据：{code_meta}
 - GORM代码：{orm_code}
 - 生成的SQL语句：{sql_statements}
-"""
\ No newline at end of file
+"""
+
+# 批量模式：共享的判断指令只发送一次，每条记录只提供分析材料
+SPECIAL_KEYWORD_INSTRUCTIONS = SPECIAL_KEYWORD_PROMPT.split("**分析材料：**")[0]
+
+SPECIAL_KEYWORD_MATERIAL = """- 调用者：{caller}
+- 元数据：{code_meta}
+- GORM代码：{orm_code}
+- 生成的SQL语句：{sql_statements}
+"""
@@ -83,6 +83,37 @@ def get_sql_completeness_check_prompt(caller: str, code_meta: str, orm_code: str
     ) 
 
 
+# 批量模式：共享的判断指令只发送一次，每条记录只提供分析材料
+SQL_COMPLETENESS_CHECK_INSTRUCTIONS = SQL_COMPLETENESS_CHECK_PROMPT.split("**分析材料：**")[0]
+
+SQL_COMPLETENESS_CHECK_MATERIAL = """调用者：{caller}
+元数据：{code_meta}
+GORM代码：{orm_code}
+生成的SQL语句：{sql_statements}
+"""
+
+
+def get_sql_completeness_check_material(caller: str, code_meta: str, orm_code: str, sql_statements: str) -> str:
+    """
+    生成批量模式下单条记录的分析材料
+    
+    Args:
+        caller: 调用者信息
+        code_meta: 元数据信息
+        orm_code: GORM代码
+        sql_statements: 生成的SQL语句
+        
+    Returns:
+        格式化的分析材料
+    """
+    return SQL_COMPLETENESS_CHECK_MATERIAL.format(
+        caller=caller,
+        code_meta=code_meta,
+        orm_code=orm_code,
+        sql_statements=sql_statements
+    )
+
+
 SQL_CORRECTNESS_CHECK_PROMPT = """请判断根据以下GORM代码和上下文信息生成的SQL语句是否完善：
 
 **判断标准：**
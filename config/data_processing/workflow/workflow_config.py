@@ -5,7 +5,7 @@
 
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Literal
 from pydantic import BaseModel
 
 
@@ -16,7 +16,20 @@ class ConcurrencyConfig(BaseModel):
     redundant_sql_validation: int = 50
     keyword_data_processing: int = 50  # 新增关键词处理步骤的并发配置
     control_flow_validation: int = 20  # 新增控制流验证步骤的并发配置
+    fix_review: int = 20  # 冗余SQL修复建议LLM审核的并发配置
     default: int = 50
+    global_llm_budget: int = 0  # 多个步骤同时运行时共享的全局LLM并发上限，0表示不限制
+
+
+class AdaptiveConcurrencyConfig(BaseModel):
+    """自适应并发（AIMD）配置"""
+    enabled: bool = True
+    min_limit: int = 1
+    max_limit: int = 64
+    latency_target_p95: float = 30.0
+    error_rate_threshold: float = 0.05
+    backoff_ratio: float = 0.5
+    sample_size: int = 200
 
 
 class TimeoutConfig(BaseModel):
@@ -29,6 +42,14 @@ class RetryConfig(BaseModel):
     """重试配置"""
     max_retries: int = 1000
     retry_delay: float = 1.0
+    # 统一重试策略：退避上限、全局重试预算、按端点熔断
+    max_delay: float = 60.0
+    budget_ratio: float = 0.2
+    budget_min_retries: float = 10
+    budget_max_retries: float = 100
+    breaker_failure_threshold: int = 5
+    breaker_recovery_timeout: float = 30.0
+    breaker_max_wait: float = 300.0  # 所有端点熔断时最长等待恢复的时间（秒），超过后请求失败
 
 
 class FormatValidationModuleConfig(BaseModel):
@@ -67,13 +88,72 @@ class LLMConfig(BaseModel):
     servers: Optional[LLMServerConfig] = None
 
 
+class StreamingConfig(BaseModel):
+    """流式响应配置"""
+    enabled: bool = False
+    modules: Dict[str, dict] = {}
+
+
+class ResponseCacheConfig(BaseModel):
+    """LLM响应缓存配置"""
+    enabled: bool = True
+    path: str = "workflow_output/llm_response_cache.sqlite"
+    max_size_mb: float = 1024
+    max_temperature: float = 0.0
+
+
+class TelemetryConfig(BaseModel):
+    """LLM调用遥测配置"""
+    save_metrics: bool = True
+    prometheus_port: Optional[int] = None
+    prometheus_host: str = "0.0.0.0"
+
+
+class CheckpointConfig(BaseModel):
+    """步骤检查点（追加写JSONL日志）配置"""
+    enabled: bool = True
+    fsync_interval: float = 5.0
+    fsync_every: int = 1000
+    keep_journal: bool = False
+
+
+class PipelineConfig(BaseModel):
+    """流水线模式配置"""
+    enabled: bool = False  # 全新工作流中是否用流水线执行关键词数据处理和控制流验证
+    queue_size: int = 200
+    stages: List[str] = ['keyword_data_processing', 'control_flow_validation']
+    concurrency: Dict[str, int] = {}
+
+
+class DataLoadingConfig(BaseModel):
+    """原始数据集加载配置"""
+    workers: int = 0  # 并行解析文件的进程数，0表示按CPU核数自动选择，1表示单进程顺序读取
+    snapshot_cache: bool = True  # 输入文件未变化时从二进制快照加载，不再解析JSON
+    snapshot_dir: str = "workflow_output/dataset_snapshots"
+
+
+class OutputConfig(BaseModel):
+    """记录文件输出格式配置"""
+    format: Literal['json', 'jsonl', 'jsonl.zst'] = 'json'  # json: 缩进的JSON数组；jsonl: 每行一条；jsonl.zst: zstd压缩的JSONL
+    zstd_level: int = 3  # jsonl.zst 的压缩级别
+
+
 class WorkflowConfig(BaseModel):
     """工作流配置"""
     concurrency: ConcurrencyConfig
+    adaptive_concurrency: AdaptiveConcurrencyConfig = AdaptiveConcurrencyConfig()
     timeout: TimeoutConfig
     retry: RetryConfig
     format_validation: FormatValidationConfig
     llm: LLMConfig
+    response_cache: ResponseCacheConfig = ResponseCacheConfig()
+    streaming: StreamingConfig = StreamingConfig()
+    prompt_batching: Dict[str, dict] = {}
+    telemetry: TelemetryConfig = TelemetryConfig()
+    checkpoint: CheckpointConfig = CheckpointConfig()
+    pipeline: PipelineConfig = PipelineConfig()
+    data_loading: DataLoadingConfig = DataLoadingConfig()
+    output: OutputConfig = OutputConfig()
 
 
 class WorkflowConfigManager:
@@ -118,6 +198,7 @@ class WorkflowConfigManager:
             # 创建配置对象
             self._config = WorkflowConfig(
                 concurrency=ConcurrencyConfig(**workflow_settings.get('concurrency', {})),
+                adaptive_concurrency=AdaptiveConcurrencyConfig(**workflow_settings.get('adaptive_concurrency', {})),
                 timeout=TimeoutConfig(**workflow_settings.get('timeout', {})),
                 retry=RetryConfig(**workflow_settings.get('retry', {})),
                 format_validation=format_validation_config,
@@ -126,7 +207,15 @@ class WorkflowConfigManager:
                     temperature=llm_settings.get('temperature', 0.0),
                     default_server=llm_settings.get('default_server', 'v3'),
                     servers=LLMServerConfig(**servers_config) if servers_config else None
-                )
+                ),
+                response_cache=ResponseCacheConfig(**workflow_settings.get('response_cache', {})),
+                streaming=StreamingConfig(**workflow_settings.get('streaming', {})),
+                prompt_batching=workflow_settings.get('prompt_batching', {}) or {},
+                telemetry=TelemetryConfig(**(workflow_settings.get('telemetry', {}) or {})),
+                checkpoint=CheckpointConfig(**(workflow_settings.get('checkpoint', {}) or {})),
+                pipeline=PipelineConfig(**(workflow_settings.get('pipeline', {}) or {})),
+                data_loading=DataLoadingConfig(**(workflow_settings.get('data_loading', {}) or {})),
+                output=OutputConfig(**(workflow_settings.get('output', {}) or {}))
             )
             
         except FileNotFoundError as e:
@@ -171,9 +260,28 @@ class WorkflowConfigManager:
             'redundant_sql_validation': self.config.concurrency.redundant_sql_validation,
             'keyword_data_processing': self.config.concurrency.keyword_data_processing,
             'control_flow_validation': self.config.concurrency.control_flow_validation,
+            'fix_review': self.config.concurrency.fix_review,
         }
         return concurrency_map.get(step_type, self.config.concurrency.default)
     
+    def get_global_llm_budget(self) -> int:
+        """
+        获取全局LLM并发预算（并行运行的步骤共享）
+        
+        Returns:
+            多个步骤同时运行时的全局在途LLM请求上限，0表示不限制
+        """
+        return self.config.concurrency.global_llm_budget
+    
+    def get_adaptive_concurrency_config(self) -> Dict[str, Any]:
+        """
+        获取自适应并发（AIMD）配置
+        
+        Returns:
+            自适应并发配置字典
+        """
+        return self.config.adaptive_concurrency.model_dump()
+    
     def get_llm_server(self, module: str, component: str = None) -> str:
         """
         获取指定模块和组件的LLM服务器
@@ -327,6 +435,115 @@ class WorkflowConfigManager:
         """
         return self.config.retry.retry_delay
     
+    def get_retry_policy_config(self) -> Dict[str, Any]:
+        """
+        获取统一重试策略配置（退避、重试预算、熔断）
+        
+        Returns:
+            重试策略配置字典
+        """
+        return self.config.retry.model_dump()
+    
+    def get_response_cache_config(self) -> Dict[str, Any]:
+        """
+        获取LLM响应缓存配置
+        
+        Returns:
+            缓存配置字典
+        """
+        return self.config.response_cache.model_dump()
+    
+    def is_streaming_enabled(self, module: str = None, component: str = None) -> bool:
+        """
+        判断指定模块和组件是否使用流式响应
+        
+        Args:
+            module: 模块名称
+            component: 组件名称
+            
+        Returns:
+            是否启用流式响应（组件配置优先于全局开关）
+        """
+        streaming = self.config.streaming
+        if module and component:
+            module_config = streaming.modules.get(module, {})
+            if isinstance(module_config, dict) and component in module_config:
+                return bool(module_config[component])
+        return streaming.enabled
+    
+    def get_batch_size(self, module: str, component: str) -> int:
+        """
+        获取指定模块和组件的提示词批大小
+        
+        Args:
+            module: 模块名称
+            component: 组件名称
+            
+        Returns:
+            每个请求打包的记录数，1表示不批处理
+        """
+        module_config = self.config.prompt_batching.get(module, {})
+        if isinstance(module_config, dict):
+            return max(1, int(module_config.get(component, 1) or 1))
+        return 1
+    
+    def get_telemetry_config(self) -> Dict[str, Any]:
+        """
+        获取LLM调用遥测配置
+        
+        Returns:
+            遥测配置字典
+        """
+        return self.config.telemetry.model_dump()
+    
+    def get_checkpoint_config(self) -> Dict[str, Any]:
+        """
+        获取步骤检查点配置
+        
+        Returns:
+            检查点配置字典
+        """
+        return self.config.checkpoint.model_dump()
+    
+    def get_pipeline_config(self) -> Dict[str, Any]:
+        """
+        获取流水线模式配置
+        
+        Returns:
+            流水线配置字典
+        """
+        return self.config.pipeline.model_dump()
+    
+    def get_pipeline_concurrency(self, stage: str) -> int:
+        """
+        获取流水线某个阶段的初始并发窗口，未单独配置时使用 concurrency 中同名步骤的并发数
+        
+        Args:
+            stage: 阶段名称
+            
+        Returns:
+            并发数
+        """
+        return self.config.pipeline.concurrency.get(stage) or self.get_concurrency(stage)
+    
+    def get_data_loading_config(self) -> Dict[str, Any]:
+        """
+        获取原始数据集加载配置
+        
+        Returns:
+            数据加载配置字典
+        """
+        return self.config.data_loading.model_dump()
+    
+    def get_output_config(self) -> Dict[str, Any]:
+        """
+        获取记录文件输出格式配置
+        
+        Returns:
+            输出格式配置字典
+        """
+        return self.config.output.model_dump()
+    
     def reload_config(self) -> None:
         """重新加载配置文件"""
         self.load_config()
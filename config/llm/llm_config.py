@@ -1,7 +1,7 @@
 """LLM配置加载器 - 从YAML文件加载配置"""
 import os
 import yaml
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, List
 from pathlib import Path
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -9,6 +9,22 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+class EndpointConfig(BaseModel):
+    """单个服务副本（endpoint）配置"""
+    host: str
+    port: int
+    
+    @property
+    def full_url(self) -> str:
+        """获取完整的API URL"""
+        return f"http://{self.host}:{self.port}"
+    
+    @property
+    def chat_completions_url(self) -> str:
+        """获取聊天完成API的完整URL"""
+        return f"{self.full_url}/v1/chat/completions"
+
+
 class ServerConfig(BaseModel):
     """服务器配置"""
     host: str
@@ -17,6 +33,25 @@ class ServerConfig(BaseModel):
     timeout: int = 120  # 增加到120秒
     max_retries: int = 1000
     api_key: Optional[str] = None
+    # 连接池配置（长连接复用）
+    pool_limit: int = 200
+    pool_limit_per_host: int = 100
+    keepalive_timeout: float = 60.0
+    dns_cache_ttl: int = 300
+    # 多副本配置（同一模型的多个服务实例），为空时仅使用 host:port
+    endpoints: List[EndpointConfig] = []
+    # 副本健康检查配置
+    health_check_interval: float = 10.0
+    health_check_path: str = "/v1/models"
+    failure_threshold: int = 3
+    ejection_time: float = 30.0
+    
+    @property
+    def all_endpoints(self) -> List[EndpointConfig]:
+        """获取全部副本（未配置endpoints时为单个 host:port）"""
+        if self.endpoints:
+            return list(self.endpoints)
+        return [EndpointConfig(host=self.host, port=self.port)]
     
     @property
     def full_url(self) -> str:
@@ -81,14 +116,38 @@ class LLMConfig:
             if api_key_env:
                 api_key = os.getenv(api_key_env, config.get('default_api_key'))
             
+            # 连接池配置：服务器配置覆盖默认配置中的对应字段
+            pool_config = {**defaults.get('connection_pool', {}), **server_data.get('connection_pool', {})}
+            health_config = {**defaults.get('health_check', {}), **server_data.get('health_check', {})}
+            
+            # 多副本：支持 {host, port} 或 "host:port" 两种写法
+            endpoints = []
+            for endpoint in server_data.get('endpoints', []) or []:
+                if isinstance(endpoint, str):
+                    host, _, port = endpoint.rpartition(':')
+                    endpoints.append(EndpointConfig(host=host, port=int(port)))
+                else:
+                    endpoints.append(EndpointConfig(host=endpoint['host'], port=endpoint['port']))
+            if not endpoints and 'host' not in config:
+                raise ValueError(f"服务器 {server_name} 未配置 host/port 或 endpoints")
+            
             # 创建服务器配置对象
             self._servers[server_name] = ServerConfig(
-                host=config['host'],
-                port=config['port'],
+                host=config['host'] if 'host' in config else endpoints[0].host,
+                port=config['port'] if 'port' in config else endpoints[0].port,
                 model_name=config['model_name'],
                 timeout=config.get('timeout', defaults.get('timeout', 45)),
                 max_retries=config.get('max_retries', defaults.get('max_retries', 1000)),
-                api_key=api_key
+                api_key=api_key,
+                pool_limit=pool_config.get('limit', 200),
+                pool_limit_per_host=pool_config.get('limit_per_host', 100),
+                keepalive_timeout=pool_config.get('keepalive_timeout', 60.0),
+                dns_cache_ttl=pool_config.get('ttl_dns_cache', 300),
+                endpoints=endpoints,
+                health_check_interval=health_config.get('interval', 10.0),
+                health_check_path=health_config.get('path', '/v1/models'),
+                failure_threshold=health_config.get('failure_threshold', 3),
+                ejection_time=health_config.get('ejection_time', 30.0)
             )
     
     def get_server_config(self, server_name: str) -> ServerConfig:
@@ -5,7 +5,7 @@
 """
 
 # 只导入核心模块，避免依赖问题
-from .data_reader import DataReader, DataSampler, FunctionRecord, CodeMetaData
+from .data_reader import DataReader, DataSampler, FunctionRecord, CodeMetaData, FunctionRecordView
 
 # 按需导入其他模块，避免依赖问题
 def get_data_cleaner():
@@ -45,6 +45,7 @@ __all__ = [
     'DataSampler', 
     'FunctionRecord', 
     'CodeMetaData',
+    'FunctionRecordView',
     'get_data_cleaner',
     'get_data_analyzer',
     'get_workflow_manager',
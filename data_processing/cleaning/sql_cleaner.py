@@ -11,6 +11,10 @@ from typing import List, Dict, Any, Union, Tuple
 from pathlib import Path
 from datetime import datetime
 
+from utils.keyword_matcher import get_keyword_matcher
+from utils.json_stream import output_path
+from utils.step_journal import write_records
+
 # 尝试导入ORM指纹分析器，如果失败则禁用该功能
 try:
     from .orm_sql_fingerprint_analyzer import ORM_SQLFingerprintAnalyzer
@@ -48,6 +52,7 @@ class SQLCleaner:
             'ALTER', 'TRUNCATE', 'REPLACE', 'SHOW', 'DESCRIBE', 'EXPLAIN',
             'WITH', 'UNION', 'HAVING', 'GROUP BY', 'ORDER BY', 'LIMIT'
         }
+        self._sql_keyword_matcher = get_keyword_matcher(sorted(self.sql_keywords))
         
         # SQL语句模式（更严格的SQL检测）
         self.sql_patterns = [
@@ -110,9 +115,8 @@ class SQLCleaner:
         
         # 检查是否包含SQL关键词（只要包含就认为有效）
         sql_upper = sql_text.upper()
-        for keyword in self.sql_keywords:
-            if keyword in sql_upper:
-                return True
+        if self._sql_keyword_matcher.contains_any(sql_upper):
+            return True
         
         # 如果是JSON数组格式，尝试解析并检查内容
         if sql_text.startswith('[') and sql_text.endswith(']'):
@@ -122,11 +126,8 @@ class SQLCleaner:
                 if isinstance(parsed, list):
                     # 检查数组中是否有SQL语句
                     for item in parsed:
-                        if isinstance(item, str):
-                            item_upper = item.upper()
-                            for keyword in self.sql_keywords:
-                                if keyword in item_upper:
-                                    return True
+                        if isinstance(item, str) and self._sql_keyword_matcher.contains_any(item.upper()):
+                            return True
             except:
                 pass
         
@@ -305,15 +306,13 @@ class SQLCleaner:
         analysis_summary = None
         logger.info("已跳过 ORM SQL 指纹分析（交由后续工作流步骤处理）")
         
-        # 保存清洗后的数据
-        cleaned_data_file = step_output_dir / "cleaned_records.json"
-        with open(cleaned_data_file, 'w', encoding='utf-8') as f:
-            json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
+        # 保存清洗后的数据（按配置的输出格式）
+        cleaned_data_file = output_path(step_output_dir / "cleaned_records.json")
+        write_records(cleaned_data_file, cleaned_data)
         
         # 保存清洗日志
-        cleaning_log_file = step_output_dir / "cleaning_log.json"
-        with open(cleaning_log_file, 'w', encoding='utf-8') as f:
-            json.dump(self.cleaning_log, f, ensure_ascii=False, indent=2)
+        cleaning_log_file = output_path(step_output_dir / "cleaning_log.json")
+        write_records(cleaning_log_file, self.cleaning_log)
         
         # 保存清洗统计
         cleaning_stats_file = step_output_dir / "cleaning_statistics.json"
@@ -324,6 +323,7 @@ class SQLCleaner:
             'input_records_count': len(data),
             'output_records_count': len(cleaned_data),
             'output_directory': str(step_output_dir),
+            'cleaned_data_file': str(cleaned_data_file),
             'orm_analysis_reports': analysis_reports,
             'orm_analysis_summary': analysis_summary
         }
@@ -25,6 +25,7 @@ sys.path.insert(0, str(project_root))
 # 现在可以导入项目内的模块
 from config.rl.data_conversion.orm2sql_prompt_template import PROMPT_TEMPLATE
 from utils.preprocess import preprocess_record
+from utils.json_stream import find_record_file, load_json_or_records
 
 # 设置日志
 logging.basicConfig(
@@ -107,29 +108,18 @@ class RLDataConverter:
             workflow_dir / "final_processed_dataset.json"  # 保留默认文件名作为备选
         ]
         
-        data_file = None
-        for file_path in possible_files:
-            if file_path.exists():
-                data_file = file_path
-                break
+        # 先按配置的文件名本身查找，再尝试其他输出格式的后缀（.json / .jsonl / .jsonl.zst）
+        data_file = next((f for f in possible_files if f.exists()), None)
+        if not data_file:
+            data_file = next((found for found in map(find_record_file, possible_files) if found), None)
         
         if not data_file:
             raise FileNotFoundError(f"数据文件不存在，尝试过的文件: {[str(f) for f in possible_files]}")
         
         logger.info(f"使用数据文件: {data_file}")
         
-        # 根据文件扩展名决定读取方式
-        if data_file.suffix == '.jsonl':
-            # JSONL格式：每行一个JSON对象
-            data = []
-            with open(data_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        data.append(json.loads(line))
-        else:
-            # JSON格式：整个文件是一个JSON数组
-            with open(data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        # 根据文件后缀决定读取方式：JSONL（可以是zstd压缩的）每行一个JSON对象，JSON为整个数组
+        data = load_json_or_records(data_file)
         
         logger.info(f"加载了 {len(data)} 条数据记录")
         return data
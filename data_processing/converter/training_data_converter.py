@@ -14,6 +14,7 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 import glob
 from config.training.data_conversion.orm2sql_prompt_template import PROMPT_TEMPLATE
+from utils.json_stream import find_record_file, load_json_or_records
 
 # 设置日志
 logging.basicConfig(
@@ -81,16 +82,16 @@ class TrainingDataConverter:
         Returns:
             处理后的数据列表
         """
-        final_data_file = workflow_dir / "final_processed_dataset.json"
+        # 最终数据文件可能是任一输出格式（.json / .jsonl / .jsonl.zst）
+        final_data_file = find_record_file(workflow_dir / "final_processed_dataset.json")
         
-        if not final_data_file.exists():
-            raise FileNotFoundError(f"未找到最终处理数据文件: {final_data_file}")
+        if final_data_file is None:
+            raise FileNotFoundError(f"未找到最终处理数据文件: {workflow_dir / 'final_processed_dataset.json'}")
         
         logger.info(f"正在加载数据文件: {final_data_file}")
         logger.info(f"文件大小: {final_data_file.stat().st_size / (1024*1024):.1f} MB")
         
-        with open(final_data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json_or_records(final_data_file)
         
         logger.info(f"成功加载 {len(data)} 条记录")
         return data
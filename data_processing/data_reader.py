@@ -7,21 +7,42 @@ Code2SQL数据集读取器
 
 import json
 import os
+import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, Iterator, Tuple
-from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Union, Iterator, Iterable, Tuple
+from dataclasses import dataclass, field, replace
 import logging
 from datetime import datetime
 import glob
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from collections.abc import MutableMapping
+
+# 可选的高速JSON解析后端
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import simdjson
+    SIMDJSON_AVAILABLE = True
+except ImportError:
+    simdjson = None
+    SIMDJSON_AVAILABLE = False
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+JSON_BACKEND = 'orjson' if ORJSON_AVAILABLE else 'simdjson' if SIMDJSON_AVAILABLE else 'json'
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class CodeMetaData:
-    """代码元数据结构"""
+    """代码元数据结构（不可变；code_file、code_version 等低基数字符串在读取时驻留）"""
     code_file: str
     code_start_line: int
     code_end_line: int
@@ -32,7 +53,7 @@ class CodeMetaData:
     code_version: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SqlScenario:
     """SQL场景结构"""
     condition: str
@@ -40,7 +61,7 @@ class SqlScenario:
     when: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ComplexSqlStatement:
     """复杂SQL语句结构"""
     description: str
@@ -49,9 +70,37 @@ class ComplexSqlStatement:
     execution_condition: Optional[str] = None
 
 
-@dataclass
+def _parse_sql_statements(sql_statement_list: List[Union[str, Dict[str, Any]]]) -> List[Union[str, ComplexSqlStatement]]:
+    """解析复杂的SQL语句结构"""
+    parsed = []
+    for stmt in sql_statement_list:
+        if isinstance(stmt, str):
+            parsed.append(stmt)
+        elif isinstance(stmt, dict):
+            scenarios = []
+            if 'scenarios' in stmt:
+                for scenario in stmt['scenarios']:
+                    if isinstance(scenario, dict):
+                        scenarios.append(SqlScenario(**scenario))
+                    else:
+                        scenarios.append(scenario)
+            
+            parsed.append(ComplexSqlStatement(
+                description=stmt.get('description', ''),
+                scenarios=scenarios,
+                parameters=stmt.get('parameters'),
+                execution_condition=stmt.get('execution_condition')
+            ))
+    return parsed
+
+
+@dataclass(slots=True)
 class FunctionRecord:
-    """函数记录数据结构"""
+    """函数记录数据结构
+    
+    使用 __slots__，不为每条记录分配实例字典。parsed_sql_statements 只解析一次并缓存在
+    槽位字段中：含复杂结构的记录在构造校验时解析，纯字符串列表在首次访问时解析。
+    """
     function_name: str
     orm_code: str
     caller: str
@@ -60,46 +109,169 @@ class FunctionRecord:
     code_meta_data: List[CodeMetaData]
     sql_pattern_cnt: int
     source_file: str
-    
-    # 解析后的字段
-    parsed_sql_statements: List[Union[str, ComplexSqlStatement]] = field(default_factory=list)
+    _parsed_sql_statements: Optional[List[Union[str, ComplexSqlStatement]]] = field(
+        default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
-        """后处理，解析复杂的SQL语句结构"""
-        self.parsed_sql_statements = []
-        for stmt in self.sql_statement_list:
-            if isinstance(stmt, str):
-                self.parsed_sql_statements.append(stmt)
-            elif isinstance(stmt, dict):
-                # 解析复杂的SQL语句结构
-                scenarios = []
-                if 'scenarios' in stmt:
-                    for scenario in stmt['scenarios']:
-                        if isinstance(scenario, dict):
-                            scenarios.append(SqlScenario(**scenario))
-                        else:
-                            scenarios.append(scenario)
-                
-                complex_stmt = ComplexSqlStatement(
-                    description=stmt.get('description', ''),
-                    scenarios=scenarios,
-                    parameters=stmt.get('parameters'),
-                    execution_condition=stmt.get('execution_condition')
-                )
-                self.parsed_sql_statements.append(complex_stmt)
+        """校验复杂SQL语句结构（格式错误时抛出异常，与之前构造时即解析的行为一致），解析结果直接缓存"""
+        if any(isinstance(stmt, dict) for stmt in self.sql_statement_list):
+            self._parsed_sql_statements = _parse_sql_statements(self.sql_statement_list)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name == 'sql_statement_list':
+            # SQL列表被替换后，缓存的解析结果失效
+            object.__setattr__(self, '_parsed_sql_statements', None)
+    
+    @property
+    def parsed_sql_statements(self) -> List[Union[str, ComplexSqlStatement]]:
+        """解析后的SQL语句（字符串或 ComplexSqlStatement）"""
+        if self._parsed_sql_statements is None:
+            self._parsed_sql_statements = _parse_sql_statements(self.sql_statement_list)
+        return self._parsed_sql_statements
+
+
+# 重复度高的低基数字段，读取时驻留为同一个字符串对象
+# （code_label、code_type 按约定是整数，部分数据文件中是字符串，是字符串时同样驻留）
+_INTERNED_META_FIELDS = ('code_file', 'code_version', 'code_label', 'code_type')
+_intern = sys.intern
+
+
+def _intern_optional(value: Any) -> Any:
+    return _intern(value) if type(value) is str else value
+
+
+def _intern_meta_dict(meta: Dict[str, Any]) -> None:
+    """原地驻留代码元数据字典中的低基数字段"""
+    for name in _INTERNED_META_FIELDS:
+        if name in meta:
+            meta[name] = _intern_optional(meta[name])
+
+
+def _reintern_record(record: Union[FunctionRecord, Dict[str, Any]]) -> Union[FunctionRecord, Dict[str, Any]]:
+    """重新驻留记录中的低基数字符串
+
+    子进程中驻留的字符串经pickle传回主进程后是新的字符串对象（同一文件内共享，跨文件不共享），
+    合并进程池结果时需要在主进程中重新驻留。
+    """
+    if isinstance(record, FunctionRecord):
+        record.source_file = _intern_optional(record.source_file)
+        record.sql_types = [_intern_optional(sql_type) for sql_type in record.sql_types]
+        record.code_meta_data = [
+            replace(meta, **{name: _intern_optional(getattr(meta, name)) for name in _INTERNED_META_FIELDS})
+            for meta in record.code_meta_data
+        ]
+    else:
+        record['source_file'] = _intern_optional(record['source_file'])
+        record['sql_types'] = [_intern_optional(sql_type) for sql_type in record['sql_types']]
+        for meta in record['code_meta_data']:
+            _intern_meta_dict(meta)
+    return record
+
+
+def load_json_file(file_path: Union[str, Path]) -> Any:
+    """用可用的最快JSON后端（orjson > simdjson > json）解析文件"""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    if SIMDJSON_AVAILABLE:
+        return simdjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def _build_function_record(item: Dict[str, Any], file_path: Path) -> Optional[FunctionRecord]:
+    """把一条原始记录解析为FunctionRecord，解析失败时记录日志并返回None"""
+    try:
+        # 解析code_meta_data
+        code_meta_list = []
+        for meta in item.get('code_meta_data', []):
+            meta = dict(meta)
+            _intern_meta_dict(meta)
+            code_meta_list.append(CodeMetaData(**meta))
+        
+        # 创建FunctionRecord
+        return FunctionRecord(
+            function_name=item.get('function_name', ''),
+            orm_code=item.get('orm_code', ''),
+            caller=item.get('caller', ''),
+            sql_statement_list=item.get('sql_statement_list', []),
+            sql_types=[_intern_optional(sql_type) for sql_type in item.get('sql_types', [])],
+            code_meta_data=code_meta_list,
+            sql_pattern_cnt=item.get('sql_pattern_cnt', 0),
+            source_file=_intern_optional(item.get('source_file', str(file_path)))
+        )
+        
+    except Exception as e:
+        logger.error(f"解析记录时出错: {e}")
+        logger.error(f"问题记录: {item}")
+        return None
+
+
+def _build_file_stats(file_path: Path, total_records: int, has_sql_records: int, total_sql: int) -> Dict[str, Any]:
+    """单个文件的统计信息"""
+    return {
+        'total_records': total_records,
+        'file_size_mb': file_path.stat().st_size / (1024 * 1024),
+        'has_sql_records': has_sql_records,
+        'avg_sql_per_record': total_sql / total_records if total_records else 0
+    }
+
+
+def _parse_data_file(file_path: Path, as_dicts: bool = False) -> Tuple[List[Union[FunctionRecord, Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """
+    解析单个数据文件（模块级函数，可在进程池中执行）
+    
+    Args:
+        file_path: 文件路径
+        as_dicts: 为True时返回 function_record_to_dict 格式的字典（逐条转换，不保留FunctionRecord）
+        
+    Returns:
+        (函数记录列表, 文件统计)，读取失败时文件统计为None
+    """
+    try:
+        data = load_json_file(file_path)
+        
+        if not isinstance(data, list):
+            logger.warning(f"文件 {file_path} 不是预期的列表格式")
+            return [], None
+        
+        records = []
+        has_sql_records = total_sql = 0
+        for item in data:
+            record = _build_function_record(item, file_path)
+            if record is None:
+                continue
+            if record.sql_statement_list:
+                has_sql_records += 1
+                total_sql += len(record.sql_statement_list)
+            records.append(function_record_to_dict(record) if as_dicts else record)
+        
+        # 统计文件信息
+        stats = _build_file_stats(file_path, len(records), has_sql_records, total_sql)
+        
+        logger.info(f"成功读取文件 {file_path}: {len(records)} 条记录")
+        return records, stats
+        
+    except Exception as e:
+        logger.error(f"读取文件 {file_path} 时出错: {e}")
+        return [], None
 
 
 class DataReader:
     """Code2SQL数据集读取器"""
     
-    def __init__(self, data_dir: Union[str, Path] = "datasets/claude_output"):
+    def __init__(self, data_dir: Union[str, Path] = "datasets/claude_output", streaming: bool = False):
         """
         初始化数据读取器
         
         Args:
             data_dir: 数据目录路径
+            streaming: 流式模式。为True时不把数据集读入内存，迭代、过滤、统计、关键词提取和采样
+                都直接在 iter_records() 上逐条进行，内存占用与单条记录大小相当
         """
         self.data_dir = Path(data_dir)
+        self.streaming = streaming
         self.records: List[FunctionRecord] = []
         self.file_stats: Dict[str, Dict[str, Any]] = {}
         
@@ -131,76 +303,141 @@ class DataReader:
             函数记录列表
         """
         file_path = Path(file_path)
+        records, stats = _parse_data_file(file_path)
+        if stats is not None:
+            self.file_stats[str(file_path)] = stats
+        return records
+    
+    def _parse_files(self, files: List[Path], workers: int = 0, as_dicts: bool = False) -> List[Union[FunctionRecord, Dict[str, Any]]]:
+        """
+        解析文件列表并按文件顺序合并记录，同时更新 file_stats
         
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if not isinstance(data, list):
-                logger.warning(f"文件 {file_path} 不是预期的列表格式")
-                return []
-            
-            records = []
-            for item in data:
-                try:
-                    # 解析code_meta_data
-                    code_meta_list = []
-                    for meta in item.get('code_meta_data', []):
-                        code_meta_list.append(CodeMetaData(**meta))
-                    
-                    # 创建FunctionRecord
-                    record = FunctionRecord(
-                        function_name=item.get('function_name', ''),
-                        orm_code=item.get('orm_code', ''),
-                        caller=item.get('caller', ''),
-                        sql_statement_list=item.get('sql_statement_list', []),
-                        sql_types=item.get('sql_types', []),
-                        code_meta_data=code_meta_list,
-                        sql_pattern_cnt=item.get('sql_pattern_cnt', 0),
-                        source_file=item.get('source_file', str(file_path))
-                    )
-                    records.append(record)
-                    
-                except Exception as e:
-                    logger.error(f"解析记录时出错: {e}")
-                    logger.error(f"问题记录: {item}")
-                    continue
-            
-            # 统计文件信息
-            self.file_stats[str(file_path)] = {
-                'total_records': len(records),
-                'file_size_mb': file_path.stat().st_size / (1024 * 1024),
-                'has_sql_records': len([r for r in records if r.sql_statement_list]),
-                'avg_sql_per_record': sum(len(r.sql_statement_list) for r in records) / len(records) if records else 0
-            }
-            
-            logger.info(f"成功读取文件 {file_path}: {len(records)} 条记录")
-            return records
-            
-        except Exception as e:
-            logger.error(f"读取文件 {file_path} 时出错: {e}")
-            return []
+        多个文件时由进程池并行解析（文件统计也在子进程中计算），结果与逐个读取完全一致。
+        进程池不可用时退化为单进程顺序读取。
+        """
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(files))
+        
+        results = None
+        if workers > 1:
+            logger.info(f"使用 {workers} 个进程并行解析 {len(files)} 个文件（JSON后端: {JSON_BACKEND}）")
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(partial(_parse_data_file, as_dicts=as_dicts), files))
+            except Exception as e:
+                logger.warning(f"⚠️ 并行读取失败，改为顺序读取: {e}")
+                results = None
+        
+        from_pool = results is not None
+        if results is None:
+            results = (_parse_data_file(file_path, as_dicts) for file_path in files)
+        
+        merged = []
+        for file_path, (records, stats) in zip(files, results):
+            if stats is not None:
+                self.file_stats[str(file_path)] = stats
+            if from_pool:
+                # 子进程中的驻留在反序列化后失效，在主进程中重新驻留
+                records = [_reintern_record(record) for record in records]
+            merged.extend(records)
+        return merged
     
-    def read_all_files(self, pattern: str = "*.json") -> "DataReader":
+    def read_all_files(self, pattern: str = "*.json", workers: int = 0) -> "DataReader":
         """
         读取所有匹配的文件
         
         Args:
             pattern: 文件匹配模式
+            workers: 并行解析的进程数，0表示按CPU核数自动选择，1表示单进程顺序读取
             
         Returns:
             自身，支持链式调用
         """
         files = self.get_file_list(pattern)
-        self.records = []
-        
-        for file_path in files:
-            records = self.read_single_file(file_path)
-            self.records.extend(records)
+        self.records = self._parse_files(files, workers)
         
         logger.info(f"总共读取了 {len(self.records)} 条记录")
         return self
     
+    def read_all_dicts(self, pattern: str = "*.json", workers: int = 0,
+                       files: Optional[List[Path]] = None) -> List[Dict[str, Any]]:
+        """
+        读取所有匹配的文件，直接返回工作流使用的字典格式记录（不保存在 self.records 中）
+        
+        每条记录解析校验后立即转换为字典，整个数据集不会同时以FunctionRecord和字典两种形式驻留内存。
+        字典中的低基数字符串与FunctionRecord一样是驻留的，但每条记录及其代码元数据仍是普通字典，
+        内存占用与转换前基本相同；紧凑表示（槽位类 + FunctionRecordView）只用于 read_all_files / iter_records。
+        
+        Args:
+            pattern: 文件匹配模式
+            workers: 并行解析的进程数，0表示按CPU核数自动选择，1表示单进程顺序读取
+            files: 要读取的文件列表，默认为 get_file_list(pattern)
+            
+        Returns:
+            function_record_to_dict 格式的记录列表
+        """
+        if files is None:
+            files = self.get_file_list(pattern)
+        records = self._parse_files(files, workers, as_dicts=True)
+        
+        logger.info(f"总共读取了 {len(records)} 条记录")
+        return records
+    
+    def iter_file_records(self, file_path: Union[str, Path]) -> Iterator[FunctionRecord]:
+        """
+        流式读取单个文件（顶层JSON数组或JSONL），逐条产出记录
+        
+        文件读完后更新 file_stats；读取出错时记录日志并结束该文件。
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            函数记录迭代器
+        """
+        from utils.json_stream import iter_json_records
+        
+        file_path = Path(file_path)
+        total_records = has_sql_records = total_sql = 0
+        try:
+            for item in iter_json_records(file_path):
+                record = _build_function_record(item, file_path)
+                if record is None:
+                    continue
+                total_records += 1
+                if record.sql_statement_list:
+                    has_sql_records += 1
+                    total_sql += len(record.sql_statement_list)
+                yield record
+        except Exception as e:
+            logger.error(f"读取文件 {file_path} 时出错: {e}")
+            return
+        
+        self.file_stats[str(file_path)] = _build_file_stats(file_path, total_records, has_sql_records, total_sql)
+        logger.info(f"成功读取文件 {file_path}: {total_records} 条记录")
+    
+    def iter_records(self, pattern: str = "*.json") -> Iterator[FunctionRecord]:
+        """
+        按文件顺序流式产出所有匹配文件中的记录（不保存在 self.records 中）
+        
+        Args:
+            pattern: 文件匹配模式（JSONL文件使用 "*.jsonl"）
+            
+        Returns:
+            函数记录迭代器
+        """
+        for file_path in self.get_file_list(pattern):
+            yield from self.iter_file_records(file_path)
+    
+    def _record_source(self, records: Optional[Iterable[FunctionRecord]] = None) -> Iterable[FunctionRecord]:
+        """处理方法的数据来源：显式传入的记录 > 流式模式下的 iter_records() > 已加载的 self.records"""
+        if records is not None:
+            return records
+        if self.streaming:
+            return self.iter_records()
+        return self.records
+    
     def read_files(self, file_names: List[str]) -> "DataReader":
         """
         读取指定的文件列表
@@ -229,9 +466,10 @@ class DataReader:
                       sql_types: Optional[List[str]] = None,
                       min_sql_count: Optional[int] = None,
                       function_name_contains: Optional[str] = None,
-                      source_file_pattern: Optional[str] = None) -> List[FunctionRecord]:
+                      source_file_pattern: Optional[str] = None,
+                      records: Optional[Iterable[FunctionRecord]] = None) -> List[FunctionRecord]:
         """
-        过滤记录
+        过滤记录（单次遍历，可直接作用于流式记录）
         
         Args:
             has_sql: 是否包含SQL语句
@@ -239,63 +477,71 @@ class DataReader:
             min_sql_count: 最小SQL语句数量
             function_name_contains: 函数名包含的字符串
             source_file_pattern: 源文件名模式
+            records: 要过滤的记录（可以是 iter_records() 生成器），默认使用 _record_source()
             
         Returns:
             过滤后的记录列表
         """
-        filtered = self.records
-        
-        if has_sql is not None:
-            filtered = [r for r in filtered if bool(r.sql_statement_list) == has_sql]
+        import fnmatch
         
-        if sql_types:
-            filtered = [r for r in filtered if any(t in r.sql_types for t in sql_types)]
+        def matches(r: FunctionRecord) -> bool:
+            if has_sql is not None and bool(r.sql_statement_list) != has_sql:
+                return False
+            if sql_types and not any(t in r.sql_types for t in sql_types):
+                return False
+            if min_sql_count is not None and len(r.sql_statement_list) < min_sql_count:
+                return False
+            if function_name_contains and function_name_contains not in r.function_name:
+                return False
+            if source_file_pattern and not fnmatch.fnmatch(r.source_file, source_file_pattern):
+                return False
+            return True
         
-        if min_sql_count is not None:
-            filtered = [r for r in filtered if len(r.sql_statement_list) >= min_sql_count]
-        
-        if function_name_contains:
-            filtered = [r for r in filtered if function_name_contains in r.function_name]
-        
-        if source_file_pattern:
-            import fnmatch
-            filtered = [r for r in filtered if fnmatch.fnmatch(r.source_file, source_file_pattern)]
+        filtered = [r for r in self._record_source(records) if matches(r)]
         
         logger.info(f"过滤后剩余 {len(filtered)} 条记录")
         return filtered
     
-    def get_statistics(self) -> Dict[str, Any]:
+    def get_statistics(self, records: Optional[Iterable[FunctionRecord]] = None) -> Dict[str, Any]:
         """
-        获取数据集统计信息
+        获取数据集统计信息（单次遍历，可直接作用于流式记录）
         
+        Args:
+            records: 要统计的记录（可以是 iter_records() 生成器），默认使用 _record_source()
+            
         Returns:
             统计信息字典
         """
-        if not self.records:
-            return {"error": "没有加载数据"}
-        
-        total_records = len(self.records)
-        records_with_sql = [r for r in self.records if r.sql_statement_list]
-        
-        # SQL类型统计
+        total_records = 0
+        records_with_sql = 0
+        total_sql_statements = 0
         sql_type_counts = {}
-        for record in self.records:
+        file_counts = {}
+        
+        for record in self._record_source(records):
+            total_records += 1
+            if record.sql_statement_list:
+                records_with_sql += 1
+            total_sql_statements += len(record.sql_statement_list)
+            
+            # SQL类型统计
             for sql_type in record.sql_types:
                 sql_type_counts[sql_type] = sql_type_counts.get(sql_type, 0) + 1
-        
-        # 文件统计
-        file_counts = {}
-        for record in self.records:
+            
+            # 文件统计
             source = record.source_file
             file_counts[source] = file_counts.get(source, 0) + 1
         
+        if not total_records:
+            return {"error": "没有加载数据"}
+        
         stats = {
             "total_records": total_records,
-            "records_with_sql": len(records_with_sql),
-            "records_without_sql": total_records - len(records_with_sql),
-            "sql_coverage_rate": len(records_with_sql) / total_records * 100,
-            "avg_sql_per_record": sum(len(r.sql_statement_list) for r in self.records) / total_records,
-            "total_sql_statements": sum(len(r.sql_statement_list) for r in self.records),
+            "records_with_sql": records_with_sql,
+            "records_without_sql": total_records - records_with_sql,
+            "sql_coverage_rate": records_with_sql / total_records * 100,
+            "avg_sql_per_record": total_sql_statements / total_records,
+            "total_sql_statements": total_sql_statements,
             "sql_type_distribution": dict(sorted(sql_type_counts.items(), key=lambda x: x[1], reverse=True)),
             "top_10_files_by_records": dict(sorted(file_counts.items(), key=lambda x: x[1], reverse=True)[:10]),
             "file_stats": self.file_stats,
@@ -304,27 +550,32 @@ class DataReader:
         
         return stats
     
-    def get_records_by_project(self, project_name: str) -> List[FunctionRecord]:
+    def get_records_by_project(self, project_name: str,
+                               records: Optional[Iterable[FunctionRecord]] = None) -> List[FunctionRecord]:
         """
         根据项目名获取记录
         
         Args:
             project_name: 项目名（如 "IVC", "KAMP" 等）
+            records: 要查找的记录（可以是 iter_records() 生成器），默认使用 _record_source()
             
         Returns:
             该项目的记录列表
         """
-        return [r for r in self.records if project_name in r.function_name]
+        return [r for r in self._record_source(records) if project_name in r.function_name]
     
-    def get_unique_sql_patterns(self) -> List[str]:
+    def get_unique_sql_patterns(self, records: Optional[Iterable[FunctionRecord]] = None) -> List[str]:
         """
         获取唯一的SQL模式
         
+        Args:
+            records: 要统计的记录（可以是 iter_records() 生成器），默认使用 _record_source()
+        
         Returns:
             SQL模式列表
         """
         patterns = set()
-        for record in self.records:
+        for record in self._record_source(records):
             for stmt in record.sql_statement_list:
                 if isinstance(stmt, str):
                     patterns.add(stmt)
@@ -333,47 +584,48 @@ class DataReader:
         
         return sorted(list(patterns))
     
-    def export_to_format(self, output_path: Union[str, Path], format_type: str = "json") -> None:
+    @staticmethod
+    def _export_record_dict(record: FunctionRecord) -> Dict[str, Any]:
+        """导出用的记录字典（不含 code_meta_data）"""
+        return {
+            "function_name": record.function_name,
+            "orm_code": record.orm_code,
+            "caller": record.caller,
+            "sql_statement_list": record.sql_statement_list,
+            "sql_types": record.sql_types,
+            "sql_pattern_cnt": record.sql_pattern_cnt,
+            "source_file": record.source_file
+        }
+    
+    def export_to_format(self, output_path: Union[str, Path], format_type: str = "json",
+                         records: Optional[Iterable[FunctionRecord]] = None) -> None:
         """
-        导出数据到指定格式
+        导出数据到指定格式（逐条写出，流式模式下不把数据集读入内存）
         
         Args:
             output_path: 输出文件路径
             format_type: 格式类型 ("json", "csv", "jsonl")
+            records: 要导出的记录（可以是 iter_records() 生成器），默认使用 _record_source()
         """
+        if format_type not in ("json", "jsonl", "csv"):
+            raise ValueError(f"不支持的格式类型: {format_type}")
         output_path = Path(output_path)
+        source = self._record_source(records)
         
         if format_type == "json":
-            # 将记录转换为可序列化的字典
-            data = []
-            for record in self.records:
-                record_dict = {
-                    "function_name": record.function_name,
-                    "orm_code": record.orm_code,
-                    "caller": record.caller,
-                    "sql_statement_list": record.sql_statement_list,
-                    "sql_types": record.sql_types,
-                    "sql_pattern_cnt": record.sql_pattern_cnt,
-                    "source_file": record.source_file
-                }
-                data.append(record_dict)
-            
+            # 逐条写出数组元素，输出与 json.dump(列表, indent=2) 一致
             with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+                separator = '[\n  '
+                for record in source:
+                    item = json.dumps(self._export_record_dict(record), ensure_ascii=False, indent=2)
+                    f.write(separator + item.replace('\n', '\n  '))
+                    separator = ',\n  '
+                f.write('[]' if separator == '[\n  ' else '\n]')
                 
         elif format_type == "jsonl":
             with open(output_path, 'w', encoding='utf-8') as f:
-                for record in self.records:
-                    record_dict = {
-                        "function_name": record.function_name,
-                        "orm_code": record.orm_code,
-                        "caller": record.caller,
-                        "sql_statement_list": record.sql_statement_list,
-                        "sql_types": record.sql_types,
-                        "sql_pattern_cnt": record.sql_pattern_cnt,
-                        "source_file": record.source_file
-                    }
-                    f.write(json.dumps(record_dict, ensure_ascii=False) + '\n')
+                for record in source:
+                    f.write(json.dumps(self._export_record_dict(record), ensure_ascii=False) + '\n')
                     
         elif format_type == "csv":
             import csv
@@ -384,7 +636,7 @@ class DataReader:
                                'sql_types', 'sql_pattern_cnt', 'source_file'])
                 
                 # 写入数据
-                for record in self.records:
+                for record in source:
                     writer.writerow([
                         record.function_name,
                         record.orm_code[:200] + '...' if len(record.orm_code) > 200 else record.orm_code,
@@ -394,24 +646,33 @@ class DataReader:
                         record.sql_pattern_cnt,
                         record.source_file
                     ])
-        else:
-            raise ValueError(f"不支持的格式类型: {format_type}")
         
         logger.info(f"数据已导出到 {output_path}")
     
     def __iter__(self) -> Iterator[FunctionRecord]:
-        """迭代器支持"""
-        return iter(self.records)
+        """迭代器支持（流式模式下逐条读取文件）"""
+        return iter(self._record_source())
+    
+    def _require_loaded(self, operation: str) -> None:
+        """流式模式下记录不驻留内存，不支持需要随机访问的操作"""
+        if self.streaming:
+            raise TypeError(
+                f"流式模式的DataReader不支持{operation}：记录不驻留内存，"
+                f"请使用迭代（for record in reader）或以 streaming=False 创建读取器"
+            )
     
     def __len__(self) -> int:
-        """获取记录数量"""
+        """获取记录数量（流式模式下不支持）"""
+        self._require_loaded("len()")
         return len(self.records)
     
     def __getitem__(self, index: int) -> FunctionRecord:
-        """索引访问"""
+        """索引访问（流式模式下不支持）"""
+        self._require_loaded("索引访问")
         return self.records[index]
 
-    def extract_by_keywords(self, keywords: List[str], output_dir: str = "extracted_data", step_name: str = "keyword_extraction") -> Dict[str, Any]:
+    def extract_by_keywords(self, keywords: List[str], output_dir: str = "extracted_data", step_name: str = "keyword_extraction",
+                            records: Optional[Iterable[FunctionRecord]] = None) -> Dict[str, Any]:
         """
         根据关键词提取数据
         
@@ -419,134 +680,47 @@ class DataReader:
             keywords: 目标关键词列表
             output_dir: 输出根目录
             step_name: 处理步骤名称，用于创建子文件夹
+            records: 要提取的记录（可以是 iter_records() 生成器），默认使用 _record_source()
             
         Returns:
             提取结果统计
         """
-        import json
-        from pathlib import Path
-        from datetime import datetime
-        
-        # 创建带时间戳的子目录
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        step_dir = f"{step_name}_{timestamp}"
-        output_path = Path(output_dir) / step_dir
-        output_path.mkdir(parents=True, exist_ok=True)
-        
         logger.info(f"开始根据关键词提取数据，目标关键词: {len(keywords)}个")
         
-        # 如果还没有读取数据，则读取所有文件
-        if not self.records:
+        # 非流式模式下如果还没有读取数据，则读取所有文件
+        if records is None and not self.streaming and not self.records:
             logger.info("数据未加载，正在读取所有JSON文件...")
             self.read_all_files()
         
-        total_records = len(self.records)
-        logger.info(f"总共处理 {total_records:,} 条记录")
+        source = self._record_source(records)
+        total_records = len(source) if isinstance(source, list) else None
+        if total_records is not None:
+            logger.info(f"总共处理 {total_records:,} 条记录")
         
-        # 提取匹配的记录
+        # 提取匹配的记录（只有匹配的记录才转换为字典）
         matched_records = []
-        keyword_stats = {keyword: 0 for keyword in keywords}
-        file_stats = {}
-        
-        for i, record in enumerate(self.records):
+        processed = 0
+        for i, record in enumerate(source):
+            processed += 1
             if i % 5000 == 0 and i > 0:
-                logger.info(f"处理进度: {i:,}/{total_records:,} ({i/total_records*100:.1f}%)")
-            
-            # 检查记录中是否包含目标关键词
-            matched_keywords = []
-            
-            # 检查code_meta_data中的code_value
-            for meta in record.code_meta_data:
-                code_value = meta.code_value
-                for keyword in keywords:
-                    if keyword in code_value:
-                        if keyword not in matched_keywords:
-                            matched_keywords.append(keyword)
-            
-            # 也检查orm_code中是否包含关键词（作为补充）
-            for keyword in keywords:
-                if keyword in record.orm_code:
-                    if keyword not in matched_keywords:
-                        matched_keywords.append(keyword)
+                if total_records:
+                    logger.info(f"处理进度: {i:,}/{total_records:,} ({i/total_records*100:.1f}%)")
+                else:
+                    logger.info(f"处理进度: {i:,}")
             
+            # 检查code_meta_data中的code_value，也检查orm_code（作为补充）
+            matched_keywords = match_keywords(
+                [meta.code_value for meta in record.code_meta_data] + [record.orm_code], keywords
+            )
             if matched_keywords:
-                # 构建记录字典
-                record_dict = {
-                    'function_name': record.function_name,
-                    'orm_code': record.orm_code,
-                    'caller': record.caller,
-                    'sql_statement_list': record.sql_statement_list,
-                    'sql_types': record.sql_types,
-                    'code_meta_data': [
-                        {
-                            'code_file': meta.code_file,
-                            'code_start_line': meta.code_start_line,
-                            'code_end_line': meta.code_end_line,
-                            'code_key': meta.code_key,
-                            'code_value': meta.code_value,
-                            'code_label': meta.code_label,
-                            'code_type': meta.code_type,
-                            'code_version': meta.code_version
-                        } for meta in record.code_meta_data
-                    ],
-                    'sql_pattern_cnt': record.sql_pattern_cnt,
-                    'source_file': record.source_file,
-                    'matched_keywords': matched_keywords
-                }
+                record_dict = function_record_to_dict(record)
+                record_dict['matched_keywords'] = matched_keywords
                 matched_records.append(record_dict)
-                
-                # 统计关键词频率
-                for keyword in matched_keywords:
-                    keyword_stats[keyword] += 1
-                
-                # 统计来源文件
-                source_file = Path(record.source_file).name
-                if source_file not in file_stats:
-                    file_stats[source_file] = 0
-                file_stats[source_file] += 1
         
         logger.info(f"关键词匹配完成，找到 {len(matched_records):,} 条匹配记录")
         
-        # 保存主数据文件
-        output_file = output_path / "keyword_matched_records.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(matched_records, f, ensure_ascii=False, indent=2)
-        logger.info(f"主数据文件已保存: {output_file}")
-        
-        # 生成按关键词分类的文件
-        keyword_dir = output_path / "by_keyword"
-        keyword_dir.mkdir(exist_ok=True)
-        
-        for keyword in keywords:
-            keyword_records = []
-            for record in matched_records:
-                if keyword in record.get('matched_keywords', []):
-                    keyword_records.append(record)
-            
-            if keyword_records:
-                keyword_file = keyword_dir / f"{keyword}_records.json"
-                with open(keyword_file, 'w', encoding='utf-8') as f:
-                    json.dump(keyword_records, f, ensure_ascii=False, indent=2)
-                logger.info(f"{keyword}: {len(keyword_records)} 条记录 -> {keyword_file}")
-        
-        # 生成统计报告
-        stats = {
-            'total_records_processed': total_records,
-            'matched_records': len(matched_records),
-            'match_rate': len(matched_records) / total_records * 100 if total_records > 0 else 0,
-            'keyword_frequency': dict(sorted(keyword_stats.items(), key=lambda x: x[1], reverse=True)),
-            'source_file_distribution': dict(sorted(file_stats.items(), key=lambda x: x[1], reverse=True)),
-            'target_keywords': keywords,
-            'output_directory': str(output_path),
-            'generated_at': datetime.now().isoformat()
-        }
-        
-        stats_file = output_path / "extraction_statistics.json"
-        with open(stats_file, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2, default=str)
-        logger.info(f"统计报告已保存: {stats_file}")
-        
-        return stats
+        stats = build_keyword_extraction_stats(matched_records, processed, keywords)
+        return save_keyword_extraction_report(output_dir, step_name, matched_records, stats)
 
     def extract_gorm_keywords(self, output_dir: str = "extracted_data") -> Dict[str, Any]:
         """
@@ -558,36 +732,288 @@ class DataReader:
         Returns:
             提取结果统计
         """
-        gorm_keywords = [
-            "Preload",
-            "Transaction", 
-            "Scopes",
-            "FindInBatches",
-            "FirstOrInit",
-            "Association",
-            "Locking",
-            "Pluck",
-            "Callbacks",
-            "AutoMigrate",
-            "ForeignKey",
-            "References",
-            "NamedQuery",
-            "Hooks",
-            "NamedParameters",
-            "save",
-            "createorupdate"
-        ]
+        logger.info(f"使用预定义的GORM关键词列表: {GORM_KEYWORDS}")
+        return self.extract_by_keywords(GORM_KEYWORDS, output_dir, "gorm_keywords")
+
+
+# 预定义的GORM关键词列表
+GORM_KEYWORDS = [
+    "Preload",
+    "Transaction", 
+    "Scopes",
+    "FindInBatches",
+    "FirstOrInit",
+    "Association",
+    "Locking",
+    "Pluck",
+    "Callbacks",
+    "AutoMigrate",
+    "ForeignKey",
+    "References",
+    "NamedQuery",
+    "Hooks",
+    "NamedParameters",
+    "save",
+    "createorupdate"
+]
+
+
+def code_meta_to_dict(meta: CodeMetaData) -> Dict[str, Any]:
+    """将CodeMetaData转换为字典"""
+    return {
+        'code_file': meta.code_file,
+        'code_start_line': meta.code_start_line,
+        'code_end_line': meta.code_end_line,
+        'code_key': meta.code_key,
+        'code_value': meta.code_value,
+        'code_label': meta.code_label,
+        'code_type': meta.code_type,
+        'code_version': meta.code_version
+    }
+
+
+def function_record_to_dict(record: FunctionRecord) -> Dict[str, Any]:
+    """将FunctionRecord转换为工作流使用的字典格式"""
+    return {
+        'function_name': record.function_name,
+        'orm_code': record.orm_code,
+        'caller': record.caller,
+        'sql_statement_list': record.sql_statement_list,
+        'sql_types': record.sql_types,
+        'code_meta_data': [code_meta_to_dict(meta) for meta in record.code_meta_data],
+        'sql_pattern_cnt': record.sql_pattern_cnt,
+        'source_file': record.source_file
+    }
+
+
+class FunctionRecordView(MutableMapping):
+    """FunctionRecord 的字典视图
+    
+    让按字典访问记录的代码（record['orm_code']、record.get(...)、RecordStore 等）直接作用于
+    read_all_files / iter_records 得到的 FunctionRecord，而不必先为每条记录构造完整的字典
+    （工作流的 load_raw_dataset 仍使用 read_all_dicts 的普通字典）：
+    - 记录字段直接读写 FunctionRecord 的属性
+    - code_meta_data 首次访问时才转换为字典列表
+    - 新增的键（如 matched_keywords）保存在视图自身
+    
+    需要 json.dump 时用 to_dict() 转换（write_json_array 会自动转换）。
+    """
+    
+    __slots__ = ('record', '_extra', '_deleted')
+    
+    _FIELDS = ('function_name', 'orm_code', 'caller', 'sql_statement_list', 'sql_types',
+               'code_meta_data', 'sql_pattern_cnt', 'source_file')
+    
+    def __init__(self, record: FunctionRecord):
+        self.record = record
+        self._extra: Optional[Dict[str, Any]] = None
+        self._deleted: Optional[set] = None
+    
+    def _is_field(self, key: str) -> bool:
+        return key in self._FIELDS and not (self._deleted and key in self._deleted)
+    
+    def __getitem__(self, key: str) -> Any:
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        if not self._is_field(key):
+            raise KeyError(key)
+        if key == 'code_meta_data':
+            # 转换后缓存，调用方对列表的修改可以保留下来
+            value = [code_meta_to_dict(meta) for meta in self.record.code_meta_data]
+            self._set_extra(key, value)
+            return value
+        return getattr(self.record, key)
+    
+    def _set_extra(self, key: str, value: Any) -> None:
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        if self._deleted:
+            self._deleted.discard(key)
+        if key in self._FIELDS and key != 'code_meta_data':
+            setattr(self.record, key, value)
+        else:
+            self._set_extra(key, value)
+    
+    def __delitem__(self, key: str) -> None:
+        found = False
+        if self._extra and key in self._extra:
+            del self._extra[key]
+            found = True
+        if self._is_field(key):
+            if self._deleted is None:
+                self._deleted = set()
+            self._deleted.add(key)
+            found = True
+        if not found:
+            raise KeyError(key)
+    
+    def __iter__(self) -> Iterator[str]:
+        for key in self._FIELDS:
+            if self._is_field(key):
+                yield key
+        if self._extra:
+            for key in self._extra:
+                if key not in self._FIELDS:
+                    yield key
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为普通字典（与 function_record_to_dict 的格式一致，附加新增的键）"""
+        return {key: self[key] for key in self}
+    
+    def copy(self) -> Dict[str, Any]:
+        """浅拷贝为普通字典（与 dict.copy 一致）"""
+        return self.to_dict()
+    
+    def __repr__(self) -> str:
+        return f"FunctionRecordView({self.to_dict()!r})"
+
+
+def match_keywords(texts: List[str], keywords: List[str]) -> List[str]:
+    """
+    查找文本中出现的关键词
+    
+    Args:
+        texts: 待检查的文本（按顺序检查）
+        keywords: 目标关键词列表
+        
+    Returns:
+        出现的关键词，按首次匹配的顺序去重
+    """
+    # 同一组关键词的匹配器只编译一次，每段文本只扫描一遍
+    from utils.keyword_matcher import get_keyword_matcher
+    matcher = get_keyword_matcher(keywords)
+    matched_keywords = []
+    for text in texts:
+        for keyword in matcher.find_all(text):
+            if keyword not in matched_keywords:
+                matched_keywords.append(keyword)
+    return matched_keywords
+
+
+def extract_keyword_records(records: List[Dict[str, Any]], keywords: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    直接在字典记录上按关键词提取数据（不转换为FunctionRecord、不落盘）
+    
+    Args:
+        records: 字典格式的记录列表
+        keywords: 目标关键词列表
+        
+    Returns:
+        (匹配的记录, 提取统计)；匹配的记录是原记录的浅拷贝，附加 matched_keywords 字段
+    """
+    matched_records = []
+    for record in records:
+        texts = [meta.get('code_value', '') for meta in record.get('code_meta_data') or []]
+        texts.append(record.get('orm_code', ''))
+        matched_keywords = match_keywords(texts, keywords)
+        if matched_keywords:
+            matched_record = dict(record)
+            matched_record['matched_keywords'] = matched_keywords
+            matched_records.append(matched_record)
+    
+    return matched_records, build_keyword_extraction_stats(matched_records, len(records), keywords)
+
+
+def build_keyword_extraction_stats(matched_records: List[Dict[str, Any]], total_records: int,
+                                   keywords: List[str]) -> Dict[str, Any]:
+    """统计关键词频率和来源文件分布"""
+    keyword_stats = {keyword: 0 for keyword in keywords}
+    file_stats = {}
+    for record in matched_records:
+        for keyword in record['matched_keywords']:
+            keyword_stats[keyword] += 1
+        source_file = Path(record.get('source_file', '')).name
+        file_stats[source_file] = file_stats.get(source_file, 0) + 1
+    
+    return {
+        'total_records_processed': total_records,
+        'matched_records': len(matched_records),
+        'match_rate': len(matched_records) / total_records * 100 if total_records > 0 else 0,
+        'keyword_frequency': dict(sorted(keyword_stats.items(), key=lambda x: x[1], reverse=True)),
+        'source_file_distribution': dict(sorted(file_stats.items(), key=lambda x: x[1], reverse=True)),
+        'target_keywords': keywords,
+        'generated_at': datetime.now().isoformat()
+    }
+
+
+def save_keyword_extraction_report(output_dir: Union[str, Path], step_name: str,
+                                   matched_records: List[Dict[str, Any]], stats: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    保存关键词提取结果：主数据文件、按关键词分类的文件和统计报告
+    
+    Args:
+        output_dir: 输出根目录，结果写入带时间戳的子目录
+        step_name: 处理步骤名称
+        matched_records: 匹配的记录
+        stats: build_keyword_extraction_stats 的统计结果
         
-        logger.info(f"使用预定义的GORM关键词列表: {gorm_keywords}")
-        return self.extract_by_keywords(gorm_keywords, output_dir, "gorm_keywords")
+    Returns:
+        带 output_directory 的统计结果
+    """
+    from utils.json_stream import output_format, with_format
+    from utils.step_journal import write_records
+    
+    # 创建带时间戳的子目录
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = Path(output_dir) / f"{step_name}_{timestamp}"
+    output_path.mkdir(parents=True, exist_ok=True)
+    record_format = output_format()
+    
+    # 保存主数据文件（按配置的输出格式）
+    output_file = with_format(output_path / "keyword_matched_records.json", record_format)
+    stats = {**stats, 'output_directory': str(output_path), 'matched_records_file': str(output_file)}
+    write_records(output_file, matched_records)
+    logger.info(f"主数据文件已保存: {output_file}")
+    
+    # 生成按关键词分类的文件（一次遍历完成分组）
+    keyword_dir = output_path / "by_keyword"
+    keyword_dir.mkdir(exist_ok=True)
+    by_keyword: Dict[str, List[Dict[str, Any]]] = {}
+    for record in matched_records:
+        for keyword in record.get('matched_keywords', []):
+            by_keyword.setdefault(keyword, []).append(record)
+    
+    for keyword in stats['target_keywords']:
+        keyword_records = by_keyword.get(keyword)
+        if keyword_records:
+            keyword_file = with_format(keyword_dir / f"{keyword}_records.json", record_format)
+            write_records(keyword_file, keyword_records)
+            logger.info(f"{keyword}: {len(keyword_records)} 条记录 -> {keyword_file}")
+    
+    # 生成统计报告
+    stats_file = output_path / "extraction_statistics.json"
+    with open(stats_file, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, ensure_ascii=False, indent=2, default=str)
+    logger.info(f"统计报告已保存: {stats_file}")
+    
+    return stats
 
 
 class DataSampler:
-    """数据采样器"""
+    """数据采样器
+    
+    读取器处于流式模式时使用蓄水池采样，单次遍历数据，只在内存中保留采样结果。
+    """
     
     def __init__(self, reader: DataReader):
         self.reader = reader
     
+    @staticmethod
+    def _reservoir_add(reservoir: List[FunctionRecord], seen: int, record: FunctionRecord, n: int, rng) -> None:
+        """蓄水池采样：seen 为加入该记录前已见过的记录数"""
+        if len(reservoir) < n:
+            reservoir.append(record)
+        else:
+            j = rng.randint(0, seen)
+            if j < n:
+                reservoir[j] = record
+    
     def random_sample(self, n: int, seed: Optional[int] = None) -> List[FunctionRecord]:
         """
         随机采样
@@ -603,6 +1029,12 @@ class DataSampler:
         if seed is not None:
             random.seed(seed)
         
+        if self.reader.streaming:
+            reservoir: List[FunctionRecord] = []
+            for seen, record in enumerate(self.reader.iter_records()):
+                self._reservoir_add(reservoir, seen, record, n, random)
+            return reservoir
+        
         if n >= len(self.reader.records):
             return self.reader.records.copy()
         
@@ -620,6 +1052,11 @@ class DataSampler:
             采样记录列表
         """
         if by_sql_type:
+            import random
+            
+            if self.reader.streaming:
+                return self._stratified_sample_streaming(n)
+            
             # 按SQL类型分组
             groups = {}
             for record in self.reader.records:
@@ -639,20 +1076,47 @@ class DataSampler:
                 if sample_size >= group_size:
                     samples.extend(group_records)
                 else:
-                    import random
                     samples.extend(random.sample(group_records, sample_size))
             
             # 如果采样数量不足，随机补充
             if len(samples) < n:
                 remaining = [r for r in self.reader.records if r not in samples]
                 if remaining:
-                    import random
                     additional = min(n - len(samples), len(remaining))
                     samples.extend(random.sample(remaining, additional))
             
             return samples[:n]
         
         return self.random_sample(n)
+    
+    def _stratified_sample_streaming(self, n: int) -> List[FunctionRecord]:
+        """流式分层采样：每个分组维护容量为n的蓄水池，遍历结束后按分组比例取样"""
+        import random
+        
+        group_counts: Dict[Any, int] = {}
+        reservoirs: Dict[Any, List[FunctionRecord]] = {}
+        for record in self.reader.iter_records():
+            key = tuple(sorted(record.sql_types)) if record.sql_types else "no_sql"
+            seen = group_counts.get(key, 0)
+            self._reservoir_add(reservoirs.setdefault(key, []), seen, record, n, random)
+            group_counts[key] = seen + 1
+        
+        total_records = sum(group_counts.values())
+        samples = []
+        remaining = []
+        for key, reservoir in reservoirs.items():
+            sample_size = max(1, int(n * group_counts[key] / total_records))
+            # 蓄水池未满时按到达顺序排列，先打乱再取前 sample_size 条
+            random.shuffle(reservoir)
+            samples.extend(reservoir[:sample_size])
+            remaining.extend(reservoir[sample_size:])
+        
+        # 如果采样数量不足，从各分组蓄水池剩余的记录中随机补充
+        if len(samples) < n and remaining:
+            additional = min(n - len(samples), len(remaining))
+            samples.extend(random.sample(remaining, additional))
+        
+        return samples[:n]
 
 
 # 使用示例和测试函数
@@ -0,0 +1,128 @@
+"""
+原始数据集快照缓存
+
+load_raw_dataset 每次都要重新解析同一批未变化的原始JSON文件。首次解析后把结果（字典格式的记录
+和文件统计）写成一个二进制快照，之后的运行直接整体读入快照，不再解析JSON：
+- 快照键由输入文件的绝对路径、大小和修改时间（纳秒）计算，任一文件新增、删除或变化都会使快照失效并重建
+- 同一数据目录只保留最新的快照，重建时删除旧快照
+- 快照使用 pickle 格式（标准库，读取为C实现的整体反序列化），先写临时文件再原子替换
+
+快照只由本机工作流写入和读取，不要从不可信来源复制快照文件。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# 快照内容格式版本，记录字典格式变化时递增使旧快照失效
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".pkl"
+
+
+def _dir_tag(data_dir: Union[str, Path]) -> str:
+    return hashlib.sha256(str(Path(data_dir).resolve()).encode('utf-8')).hexdigest()[:12]
+
+
+def snapshot_key(files: List[Path]) -> str:
+    """按输入文件的绝对路径、大小和修改时间计算快照键"""
+    entries = []
+    for file_path in files:
+        stat = os.stat(file_path)
+        entries.append([str(Path(file_path).resolve()), stat.st_size, stat.st_mtime_ns])
+    payload = json.dumps({'version': SNAPSHOT_VERSION, 'files': entries}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DatasetSnapshotCache:
+    """原始数据集快照缓存"""
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        """
+        初始化快照缓存
+
+        Args:
+            cache_dir: 快照文件目录
+        """
+        self.cache_dir = Path(cache_dir)
+
+    def snapshot_path(self, data_dir: Union[str, Path], key: str) -> Path:
+        """数据目录和快照键对应的快照文件"""
+        return self.cache_dir / f"raw_dataset_{_dir_tag(data_dir)}_{key[:16]}{SNAPSHOT_SUFFIX}"
+
+    def load(self, data_dir: Union[str, Path], key: str
+             ) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]]:
+        """
+        读取与当前输入文件一致的快照
+
+        Args:
+            data_dir: 原始数据目录
+            key: 当前输入文件的快照键（snapshot_key）
+
+        Returns:
+            (记录列表, 文件统计)，没有可用快照时返回None
+        """
+        path = self.snapshot_path(data_dir, key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as f:
+                snapshot = pickle.loads(f.read())
+            if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('key') != key:
+                logger.info(f"快照与当前输入不一致，将重建: {path}")
+                return None
+            logger.info(f"⚡ 从快照加载原始数据集: {path}（{len(snapshot['records']):,} 条记录）")
+            return snapshot['records'], snapshot['file_stats']
+        except Exception as e:
+            logger.warning(f"⚠️ 读取快照失败，将重新解析原始数据: {path}: {e}")
+            return None
+
+    def save(self, data_dir: Union[str, Path], files: List[Path], key: str,
+             records: List[Dict[str, Any]], file_stats: Dict[str, Dict[str, Any]]) -> Optional[Path]:
+        """
+        写出快照并删除同一数据目录的旧快照
+
+        Args:
+            data_dir: 原始数据目录
+            files: 输入文件列表
+            key: 解析前计算的快照键；解析期间输入文件发生变化时不写快照
+            records: 记录列表
+            file_stats: 文件统计
+
+        Returns:
+            快照文件路径，未写出时返回None
+        """
+        if snapshot_key(files) != key:
+            logger.warning("⚠️ 读取期间原始数据文件发生变化，本次不写快照")
+            return None
+
+        path = self.snapshot_path(data_dir, key)
+        tmp_path = path.with_name(path.name + '.tmp')
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'key': key,
+            'data_dir': str(Path(data_dir).resolve()),
+            'file_stats': file_stats,
+            'records': records
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ 写出快照失败: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return None
+
+        for old_path in self.cache_dir.glob(f"raw_dataset_{_dir_tag(data_dir)}_*{SNAPSHOT_SUFFIX}"):
+            if old_path != path:
+                old_path.unlink(missing_ok=True)
+
+        logger.info(f"💾 原始数据集快照已保存: {path}")
+        return path
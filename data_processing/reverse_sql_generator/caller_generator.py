@@ -26,11 +26,8 @@ class CallerGenerator:
     
     @property
     def session(self):
-        """获取aiohttp session（懒加载）"""
-        if self._session is None:
-            import aiohttp
-            self._session = aiohttp.ClientSession()
-        return self._session
+        """获取aiohttp session（按服务器共享连接池）"""
+        return self.llm_client.get_session()
     
     async def generate_caller(self, orm_code: Dict, scenario: str) -> Dict:
         """生成基本调用者代码
@@ -961,7 +958,5 @@ class CallerGenerator:
             raise ValueError("Caller代码不能为空")
     
     async def close(self):
-        """关闭会话"""
-        if self._session:
-            await self._session.close()
-            self._session = None 
\ No newline at end of file
+        """释放会话引用（共享连接池由 close_shared_sessions 统一关闭）"""
+        self._session = None 
\ No newline at end of file
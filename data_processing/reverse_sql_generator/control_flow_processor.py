@@ -27,11 +27,8 @@ class ControlFlowProcessor:
     
     @property
     def session(self):
-        """获取aiohttp session（懒加载）"""
-        if self._session is None:
-            import aiohttp
-            self._session = aiohttp.ClientSession()
-        return self._session
+        """获取aiohttp session（按服务器共享连接池）"""
+        return self.llm_client.get_session()
     
     async def process_control_flow(self, base_sql: Dict, orm_code: Dict, scenario: str, complexity: str) -> List[Dict]:
         """处理控制流，生成SQL变体
@@ -230,7 +227,5 @@ class ControlFlowProcessor:
         return await self.sql_generator.generate_sql_variants(base_sql, "conditional_meta", scenario, "medium")
     
     async def close(self):
-        """关闭会话"""
-        if self._session:
-            await self._session.close()
-            self._session = None 
\ No newline at end of file
+        """释放会话引用（共享连接池由 close_shared_sessions 统一关闭）"""
+        self._session = None 
\ No newline at end of file
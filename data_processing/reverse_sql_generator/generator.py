@@ -3,13 +3,13 @@
 """
 import json
 import asyncio
-import random
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
 from utils.format_validators import validate_synthetic_data_response
 
 from utils.llm_client import LLMClient
+from utils.retry_policy import get_retry_policy
 from config.data_processing.reverse_sql_generator.config import ReverseSQLConfig
 from .sql_generator import SQLGenerator
 from .orm_mapper import ORMMapper
@@ -81,72 +81,78 @@ class ReverseSQLGenerator:
     
     @property
     def session(self):
-        """获取aiohttp session（懒加载）"""
-        if self._session is None:
-            import aiohttp
-            self._session = aiohttp.ClientSession()
-        return self._session
+        """获取aiohttp session（按服务器共享连接池）"""
+        return self.llm_client.get_session()
     
     async def _exponential_backoff_delay(self, attempt: int, base_delay: float = 1.0, max_delay: float = 60.0):
-        """指数退避延迟
+        """指数退避延迟（统一重试策略的 decorrelated jitter）
         
         Args:
             attempt: 当前尝试次数
             base_delay: 基础延迟时间（秒）
             max_delay: 最大延迟时间（秒）
         """
-        delay = min(base_delay * (2 ** attempt) + random.uniform(0, 1), max_delay)
+        delay = get_retry_policy().delay_for_attempt(attempt, base_delay, max_delay)
         print(f"⏳ 等待 {delay:.1f} 秒后重试...")
         await asyncio.sleep(delay)
     
     async def _retry_with_backoff(self, operation, operation_name: str, max_retries: int = 10):
-        """带指数退避的重试机制
+        """带指数退避的重试机制（统一重试策略：退避抖动 + 全局重试预算）
+        
+        底层HTTP请求的按副本熔断由 LLMClient 负责，熔断时这里直接失败而不再重试。
         
         Args:
             operation: 要执行的操作（异步函数）
             operation_name: 操作名称（用于日志）
-            max_retries: 最大重试次数
+            max_retries: 最大尝试次数
             
         Returns:
             操作结果
         """
-        for attempt in range(max_retries):
-            try:
-                print(f"🔄 {operation_name} 尝试 {attempt + 1}/{max_retries}")
-                result = await operation()
-                
-                # 检查结果是否为空或无效
-                if result is None or (isinstance(result, str) and not result.strip()):
-                    print(f"⚠️ {operation_name} 返回空响应，将重试")
-                    if attempt < max_retries - 1:
-                        await self._exponential_backoff_delay(attempt)
-                        continue
-                    else:
-                        raise ValueError(f"{operation_name} 返回空响应，已重试 {max_retries} 次")
-                
-                print(f"✅ {operation_name} 成功")
-                return result
-            except Exception as e:
-                error_msg = str(e)
-                print(f"❌ {operation_name} 尝试 {attempt + 1} 失败: {error_msg}")
-                
-                # 根据错误类型决定是否重试
-                if "超时" in error_msg or "timeout" in error_msg.lower():
-                    print(f"  - 检测到超时错误，将重试")
-                elif "Expecting value" in error_msg or "JSON" in error_msg:
-                    print(f"  - 检测到JSON解析错误，将重试")
-                elif "连接" in error_msg or "connection" in error_msg.lower():
-                    print(f"  - 检测到连接错误，将重试")
-                elif "空响应" in error_msg:
-                    print(f"  - 检测到空响应错误，将重试")
-                else:
-                    print(f"  - 未知错误类型，将重试")
-                
-                if attempt < max_retries - 1:
-                    await self._exponential_backoff_delay(attempt)
-                else:
-                    print(f"❌ {operation_name} 最终失败: 已重试 {max_retries} 次")
-                    raise
+        attempt_counter = {'attempt': 0}
+        
+        async def attempt_operation():
+            attempt_counter['attempt'] += 1
+            print(f"🔄 {operation_name} 尝试 {attempt_counter['attempt']}/{max_retries}")
+            result = await operation()
+            # 检查结果是否为空或无效
+            if result is None or (isinstance(result, str) and not result.strip()):
+                print(f"⚠️ {operation_name} 返回空响应，将重试")
+                raise ValueError(f"{operation_name} 返回空响应")
+            return result
+        
+        def report_retry(attempt, e, delay):
+            error_msg = str(e)
+            print(f"❌ {operation_name} 尝试 {attempt + 1} 失败: {error_msg}")
+            
+            # 根据错误类型输出日志
+            if "超时" in error_msg or "timeout" in error_msg.lower():
+                print(f"  - 检测到超时错误，将重试")
+            elif "Expecting value" in error_msg or "JSON" in error_msg:
+                print(f"  - 检测到JSON解析错误，将重试")
+            elif "连接" in error_msg or "connection" in error_msg.lower():
+                print(f"  - 检测到连接错误，将重试")
+            elif "空响应" in error_msg:
+                print(f"  - 检测到空响应错误，将重试")
+            else:
+                print(f"  - 未知错误类型，将重试")
+            print(f"⏳ 等待 {delay:.1f} 秒后重试...")
+        
+        try:
+            result = await get_retry_policy().run(
+                attempt_operation,
+                operation_name=operation_name,
+                max_retries=max_retries - 1,
+                on_retry=report_retry,
+                # 每次HTTP请求已由 LLMClient 记入重试预算
+                record_requests=False
+            )
+        except Exception as e:
+            print(f"❌ {operation_name} 最终失败 (尝试 {attempt_counter['attempt']}/{max_retries}): {e}")
+            raise
+        
+        print(f"✅ {operation_name} 成功")
+        return result
     
     async def generate_complete_case(self, scenario: str, complexity: str = "simple") -> Dict:
         """生成完整的反向案例
@@ -891,11 +897,12 @@ class ReverseSQLGenerator:
         return all(field in orm_data for field in required_fields)
     
     async def close(self):
-        """关闭所有会话和连接"""
-        if self._session:
-            await self._session.close()
-            self._session = None
-            print("  - 已关闭主会话")
+        """释放会话引用并关闭各组件
+        
+        按服务器共享的连接池可能仍被其他组件使用，不在这里关闭，由事件循环结束时统一关闭。
+        """
+        self._session = None
+        print("  - 已释放共享连接池引用（连接池在事件循环结束时关闭）")
         
         # 关闭各个组件的会话
         if hasattr(self.sql_generator, 'close'):
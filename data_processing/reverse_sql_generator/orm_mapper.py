@@ -26,11 +26,8 @@ class ORMMapper:
     
     @property
     def session(self):
-        """获取aiohttp session（懒加载）"""
-        if self._session is None:
-            import aiohttp
-            self._session = aiohttp.ClientSession()
-        return self._session
+        """获取aiohttp session（按服务器共享连接池）"""
+        return self.llm_client.get_session()
     
     async def sql_to_orm(self, base_sql: Dict) -> Dict:
         """将SQL查询转换为ORM代码
@@ -272,7 +269,5 @@ class ORMMapper:
             raise ValueError("ORM代码不能为空")
     
     async def close(self):
-        """关闭会话"""
-        if self._session:
-            await self._session.close()
-            self._session = None 
\ No newline at end of file
+        """释放会话引用（共享连接池由 close_shared_sessions 统一关闭）"""
+        self._session = None 
\ No newline at end of file
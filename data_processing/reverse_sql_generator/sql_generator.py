@@ -27,11 +27,8 @@ class SQLGenerator:
     
     @property
     def session(self):
-        """获取aiohttp session（懒加载）"""
-        if self._session is None:
-            import aiohttp
-            self._session = aiohttp.ClientSession()
-        return self._session
+        """获取aiohttp session（按服务器共享连接池）"""
+        return self.llm_client.get_session()
     
     async def generate_complete_sql(self, scenario: str, complexity: str = "simple") -> Dict:
         """生成完整的SQL查询
@@ -222,10 +219,8 @@ class SQLGenerator:
         return True
     
     async def close(self):
-        """关闭会话"""
-        if self._session:
-            await self._session.close()
-            self._session = None
+        """释放会话引用（共享连接池由 close_shared_sessions 统一关闭）"""
+        self._session = None
     
     async def generate_sql_variants(self, base_sql: Dict, variant_type: str, scenario: str = None, complexity: str = "simple") -> List[Dict]:
         """生成SQL变体
@@ -45,11 +45,8 @@ class SyntheticDataGenerator:
     
     @property
     def session(self):
-        """获取aiohttp session（懒加载）"""
-        if self._session is None:
-            import aiohttp
-            self._session = aiohttp.ClientSession()
-        return self._session
+        """获取aiohttp session（按服务器共享连接池）"""
+        return self.llm_client.get_session()
     
     def _load_full_scenarios(self) -> Dict:
         """加载full_scenario.json文件"""
@@ -1176,4 +1173,8 @@ class SyntheticDataGenerator:
 
     async def _generate_with_count_pack(self) -> Dict:
         """生成with_count场景的数据包"""
-        return await self._generate_with_method_pack("count") 
\ No newline at end of file
+        return await self._generate_with_method_pack("count")
+
+    async def close(self):
+        """释放会话引用（共享连接池可能仍被其他组件使用，由事件循环结束时统一关闭）"""
+        self._session = None
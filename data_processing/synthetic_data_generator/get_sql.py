@@ -8,7 +8,6 @@ from tqdm import tqdm
 import time
 import base64
 from mimetypes import guess_type
-import random
 from typing import Any, Dict, List
 import aiohttp # Added for call_async_with_format_validation
 
@@ -72,8 +71,8 @@ SCENARIO_SQL_RULES = {
     ),
 }
 
-# 添加指数退避重试机制
-async def retry_with_exponential_backoff(func, max_retries=10, base_delay=1.0, max_delay=60.0, backoff_factor=2.0, jitter=True):
+# 添加指数退避重试机制（统一重试策略：decorrelated jitter + 全局重试预算 + 按端点熔断）
+async def retry_with_exponential_backoff(func, max_retries=10, base_delay=1.0, max_delay=60.0, endpoint=None):
     """
     带指数退避的重试机制
     
@@ -82,36 +81,21 @@ async def retry_with_exponential_backoff(func, max_retries=10, base_delay=1.0, m
         max_retries: 最大重试次数
         base_delay: 基础延迟时间（秒）
         max_delay: 最大延迟时间（秒）
-        backoff_factor: 退避因子
-        jitter: 是否添加随机抖动
+        endpoint: 请求的服务地址，提供时按该地址熔断
     """
-    last_exception = None
-    
-    for attempt in range(max_retries + 1):  # 包括第一次尝试
-        try:
-            return await func()
-        except Exception as e:
-            last_exception = e
-            
-            if attempt == max_retries:
-                # 最后一次重试失败，抛出异常
-                break
-            
-            # 计算延迟时间
-            delay = min(base_delay * (backoff_factor ** attempt), max_delay)
-            
-            # 添加随机抖动以避免惊群效应
-            if jitter:
-                delay = delay * (0.5 + random.random() * 0.5)
-            
-            print(f"第 {attempt + 1} 次尝试失败，{delay:.2f}秒后重试: {str(e)[:100]}")
-            await asyncio.sleep(delay)
-    
-    # 如果所有重试都失败，抛出最后一个异常
-    if last_exception is not None:
-        raise last_exception
-    else:
-        raise Exception("所有重试都失败，但没有捕获到具体异常")
+    from utils.retry_policy import get_retry_policy
+    
+    def report_retry(attempt, e, delay):
+        print(f"第 {attempt + 1} 次尝试失败，{delay:.2f}秒后重试: {str(e)[:100]}")
+    
+    return await get_retry_policy().run(
+        func,
+        endpoint=endpoint,
+        max_retries=max_retries,
+        base_delay=base_delay,
+        max_delay=max_delay,
+        on_retry=report_retry
+    )
 
 # 互斥条件场景专用SQL生成函数
 async def generate_mutual_exclusive_sql(orm_code: str, llm_client, semaphore=None) -> Dict:
@@ -193,16 +177,7 @@ async def analyze_mutual_exclusive_sql(orm_code: str, function_name: str = "", c
     
     if semaphore:
         async with semaphore:
-            async with aiohttp.ClientSession() as session:
-                response = await llm_client.call_async_with_format_validation(
-                    session=session,
-                    prompt=prompt,
-                    validator=validate_json_response,
-                    max_tokens=4096,
-                    temperature=0.0
-                )
-    else:
-        async with aiohttp.ClientSession() as session:
+            session = llm_client.get_session()
             response = await llm_client.call_async_with_format_validation(
                 session=session,
                 prompt=prompt,
@@ -210,6 +185,15 @@ async def analyze_mutual_exclusive_sql(orm_code: str, function_name: str = "", c
                 max_tokens=4096,
                 temperature=0.0
             )
+    else:
+        session = llm_client.get_session()
+        response = await llm_client.call_async_with_format_validation(
+            session=session,
+            prompt=prompt,
+            validator=validate_json_response,
+            max_tokens=4096,
+            temperature=0.0
+        )
     
     # 处理LLM响应 - 支持分析报告格式和JSON格式
     def parse_llm_response(response_text: str) -> dict:
@@ -533,16 +517,7 @@ async def verify_mutual_exclusive_sql(sql_analysis: List[Dict], orm_code: str, f
     
     if semaphore:
         async with semaphore:
-            async with aiohttp.ClientSession() as session:
-                response = await llm_client.call_async_with_format_validation(
-                    session=session,
-                    prompt=prompt,
-                    validator=validate_json_response,
-                    max_tokens=2048,
-                    temperature=0.0
-                )
-    else:
-        async with aiohttp.ClientSession() as session:
+            session = llm_client.get_session()
             response = await llm_client.call_async_with_format_validation(
                 session=session,
                 prompt=prompt,
@@ -550,6 +525,15 @@ async def verify_mutual_exclusive_sql(sql_analysis: List[Dict], orm_code: str, f
                 max_tokens=2048,
                 temperature=0.0
             )
+    else:
+        session = llm_client.get_session()
+        response = await llm_client.call_async_with_format_validation(
+            session=session,
+            prompt=prompt,
+            validator=validate_json_response,
+            max_tokens=2048,
+            temperature=0.0
+        )
     
     # 处理LLM响应 - 支持分析报告格式和JSON格式
     def parse_llm_response(response_text: str) -> dict:
@@ -824,29 +808,37 @@ async def verify_mutual_exclusive_sql(sql_analysis: List[Dict], orm_code: str, f
     print(f"验证后SQL分析结果长度: {len(str(verified_sql_analysis))} 字符")
     return verified_sql_analysis
 
+# 中间结果文件：json 格式沿用 <output_file>.<stage_name>.tmp，其他输出格式追加对应后缀（如 .tmp.jsonl）
+def intermediate_result_files(output_file, stage_name):
+    """各输出格式下的中间结果文件路径，配置的输出格式排在最前"""
+    from utils.json_stream import FORMAT_SUFFIXES, output_format
+    base = f"{output_file}.{stage_name}.tmp"
+    formats = [output_format()] + [fmt for fmt in FORMAT_SUFFIXES if fmt != output_format()]
+    return [base if fmt == 'json' else base + FORMAT_SUFFIXES[fmt] for fmt in formats]
+
 # 保存中间结果的函数
 def save_intermediate_results(results, output_file, stage_name):
-    """保存中间结果到文件"""
-    intermediate_file = f"{output_file}.{stage_name}.tmp"
+    """按配置的输出格式保存中间结果到文件"""
+    from utils.step_journal import write_records
+    intermediate_file = intermediate_result_files(output_file, stage_name)[0]
     try:
-        with open(intermediate_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        write_records(intermediate_file, results)
         print(f"已保存 {stage_name} 阶段的中间结果到 {intermediate_file}")
     except Exception as e:
         print(f"保存 {stage_name} 阶段中间结果失败: {e}")
 
 # 加载中间结果的函数
 def load_intermediate_results(output_file, stage_name):
-    """加载中间结果"""
-    intermediate_file = f"{output_file}.{stage_name}.tmp"
-    if os.path.exists(intermediate_file):
-        try:
-            with open(intermediate_file, 'r', encoding='utf-8') as f:
-                results = json.load(f)
-            print(f"找到 {stage_name} 阶段的中间结果，加载了 {len(results)} 个任务")
-            return results
-        except Exception as e:
-            print(f"加载 {stage_name} 阶段中间结果失败: {e}")
+    """加载中间结果（按文件后缀自动识别格式）"""
+    from utils.json_stream import load_json_or_records
+    for intermediate_file in intermediate_result_files(output_file, stage_name):
+        if os.path.exists(intermediate_file):
+            try:
+                results = load_json_or_records(intermediate_file)
+                print(f"找到 {stage_name} 阶段的中间结果，加载了 {len(results)} 个任务")
+                return results
+            except Exception as e:
+                print(f"加载 {stage_name} 阶段中间结果失败: {e}")
     return None
 
 async def process_json_file_async(input_file, output_file, concurrency=10):
@@ -1310,13 +1302,13 @@ async def process_json_file_async(input_file, output_file, concurrency=10):
     
     # 清理中间文件
     for stage in ["stage1_sql_generation", "stage2_sql_verification", "stage3_sql_formatting"]:
-        intermediate_file = f"{output_file}.{stage}.tmp"
-        if os.path.exists(intermediate_file):
-            try:
-                os.remove(intermediate_file)
-                print(f"已清理中间文件: {intermediate_file}")
-            except Exception as e:
-                print(f"清理中间文件失败 {intermediate_file}: {e}")
+        for intermediate_file in intermediate_result_files(output_file, stage):
+            if os.path.exists(intermediate_file):
+                try:
+                    os.remove(intermediate_file)
+                    print(f"已清理中间文件: {intermediate_file}")
+                except Exception as e:
+                    print(f"清理中间文件失败 {intermediate_file}: {e}")
     
     # 统计SQL类型
     sql_type_counts = {"SELECT": 0, "INSERT": 0, "UPDATE": 0, "DELETE": 0, "OTHER": 0}
@@ -1331,7 +1323,14 @@ async def process_json_file_async(input_file, output_file, concurrency=10):
 
 def process_json_file(input_file, output_file, concurrency=10):
     """同步版本的处理函数"""
-    return asyncio.run(process_json_file_async(input_file, output_file, concurrency))
+    async def _run():
+        try:
+            return await process_json_file_async(input_file, output_file, concurrency)
+        finally:
+            # 关闭本事件循环内共享的连接池
+            from utils.llm_client import close_shared_sessions
+            await close_shared_sessions()
+    return asyncio.run(_run())
 
 # 添加场景识别函数
 def identify_orm_scenario(function_info):
@@ -1472,7 +1471,7 @@ async def send_request_async(question, semaphore):
             return response.choices[0].message.content
         
         try:
-            return await retry_with_exponential_backoff(make_request)
+            return await retry_with_exponential_backoff(make_request, endpoint=str(client.base_url))
         except Exception as e:
             print(f"请求最终失败: {question[:50]}... 错误: {e}")
             return f"请求失败: {question[:50]}..."
@@ -1519,7 +1518,7 @@ async def verify_sql_async(sql_statement, function_definition=None, code_meta_da
             return response.choices[0].message.content
         
         try:
-            result = await retry_with_exponential_backoff(make_verify_request)
+            result = await retry_with_exponential_backoff(make_verify_request, endpoint=str(client.base_url))
             
             # 验证并重新生成（如果需要）
             validated_result = await validate_and_regenerate_sql(
@@ -1598,7 +1597,7 @@ async def format_sql_async(sql_statement, semaphore):
                 return sql_statements
         
         try:
-            result = await retry_with_exponential_backoff(make_format_request)
+            result = await retry_with_exponential_backoff(make_format_request, endpoint=str(client.base_url))
             
             # 验证并重新生成（如果需要）
             validated_result = await validate_and_regenerate_sql(
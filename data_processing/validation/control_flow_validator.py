@@ -21,6 +21,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
 # 导入格式验证器
 from utils.format_validators import  validate_control_flow_validation_response, validate_control_flow_sql_regeneration_response
+from utils.keyword_matcher import get_keyword_matcher
+from utils.json_stream import output_path
+from utils.step_journal import write_records
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +57,7 @@ class ControlFlowValidator:
         self.control_flow_keywords = [
             'switch', 'if', 'else if', 'else', 'case', 'default'
         ]
+        self._control_flow_matcher = get_keyword_matcher(self.control_flow_keywords)
         
         logger.info(f"控制流验证器初始化完成，输出目录: {self.output_dir}")
     
@@ -90,15 +94,8 @@ class ControlFlowValidator:
         if not orm_code:
             return False
         
-        # 转换为小写进行匹配
-        code_lower = orm_code.lower()
-        
-        # 检查是否包含控制流关键词
-        for keyword in self.control_flow_keywords:
-            if keyword in code_lower:
-                return True
-        
-        return False
+        # 转换为小写后检查是否包含控制流关键词
+        return self._control_flow_matcher.contains_any(orm_code.lower())
     
     def _format_code_meta_data(self, code_meta_data: List[Dict[str, Any]]) -> str:
         """
@@ -171,14 +168,95 @@ class ControlFlowValidator:
         else:
             return str(sql_list)
     
+    async def validate_record(self, session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        验证单条控制流记录（批量验证与流水线模式共用）
+        
+        Args:
+            session: aiohttp会话
+            record: 记录
+            
+        Returns:
+            包含 record、validation_result、llm_response、status 的验证详情
+        """
+        try:
+            from config.data_processing.validation.control_flow_validation_prompt import get_control_flow_validation_prompt
+            
+            # 准备验证所需的信息
+            orm_code = record.get('orm_code', '')
+            caller = record.get('caller', '')
+            code_meta_data = record.get('code_meta_data', [])
+            sql_variants = self._extract_sql_variants(record)
+            
+            # 格式化代码元数据
+            formatted_meta_data = self._format_code_meta_data(code_meta_data)
+            
+            # 生成验证提示词
+            prompt = get_control_flow_validation_prompt(
+                orm_code=orm_code,
+                caller=caller,
+                code_meta_data=formatted_meta_data,
+                current_sql_variants=sql_variants
+            )
+            
+            # 使用格式验证调用LLM
+            # 从配置获取参数
+            from config.data_processing.workflow.workflow_config import get_workflow_config
+            from utils.llm_client import LLMClient
+            workflow_config = get_workflow_config()
+            max_tokens = workflow_config.get_max_tokens("validation", "control_flow_validator")
+            max_retries = workflow_config.get_max_retries("validation", "control_flow_validator")
+            retry_delay = workflow_config.get_retry_delay("validation", "control_flow_validator")
+            
+            # 创建LLM客户端
+            llm_client = LLMClient(self.llm_server)
+            
+            response = await llm_client.call_async_with_format_validation(
+                session, 
+                prompt, 
+                validator=validate_control_flow_validation_response,
+                max_tokens=max_tokens, 
+                temperature=0.0,
+                max_retries=max_retries,
+                retry_delay=retry_delay,
+                module="validation", component="control_flow_validator"
+            )
+            
+            # 解析响应
+            response_str = response if isinstance(response, str) else str(response)
+            validation_result = self._parse_llm_response(response_str, record)
+            
+            return {
+                'record': record,
+                'validation_result': validation_result,
+                'llm_response': response,
+                'status': 'success'
+            }
+            
+        except Exception as e:
+            logger.warning(f"验证记录失败: {e}")
+            return {
+                'record': record,
+                'validation_result': {
+                    'is_correct': True,  # 默认认为正确，避免误判
+                    'reason': f'验证失败: {str(e)}',
+                    'error': True
+                },
+                'llm_response': '',
+                'status': 'error',
+                'error': str(e)
+            }
+    
     async def validate_control_flow_records(self, records: List[Dict[str, Any]], 
-                                          max_concurrent: int = 50) -> Dict[str, Any]:
+                                          max_concurrent: int = 50, journal=None) -> Dict[str, Any]:
         """
         验证包含控制流语句的记录
         
         Args:
             records: 包含控制流语句的记录列表
             max_concurrent: 最大并发数
+            journal: 步骤检查点日志（StepJournal），提供时已完成的记录直接复用验证详情（含重新生成的SQL），
+                只验证剩余记录；未出错的验证详情在验证（及重新生成）完成后逐条追加到日志。日志由调用方关闭
             
         Returns:
             验证结果
@@ -211,108 +289,50 @@ class ControlFlowValidator:
                 'validation_details': []
             }
         
-        # 定义单个记录验证函数
-        async def validate_single_record(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
-            """验证单个记录"""
-            try:
-                # 准备验证所需的信息
-                orm_code = record.get('orm_code', '')
-                caller = record.get('caller', '')
-                code_meta_data = record.get('code_meta_data', [])
-                sql_variants = self._extract_sql_variants(record)
-                
-                # 格式化代码元数据
-                formatted_meta_data = self._format_code_meta_data(code_meta_data)
-                
-                # 生成验证提示词
-                prompt = get_control_flow_validation_prompt(
-                    orm_code=orm_code,
-                    caller=caller,
-                    code_meta_data=formatted_meta_data,
-                    current_sql_variants=sql_variants
-                )
-                
-                # 使用格式验证调用LLM
-                # 从配置获取参数
-                from config.data_processing.workflow.workflow_config import get_workflow_config
-                from utils.llm_client import LLMClient
-                workflow_config = get_workflow_config()
-                max_tokens = workflow_config.get_max_tokens("validation", "control_flow_validator")
-                max_retries = workflow_config.get_max_retries("validation", "control_flow_validator")
-                retry_delay = workflow_config.get_retry_delay("validation", "control_flow_validator")
-                
-                # 创建LLM客户端
-                llm_client = LLMClient(self.llm_server)
-                
-                response = await llm_client.call_async_with_format_validation(
-                    session, 
-                    prompt, 
-                    validator=validate_control_flow_validation_response,
-                    max_tokens=max_tokens, 
-                    temperature=0.0,
-                    max_retries=max_retries,
-                    retry_delay=retry_delay,
-                    module="validation", component="control_flow_validator"
-                )
-                
-                # 解析响应
-                response_str = response if isinstance(response, str) else str(response)
-                validation_result = self._parse_llm_response(response_str, record)
-                
-                return {
-                    'record': record,
-                    'validation_result': validation_result,
-                    'llm_response': response,
-                    'status': 'success'
-                }
-                
-            except Exception as e:
-                logger.warning(f"验证记录失败: {e}")
-                return {
-                    'record': record,
-                    'validation_result': {
-                        'is_correct': True,  # 默认认为正确，避免误判
-                        'reason': f'验证失败: {str(e)}',
-                        'error': True
-                    },
-                    'llm_response': '',
-                    'status': 'error',
-                    'error': str(e)
-                }
-        
         # 执行并发验证
         validated_records = []
         
-        # 创建信号量控制并发数
-        semaphore = asyncio.Semaphore(max_concurrent)
+        # 检查点日志中已完成的记录直接复用验证详情
+        pending_records = journal.pending(records) if journal is not None else records
+        if journal is not None and journal.resumed_count:
+            logger.info(f"已从检查点恢复 {journal.resumed_count:,} 条控制流记录，剩余 {len(pending_records):,} 条待验证")
+        
+        # 创建自适应并发控制器
+        limiter = LLMClient(self.llm_server).get_concurrency_limiter('control_flow_validation', max_concurrent)
         
         async def validate_with_semaphore(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
-            async with semaphore:
-                return await validate_single_record(session, record)
+            async with limiter:
+                result = await self.validate_record(session, record)
+            validation_result = result['validation_result']
+            # 验证错误的记录要等重新生成SQL后再写日志
+            if journal is not None and not validation_result.get('error') and validation_result.get('is_correct', True):
+                journal.append(record, result)
+            return result
         
-        with tqdm_asyncio(total=len(records), desc="验证控制流记录") as pbar:
-            async with aiohttp.ClientSession() as session:
-                tasks = []
-                for record in records:
-                    task = asyncio.ensure_future(validate_with_semaphore(session, record))
-                    
-                    def update_progress(fut, pbar=pbar):
-                        pbar.update(1)
-                    
-                    task.add_done_callback(update_progress)
-                    tasks.append(task)
+        with tqdm_asyncio(total=len(pending_records), desc="验证控制流记录") as pbar:
+            session = LLMClient(self.llm_server).get_session()
+            tasks = []
+            for record in pending_records:
+                task = asyncio.ensure_future(validate_with_semaphore(session, record))
+                
+                def update_progress(fut, pbar=pbar):
+                    pbar.update(1)
+                
+                task.add_done_callback(update_progress)
+                tasks.append(task)
                 
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        if journal is not None:
+            results = journal.merge(records, results)
         
         # 处理结果
         correct_count = 0
         incorrect_count = 0
         error_count = 0
-        regenerated_count = 0
         
         # 收集需要重新生成的记录
         records_to_regenerate = []
-        for result in results:
+        for record, result in zip(records, results):
             if isinstance(result, Exception):
                 error_count += 1
                 logger.warning(f"验证过程异常: {result}")
@@ -333,45 +353,82 @@ class ControlFlowValidator:
                 correct_count += 1
             else:
                 incorrect_count += 1
-                # 收集需要重新生成的记录
-                records_to_regenerate.append((result, validation_result))
+                # 收集需要重新生成的记录（从检查点恢复的验证详情已包含重新生成的结果）
+                if journal is None or journal.lookup(record) is None:
+                    records_to_regenerate.append((result, validation_result))
         
         # 重新生成SQL（带进度条）
         if records_to_regenerate:
             logger.info(f"开始重新生成 {len(records_to_regenerate)} 条记录的SQL...")
             
-            # 创建信号量控制重新生成的并发数
-            regen_semaphore = asyncio.Semaphore(max_concurrent)
+            # 创建自适应并发控制器控制重新生成的并发数
+            regen_limiter = LLMClient(self.llm_server).get_concurrency_limiter('control_flow_regeneration', max_concurrent)
             
             async def regenerate_with_semaphore(session: aiohttp.ClientSession, result: Dict[str, Any], validation_result: Dict[str, Any]) -> Dict[str, Any]:
-                async with regen_semaphore:
+                async with regen_limiter:
                     regenerated_record = await self._regenerate_sql_for_incorrect_record(
                         session, result['record'], validation_result
                     )
                     if regenerated_record:
                         result['regenerated_sql'] = regenerated_record
-                        return result
-                    return result
+                if journal is not None:
+                    journal.append(result['record'], result)
+                return result
             
             with tqdm_asyncio(total=len(records_to_regenerate), desc="重新生成SQL") as pbar:
-                async with aiohttp.ClientSession() as regen_session:
-                    tasks = []
-                    for result, validation_result in records_to_regenerate:
-                        task = asyncio.ensure_future(regenerate_with_semaphore(regen_session, result, validation_result))
-                        
-                        def update_progress(fut, pbar=pbar):
-                            pbar.update(1)
-                        
-                        task.add_done_callback(update_progress)
-                        tasks.append(task)
+                regen_session = LLMClient(self.llm_server).get_session()
+                tasks = []
+                for result, validation_result in records_to_regenerate:
+                    task = asyncio.ensure_future(regenerate_with_semaphore(regen_session, result, validation_result))
                     
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
+                    def update_progress(fut, pbar=pbar):
+                        pbar.update(1)
                     
-                    # 统计重新生成成功的数量
-                    for result in results:
-                        if isinstance(result, dict) and 'regenerated_sql' in result:
-                            regenerated_count += 1
+                    task.add_done_callback(update_progress)
+                    tasks.append(task)
+                    
+                await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # 统计重新生成成功的数量（含从检查点恢复的记录）
+        regenerated_count = sum(1 for result in validated_records if 'regenerated_sql' in result)
+        
+        # 保存验证结果与问题记录报告
+        validation_file, problematic_records, problematic_file = self.save_validation_reports(
+            len(records), validated_records, correct_count, incorrect_count, error_count
+        )
+        
+        result = {
+            'total_records': len(records),
+            'validated_records': len(validated_records),
+            'correct_records': correct_count,
+            'incorrect_records': incorrect_count,
+            'error_records': error_count,
+            'regenerated_records': regenerated_count,
+            'validation_details': validated_records,
+            'problematic_records': problematic_records,
+            'validation_file': str(validation_file) if validation_file else None,
+            'problematic_file': str(problematic_file) if problematic_file else None
+        }
         
+        logger.info(f"控制流验证完成 - 正确: {correct_count}, 错误: {incorrect_count}, 异常: {error_count}, 重新生成: {regenerated_count}")
+        return result
+    
+    def save_validation_reports(self, total_records: int, validated_records: List[Dict[str, Any]],
+                                correct_count: int, incorrect_count: int,
+                                error_count: int) -> Tuple[Optional[Path], List[Dict[str, Any]], Optional[Path]]:
+        """
+        保存验证结果文件和问题记录报告
+        
+        Args:
+            total_records: 待验证的记录数
+            validated_records: 验证详情列表
+            correct_count: 验证正确数
+            incorrect_count: 验证错误数
+            error_count: 验证异常数
+            
+        Returns:
+            (验证结果文件, 问题记录列表, 问题记录文件)，保存失败的文件为None
+        """
         # 保存验证结果
         try:
             validation_file = self.output_dir / "control_flow_validation_results.json"
@@ -381,7 +438,7 @@ class ControlFlowValidator:
             with open(validation_file, 'w', encoding='utf-8') as f:
                 json.dump({
                     'validation_timestamp': datetime.now().isoformat(),
-                    'total_records': len(records),
+                    'total_records': total_records,
                     'validated_records': len(validated_records),
                     'correct_records': correct_count,
                     'incorrect_records': incorrect_count,
@@ -404,32 +461,17 @@ class ControlFlowValidator:
         problematic_file = None
         if problematic_records:
             try:
-                problematic_file = self.output_dir / "problematic_control_flow_records.json"
+                problematic_file = output_path(self.output_dir / "problematic_control_flow_records.json")
                 # 确保输出目录存在
                 self.output_dir.mkdir(parents=True, exist_ok=True)
                 
-                with open(problematic_file, 'w', encoding='utf-8') as f:
-                    json.dump(problematic_records, f, ensure_ascii=False, indent=2)
+                write_records(problematic_file, problematic_records)
                 logger.info(f"发现 {len(problematic_records)} 条有问题的控制流记录，已保存到: {problematic_file}")
             except Exception as e:
                 logger.error(f"保存问题记录报告失败: {e}")
                 problematic_file = None
         
-        result = {
-            'total_records': len(records),
-            'validated_records': len(validated_records),
-            'correct_records': correct_count,
-            'incorrect_records': incorrect_count,
-            'error_records': error_count,
-            'regenerated_records': regenerated_count,
-            'validation_details': validated_records,
-            'problematic_records': problematic_records,
-            'validation_file': str(validation_file) if validation_file else None,
-            'problematic_file': str(problematic_file) if problematic_file else None
-        }
-        
-        logger.info(f"控制流验证完成 - 正确: {correct_count}, 错误: {incorrect_count}, 异常: {error_count}, 重新生成: {regenerated_count}")
-        return result
+        return validation_file, problematic_records, problematic_file
     
     async def _regenerate_sql_for_incorrect_record(self, session: aiohttp.ClientSession, 
                                                   record: Dict[str, Any], 
@@ -660,13 +702,14 @@ class ControlFlowValidator:
             }
     
     async def validate_dataset(self, data: List[Dict[str, Any]], 
-                             max_concurrent: int = 50) -> Dict[str, Any]:
+                             max_concurrent: int = 50, journal=None) -> Dict[str, Any]:
         """
         验证整个数据集的控制流
         
         Args:
             data: 数据集
             max_concurrent: 最大并发数
+            journal: 步骤检查点日志，见 validate_control_flow_records
             
         Returns:
             验证结果
@@ -687,7 +730,8 @@ class ControlFlowValidator:
         # 验证控制流记录
         validation_result = await self.validate_control_flow_records(
             control_flow_records, 
-            max_concurrent
+            max_concurrent,
+            journal=journal
         )
         
         # 添加总体统计
@@ -44,6 +44,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 候选项的输入字段：检查点日志按这些字段计算候选项ID（validation_id 只含ORM和调用者，不能反映SQL内容变化）
+CANDIDATE_ID_FIELDS = ('validation_type', 'orm_code', 'orm_code_content', 'target_caller', 'reference_caller', 'candidate_info')
+
 
 class RedundantSQLValidator:
     """
@@ -94,13 +97,15 @@ class RedundantSQLValidator:
         logger.info(f"冗余SQL验证器（重构版）初始化完成，输出目录: {self.output_dir}")
     
     async def validate_llm_candidates(self, llm_candidates: List[Dict[str, Any]], 
-                                    max_concurrent: int = 100) -> Dict[str, Any]:
+                                    max_concurrent: int = 100, journal=None) -> Dict[str, Any]:
         """
         验证LLM候选项
         
         Args:
             llm_candidates: 从ORM分析器获取的候选项列表
             max_concurrent: 最大并发数，默认100以避免服务器压力过大
+            journal: 步骤检查点日志（StepJournal，按 CANDIDATE_ID_FIELDS 计算ID），提供时已完成的候选项直接复用结果，
+                只验证剩余候选项；未出错的验证结果逐条追加到日志。日志由调用方关闭
             
         Returns:
             Dict: 验证结果摘要
@@ -124,28 +129,36 @@ class RedundantSQLValidator:
         for v_type, candidates in candidates_by_type.items():
             self.validation_stats['type_stats'][v_type]['total'] = len(candidates)
         
+        # 检查点日志中已完成的候选项直接复用结果
+        pending_candidates = journal.pending(llm_candidates) if journal is not None else llm_candidates
+        if journal is not None and journal.resumed_count:
+            logger.info(f"已从检查点恢复 {journal.resumed_count:,} 个候选项，剩余 {len(pending_candidates):,} 个待验证")
+        
         # 异步验证所有候选项
-        semaphore = asyncio.Semaphore(max_concurrent)
+        limiter = self.llm_client.get_concurrency_limiter('redundant_sql_validation', max_concurrent)
         
         async def validate_with_semaphore(candidate: Dict) -> Dict:
-            async with semaphore:
-                return await self._validate_single_candidate(candidate)
+            async with limiter:
+                result = await self._validate_single_candidate(candidate)
+            if journal is not None and not any(step.get('step') == 'error' for step in result['validation_steps']):
+                journal.append(candidate, result)
+            return result
         
         validated_results = []
-        with tqdm_asyncio(total=len(llm_candidates), desc="验证候选项") as pbar:
-            async with aiohttp.ClientSession() as session:
-                self.session = session  # 保存session供子方法使用
-                tasks = [asyncio.ensure_future(validate_with_semaphore(candidate)) for candidate in llm_candidates]
-                for task in tasks:
-                    task.add_done_callback(lambda p: pbar.update(1))
-                validated_results = await asyncio.gather(*tasks, return_exceptions=True)
+        with tqdm_asyncio(total=len(pending_candidates), desc="验证候选项") as pbar:
+            session = self.llm_client.get_session()
+            self.session = session  # 保存session供子方法使用
+            tasks = [asyncio.ensure_future(validate_with_semaphore(candidate)) for candidate in pending_candidates]
+            for task in tasks:
+                task.add_done_callback(lambda p: pbar.update(1))
+            validated_results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # 处理异常结果
         final_results = []
         for i, result in enumerate(validated_results):
             if isinstance(result, Exception):
                 logger.error(f"候选项 {i} 验证异常: {result}")
-                error_result = llm_candidates[i].copy()
+                error_result = pending_candidates[i].copy()
                 error_result.update({
                     'validation_status': 'error',
                     'validation_error': str(result),
@@ -157,6 +170,8 @@ class RedundantSQLValidator:
                 self.validation_stats['step_stats']['llm_errors'] += 1
             else:
                 final_results.append(result)
+        if journal is not None:
+            final_results = journal.merge(llm_candidates, final_results)
         
         # 更新统计信息
         self._update_final_stats(final_results)
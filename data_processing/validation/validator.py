@@ -85,7 +85,7 @@ class RerunValidator:
             sql_pattern_cnt=record.get('sql_pattern_cnt', 0)
         )
 
-    async def _run_single_analysis(self, semaphore: asyncio.Semaphore, record: dict, pbar: tqdm, output_file, file_lock, session) -> dict:
+    async def _run_single_analysis(self, semaphore, record: dict, pbar: tqdm, output_file, file_lock, session) -> dict:
         """对单个记录进行分析，并立即将结果写入文件"""
         async with semaphore:
             prompt = self._format_rerun_prompt(record)
@@ -332,232 +332,232 @@ class RerunValidator:
             # 获取LLM客户端
             client = self.client
             
-            async with aiohttp.ClientSession() as session:
-                # 预检查步骤：判断是否会生成SQL
-                logger.info(f"🔍 开始预检查: {record.get('function_name', 'N/A')}")
-                precheck_result = await self._precheck_sql_generation(record, session)
+            session = client.get_session()
+            # 预检查步骤：判断是否会生成SQL
+            logger.info(f"🔍 开始预检查: {record.get('function_name', 'N/A')}")
+            precheck_result = await self._precheck_sql_generation(record, session)
                 
-                if not precheck_result["success"]:
-                    logger.error(f"❌ 预检查失败: {precheck_result['error']}")
-                    return {
-                        "analysis_result": "",
-                        "verification_result": "",
-                        "final_result": "",
-                        "parsed_json": None,
-                        "success": False,
-                        "error": f"预检查失败: {precheck_result['error']}",
-                        "precheck_result": precheck_result
-                    }
+            if not precheck_result["success"]:
+                logger.error(f"❌ 预检查失败: {precheck_result['error']}")
+                return {
+                    "analysis_result": "",
+                    "verification_result": "",
+                    "final_result": "",
+                    "parsed_json": None,
+                    "success": False,
+                    "error": f"预检查失败: {precheck_result['error']}",
+                    "precheck_result": precheck_result
+                }
                 
-                # 根据预检查结果决定是否进行三段式分析
-                if precheck_result["will_generate_sql"] is False:
-                    logger.info(f"✅ 预检查结果：不会生成SQL，跳过三段式分析")
-                    return {
-                        "analysis_result": "",
-                        "verification_result": "",
-                        "final_result": "",
-                        "parsed_json": None,
-                        "success": True,
-                        "skipped_three_stage": True,
-                        "precheck_result": precheck_result,
-                        "skip_reason": "预检查确认不会生成SQL"
-                    }
-                elif precheck_result["will_generate_sql"] is None:
-                    logger.warning(f"⚠️ 预检查结果无法确定，继续三段式分析")
-                else:
-                    logger.info(f"✅ 预检查结果：会生成SQL，继续三段式分析")
+            # 根据预检查结果决定是否进行三段式分析
+            if precheck_result["will_generate_sql"] is False:
+                logger.info(f"✅ 预检查结果：不会生成SQL，跳过三段式分析")
+                return {
+                    "analysis_result": "",
+                    "verification_result": "",
+                    "final_result": "",
+                    "parsed_json": None,
+                    "success": True,
+                    "skipped_three_stage": True,
+                    "precheck_result": precheck_result,
+                    "skip_reason": "预检查确认不会生成SQL"
+                }
+            elif precheck_result["will_generate_sql"] is None:
+                logger.warning(f"⚠️ 预检查结果无法确定，继续三段式分析")
+            else:
+                logger.info(f"✅ 预检查结果：会生成SQL，继续三段式分析")
                 
-                # 第一阶段：分析
-                stage_prompts = self.generate_precheck_prompts(record)
-                # 从配置获取max_tokens
-                from config.data_processing.workflow.workflow_config import get_workflow_config
-                workflow_config = get_workflow_config()
-                max_tokens = workflow_config.get_max_tokens("validation", "validator")
+            # 第一阶段：分析
+            stage_prompts = self.generate_precheck_prompts(record)
+            # 从配置获取max_tokens
+            from config.data_processing.workflow.workflow_config import get_workflow_config
+            workflow_config = get_workflow_config()
+            max_tokens = workflow_config.get_max_tokens("validation", "validator")
                 
-                # 从配置获取重试参数
-                max_retries = workflow_config.get_max_retries("validation", "validator")
-                retry_delay = workflow_config.get_retry_delay("validation", "validator")
+            # 从配置获取重试参数
+            max_retries = workflow_config.get_max_retries("validation", "validator")
+            retry_delay = workflow_config.get_retry_delay("validation", "validator")
                 
-                analysis_result = await client.call_async_with_format_validation(
-                    session,
-                    stage_prompts['analysis_prompt'], 
-                    validator=validate_sql_generation_response,
-                    max_tokens=max_tokens, 
-                    temperature=0.0,
-                    max_retries=max_retries,
-                    retry_delay=retry_delay,
-                    module="validation"
-                )
+            analysis_result = await client.call_async_with_format_validation(
+                session,
+                stage_prompts['analysis_prompt'], 
+                validator=validate_sql_generation_response,
+                max_tokens=max_tokens, 
+                temperature=0.0,
+                max_retries=max_retries,
+                retry_delay=retry_delay,
+                module="validation"
+            )
                 
-                if not analysis_result:
-                    logger.error("❌ 第一阶段返回空结果")
-                    return {
-                        "analysis_result": "",
-                        "verification_result": "",
-                        "final_result": "",
-                        "parsed_json": None,
-                        "success": False,
-                        "error": "第一阶段LLM调用失败",
-                        "precheck_result": precheck_result
-                    }
+            if not analysis_result:
+                logger.error("❌ 第一阶段返回空结果")
+                return {
+                    "analysis_result": "",
+                    "verification_result": "",
+                    "final_result": "",
+                    "parsed_json": None,
+                    "success": False,
+                    "error": "第一阶段LLM调用失败",
+                    "precheck_result": precheck_result
+                }
                 
-                # 第二阶段：验证
-                # 确保analysis_result是字符串
-                if isinstance(analysis_result, dict):
-                    analysis_result = json.dumps(analysis_result)
+            # 第二阶段：验证
+            # 确保analysis_result是字符串
+            if isinstance(analysis_result, dict):
+                analysis_result = json.dumps(analysis_result)
                 
-                verification_prompts = self.generate_precheck_prompts(record, analysis_result)
-                verification_result = await client.call_async_with_format_validation(
-                    session,
-                    verification_prompts['verification_prompt'],
-                    validator=validate_sql_generation_response,
-                    max_tokens=max_tokens,
-                    temperature=0.0,
-                    max_retries=max_retries,
-                    retry_delay=retry_delay,
-                    module="validation"
-                )
+            verification_prompts = self.generate_precheck_prompts(record, analysis_result)
+            verification_result = await client.call_async_with_format_validation(
+                session,
+                verification_prompts['verification_prompt'],
+                validator=validate_sql_generation_response,
+                max_tokens=max_tokens,
+                temperature=0.0,
+                max_retries=max_retries,
+                retry_delay=retry_delay,
+                module="validation"
+            )
                 
-                if not verification_result:
-                    logger.error("❌ 第二阶段返回空结果")
-                    return {
-                        "analysis_result": analysis_result,
-                        "verification_result": "",
-                        "final_result": "",
-                        "parsed_json": None,
-                        "success": False,
-                        "error": "第二阶段LLM调用失败",
-                        "precheck_result": precheck_result
-                    }
+            if not verification_result:
+                logger.error("❌ 第二阶段返回空结果")
+                return {
+                    "analysis_result": analysis_result,
+                    "verification_result": "",
+                    "final_result": "",
+                    "parsed_json": None,
+                    "success": False,
+                    "error": "第二阶段LLM调用失败",
+                    "precheck_result": precheck_result
+                }
                 
-                # 第三阶段：格式化
-                format_prompt = FORMATTING_PROMPT_TEMPLATE.format(sql_statement=verification_result)
-                final_result = await client.call_async_with_format_validation(
-                    session,
-                    format_prompt,
-                    validator=validate_sql_generation_response,
-                    max_tokens=max_tokens,
-                    temperature=0.0,
-                    max_retries=max_retries,
-                    retry_delay=retry_delay,
-                    module="validation"
-                )
+            # 第三阶段：格式化
+            format_prompt = FORMATTING_PROMPT_TEMPLATE.format(sql_statement=verification_result)
+            final_result = await client.call_async_with_format_validation(
+                session,
+                format_prompt,
+                validator=validate_sql_generation_response,
+                max_tokens=max_tokens,
+                temperature=0.0,
+                max_retries=max_retries,
+                retry_delay=retry_delay,
+                module="validation"
+            )
                 
-                if not final_result:
-                    logger.error("❌ 第三阶段返回空结果")
-                    return {
-                        "analysis_result": analysis_result,
-                        "verification_result": verification_result,
-                        "final_result": "",
-                        "parsed_json": None,
-                        "success": False,
-                        "error": "第三阶段LLM调用失败",
-                        "precheck_result": precheck_result
-                    }
+            if not final_result:
+                logger.error("❌ 第三阶段返回空结果")
+                return {
+                    "analysis_result": analysis_result,
+                    "verification_result": verification_result,
+                    "final_result": "",
+                    "parsed_json": None,
+                    "success": False,
+                    "error": "第三阶段LLM调用失败",
+                    "precheck_result": precheck_result
+                }
                 
-                # 尝试解析JSON
-                parsed_json = None
-                try:
-                    # 确保final_result是字符串
-                    if isinstance(final_result, dict):
-                        final_result = json.dumps(final_result)
-                    
-                    parsed_json = json.loads(final_result)
-                except (json.JSONDecodeError, TypeError) as e:
-                    # 尝试提取JSON部分（可能包含在代码块中）
-                    import re
-                    # 确保final_result是字符串
-                    if isinstance(final_result, dict):
-                        final_result = json.dumps(final_result)
-                    
-                    # 修复正则表达式，正确处理换行符和嵌套结构
-                    json_match = re.search(r'```json\s*(.*?)\s*```', final_result, re.DOTALL)
-                    if json_match:
-                        json_content = json_match.group(1).strip()
-                        try:
-                            parsed_json = json.loads(json_content)
-                        except (json.JSONDecodeError, TypeError):
-                            logger.warning(f"⚠️ JSON解析失败: {e}")
-                            logger.warning(f"🔍 解析失败的内容: {repr(final_result[:500])}...")
-                    else:
+            # 尝试解析JSON
+            parsed_json = None
+            try:
+                # 确保final_result是字符串
+                if isinstance(final_result, dict):
+                    final_result = json.dumps(final_result)
+                
+                parsed_json = json.loads(final_result)
+            except (json.JSONDecodeError, TypeError) as e:
+                # 尝试提取JSON部分（可能包含在代码块中）
+                import re
+                # 确保final_result是字符串
+                if isinstance(final_result, dict):
+                    final_result = json.dumps(final_result)
+                
+                # 修复正则表达式，正确处理换行符和嵌套结构
+                json_match = re.search(r'```json\s*(.*?)\s*```', final_result, re.DOTALL)
+                if json_match:
+                    json_content = json_match.group(1).strip()
+                    try:
+                        parsed_json = json.loads(json_content)
+                    except (json.JSONDecodeError, TypeError):
                         logger.warning(f"⚠️ JSON解析失败: {e}")
                         logger.warning(f"🔍 解析失败的内容: {repr(final_result[:500])}...")
+                else:
+                    logger.warning(f"⚠️ JSON解析失败: {e}")
+                    logger.warning(f"🔍 解析失败的内容: {repr(final_result[:500])}...")
                 
-                # 构建详细的结果信息
-                detailed_result = {
-                    # 基本结果信息（保持向后兼容）
-                    "analysis_result": analysis_result,
-                    "verification_result": verification_result,
-                    "final_result": final_result,
-                    "parsed_json": parsed_json,
-                    "success": True,
-                    
-                    # 新增：预检查结果
-                    "precheck_result": precheck_result,
-                    
-                    # 新增：详细的阶段信息
-                    "stage_details": {
-                        "precheck": {
-                            "prompt": self._format_no_sql_check_prompt(record),
-                            "prompt_length": len(self._format_no_sql_check_prompt(record)),
-                            "raw_response": precheck_result.get("precheck_result", ""),
-                            "response_length": len(precheck_result.get("precheck_result", "")),
-                            "stage_type": "SQL生成预检查"
-                        },
-                        "stage1_analysis": {
-                            "prompt": stage_prompts['analysis_prompt'],
-                            "prompt_length": len(stage_prompts['analysis_prompt']),
-                            "raw_response": analysis_result,
-                            "response_length": len(analysis_result),
-                            "stage_type": "ORM代码分析"
-                        },
-                        "stage2_verification": {
-                            "prompt": verification_prompts['verification_prompt'],
-                            "prompt_length": len(verification_prompts['verification_prompt']),
-                            "raw_response": verification_result,
-                            "response_length": len(verification_result),
-                            "stage_type": "SQL语句验证"
-                        },
-                        "stage3_formatting": {
-                            "prompt": format_prompt,
-                            "prompt_length": len(format_prompt),
-                            "raw_response": final_result,
-                            "response_length": len(final_result),
-                            "stage_type": "结果格式化"
-                        }
+            # 构建详细的结果信息
+            detailed_result = {
+                # 基本结果信息（保持向后兼容）
+                "analysis_result": analysis_result,
+                "verification_result": verification_result,
+                "final_result": final_result,
+                "parsed_json": parsed_json,
+                "success": True,
+                
+                # 新增：预检查结果
+                "precheck_result": precheck_result,
+                
+                # 新增：详细的阶段信息
+                "stage_details": {
+                    "precheck": {
+                        "prompt": self._format_no_sql_check_prompt(record),
+                        "prompt_length": len(self._format_no_sql_check_prompt(record)),
+                        "raw_response": precheck_result.get("precheck_result", ""),
+                        "response_length": len(precheck_result.get("precheck_result", "")),
+                        "stage_type": "SQL生成预检查"
                     },
-                    
-                    # 新增：输入记录信息
-                    "input_record": {
-                        "function_name": record.get('function_name', ''),
-                        "source_file": record.get('source_file', ''),
-                        "caller": record.get('caller', ''),
-                        "sql_pattern_cnt": record.get('sql_pattern_cnt', 0),
-                        "orm_code_length": len(record.get('orm_code', '')),
-                        "code_meta_data_count": len(record.get('code_meta_data', []))
+                    "stage1_analysis": {
+                        "prompt": stage_prompts['analysis_prompt'],
+                        "prompt_length": len(stage_prompts['analysis_prompt']),
+                        "raw_response": analysis_result,
+                        "response_length": len(analysis_result),
+                        "stage_type": "ORM代码分析"
                     },
-                    
-                    # 新增：处理元数据
-                    "processing_metadata": {
-                        "server": self.config.get('server', 'unknown'),
-                        "max_tokens": 4096,
-                        "temperature": 0.0,
-                        "retry_config": {
-                            "max_retries": 5,
-                            "retry_delay": 1.0
-                        },
-                        "json_parsing": {
-                            "final_parse_success": parsed_json is not None,
-                            "final_parse_error": None if parsed_json is not None else "解析失败"
-                        }
+                    "stage2_verification": {
+                        "prompt": verification_prompts['verification_prompt'],
+                        "prompt_length": len(verification_prompts['verification_prompt']),
+                        "raw_response": verification_result,
+                        "response_length": len(verification_result),
+                        "stage_type": "SQL语句验证"
+                    },
+                    "stage3_formatting": {
+                        "prompt": format_prompt,
+                        "prompt_length": len(format_prompt),
+                        "raw_response": final_result,
+                        "response_length": len(final_result),
+                        "stage_type": "结果格式化"
+                    }
+                },
+                
+                # 新增：输入记录信息
+                "input_record": {
+                    "function_name": record.get('function_name', ''),
+                    "source_file": record.get('source_file', ''),
+                    "caller": record.get('caller', ''),
+                    "sql_pattern_cnt": record.get('sql_pattern_cnt', 0),
+                    "orm_code_length": len(record.get('orm_code', '')),
+                    "code_meta_data_count": len(record.get('code_meta_data', []))
+                },
+                
+                # 新增：处理元数据
+                "processing_metadata": {
+                    "server": self.config.get('server', 'unknown'),
+                    "max_tokens": 4096,
+                    "temperature": 0.0,
+                    "retry_config": {
+                        "max_retries": 5,
+                        "retry_delay": 1.0
+                    },
+                    "json_parsing": {
+                        "final_parse_success": parsed_json is not None,
+                        "final_parse_error": None if parsed_json is not None else "解析失败"
                     }
                 }
+            }
                 
-                # 如果需要保存详细结果到文件
-                if save_detailed_results:
-                    await self._collect_detailed_results(record, detailed_result)
+            # 如果需要保存详细结果到文件
+            if save_detailed_results:
+                await self._collect_detailed_results(record, detailed_result)
                 
-                return detailed_result
+            return detailed_result
             
         except Exception as e:
             logger.error(f"❌ 三段式分析流程异常: {e}")
@@ -638,18 +638,18 @@ class RerunValidator:
         output_dir.mkdir(parents=True, exist_ok=True)
         output_path = output_dir / self.config['output_filename']
         
-        semaphore = asyncio.Semaphore(self.config['concurrency'])
+        semaphore = self.client.get_concurrency_limiter('rerun_validation', self.config['concurrency'])
         file_lock = asyncio.Lock()
         
         results = []
-        async with aiohttp.ClientSession() as session:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                with tqdm(total=len(records_to_process), desc="重新分析进度") as pbar:
-                    tasks = [
-                        self._run_single_analysis(semaphore, record, pbar, f, file_lock, session) 
-                        for record in records_to_process
-                    ]
-                    results = await asyncio.gather(*tasks)
+        session = self.client.get_session()
+        with open(output_path, 'w', encoding='utf-8') as f:
+            with tqdm(total=len(records_to_process), desc="重新分析进度") as pbar:
+                tasks = [
+                    self._run_single_analysis(semaphore, record, pbar, f, file_lock, session) 
+                    for record in records_to_process
+                ]
+                results = await asyncio.gather(*tasks)
 
         self._print_summary_report(results, records_to_process, output_path)
 
@@ -0,0 +1,184 @@
+"""
+工作流步骤DAG调度器
+
+步骤声明为有向无环图：每个步骤声明自己读取的输入和产出的输出（按名称），
+调度器在同一个事件循环中运行，输入全部就绪的步骤立即启动，相互独立的分支并发执行。
+运行结束后可导出步骤图（依赖关系与各步骤的开始/结束时间），写入工作流摘要。
+"""
+
+import asyncio
+import logging
+import time
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class DAGStep:
+    """DAG中的一个步骤"""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 inputs: Iterable[str] = (), outputs: Iterable[str] = ()):
+        """
+        初始化步骤
+
+        Args:
+            name: 步骤名称
+            func: 协程函数，参数为只含本步骤输入的字典，返回本步骤输出的字典
+            inputs: 输入名称列表
+            outputs: 输出名称列表
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.status = 'pending'
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+class StepDAG:
+    """步骤DAG及其调度器"""
+
+    def __init__(self, name: str = "workflow"):
+        self.name = name
+        self.steps: Dict[str, DAGStep] = {}
+        self._producers: Dict[str, str] = {}
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+
+    def add_step(self, name: str, func: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 inputs: Iterable[str] = (), outputs: Iterable[str] = ()) -> DAGStep:
+        """添加步骤，输出名称在整个图中必须唯一"""
+        if name in self.steps:
+            raise ValueError(f"重复的步骤名称: {name}")
+        step = DAGStep(name, func, inputs, outputs)
+        for output in step.outputs:
+            if output in self._producers:
+                raise ValueError(f"输出 {output} 同时由 {self._producers[output]} 和 {name} 产出")
+            self._producers[output] = name
+        self.steps[name] = step
+        return step
+
+    def dependencies(self, step: DAGStep) -> List[str]:
+        """步骤依赖的上游步骤"""
+        return sorted({self._producers[i] for i in step.inputs if i in self._producers})
+
+    def _validate(self, initial: Dict[str, Any]) -> None:
+        """检查输入是否都有来源、图中是否有环"""
+        for step in self.steps.values():
+            missing = [i for i in step.inputs if i not in self._producers and i not in initial]
+            if missing:
+                raise ValueError(f"步骤 {step.name} 的输入没有来源: {missing}")
+
+        visiting, visited = set(), set()
+
+        def visit(name: str, path: List[str]):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"步骤图存在环: {' → '.join(path + [name])}")
+            visiting.add(name)
+            for dep in self.dependencies(self.steps[name]):
+                visit(dep, path + [name])
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.steps:
+            visit(name, [])
+
+    async def run(self, initial: Optional[Dict[str, Any]] = None,
+                  on_running_change: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """
+        运行DAG
+
+        Args:
+            initial: 初始输入
+            on_running_change: 同时运行的步骤数变化时的回调，参数为当前运行中的步骤数
+
+        Returns:
+            所有输入和输出组成的字典
+
+        Raises:
+            任一步骤的异常；此时仍在运行的步骤会被取消
+        """
+        values: Dict[str, Any] = dict(initial or {})
+        self._validate(values)
+        self.start_time = time.monotonic()
+        pending = dict(self.steps)
+        running: Dict[asyncio.Task, DAGStep] = {}
+        running_count = 0
+
+        def notify_running_change() -> None:
+            nonlocal running_count
+            if on_running_change is not None and len(running) != running_count:
+                running_count = len(running)
+                on_running_change(running_count)
+
+        async def execute(step: DAGStep) -> Dict[str, Any]:
+            step.status = 'running'
+            step.start_time = time.monotonic()
+            logger.info(f"▶️ 开始步骤: {step.name}")
+            try:
+                result = await step.func({i: values[i] for i in step.inputs}) or {}
+            finally:
+                step.end_time = time.monotonic()
+            missing = [o for o in step.outputs if o not in result]
+            if missing:
+                raise ValueError(f"步骤 {step.name} 未产出声明的输出: {missing}")
+            logger.info(f"✅ 完成步骤: {step.name} ({step.end_time - step.start_time:.1f}秒)")
+            return result
+
+        try:
+            while pending or running:
+                for name, step in list(pending.items()):
+                    if all(i in values for i in step.inputs):
+                        del pending[name]
+                        running[asyncio.ensure_future(execute(step))] = step
+                if not running:
+                    raise RuntimeError(f"步骤无法调度: {list(pending)}")
+                notify_running_change()
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step = running.pop(task)
+                    if task.exception() is not None:
+                        step.status = 'failed'
+                        step.error = str(task.exception())
+                        raise task.exception()
+                    step.status = 'completed'
+                    values.update({o: task.result()[o] for o in step.outputs})
+        finally:
+            for task, step in running.items():
+                task.cancel()
+                step.status = 'cancelled'
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            self.end_time = time.monotonic()
+        return values
+
+    def get_graph(self) -> Dict[str, Any]:
+        """导出步骤图：节点（输入输出、依赖、状态、相对开始时间与耗时）和边"""
+        origin = self.start_time or 0.0
+        nodes = []
+        for step in self.steps.values():
+            node = {
+                'name': step.name,
+                'inputs': step.inputs,
+                'outputs': step.outputs,
+                'depends_on': self.dependencies(step),
+                'status': step.status,
+                'start_offset': round(step.start_time - origin, 3) if step.start_time else None,
+                'end_offset': round(step.end_time - origin, 3) if step.end_time else None,
+                'duration': round(step.end_time - step.start_time, 3) if step.start_time and step.end_time else None
+            }
+            if step.error:
+                node['error'] = step.error
+            nodes.append(node)
+        edges = [{'from': dep, 'to': step.name} for step in self.steps.values() for dep in self.dependencies(step)]
+        return {
+            'name': self.name,
+            'wall_seconds': round(self.end_time - self.start_time, 3) if self.start_time and self.end_time else None,
+            'nodes': nodes,
+            'edges': edges
+        }
@@ -4,6 +4,7 @@ Workflow管理器
 管理数据处理的整个工作流，包括数据读取、清洗、验证等步骤
 """
 
+import copy
 import json
 import logging
 import asyncio
@@ -26,6 +27,10 @@ except ImportError:
     from data_reader import DataReader
     from cleaning.sql_cleaner import SQLCleaner
 
+from utils.step_profiler import profile_step
+from utils.json_stream import find_record_file, load_json_or_records, output_path, record_file_patterns
+from utils.step_journal import write_records
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -35,6 +40,10 @@ except ImportError:
     KEYWORD_PROCESSING_PROMPT = "Legacy or default prompt here, if any."
     logger.warning("Could not import KEYWORD_PROCESSING_PROMPT, using fallback.")
 
+# 修复审核使用的LLM服务器，以及修复审核检查点日志计算请求ID的字段
+FIX_REVIEW_LLM_SERVER = "v3"
+FIX_REVIEW_ID_FIELDS = ('action', 'orm_code', 'caller', 'target_sql')
+
 
 class WorkflowManager:
     """工作流管理器
@@ -42,28 +51,130 @@ class WorkflowManager:
     负责协调数据处理的各个步骤，记录处理过程和结果
     """
     
-    def __init__(self, base_output_dir: str = "workflow_output"):
+    # 流水线模式的阶段顺序，与逐步骤执行时这些步骤的先后一致
+    PIPELINE_STAGE_ORDER = ['sql_completeness_check', 'sql_correctness_check',
+                            'keyword_data_processing', 'control_flow_validation']
+    
+    def __init__(self, base_output_dir: str = "workflow_output", previous_workflow_dir: Optional[str] = None,
+                 workflow_dir: Optional[str] = None):
         """
         初始化工作流管理器
         
         Args:
             base_output_dir: 工作流输出基目录
+            previous_workflow_dir: 上一次的工作流目录，指定时各LLM步骤只重新计算新增/变化的记录
+            workflow_dir: 已有的工作流目录，指定时在该目录中继续运行（各LLM步骤复用目录中的检查点日志），
+                不再新建带时间戳的目录
         """
-        self.base_output_dir = Path(base_output_dir)
-        self.base_output_dir.mkdir(exist_ok=True)
-        
-        # 创建当前workflow实例的目录
-        self.workflow_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.workflow_dir = self.base_output_dir / f"workflow_{self.workflow_timestamp}"
-        self.workflow_dir.mkdir(exist_ok=True)
+        if workflow_dir:
+            # 继续运行已有的工作流目录
+            self.workflow_dir = Path(workflow_dir)
+            if not self.workflow_dir.is_dir():
+                raise ValueError(f"工作流目录不存在: {workflow_dir}")
+            self.base_output_dir = self.workflow_dir.parent
+            workflow_dir_name = self.workflow_dir.name
+            if workflow_dir_name.startswith('workflow_'):
+                self.workflow_timestamp = workflow_dir_name.replace('workflow_', '')
+            else:
+                self.workflow_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        else:
+            self.base_output_dir = Path(base_output_dir)
+            self.base_output_dir.mkdir(exist_ok=True)
+            
+            # 创建当前workflow实例的目录
+            self.workflow_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.workflow_dir = self.base_output_dir / f"workflow_{self.workflow_timestamp}"
+            self.workflow_dir.mkdir(exist_ok=True)
         
         # 工作流步骤记录
         self.workflow_steps = []
         self.current_data = None
         self.extracted_data = None  # 提取的关键词数据
+        self.previous_workflow_dir = Path(previous_workflow_dir) if previous_workflow_dir else None
+        if self.previous_workflow_dir is not None:
+            from utils.step_journal import has_reusable_results
+            if not self.previous_workflow_dir.is_dir():
+                raise FileNotFoundError(f"上次工作流目录不存在: {self.previous_workflow_dir}")
+            if not has_reusable_results(self.previous_workflow_dir):
+                raise ValueError(
+                    f"上次工作流目录中没有可复用的步骤结果（*.result_index.jsonl.gz 或 *.journal.jsonl），"
+                    f"增量重跑会重新计算全部记录: {self.previous_workflow_dir}"
+                )
+        
+        # 工作流输出清单：各步骤登记输出文件，恢复时按清单直接打开数据文件
+        from data_processing.workflow.workflow_manifest import WorkflowManifest
+        self.manifest = WorkflowManifest(self.workflow_dir)
+        self._background_tasks: List[asyncio.Future] = []  # 后台写文件等任务，close 时等待完成
+        self.step_graph = None  # DAG调度时的步骤图（依赖与各步骤耗时）
+        
+        # 可选的 Prometheus 指标端点（LLM调用遥测）
+        from config.data_processing.workflow.workflow_config import get_workflow_config
+        telemetry_config = get_workflow_config().get_telemetry_config()
+        if telemetry_config['prometheus_port']:
+            from utils.llm_metrics import start_prometheus_endpoint
+            start_prometheus_endpoint(telemetry_config['prometheus_port'], telemetry_config['prometheus_host'])
         
         logger.info(f"工作流管理器初始化完成，输出目录: {self.workflow_dir}")
+        if workflow_dir:
+            logger.info(f"🔄 在已有工作流目录中继续运行，已完成的记录从检查点日志复用: {self.workflow_dir}")
+        if self.previous_workflow_dir:
+            logger.info(f"增量模式：复用上次工作流中未变化记录的结果: {self.previous_workflow_dir}")
 
+    def branch(self, current_data: Optional[List[Dict[str, Any]]] = None,
+               extracted_data: Optional[List[Dict[str, Any]]] = None) -> "WorkflowManager":
+        """
+        创建工作流分支视图（DAG中并行运行的分支使用）
+        
+        分支与原工作流共享输出目录、步骤记录、输出清单和后台任务，
+        但 current_data / extracted_data 各自独立，并行分支互不覆盖对方的数据。
+        
+        Args:
+            current_data: 分支的当前数据
+            extracted_data: 分支的关键词数据
+        """
+        view = copy.copy(self)
+        view.current_data = current_data
+        view.extracted_data = extracted_data
+        return view
+
+    def _open_step_journal(self, output_dir: Path, step_name: str, id_fields: Optional[Tuple[str, ...]] = None,
+                           **fingerprint_config):
+        """
+        打开步骤检查点日志
+        
+        Args:
+            output_dir: 步骤输出目录（位于 workflow_dir 下）
+            step_name: 步骤名称
+            id_fields: 计算记录ID的字段，为None时使用数据集记录的默认字段
+            **fingerprint_config: 影响步骤结果的配置（提示词模板、服务器、max_tokens 等），变化时不复用旧结果
+        """
+        from utils.step_journal import RECORD_ID_FIELDS, open_step_journal, step_fingerprint
+        previous_output_dir = None
+        if self.previous_workflow_dir is not None:
+            previous_output_dir = self.previous_workflow_dir / output_dir.relative_to(self.workflow_dir)
+        return open_step_journal(output_dir, step_name, step_fingerprint(**fingerprint_config), previous_output_dir,
+                                 id_fields=id_fields or RECORD_ID_FIELDS)
+
+    def _register_output(self, file_path, step_name: str, kind: str = 'records',
+                         record_count: Optional[int] = None, step_type: Optional[str] = None) -> None:
+        """
+        在工作流清单中登记步骤输出文件，登记失败只记录警告，不影响步骤本身
+        
+        Args:
+            file_path: 输出文件路径
+            step_name: 步骤名称
+            kind: 数据类型（records / keyword_records / records_subset / generated_records / report）
+            record_count: 记录数
+            step_type: 步骤类型
+        """
+        if not file_path:
+            return
+        try:
+            self.manifest.register(file_path, step_name, kind, record_count, step_type)
+        except Exception as e:
+            logger.warning(f"登记输出文件到清单失败 {file_path}: {e}")
+    
+    @profile_step
     def load_raw_dataset(self, data_dir: str) -> Dict[str, Any]:
         """
         从原始数据集加载所有数据
@@ -76,35 +187,34 @@ class WorkflowManager:
         """
         logger.info(f"开始从原始数据集加载所有数据: {data_dir}")
         
-        # 创建数据读取器并读取所有数据
+        # 创建数据读取器并读取所有数据（进程池并行解析）
+        from config.data_processing.workflow.workflow_config import get_workflow_config
+        loading_config = get_workflow_config().get_data_loading_config()
         reader = DataReader(data_dir)
-        reader.read_all_files()
-        
-        # 转换为dict格式的数据
-        self.current_data = []
-        for record in reader.records:
-            record_dict = {
-                'function_name': record.function_name,
-                'orm_code': record.orm_code,
-                'caller': record.caller,
-                'sql_statement_list': record.sql_statement_list,
-                'sql_types': record.sql_types,
-                'code_meta_data': [
-                    {
-                        'code_file': meta.code_file,
-                        'code_start_line': meta.code_start_line,
-                        'code_end_line': meta.code_end_line,
-                        'code_key': meta.code_key,
-                        'code_value': meta.code_value,
-                        'code_label': meta.code_label,
-                        'code_type': meta.code_type,
-                        'code_version': meta.code_version
-                    } for meta in record.code_meta_data
-                ],
-                'sql_pattern_cnt': record.sql_pattern_cnt,
-                'source_file': record.source_file
-            }
-            self.current_data.append(record_dict)
+        files = reader.get_file_list()
+        
+        # 输入文件未变化时直接读取上次解析后保存的快照
+        snapshot_status = 'disabled'
+        snapshot_file = None
+        snapshot_cache = None
+        if loading_config['snapshot_cache']:
+            from data_processing.dataset_snapshot import DatasetSnapshotCache, snapshot_key
+            snapshot_cache = DatasetSnapshotCache(loading_config['snapshot_dir'])
+            key = snapshot_key(files)
+            snapshot = snapshot_cache.load(data_dir, key)
+            if snapshot is not None:
+                self.current_data, reader.file_stats = snapshot
+                snapshot_status = 'hit'
+                snapshot_file = str(snapshot_cache.snapshot_path(data_dir, key))
+        
+        if snapshot_status != 'hit':
+            # 直接读取为dict格式的数据（逐条转换，不保留FunctionRecord）
+            # 后续步骤会修改记录、整体序列化，仍使用普通字典，不使用 FunctionRecordView
+            self.current_data = reader.read_all_dicts(workers=loading_config['workers'], files=files)
+            if snapshot_cache:
+                saved = snapshot_cache.save(data_dir, files, key, self.current_data, reader.file_stats)
+                snapshot_status = 'rebuilt' if saved else 'not_saved'
+                snapshot_file = str(saved) if saved else None
         
         step_info = {
             'step_name': 'load_raw_dataset',
@@ -112,7 +222,10 @@ class WorkflowManager:
             'timestamp': datetime.now().isoformat(),
             'input_source': str(data_dir),
             'total_records_loaded': len(self.current_data),
-            'data_size_mb': sum(len(str(record)) for record in self.current_data) / (1024 * 1024)
+            'files_loaded': len(reader.file_stats),
+            'data_size_mb': sum(stats['file_size_mb'] for stats in reader.file_stats.values()),
+            'snapshot_status': snapshot_status,
+            'snapshot_file': snapshot_file
         }
         
         self.workflow_steps.append(step_info)
@@ -120,6 +233,7 @@ class WorkflowManager:
         logger.info(f"原始数据集加载完成，共 {len(self.current_data):,} 条记录")
         return step_info
     
+    @profile_step
     def run_sql_cleaning(self, step_name: str = "sql_cleaning_step1") -> Dict[str, Any]:
         """
         运行SQL清洗步骤（清洗全体数据）
@@ -143,19 +257,18 @@ class WorkflowManager:
         cleaning_result = sql_cleaner.clean_dataset(self.current_data, step_name)
         
         # 优先加载带有冗余标记的数据（如果ORM分析成功）
-        marked_data_file = Path(cleaning_result['output_directory']) / "cleaned_records_with_redundant_marks.json"
-        cleaned_data_file = Path(cleaning_result['output_directory']) / "cleaned_records.json"
+        marked_data_file = find_record_file(Path(cleaning_result['output_directory']) / "cleaned_records_with_redundant_marks.json")
+        cleaned_data_file = Path(cleaning_result['cleaned_data_file'])
         
-        if marked_data_file.exists():
+        if marked_data_file is not None:
             logger.info("检测到ORM指纹分析结果，加载带冗余标记的数据...")
-            with open(marked_data_file, 'r', encoding='utf-8') as f:
-                self.current_data = json.load(f)
+            self.current_data = load_json_or_records(marked_data_file)
             preferred_data_file = str(marked_data_file)
         else:
             logger.info("未检测到ORM指纹分析结果，加载清洗后的数据...")
-            with open(cleaned_data_file, 'r', encoding='utf-8') as f:
-                self.current_data = json.load(f)
+            self.current_data = load_json_or_records(cleaned_data_file)
             preferred_data_file = str(cleaned_data_file)
+        self._register_output(preferred_data_file, step_name, 'records', len(self.current_data), 'sql_cleaning')
         
         # 记录工作流步骤，包含ORM分析信息
         input_count = cleaning_result['input_records_count']
@@ -205,6 +318,297 @@ class WorkflowManager:
         logger.info(f"全体数据集SQL清洗完成 - 移除了 {cleaning_result['invalid_sql_removed']:,} 个无效SQL，修改了 {cleaning_result['records_modified']:,} 条记录")
         return cleaning_result
     
+    @staticmethod
+    def _is_no_sql_generate(record: Dict[str, Any]) -> bool:
+        """sql_statement_list 是否为 <NO SQL GENERATE>（可能是字符串或包含该字符串的列表）"""
+        sql_list = record.get('sql_statement_list', [])
+        if isinstance(sql_list, str):
+            return sql_list == '<NO SQL GENERATE>'
+        if isinstance(sql_list, list):
+            return len(sql_list) == 1 and sql_list[0] == '<NO SQL GENERATE>'
+        return False
+
+    @classmethod
+    def _needs_correctness_check(cls, record: Dict[str, Any]) -> bool:
+        """是否需要SQL正确性检查（排除 <NO SQL GENERATE> 和已标记 <LACK INFORMATION> 的记录）"""
+        has_lack_info_tag = record.get('completeness_check', {}).get('tag') == '<LACK INFORMATION>'
+        return not cls._is_no_sql_generate(record) and not has_lack_info_tag
+
+    @staticmethod
+    def _completeness_check_materials(record: Dict[str, Any]) -> Dict[str, str]:
+        """准备SQL完整性检查材料"""
+        caller_raw = record.get('caller')
+        caller = str(caller_raw).strip() if caller_raw else '<EMPTY>'
+        orm_code = record.get('orm_code', '')
+        sql_statements = str(record.get('sql_statement_list', []))
+        
+        # 处理元数据
+        code_meta_data = record.get('code_meta_data', [])
+        if isinstance(code_meta_data, list) and code_meta_data:
+            code_meta = str(code_meta_data[0])
+        else:
+            code_meta = '<EMPTY>' if (isinstance(code_meta_data, list) and not code_meta_data) else str(code_meta_data)
+        
+        return {
+            'caller': caller,
+            'code_meta': code_meta,
+            'orm_code': orm_code,
+            'sql_statements': sql_statements
+        }
+
+    def _make_completeness_checker(self, llm_client):
+        """
+        创建单条记录的SQL完整性检查函数（逐步骤模式与流水线模式共用）
+        
+        Args:
+            llm_client: LLM客户端
+            
+        Returns:
+            check_single_record(session, record, response=None) 协程函数
+        """
+        from config.data_processing.cleaning.sql_completeness_check_prompt import get_sql_completeness_check_prompt  # type: ignore
+        from utils.format_validators import validate_sql_completeness_response
+        
+        async def check_single_record(session: aiohttp.ClientSession, record: Dict[str, Any],
+                                      response: Optional[str] = None) -> Dict[str, Any]:
+            """检查单条记录的SQL完整性（response不为空时直接使用批量模式得到的回答）"""
+            try:
+                if response is None:
+                    # 生成提示词
+                    prompt = get_sql_completeness_check_prompt(**self._completeness_check_materials(record))
+                    
+                    # 使用格式验证调用LLM
+                    response = await llm_client.call_async_with_format_validation(
+                        session, prompt, 
+                        validator=validate_sql_completeness_response,
+                        max_tokens=100, temperature=0.0,
+                        module="workflow", component="sql_completeness_check"
+                    )
+                
+                # 处理响应
+                is_complete = True
+                reason = ""
+                
+                if response:
+                    response_lower = response.strip().lower()
+                    if response_lower.startswith('否'):
+                        is_complete = False
+                        # 提取原因
+                        if '，' in response:
+                            reason = response.split('，', 1)[1].strip()
+                        elif ',' in response:
+                            reason = response.split(',', 1)[1].strip()
+                        else:
+                            reason = response.replace('否', '').strip()
+                
+                # 创建新记录
+                new_record = record.copy()
+                
+                # 添加检查结果
+                if not is_complete:
+                    new_record['completeness_check'] = {
+                        'is_complete': False,
+                        'reason': reason,
+                        'tag': '<LACK INFORMATION>',
+                        'checked_at': datetime.now().isoformat()
+                    }
+                    new_record['sql_statement_list'] = "<LACK INFORMATION>"
+                else:
+                    new_record['completeness_check'] = {
+                        'is_complete': True,
+                        'reason': '',
+                        'tag': '',
+                        'checked_at': datetime.now().isoformat()
+                    }
+                
+                return new_record
+                
+            except Exception as e:
+                logger.warning(f"检查记录失败: {e}")
+                # 出错时保留原记录并标记为未检查
+                error_record = record.copy()
+                error_record['completeness_check'] = {
+                    'is_complete': True,  # 默认认为完整，避免错误标记
+                    'reason': f'检查失败: {str(e)}',
+                    'tag': '',
+                    'checked_at': datetime.now().isoformat(),
+                    'check_error': True
+                }
+                return error_record
+        
+        return check_single_record
+
+    def _make_correctness_checker(self, llm_client):
+        """
+        创建单条记录的SQL正确性检查函数（逐步骤模式与流水线模式共用）
+        
+        Args:
+            llm_client: LLM客户端
+            
+        Returns:
+            check_single_record(session, record) 协程函数
+        """
+        from config.data_processing.cleaning.sql_completeness_check_prompt import get_sql_correctness_check_prompt  # type: ignore
+        
+        async def check_single_record(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
+            """检查单条记录的SQL正确性"""
+            try:
+                # 安全地处理元数据
+                code_meta_data = record.get('code_meta_data', [])
+                if isinstance(code_meta_data, list) and code_meta_data:
+                    code_meta = str(code_meta_data[0])
+                else:
+                    # 如果是空列表，传递空字符串；否则，转换整个对象
+                    code_meta = '' if isinstance(code_meta_data, list) else str(code_meta_data)
+
+                caller_raw = record.get('caller')
+                caller = str(caller_raw).strip() if caller_raw else '<EMPTY>'
+                prompt = get_sql_correctness_check_prompt(
+                    caller=caller,
+                    code_meta=code_meta,
+                    orm_code=record.get('orm_code', ''),
+                    sql_statements=str(record.get('sql_statement_list', []))
+                )
+                
+                # 使用格式验证调用LLM
+                from utils.format_validators import validate_sql_correctness_response
+                
+                response = await llm_client.call_async_with_format_validation(
+                    session, prompt, 
+                    validator=validate_sql_correctness_response,
+                    max_tokens=100, temperature=0.0,
+                    module="workflow", component="sql_correctness_check"
+                )
+                
+                is_correct = True
+                reason = ""
+                correction_override = None
+                
+                if response and response.strip().lower().startswith('否'):
+                    is_correct = False
+                    reason = response.replace('否', '').strip(' ，,')
+
+                    # 新增逻辑：如果理由涉及特定关键词，则覆盖为正确
+                    if re.search(r'事务|表名', reason):
+                        is_correct = True
+                        correction_override = f"Keyword match: {reason}"
+                
+                new_record = record.copy()
+                new_record['correctness_check'] = {
+                    'is_correct': is_correct,
+                    'reason': reason,
+                    'tag': '' if is_correct else '<INCORRECT SQL>',
+                    'checked_at': datetime.now().isoformat(),
+                    'correction_override': correction_override
+                }
+                return new_record
+
+            except Exception as e:
+                logger.warning(f"检查记录正确性失败: {e}")
+                error_record = record.copy()
+                error_record['correctness_check'] = {
+                    'is_correct': True,  # 默认正确
+                    'reason': f'检查失败: {str(e)}',
+                    'tag': '',
+                    'checked_at': datetime.now().isoformat(),
+                    'check_error': True
+                }
+                return error_record
+
+        return check_single_record
+
+    def _make_keyword_data_processor(self, llm_client, prompt_template: str = KEYWORD_PROCESSING_PROMPT):
+        """
+        创建单条关键词记录的LLM处理函数（逐步骤模式与流水线模式共用）
+        
+        Args:
+            llm_client: LLM客户端
+            prompt_template: 关键词处理提示词模板
+            
+        Returns:
+            process_single_record(session, record) 协程函数
+        """
+        async def process_single_record(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                keywords = record.get('llm_keyword_analysis', {}).get('matched_keywords', [])
+
+                # 1️⃣ 安全替换，仅替换我们预定义的占位符，避免模板中其他 JSON 花括号触发 KeyError
+                replacements = {
+                    '{function_name}': record.get('function_name', ''),
+                    '{orm_code}': record.get('orm_code', ''),
+                    '{keyword}': ', '.join(keywords),
+                    '{caller}': record.get('caller', ''),
+                    '{code_meta}': json.dumps(record.get('code_meta_data', []), ensure_ascii=False, indent=2),
+                }
+
+                prompt = prompt_template
+                for placeholder, value in replacements.items():
+                    prompt = prompt.replace(placeholder, value)
+
+                # 使用格式验证调用LLM
+                from utils.format_validators import validate_keyword_extraction_response
+                
+                response = await llm_client.call_async_with_format_validation(
+                    session, prompt,
+                    validator=validate_keyword_extraction_response,
+                    temperature=0.0,
+                    module="workflow", component="keyword_processing"
+                )
+
+                # 使用新的、更健壮的解析器
+                from utils.response_parser import parse_model_response
+                new_sql_list = parse_model_response(response)
+                
+                # 检查解析结果是否有效（例如，不是原始字符串的回退）
+                is_successfully_parsed = True
+                if isinstance(new_sql_list, list) and len(new_sql_list) == 1 and isinstance(new_sql_list[0], str) and new_sql_list[0] == response.strip():
+                    is_successfully_parsed = False
+                    logger.warning(f"Failed to parse LLM response for {record.get('function_name')}. Response: {response[:200]}")
+                    # 🔧 修复：即使解析失败，也要添加处理信息确保记录完整性
+                    updated_record = record.copy()
+                    updated_record['keyword_processing_info'] = {
+                        'status': 'parse_failed',
+                        'timestamp': datetime.now().isoformat(),
+                        'original_sql_list': record.get('sql_statement_list'),
+                        'raw_response': response[:500],
+                        'error': 'LLM response parsing failed'
+                    }
+                    return updated_record
+
+                updated_record = record.copy()
+                updated_record['sql_statement_list'] = new_sql_list
+                updated_record['keyword_processing_info'] = {
+                    'status': 'processed',
+                    'timestamp': datetime.now().isoformat(),
+                    'original_sql_list': record.get('sql_statement_list')
+                }
+                return updated_record
+            except Exception as e:
+                import traceback
+                tb = traceback.format_exc()
+                # Include raw response if available
+                raw_resp = locals().get('response', '<<no response captured>>')
+                logger.error(
+                    f"❌ 处理记录 {record.get('function_name')} 失败:\n"
+                    f"Exception: {e}\n"
+                    f"Traceback:\n{tb}\n"
+                    f"Raw LLM Response (first 500 chars):\n{str(raw_resp)[:500]}\n"
+                    f"Prompt (excerpt): {prompt[:200]} ..."
+                )
+                # 🔧 修复：即使出现异常，也要确保记录被保留并标记
+                error_record = record.copy()
+                error_record['keyword_processing_info'] = {
+                    'status': 'error',
+                    'timestamp': datetime.now().isoformat(),
+                    'original_sql_list': record.get('sql_statement_list'),
+                    'error': str(e),
+                    'traceback': tb
+                }
+                return error_record
+
+        return process_single_record
+
+    @profile_step
     async def tag_lack_information_data(self, step_name: str = "sql_completeness_check_step") -> Dict[str, Any]:
         """
         使用LLM检查数据的SQL完整性并标记缺少信息的数据
@@ -225,15 +629,7 @@ class WorkflowManager:
         excluded_records = []
         if self.current_data:
             for record in self.current_data:
-                sql_list = record.get('sql_statement_list', [])
-                # 检查是否为 <NO SQL GENERATE>（可能是字符串或包含该字符串的列表）
-                is_no_sql = False
-                if isinstance(sql_list, str):
-                    is_no_sql = sql_list == '<NO SQL GENERATE>'
-                elif isinstance(sql_list, list):
-                    is_no_sql = len(sql_list) == 1 and sql_list[0] == '<NO SQL GENERATE>'
-                
-                if is_no_sql:
+                if self._is_no_sql_generate(record):
                     excluded_records.append(record)
                 else:
                     records_to_process.append(record)
@@ -268,6 +664,9 @@ class WorkflowManager:
         try:
             from utils.llm_client import LLMClient
             from config.data_processing.cleaning.sql_completeness_check_prompt import get_sql_completeness_check_prompt  # type: ignore
+            from config.data_processing.cleaning.sql_completeness_check_prompt import (  # type: ignore
+                SQL_COMPLETENESS_CHECK_INSTRUCTIONS, get_sql_completeness_check_material
+            )
         except ImportError as e:
             logger.error(f"无法导入LLM相关模块: {e}")
             raise ValueError("LLM模块不可用，无法执行SQL完整性检查")
@@ -280,110 +679,79 @@ class WorkflowManager:
         # 创建LLM客户端
         llm_client = LLMClient(llm_server)
         
-        # 并发处理的函数
-        async def check_single_record(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
-            """检查单条记录的SQL完整性"""
-            try:
-                # 准备检查材料
-                caller_raw = record.get('caller')
-                caller = str(caller_raw).strip() if caller_raw else '<EMPTY>'
-                orm_code = record.get('orm_code', '')
-                sql_statements = str(record.get('sql_statement_list', []))
-                
-                # 处理元数据
-                code_meta_data = record.get('code_meta_data', [])
-                if isinstance(code_meta_data, list) and code_meta_data:
-                    code_meta = str(code_meta_data[0])
-                else:
-                    code_meta = '<EMPTY>' if (isinstance(code_meta_data, list) and not code_meta_data) else str(code_meta_data)
-                
-                # 生成提示词
-                prompt = get_sql_completeness_check_prompt(
-                    caller=caller,
-                    code_meta=code_meta,
-                    orm_code=orm_code,
-                    sql_statements=sql_statements
-                )
-                
-                # 使用格式验证调用LLM
-                from utils.format_validators import validate_sql_completeness_response
-                
-                response = await llm_client.call_async_with_format_validation(
-                    session, prompt, 
-                    validator=validate_sql_completeness_response,
-                    max_tokens=100, temperature=0.0,
-                    module="workflow", component="sql_completeness_check"
-                )
-                
-                # 处理响应
-                is_complete = True
-                reason = ""
-                
-                if response:
-                    response_lower = response.strip().lower()
-                    if response_lower.startswith('否'):
-                        is_complete = False
-                        # 提取原因
-                        if '，' in response:
-                            reason = response.split('，', 1)[1].strip()
-                        elif ',' in response:
-                            reason = response.split(',', 1)[1].strip()
-                        else:
-                            reason = response.replace('否', '').strip()
-                
-                # 创建新记录
-                new_record = record.copy()
-                
-                # 添加检查结果
-                if not is_complete:
-                    new_record['completeness_check'] = {
-                        'is_complete': False,
-                        'reason': reason,
-                        'tag': '<LACK INFORMATION>',
-                        'checked_at': datetime.now().isoformat()
-                    }
-                    new_record['sql_statement_list'] = "<LACK INFORMATION>"
-                else:
-                    new_record['completeness_check'] = {
-                        'is_complete': True,
-                        'reason': '',
-                        'tag': '',
-                        'checked_at': datetime.now().isoformat()
-                    }
-                
-                return new_record
-                
-            except Exception as e:
-                logger.warning(f"检查记录失败: {e}")
-                # 出错时保留原记录并标记为未检查
-                error_record = record.copy()
-                error_record['completeness_check'] = {
-                    'is_complete': True,  # 默认认为完整，避免错误标记
-                    'reason': f'检查失败: {str(e)}',
-                    'tag': '',
-                    'checked_at': datetime.now().isoformat(),
-                    'check_error': True
-                }
-                return error_record
+        from utils.format_validators import validate_sql_completeness_response
+        check_single_record = self._make_completeness_checker(llm_client)
         
         # 动态获取并发数
         from config.data_processing.workflow.workflow_config import get_workflow_config
         workflow_config = get_workflow_config()
         concurrency = workflow_config.get_concurrency('sql_completeness_check')
-        semaphore = asyncio.Semaphore(concurrency)
+        limiter = llm_client.get_concurrency_limiter('sql_completeness_check', concurrency)
+        
+        # 检查点日志：已完成的记录在中断重跑时直接复用
+        from config.data_processing.cleaning.sql_completeness_check_prompt import SQL_COMPLETENESS_CHECK_PROMPT  # type: ignore
+        batch_size = workflow_config.get_batch_size("workflow", "sql_completeness_check")
+        tagging_output_dir = self.workflow_dir / "sql_completeness_check"
+        tagging_output_dir.mkdir(exist_ok=True)
+        journal = self._open_step_journal(
+            tagging_output_dir, step_name, step_type='sql_completeness_check',
+            prompt=SQL_COMPLETENESS_CHECK_PROMPT, server=llm_server, model=llm_client.config.model_name,
+            max_tokens=100, batch_size=batch_size
+        )
+        pending_records = journal.pending(records_to_process)
+        
+        def journal_result(record: Dict[str, Any], result: Any) -> None:
+            if isinstance(result, dict) and not result.get('completeness_check', {}).get('check_error'):
+                journal.append(record, result)
         
         async def process_with_semaphore(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
-            async with semaphore:
-                return await check_single_record(session, record)
+            async with limiter:
+                result = await check_single_record(session, record)
+            journal_result(record, result)
+            return result
+        
+        # 批处理模式：多条记录打包进一个提示词，未通过验证的槽位单独重新请求
+        batcher = None
+        if batch_size > 1:
+            from utils.prompt_batcher import PromptBatcher
+            batcher = PromptBatcher(
+                llm_client, SQL_COMPLETENESS_CHECK_INSTRUCTIONS,
+                slot_validator=validate_sql_completeness_response,
+                batch_size=batch_size, max_tokens_per_slot=100,
+                module="workflow", component="sql_completeness_check"
+            )
+        
+        async def process_batch_with_semaphore(session: aiohttp.ClientSession, batch: List[Dict[str, Any]]) -> List[Any]:
+            async with limiter:
+                materials = [get_sql_completeness_check_material(**self._completeness_check_materials(r)) for r in batch]
+                answers = await batcher.run_batch(session, materials)
+            # 批量槽位已释放：通过验证的回答直接解析，其余记录各自经并发控制器单条重新请求
+            results = await asyncio.gather(
+                *(check_single_record(session, r, answer) if answer is not None else process_with_semaphore(session, r)
+                  for r, answer in zip(batch, answers)),
+                return_exceptions=True
+            )
+            for r, result, answer in zip(batch, results, answers):
+                if answer is not None:
+                    journal_result(r, result)
+            return results
         
         # 执行并发处理
-        logger.info(f"使用 {semaphore._value} 并发请求处理 {len(records_to_process)} 条记录...")
+        logger.info(f"使用 {limiter.limit} 并发请求处理 {len(pending_records)} 条记录..."
+                    + (f"（已从检查点恢复 {journal.resumed_count} 条）" if journal.resumed_count else "")
+                    + (f"（批处理，每批 {batch_size} 条）" if batcher else ""))
         
         processed_records = []
-        with tqdm_asyncio(total=len(records_to_process), desc=f"检查SQL完整性 ({step_name})") as pbar:
-            async with aiohttp.ClientSession() as session:
-                tasks = []
-                for record in records_to_process:
+        with tqdm_asyncio(total=len(pending_records), desc=f"检查SQL完整性 ({step_name})") as pbar:
+            session = llm_client.get_session()
+            tasks = []
+            if batcher:
+                for batch in batcher.split(pending_records):
+                    task = asyncio.ensure_future(process_batch_with_semaphore(session, batch))
+                    task.add_done_callback(lambda fut, n=len(batch), pbar=pbar: pbar.update(n))
+                    tasks.append(task)
+            else:
+                for record in pending_records:
                     task = asyncio.ensure_future(process_with_semaphore(session, record))
                     
                     def update_progress(fut, pbar=pbar):
@@ -392,7 +760,19 @@ class WorkflowManager:
                     task.add_done_callback(update_progress)
                     tasks.append(task)
                 
+            try:
                 processed_records = await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                journal.close()
+            
+            if batcher:
+                # 展开批结果，整批异常时该批每条记录都记为异常
+                batch_results = processed_records
+                processed_records = []
+                for batch, result in zip(batcher.split(pending_records), batch_results):
+                    processed_records.extend(result if isinstance(result, list) else [result] * len(batch))
+        
+        processed_records = journal.merge(records_to_process, processed_records)
         
         # 处理结果
         tagged_data = []
@@ -422,12 +802,10 @@ class WorkflowManager:
         self.current_data = excluded_records + tagged_data
         
         # 保存标记后的数据
-        tagging_output_dir = self.workflow_dir / "sql_completeness_check"
-        tagging_output_dir.mkdir(exist_ok=True)
-        
-        tagged_data_file = tagging_output_dir / f"{step_name}.json"
-        with open(tagged_data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.current_data, f, ensure_ascii=False, indent=2)
+        tagged_data_file = output_path(tagging_output_dir / f"{step_name}.json")
+        write_records(tagged_data_file, self.current_data)
+        journal.finalize()
+        self._register_output(tagged_data_file, step_name, 'records', len(self.current_data), 'sql_completeness_check')
         
         # 记录工作流步骤
         step_info = {
@@ -444,12 +822,17 @@ class WorkflowManager:
             'concurrent_requests': concurrency,
             'output_file': str(tagged_data_file)
         }
+        if journal.resumed_count:
+            step_info['checkpoint'] = journal.get_stats()
+        if batcher:
+            step_info['prompt_batching'] = batcher.get_stats()
         
         self.workflow_steps.append(step_info)
         
         logger.info(f"SQL完整性检查完成 - 在 {len(records_to_process):,} 条待查记录中，标记了 {lack_info_count:,} 条缺少信息的记录，{error_count:,} 条处理错误。")
         return step_info
 
+    @profile_step
     async def check_sql_correctness(self, step_name: str = "sql_correctness_check_step") -> Dict[str, Any]:
         """
         使用LLM检查数据的SQL正确性并进行标记
@@ -469,17 +852,7 @@ class WorkflowManager:
         records_to_process = []
         excluded_records = []
         for record in self.current_data:
-            sql_list = record.get('sql_statement_list', [])
-            # 检查是否为 <NO SQL GENERATE>（可能是字符串或包含该字符串的列表）
-            is_no_sql = False
-            if isinstance(sql_list, str):
-                is_no_sql = sql_list == '<NO SQL GENERATE>'
-            elif isinstance(sql_list, list):
-                is_no_sql = len(sql_list) == 1 and sql_list[0] == '<NO SQL GENERATE>'
-            
-            has_lack_info_tag = record.get('completeness_check', {}).get('tag') == '<LACK INFORMATION>'
-            
-            if is_no_sql or has_lack_info_tag:
+            if not self._needs_correctness_check(record):
                 excluded_records.append(record)
             else:
                 records_to_process.append(record)
@@ -523,87 +896,45 @@ class WorkflowManager:
         
         llm_client = LLMClient(llm_server)
 
-        async def check_single_record(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
-            """检查单条记录的SQL正确性"""
-            try:
-                # 安全地处理元数据
-                code_meta_data = record.get('code_meta_data', [])
-                if isinstance(code_meta_data, list) and code_meta_data:
-                    code_meta = str(code_meta_data[0])
-                else:
-                    # 如果是空列表，传递空字符串；否则，转换整个对象
-                    code_meta = '' if isinstance(code_meta_data, list) else str(code_meta_data)
-
-                caller_raw = record.get('caller')
-                caller = str(caller_raw).strip() if caller_raw else '<EMPTY>'
-                prompt = get_sql_correctness_check_prompt(
-                    caller=caller,
-                    code_meta=code_meta,
-                    orm_code=record.get('orm_code', ''),
-                    sql_statements=str(record.get('sql_statement_list', []))
-                )
-                
-                # 使用格式验证调用LLM
-                from utils.format_validators import validate_sql_correctness_response
-                
-                response = await llm_client.call_async_with_format_validation(
-                    session, prompt, 
-                    validator=validate_sql_correctness_response,
-                    max_tokens=100, temperature=0.0,
-                    module="workflow", component="sql_correctness_check"
-                )
-                
-                is_correct = True
-                reason = ""
-                correction_override = None
-                
-                if response and response.strip().lower().startswith('否'):
-                    is_correct = False
-                    reason = response.replace('否', '').strip(' ，,')
-
-                    # 新增逻辑：如果理由涉及特定关键词，则覆盖为正确
-                    if re.search(r'事务|表名', reason):
-                        is_correct = True
-                        correction_override = f"Keyword match: {reason}"
-                
-                new_record = record.copy()
-                new_record['correctness_check'] = {
-                    'is_correct': is_correct,
-                    'reason': reason,
-                    'tag': '' if is_correct else '<INCORRECT SQL>',
-                    'checked_at': datetime.now().isoformat(),
-                    'correction_override': correction_override
-                }
-                return new_record
-
-            except Exception as e:
-                logger.warning(f"检查记录正确性失败: {e}")
-                error_record = record.copy()
-                error_record['correctness_check'] = {
-                    'is_correct': True,  # 默认正确
-                    'reason': f'检查失败: {str(e)}',
-                    'tag': '',
-                    'checked_at': datetime.now().isoformat(),
-                    'check_error': True
-                }
-                return error_record
+        check_single_record = self._make_correctness_checker(llm_client)
 
         # 动态获取并发数
         from config.data_processing.workflow.workflow_config import get_workflow_config  # type: ignore
         workflow_config = get_workflow_config()
         concurrency = workflow_config.get_concurrency('sql_correctness_check')
-        semaphore = asyncio.Semaphore(concurrency)
+        limiter = llm_client.get_concurrency_limiter('sql_correctness_check', concurrency)
+
+        # 检查点日志：已完成的记录在中断重跑时直接复用
+        from config.data_processing.cleaning.sql_completeness_check_prompt import SQL_CORRECTNESS_CHECK_PROMPT  # type: ignore
+        output_dir = self.workflow_dir / "sql_correctness_check"
+        output_dir.mkdir(exist_ok=True)
+        journal = self._open_step_journal(
+            output_dir, step_name, step_type='sql_correctness_check',
+            prompt=SQL_CORRECTNESS_CHECK_PROMPT, server=llm_server, model=llm_client.config.model_name,
+            max_tokens=100
+        )
+        pending_records = journal.pending(records_to_process)
+        if journal.resumed_count:
+            logger.info(f"已从检查点恢复 {journal.resumed_count:,} 条记录，剩余 {len(pending_records):,} 条待检查")
+
         async def process_with_semaphore(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
-            async with semaphore:
-                return await check_single_record(session, record)
+            async with limiter:
+                result = await check_single_record(session, record)
+            if not result.get('correctness_check', {}).get('check_error'):
+                journal.append(record, result)
+            return result
 
         processed_records = []
-        with tqdm_asyncio(total=len(records_to_process), desc=f"检查SQL正确性 ({step_name})") as pbar:
-            async with aiohttp.ClientSession() as session:
-                tasks = [asyncio.ensure_future(process_with_semaphore(session, r)) for r in records_to_process]
-                for task in tasks:
-                    task.add_done_callback(lambda p: pbar.update(1))
+        with tqdm_asyncio(total=len(pending_records), desc=f"检查SQL正确性 ({step_name})") as pbar:
+            session = llm_client.get_session()
+            tasks = [asyncio.ensure_future(process_with_semaphore(session, r)) for r in pending_records]
+            for task in tasks:
+                task.add_done_callback(lambda p: pbar.update(1))
+            try:
                 processed_records = await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                journal.close()
+        processed_records = journal.merge(records_to_process, processed_records)
 
         final_data = []
         error_count = 0
@@ -647,11 +978,10 @@ class WorkflowManager:
 
         self.current_data = excluded_records + final_data
         
-        output_dir = self.workflow_dir / "sql_correctness_check"
-        output_dir.mkdir(exist_ok=True)
-        output_file = output_dir / f"{step_name}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.current_data, f, ensure_ascii=False, indent=2)
+        output_file = output_path(output_dir / f"{step_name}.json")
+        write_records(output_file, self.current_data)
+        journal.finalize()
+        self._register_output(output_file, step_name, 'records', len(self.current_data), 'sql_correctness_check')
             
         step_info = {
             'step_name': step_name,
@@ -667,11 +997,14 @@ class WorkflowManager:
             'incorrect_rate': incorrect_count / len(records_to_process) * 100 if records_to_process else 0.0,
             'output_file': str(output_file)
         }
+        if journal.resumed_count:
+            step_info['checkpoint'] = journal.get_stats()
         
         self.workflow_steps.append(step_info)
         logger.info(f"SQL正确性检查完成 - 在 {len(records_to_process):,} 条记录中，发现 {incorrect_count:,} 条不正确，{override_count:,} 条因关键词被覆盖为正确，{error_count:,} 条处理错误。")
         return step_info
 
+    @profile_step
     async def run_redundant_sql_validation(self, apply_fix: bool = False, step_name: str = "redundant_sql_validation_step") -> Dict[str, Any]:
         """
         运行冗余SQL验证步骤（新版接口）
@@ -736,20 +1069,54 @@ class WorkflowManager:
         logger.info(f"读取到 {len(llm_candidates)} 个LLM验证候选项")
         
         # 2️⃣ 调用新版验证器
-        from data_processing.validation.redundant_sql_validator import RedundantSQLValidator
+        from data_processing.validation.redundant_sql_validator import CANDIDATE_ID_FIELDS, RedundantSQLValidator
+        from config.data_processing.validation.redundant_sql_validation_prompt import (  # type: ignore
+            SYNTAX_EQUIVALENCE_PROMPT, REDUNDANT_BUSINESS_VALIDATION_PROMPT, NEW_FINGERPRINT_VALIDATION_PROMPT,
+            MISSING_SQL_VALIDATION_PROMPT, RULE_BASED_FILTER_PROMPT
+        )
         validation_output_dir = self.workflow_dir / "redundant_sql_validation"
         validator = RedundantSQLValidator(output_dir=str(validation_output_dir))
         # 动态获取并发数
         from config.data_processing.workflow.workflow_config import get_workflow_config  # type: ignore
         workflow_config = get_workflow_config()
         concurrency = workflow_config.get_concurrency('redundant_sql_validation')
-        validation_result = await validator.validate_llm_candidates(llm_candidates, max_concurrent=concurrency)
         
-        # 3️⃣ 可选：应用修复
+        # 检查点日志：已验证的候选项在中断重跑、增量重跑时直接复用
+        journal = self._open_step_journal(
+            validation_output_dir, step_name, id_fields=CANDIDATE_ID_FIELDS, step_type='redundant_sql_validation',
+            prompts=[SYNTAX_EQUIVALENCE_PROMPT, REDUNDANT_BUSINESS_VALIDATION_PROMPT, NEW_FINGERPRINT_VALIDATION_PROMPT,
+                     MISSING_SQL_VALIDATION_PROMPT, RULE_BASED_FILTER_PROMPT],
+            server=validator.llm_client.server_name, model=validator.llm_client.config.model_name,
+            max_tokens=workflow_config.get_max_tokens("validation", "redundant_sql_validator")
+        )
+        try:
+            validation_result = await validator.validate_llm_candidates(llm_candidates, max_concurrent=concurrency,
+                                                                        journal=journal)
+        finally:
+            journal.close()
+        journal.finalize()
+        
+        # 3️⃣ 可选：应用修复（修复审核同样写检查点日志）
+        review_journal = None
         if apply_fix:
-            await self._apply_fix_recommendations_async(validation_result.get('fix_recommendations', {}))
+            from config.data_processing.cleaning.fix_review_prompts import REMOVAL_REVIEW_PROMPT, ADDITION_REVIEW_PROMPT  # type: ignore
+            review_journal = self._open_step_journal(
+                validation_output_dir, f"{step_name}.fix_review", id_fields=FIX_REVIEW_ID_FIELDS,
+                step_type='fix_review', prompts=[REMOVAL_REVIEW_PROMPT, ADDITION_REVIEW_PROMPT],
+                server=FIX_REVIEW_LLM_SERVER, max_tokens=workflow_config.get_max_tokens("workflow", "fix_review")
+            )
+            try:
+                await self._apply_fix_recommendations_async(validation_result.get('fix_recommendations', {}),
+                                                            journal=review_journal)
+            finally:
+                review_journal.close()
+            review_journal.finalize()
             logger.info("已根据fix_recommendations应用修复到当前数据集")
         
+        for report_file in (validation_result.get('report_files') or {}).values():
+            if isinstance(report_file, (str, Path)):
+                self._register_output(report_file, step_name, 'report', step_type='redundant_sql_validation')
+        
         # 4️⃣ 记录workflow步骤
         fr = validation_result['fix_recommendations']
         step_info = {
@@ -763,6 +1130,10 @@ class WorkflowManager:
             'apply_fix': apply_fix,
             'orm_analysis_reports': analysis_reports
         }
+        if journal.resumed_count:
+            step_info['checkpoint'] = journal.get_stats()
+        if review_journal is not None and review_journal.resumed_count:
+            step_info['fix_review_checkpoint'] = review_journal.get_stats()
         self.workflow_steps.append(step_info)
         
         logger.info("冗余SQL验证(新版接口)完成")
@@ -771,7 +1142,7 @@ class WorkflowManager:
     # ------------------------------------------------------------------
     # 新增: 根据验证结果中的 fix_recommendations 修改 self.current_data
     # ------------------------------------------------------------------
-    async def _apply_fix_recommendations_async(self, fix_recommendations: Dict[str, Any]):
+    async def _apply_fix_recommendations_async(self, fix_recommendations: Dict[str, Any], journal=None):
         """
         根据fix_recommendations修改当前数据集（异步版本）
         
@@ -789,6 +1160,14 @@ class WorkflowManager:
         修复逻辑：
         - 冗余SQL直接删除，不置为<NO SQL GENERATE>
         - 如果删除后SQL列表为空，删除整条记录
+        
+        每条修复先经LLM审核：审核请求并发执行（fix_review 并发控制器），
+        结果按修复建议中的原始顺序应用，输出与串行审核一致。
+        
+        Args:
+            fix_recommendations: 验证器生成的修复建议
+            journal: 修复审核的检查点日志（按 FIX_REVIEW_ID_FIELDS 计算ID），提供时已审核的修复直接复用审核结果，
+                审核成功的结果逐条追加到日志。日志由调用方关闭
         """
         if not fix_recommendations or not self.current_data:
             logger.info("没有修复建议或当前数据为空，跳过修复应用")
@@ -799,6 +1178,10 @@ class WorkflowManager:
         remove_wrong_new_map: Dict[Tuple[str, str], set] = {}
         add_missing_map: Dict[Tuple[str, str], List[Any]] = {}
         
+        # 第一遍：按原有顺序收集所有待审核的修复操作
+        # 每项为 (目标映射, key, 审核动作, 审核文本, 审核通过时写入的值)
+        review_jobs: List[Tuple[Dict[Tuple[str, str], Any], Tuple[str, str], str, str, Any]] = []
+        
         # 处理冗余删除
         for item in fix_recommendations.get('remove_redundant', []):
             orm_code = item.get('orm_code', '')
@@ -808,19 +1191,8 @@ class WorkflowManager:
                 remove_redundant_map[key] = set()
             for sql_rec in item.get('candidate_info', {}).get('redundant_sqls', []):
                 sql_text = sql_rec.get('sql_text', '').replace(' <REDUNDANT SQL>', '').strip()
-                if not sql_text:
-                    continue
-
-                # LLM 审核删除操作（异步）
-                review = await self._llm_review_fix_async(orm_code, caller, 'remove', sql_text)
-                if review.get('accepted', True):
-                    remove_redundant_map[key].add(sql_text)
-                else:
-                    replacement = review.get('replacement', '')
-                    if replacement:
-                        if key not in add_missing_map:
-                            add_missing_map[key] = []
-                        add_missing_map[key].append(replacement)
+                if sql_text:
+                    review_jobs.append((remove_redundant_map, key, 'remove', sql_text, sql_text))
         
         # 处理错误新增删除
         for item in fix_recommendations.get('remove_wrong_new', []):
@@ -831,18 +1203,8 @@ class WorkflowManager:
                 remove_wrong_new_map[key] = set()
             for sql_rec in item.get('candidate_info', {}).get('new_sqls', []):
                 sql_text = sql_rec.get('sql_text', '').strip()
-                if not sql_text:
-                    continue
-
-                review = await self._llm_review_fix_async(orm_code, caller, 'remove', sql_text)
-                if review.get('accepted', True):
-                    remove_wrong_new_map[key].add(sql_text)
-                else:
-                    replacement = review.get('replacement', '')
-                    if replacement:
-                        if key not in add_missing_map:
-                            add_missing_map[key] = []
-                        add_missing_map[key].append(replacement)
+                if sql_text:
+                    review_jobs.append((remove_wrong_new_map, key, 'remove', sql_text, sql_text))
         
         # 处理缺失添加
         for item in fix_recommendations.get('add_missing', []):
@@ -859,34 +1221,56 @@ class WorkflowManager:
                     # 简单SQL文本
                     sql_text = missing_item.get('sql_text', '').strip()
                     if sql_text:
-                        review = await self._llm_review_fix_async(orm_code, caller, 'add', sql_text)
-                        if review.get('accepted', True):
-                            add_missing_map[key].append(sql_text)
-                        else:
-                            replacement = review.get('replacement', '')
-                            if replacement:
-                                add_missing_map[key].append(replacement)
+                        review_jobs.append((add_missing_map, key, 'add', sql_text, sql_text))
                 elif isinstance(missing_item, dict) and missing_item.get('type') == 'param_dependent':
-                    # param_dependent结构
-                    # 将整个结构转为字符串示例进行审核
-                    review = await self._llm_review_fix_async(orm_code, caller, 'add', str(missing_item))
-                    if review.get('accepted', True):
-                        add_missing_map[key].append(missing_item)
-                    else:
-                        replacement = review.get('replacement', '')
-                        if replacement:
-                            add_missing_map[key].append(replacement)
+                    # param_dependent结构：将整个结构转为字符串示例进行审核
+                    review_jobs.append((add_missing_map, key, 'add', str(missing_item), missing_item))
                 elif isinstance(missing_item, str):
                     # 直接的SQL字符串
                     sql_text = missing_item.strip()
                     if sql_text:
-                        review = await self._llm_review_fix_async(orm_code, caller, 'add', sql_text)
-                        if review.get('accepted', True):
-                            add_missing_map[key].append(sql_text)
-                        else:
-                            replacement = review.get('replacement', '')
-                            if replacement:
-                                add_missing_map[key].append(replacement)
+                        review_jobs.append((add_missing_map, key, 'add', sql_text, sql_text))
+        
+        # 第二遍：并发审核（共享客户端与连接池，受自适应并发控制器限制）
+        reviews: List[Dict[str, Any]] = []
+        if review_jobs:
+            from utils.llm_client import LLMClient
+            review_client = LLMClient(FIX_REVIEW_LLM_SERVER)
+            limiter = review_client.get_concurrency_limiter('fix_review')
+            
+            review_requests = [{'action': action, 'orm_code': key[0], 'caller': key[1], 'target_sql': review_text}
+                               for _, key, action, review_text, _ in review_jobs]
+            pending_requests = journal.pending(review_requests) if journal is not None else review_requests
+            if journal is not None and journal.resumed_count:
+                logger.info(f"已从检查点恢复 {journal.resumed_count:,} 条修复审核结果，剩余 {len(pending_requests):,} 条待审核")
+            
+            async def review_with_limiter(request: Dict[str, str]) -> Dict[str, Any]:
+                async with limiter:
+                    review = await self._llm_review_fix_async(request['orm_code'], request['caller'], request['action'],
+                                                              request['target_sql'], llm_client=review_client)
+                if journal is not None and not review.get('review_error'):
+                    journal.append(request, review)
+                return review
+            
+            with tqdm_asyncio(total=len(pending_requests), desc="LLM审核修复建议") as pbar:
+                tasks = [asyncio.ensure_future(review_with_limiter(request)) for request in pending_requests]
+                for task in tasks:
+                    task.add_done_callback(lambda p: pbar.update(1))
+                reviews = await asyncio.gather(*tasks)
+            if journal is not None:
+                reviews = journal.merge(review_requests, reviews)
+        
+        # 第三遍：按收集顺序应用审核结果，保证输出与串行审核一致
+        for (target_map, key, action, _, value), review in zip(review_jobs, reviews):
+            if review.get('accepted', True):
+                if action == 'remove':
+                    target_map[key].add(value)
+                else:
+                    target_map[key].append(value)
+            else:
+                replacement = review.get('replacement', '')
+                if replacement:
+                    add_missing_map.setdefault(key, []).append(replacement)
         
         # 合并所有删除映射
         all_remove_map: Dict[Tuple[str, str], set] = {}
@@ -1139,7 +1523,9 @@ class WorkflowManager:
             # 所有变体都被删除，返回None
             return None
 
-    async def extract_keyword_data(self, keywords: Optional[List[str]] = None, step_name: str = "keyword_extraction_step2", use_llm: bool = False) -> Dict[str, Any]:
+    @profile_step
+    async def extract_keyword_data(self, keywords: Optional[List[str]] = None, step_name: str = "keyword_extraction_step2",
+                                   use_llm: bool = False, save_report: bool = False) -> Dict[str, Any]:
         """
         从清洗后的数据中提取关键词数据
         
@@ -1147,6 +1533,7 @@ class WorkflowManager:
             keywords: 关键词列表，如果为None则使用GORM关键词
             step_name: 步骤名称
             use_llm: 是否使用LLM进行关键词判断而不是正则匹配
+            save_report: 关键词匹配模式下是否写出提取报告（匹配记录、按关键词分类的文件和统计）
             
         Returns:
             提取结果信息
@@ -1160,64 +1547,31 @@ class WorkflowManager:
         if use_llm:
             return await self._extract_keyword_data_with_llm(step_name)
         
-        # 创建临时的DataReader来使用其提取功能
-        try:
-            from ..data_reader import DataReader
-        except ImportError:
-            from data_reader import DataReader
-        
-        # 转换回FunctionRecord格式
-        temp_records = []
-        for record_dict in self.current_data:
-            code_meta_data = [
-                CodeMetaData(
-                    code_file=meta['code_file'],
-                    code_start_line=meta['code_start_line'],
-                    code_end_line=meta['code_end_line'],
-                    code_key=meta['code_key'],
-                    code_value=meta.get('code_value', ''),
-                    code_label=meta['code_label'],
-                    code_type=meta['code_type'],
-                    code_version=meta['code_version']
-                ) for meta in record_dict['code_meta_data']
-            ]
-            
-            record = FunctionRecord(
-                function_name=record_dict['function_name'],
-                orm_code=record_dict['orm_code'],
-                caller=record_dict['caller'],
-                sql_statement_list=record_dict['sql_statement_list'],
-                sql_types=record_dict['sql_types'],
-                code_meta_data=code_meta_data,
-                sql_pattern_cnt=record_dict['sql_pattern_cnt'],
-                source_file=record_dict['source_file']
-            )
-            temp_records.append(record)
-        
-        # 创建临时目录
-        import tempfile
-        import os
+        # 直接在字典记录上匹配关键词，结果保留在内存中
+        from data_processing.data_reader import (
+            GORM_KEYWORDS, extract_keyword_records, save_keyword_extraction_report
+        )
+        target_keywords = keywords if keywords is not None else GORM_KEYWORDS
+        matched_records, extraction_stats = extract_keyword_records(self.current_data, target_keywords)
+        self.extracted_data = matched_records
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # 创建临时DataReader并设置数据（不依赖实际文件）
-            temp_reader = DataReader(temp_dir)
-            temp_reader.records = temp_records
-            
-            # 执行关键词提取
+        # 报告文件只在需要时写出，在后台线程中进行，不阻塞后续步骤（close 时等待写完）
+        output_directory = None
+        if save_report:
             extraction_output_dir = self.workflow_dir / "keyword_extraction"
-            if keywords is None:
-                extract_result = temp_reader.extract_gorm_keywords(str(extraction_output_dir))
-            else:
-                extract_result = temp_reader.extract_by_keywords(
-                    keywords=keywords,
-                    output_dir=str(extraction_output_dir),
-                    step_name=step_name
-                )
-        
-        # 加载提取的数据
-        extracted_data_file = Path(extract_result['output_directory']) / "keyword_matched_records.json"
-        with open(extracted_data_file, 'r', encoding='utf-8') as f:
-            self.extracted_data = json.load(f)
+            report_step_name = step_name if keywords is not None else "gorm_keywords"
+            def write_report():
+                report = save_keyword_extraction_report(extraction_output_dir, report_step_name,
+                                                        matched_records, extraction_stats)
+                report_dir = Path(report['output_directory'])
+                self._register_output(report['matched_records_file'], step_name,
+                                      'keyword_records', len(matched_records), 'keyword_extraction')
+                self._register_output(report_dir / "extraction_statistics.json", step_name,
+                                      'report', step_type='keyword_extraction')
+            
+            report_task = asyncio.ensure_future(asyncio.to_thread(write_report))
+            self._background_tasks.append(report_task)
+            output_directory = str(extraction_output_dir)
         
         step_info = {
             'step_name': step_name,
@@ -1225,9 +1579,10 @@ class WorkflowManager:
             'timestamp': datetime.now().isoformat(),
             'input_records': len(self.current_data),
             'extracted_records': len(self.extracted_data),
-            'extraction_rate': len(self.extracted_data) / len(self.current_data) * 100,
+            'extraction_rate': extraction_stats['match_rate'],
             'keywords_used': keywords or "GORM预定义关键词",
-            'output_directory': extract_result['output_directory']
+            'keyword_frequency': extraction_stats['keyword_frequency'],
+            'output_directory': output_directory
         }
         
         self.workflow_steps.append(step_info)
@@ -1235,7 +1590,8 @@ class WorkflowManager:
         logger.info(f"关键词提取完成 - 从 {len(self.current_data):,} 条记录中提取了 {len(self.extracted_data):,} 条匹配记录")
         return step_info
 
-    async def _llm_review_fix_async(self, orm_code: str, caller: str, action: str, target_sql: str) -> Dict[str, Any]:
+    async def _llm_review_fix_async(self, orm_code: str, caller: str, action: str, target_sql: str,
+                                    llm_client=None) -> Dict[str, Any]:
         """使用LLM对单条修复操作进行审核（异步版本）。
 
         Args:
@@ -1243,9 +1599,10 @@ class WorkflowManager:
             caller: 调用者名称
             action: 'remove' or 'add'
             target_sql: 目标 SQL 文本
+            llm_client: 复用的LLM客户端，为None时新建
 
         Returns:
-            dict: {"accepted": bool, "replacement": str}
+            dict: {"accepted": bool, "replacement": str}，调用失败时默认接受并带 "review_error": True
         """
         try:
             # 延迟导入避免循环依赖
@@ -1261,7 +1618,7 @@ class WorkflowManager:
             prompt = prompt.replace('{caller}', str(caller))
             prompt = prompt.replace('{target_sql}', str(target_sql))
             
-            client = LLMClient("v3")
+            client = llm_client or LLMClient(FIX_REVIEW_LLM_SERVER)
             
             # 使用格式验证调用LLM
             from utils.format_validators import validate_fix_review_response
@@ -1273,32 +1630,33 @@ class WorkflowManager:
             max_retries = workflow_config.get_max_retries("workflow", "fix_review")
             retry_delay = workflow_config.get_retry_delay("workflow", "fix_review")
             
-            async with aiohttp.ClientSession() as session:
-                response = await client.call_async_with_format_validation(
-                    session, 
-                    prompt, 
-                    validator=validate_fix_review_response,
-                    max_tokens=max_tokens, 
-                    temperature=0.0,
-                    max_retries=max_retries,
-                    retry_delay=retry_delay,
-                    module="workflow", component="fix_review"
-                )
+            session = client.get_session()
+            response = await client.call_async_with_format_validation(
+                session, 
+                prompt, 
+                validator=validate_fix_review_response,
+                max_tokens=max_tokens, 
+                temperature=0.0,
+                max_retries=max_retries,
+                retry_delay=retry_delay,
+                module="workflow", component="fix_review"
+            )
                 
-                if response:
-                    # 提取 JSON
-                    match = re.search(r"\{[\s\S]*\}", response)
-                    if match:
-                        resp_json = json.loads(match.group(0))
-                        accepted = bool(resp_json.get("accepted", True))
-                        replacement = resp_json.get("replacement", "")
-                        return {"accepted": accepted, "replacement": replacement}
+            if response:
+                # 提取 JSON
+                match = re.search(r"\{[\s\S]*\}", response)
+                if match:
+                    resp_json = json.loads(match.group(0))
+                    accepted = bool(resp_json.get("accepted", True))
+                    replacement = resp_json.get("replacement", "")
+                    return {"accepted": accepted, "replacement": replacement}
         except Exception as e:
             # 记录错误但不中断流程
             import logging
             logger = logging.getLogger(__name__)
             logger.warning(f"LLM审查调用失败: {e}")
-            pass  # 出错时默认接受
+            # 出错时默认接受，标记出错，检查点日志不记录该结果
+            return {"accepted": True, "replacement": "", "review_error": True}
         return {"accepted": True, "replacement": ""}
 
     async def _extract_keyword_data_with_llm(self, step_name: str) -> Dict[str, Any]:
@@ -1372,126 +1730,191 @@ class WorkflowManager:
             
             return unique_keywords
 
-        # 设置并发控制
-        concurrency = 10  # 降低并发数以避免服务器过载
-        semaphore = asyncio.Semaphore(concurrency)
-
         # 延迟导入避免循环依赖
         from utils.llm_client import LLMClient
         from config.data_processing.cleaning.special_keyword_prompt import SPECIAL_KEYWORD_PROMPT, SPECIAL_KEYWORDS
         
-        # 获取LLM服务器配置
-        from config.data_processing.workflow.workflow_config import get_workflow_config
-        workflow_config = get_workflow_config()
-        llm_server = workflow_config.get_llm_server("workflow", "keyword_processing")
+        # 获取LLM服务器配置
+        from config.data_processing.workflow.workflow_config import get_workflow_config
+        workflow_config = get_workflow_config()
+        llm_server = workflow_config.get_llm_server("workflow", "keyword_processing")
+
+        llm_client = LLMClient(llm_server)
+
+        # 设置并发控制（该服务器共享的控制器）
+        concurrency = 10  # 降低并发数以避免服务器过载
+        limiter = llm_client.get_concurrency_limiter('llm_keyword_extraction', concurrency)
+
+        session = llm_client.get_session()
+
+        from utils.format_validators import validate_keyword_extraction_response
+
+        def fill_keyword_template(template: str, record: Dict[str, Any]) -> str:
+            """填充提示词模板（使用安全的字符串替换而不是format）"""
+            text = template.replace('{caller}', str(record.get('caller', '')))
+            text = text.replace('{code_meta}', json.dumps(record.get('code_meta_data', []), ensure_ascii=False, indent=2))
+            text = text.replace('{orm_code}', str(record.get('orm_code', '')))
+            text = text.replace('{sql_statements}', json.dumps(record.get('sql_statement_list', []), ensure_ascii=False, indent=2))
+            return text
+
+        async def analyze_record(record: Dict[str, Any], response: Optional[str] = None) -> Dict[str, Any]:
+            """处理单条记录，确保总是返回记录而不是None（response不为空时直接使用批量模式得到的回答）"""
+            try:
+                if response is None:
+                    # 构造提示
+                    prompt = fill_keyword_template(SPECIAL_KEYWORD_PROMPT, record)
+                    
+                    # 使用格式验证调用LLM
+                    response = await llm_client.call_async_with_format_validation(
+                        session, 
+                        prompt, 
+                        validator=validate_keyword_extraction_response,
+                        max_tokens=200, 
+                        temperature=0.0,
+                        module="workflow", component="keyword_processing"
+                    )
+                
+                if response:
+                    result_text = response.strip()
+                    logger.debug(f"LLM响应 for {record.get('function_name', 'unknown')}: {result_text}")
+                    
+                    # 使用新的解析函数
+                    matched_keywords = parse_llm_keyword_response(result_text)
+                    
+                    # 复制记录并添加分析信息
+                    processed_record = record.copy()
+                    processed_record['llm_keyword_analysis'] = {
+                        'matched_keywords': matched_keywords,
+                        'llm_response': result_text,
+                        'analysis_timestamp': datetime.now().isoformat(),
+                        'has_special_keywords': bool(matched_keywords)
+                    }
+                    return processed_record
+                else:
+                    logger.error(f"LLM调用失败 for {record.get('function_name', 'unknown')}: 无响应")
+                    # LLM调用失败，返回原记录并标记
+                    failed_record = record.copy()
+                    failed_record['llm_keyword_analysis'] = {
+                        'matched_keywords': [],
+                        'llm_response': '',
+                        'analysis_timestamp': datetime.now().isoformat(),
+                        'has_special_keywords': False,
+                        'llm_call_failed': True,
+                        'error': 'LLM调用无响应'
+                    }
+                    return failed_record
+                    
+            except Exception as e:
+                logger.error(f"处理记录时发生错误 {record.get('function_name', 'unknown')}: {e}")
+                # 异常情况，返回原记录并标记错误
+                error_record = record.copy()
+                error_record['llm_keyword_analysis'] = {
+                    'matched_keywords': [],
+                    'llm_response': '',
+                    'analysis_timestamp': datetime.now().isoformat(),
+                    'has_special_keywords': False,
+                    'processing_error': True,
+                    'error': str(e)
+                }
+                return error_record
+        
+        # 检查点日志：已完成的记录在中断重跑时直接复用
+        batch_size = workflow_config.get_batch_size("workflow", "keyword_processing")
+        extraction_output_dir = self.workflow_dir / "keyword_extraction_llm"
+        extraction_output_dir.mkdir(exist_ok=True)
+        journal = self._open_step_journal(
+            extraction_output_dir, step_name, step_type='llm_keyword_extraction',
+            prompt=SPECIAL_KEYWORD_PROMPT, keywords=SPECIAL_KEYWORDS, server=llm_server,
+            model=llm_client.config.model_name, max_tokens=200, batch_size=batch_size
+        )
+        pending_records = journal.pending(self.current_data)
+        if journal.resumed_count:
+            logger.info(f"已从检查点恢复 {journal.resumed_count:,} 条记录，剩余 {len(pending_records):,} 条待分析")
 
-        llm_client = LLMClient(llm_server)
+        def journal_result(record: Dict[str, Any], result: Dict[str, Any]) -> None:
+            analysis = result.get('llm_keyword_analysis', {})
+            if not analysis.get('llm_call_failed') and not analysis.get('processing_error'):
+                journal.append(record, result)
 
-        async with aiohttp.ClientSession() as session:
-            async def process_single_record(record: Dict[str, Any]) -> Dict[str, Any]:
-                """处理单条记录，确保总是返回记录而不是None"""
-                async with semaphore:
-                    try:                        # 构造提示
-                        # 使用安全的字符串替换而不是format
-                        prompt = SPECIAL_KEYWORD_PROMPT.replace('{caller}', str(record.get('caller', '')))
-                        prompt = prompt.replace('{code_meta}', json.dumps(record.get('code_meta_data', []), ensure_ascii=False, indent=2))
-                        prompt = prompt.replace('{orm_code}', str(record.get('orm_code', '')))
-                        prompt = prompt.replace('{sql_statements}', json.dumps(record.get('sql_statement_list', []), ensure_ascii=False, indent=2))
+        async def process_single_record(record: Dict[str, Any]) -> Dict[str, Any]:
+            async with limiter:
+                result = await analyze_record(record)
+            journal_result(record, result)
+            return result
 
-                        
-                        # 使用格式验证调用LLM
-                        from utils.format_validators import validate_keyword_extraction_response
-                        
-                        response = await llm_client.call_async_with_format_validation(
-                            session, 
-                            prompt, 
-                            validator=validate_keyword_extraction_response,
-                            max_tokens=200, 
-                            temperature=0.0,
-                            module="workflow", component="keyword_processing"
-                        )
-                        
-                        if response:
-                            result_text = response.strip()
-                            logger.debug(f"LLM响应 for {record.get('function_name', 'unknown')}: {result_text}")
-                            
-                            # 使用新的解析函数
-                            matched_keywords = parse_llm_keyword_response(result_text)
-                            
-                            # 复制记录并添加分析信息
-                            processed_record = record.copy()
-                            processed_record['llm_keyword_analysis'] = {
-                                'matched_keywords': matched_keywords,
-                                'llm_response': result_text,
-                                'analysis_timestamp': datetime.now().isoformat(),
-                                'has_special_keywords': bool(matched_keywords)
-                            }
-                            return processed_record
-                        else:
-                            logger.error(f"LLM调用失败 for {record.get('function_name', 'unknown')}: 无响应")
-                            # LLM调用失败，返回原记录并标记
-                            failed_record = record.copy()
-                            failed_record['llm_keyword_analysis'] = {
-                                'matched_keywords': [],
-                                'llm_response': '',
-                                'analysis_timestamp': datetime.now().isoformat(),
-                                'has_special_keywords': False,
-                                'llm_call_failed': True,
-                                'error': 'LLM调用无响应'
-                            }
-                            return failed_record
-                            
-                    except Exception as e:
-                        logger.error(f"处理记录时发生错误 {record.get('function_name', 'unknown')}: {e}")
-                        # 异常情况，返回原记录并标记错误
-                        error_record = record.copy()
-                        error_record['llm_keyword_analysis'] = {
-                            'matched_keywords': [],
-                            'llm_response': '',
-                            'analysis_timestamp': datetime.now().isoformat(),
-                            'has_special_keywords': False,
-                            'processing_error': True,
-                            'error': str(e)
-                        }
-                        return error_record
-            
-            # 使用进度条并发处理所有记录
-            tasks = [process_single_record(record) for record in self.current_data]
-            
-            logger.info("开始并发调用LLM进行关键词分析...")
-            results = await tqdm_asyncio.gather(*tasks, desc="LLM关键词分析")
-            
-            # 所有记录都已经被处理并标记，更新当前数据
-            self.current_data = results
+        # 批处理模式：多条记录打包进一个提示词，未通过验证的槽位单独重新请求
+        batcher = None
+        if batch_size > 1:
+            from utils.prompt_batcher import PromptBatcher
+            from config.data_processing.cleaning.special_keyword_prompt import SPECIAL_KEYWORD_INSTRUCTIONS, SPECIAL_KEYWORD_MATERIAL
+            batcher = PromptBatcher(
+                llm_client, SPECIAL_KEYWORD_INSTRUCTIONS,
+                slot_validator=validate_keyword_extraction_response,
+                batch_size=batch_size, max_tokens_per_slot=200,
+                module="workflow", component="keyword_processing"
+            )
+
+        async def process_batch(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with limiter:
+                materials = [fill_keyword_template(SPECIAL_KEYWORD_MATERIAL, r) for r in batch]
+                answers = await batcher.run_batch(session, materials)
+            # 批量槽位已释放：通过验证的回答直接解析，其余记录各自经并发控制器单条重新请求
+            results = await asyncio.gather(*(
+                analyze_record(r, answer) if answer is not None else process_single_record(r)
+                for r, answer in zip(batch, answers)
+            ))
+            for r, result, answer in zip(batch, results, answers):
+                if answer is not None:
+                    journal_result(r, result)
+            return results
+
+        # 使用进度条并发处理所有记录
+        logger.info("开始并发调用LLM进行关键词分析..." + (f"（批处理，每批 {batch_size} 条）" if batcher else ""))
+        try:
+            if batcher:
+                results = []
+                with tqdm_asyncio(total=len(pending_records), desc="LLM关键词分析") as pbar:
+                    batch_tasks = []
+                    for batch in batcher.split(pending_records):
+                        task = asyncio.ensure_future(process_batch(batch))
+                        task.add_done_callback(lambda fut, n=len(batch), pbar=pbar: pbar.update(n))
+                        batch_tasks.append(task)
+                    for batch_result in await asyncio.gather(*batch_tasks):
+                        results.extend(batch_result)
+            else:
+                tasks = [process_single_record(record) for record in pending_records]
+                results = await tqdm_asyncio.gather(*tasks, desc="LLM关键词分析")
+        finally:
+            journal.close()
             
-            # 分离匹配和未匹配的记录
-            matched_records = [record for record in self.current_data 
-                             if record.get('llm_keyword_analysis', {}).get('has_special_keywords', False)]
-            unmatched_records = [record for record in self.current_data 
-                               if not record.get('llm_keyword_analysis', {}).get('has_special_keywords', False)]
+        # 所有记录都已经被处理并标记，更新当前数据
+        self.current_data = journal.merge(self.current_data, results)
             
-            # 数据完整性检查
-            # if len(matched_records) + len(unmatched_records) != len(self.current_data):
-            #     logger.error(f"❌ 数据处理后总数不匹配！原始: {len(self.current_data)}, 处理后: {len(matched_records) + len(unmatched_records)}")
-            #     logger.error(f"匹配记录: {len(matched_records)}, 未匹配记录: {len(unmatched_records)}")
-            #     raise ValueError("数据完整性检查失败：处理前后记录数不一致")
+        # 分离匹配和未匹配的记录
+        matched_records = [record for record in self.current_data 
+                         if record.get('llm_keyword_analysis', {}).get('has_special_keywords', False)]
+        unmatched_records = [record for record in self.current_data 
+                           if not record.get('llm_keyword_analysis', {}).get('has_special_keywords', False)]
             
-            # 保存提取的数据
-            extraction_output_dir = self.workflow_dir / "keyword_extraction_llm"
-            extraction_output_dir.mkdir(exist_ok=True)
+        # 数据完整性检查
+        # if len(matched_records) + len(unmatched_records) != len(self.current_data):
+        #     logger.error(f"❌ 数据处理后总数不匹配！原始: {len(self.current_data)}, 处理后: {len(matched_records) + len(unmatched_records)}")
+        #     logger.error(f"匹配记录: {len(matched_records)}, 未匹配记录: {len(unmatched_records)}")
+        #     raise ValueError("数据完整性检查失败：处理前后记录数不一致")
             
-            # 保存匹配的记录（用于后续处理）
-            self.extracted_data = matched_records  # 只保留匹配的记录用于后续处理
-            extracted_data_file = extraction_output_dir / "llm_keyword_matched_records.json"
-            with open(extracted_data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.extracted_data, f, ensure_ascii=False, indent=2)
+        # 保存匹配的记录（用于后续处理）
+        self.extracted_data = matched_records  # 只保留匹配的记录用于后续处理
+        extracted_data_file = output_path(extraction_output_dir / "llm_keyword_matched_records.json")
+        write_records(extracted_data_file, self.extracted_data)
             
-            # 保存未匹配的记录
-            unmatched_data_file = extraction_output_dir / "llm_keyword_unmatched_records.json"
-            with open(unmatched_data_file, 'w', encoding='utf-8') as f:
-                json.dump(unmatched_records, f, ensure_ascii=False, indent=2)
-        
-                # 统计关键词匹配情况
+        # 保存未匹配的记录
+        unmatched_data_file = output_path(extraction_output_dir / "llm_keyword_unmatched_records.json")
+        write_records(unmatched_data_file, unmatched_records)
+        journal.finalize()
+        self._register_output(extracted_data_file, step_name, 'keyword_records', len(self.extracted_data), 'llm_keyword_extraction')
+        self._register_output(unmatched_data_file, step_name, 'records_subset', len(unmatched_records), 'llm_keyword_extraction')
+        
+            # 统计关键词匹配情况
         keyword_stats = {}
         for record in self.extracted_data:
             for keyword in record.get('llm_keyword_analysis', {}).get('matched_keywords', []):
@@ -1508,6 +1931,7 @@ class WorkflowManager:
                 'special_keywords_used': SPECIAL_KEYWORDS,
                 'extraction_timestamp': datetime.now().isoformat()
             }, f, ensure_ascii=False, indent=2)
+        self._register_output(stats_file, step_name, 'report', step_type='llm_keyword_extraction')
         
         step_info = {
             'step_name': step_name,
@@ -1524,6 +1948,10 @@ class WorkflowManager:
             'unmatched_data_file': str(unmatched_data_file),
             'stats_file': str(stats_file)
         }
+        if journal.resumed_count:
+            step_info['checkpoint'] = journal.get_stats()
+        if batcher:
+            step_info['prompt_batching'] = batcher.get_stats()
         
         self.workflow_steps.append(step_info)
         
@@ -1532,6 +1960,7 @@ class WorkflowManager:
         
         return step_info
     
+    @profile_step
     def process_extracted_data(self, step_name: str = "special_processing_step3") -> Dict[str, Any]:
         """
         对提取的数据进行特殊处理
@@ -1576,9 +2005,9 @@ class WorkflowManager:
         processing_output_dir = self.workflow_dir / "special_processing"
         processing_output_dir.mkdir(exist_ok=True)
         
-        processed_data_file = processing_output_dir / f"{step_name}.json"
-        with open(processed_data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.extracted_data, f, ensure_ascii=False, indent=2)
+        processed_data_file = output_path(processing_output_dir / f"{step_name}.json")
+        write_records(processed_data_file, self.extracted_data)
+        self._register_output(processed_data_file, step_name, 'keyword_records', len(self.extracted_data), 'special_processing')
         
         step_info = {
             'step_name': step_name,
@@ -1595,6 +2024,7 @@ class WorkflowManager:
         logger.info(f"特殊处理完成 - 处理了 {len(self.extracted_data):,} 条提取的记录")
         return step_info
     
+    @profile_step
     def merge_processed_data_back(self, step_name: str = "merge_back_step4") -> Dict[str, Any]:
         """
         将处理后的数据合并回原数据集
@@ -1610,19 +2040,20 @@ class WorkflowManager:
         
         logger.info(f"开始将处理后的数据合并回原数据集: {step_name}")
         
-        # 创建function_name到记录的映射，用于快速查找
-        extracted_data_map = {record['function_name']: record for record in self.extracted_data}
+        # 按记录ID（function_name/orm_code/caller 内容哈希）索引处理后的数据，同名函数的不同调用者不会互相覆盖
+        from utils.record_store import RecordStore
+        extracted_store = RecordStore(self.extracted_data)
         
         # 合并数据
         merged_data = []
         updated_count = 0
         
         for original_record in self.current_data:
-            function_name = original_record['function_name']
+            processed = extracted_store.get(original_record)
             
-            if function_name in extracted_data_map:
+            if processed is not None:
                 # 如果在提取数据中找到对应记录，使用处理后的版本
-                processed_record = extracted_data_map[function_name].copy()
+                processed_record = processed.copy()
                 
                 # 保留原始记录中可能不在提取数据中的字段
                 for key, value in original_record.items():
@@ -1654,9 +2085,9 @@ class WorkflowManager:
         merge_output_dir = self.workflow_dir / "merged_data"
         merge_output_dir.mkdir(exist_ok=True)
         
-        merged_data_file = merge_output_dir / f"{step_name}.json"
-        with open(merged_data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.current_data, f, ensure_ascii=False, indent=2)
+        merged_data_file = output_path(merge_output_dir / f"{step_name}.json")
+        write_records(merged_data_file, self.current_data)
+        self._register_output(merged_data_file, step_name, 'records', len(self.current_data), 'data_merging')
         
         step_info = {
             'step_name': step_name,
@@ -1692,6 +2123,48 @@ class WorkflowManager:
             'workflow_directory': str(self.workflow_dir)
         }
         
+        # DAG调度的步骤图：依赖关系、各步骤开始/结束时间，可看出哪些分支并行执行
+        if self.step_graph:
+            summary['step_graph'] = self.step_graph
+        
+        # 自适应并发控制器的窗口与延迟样本
+        from utils.adaptive_limiter import get_all_limiter_stats
+        limiter_stats = get_all_limiter_stats()
+        if limiter_stats:
+            summary['concurrency_limiters'] = limiter_stats
+        
+        # LLM响应缓存命中统计
+        from utils.llm_response_cache import get_response_cache
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            cache_stats = response_cache.get_stats()
+            summary['llm_response_cache'] = cache_stats
+            logger.info(f"💾 LLM响应缓存: 命中 {cache_stats['hits']}, 未命中 {cache_stats['misses']}, "
+                        f"命中率 {cache_stats['hit_rate']:.1%}")
+        
+        # 并发相同请求被合并的次数（按模块/组件）
+        from utils.llm_client import get_coalescing_stats
+        coalescing_stats = get_coalescing_stats()
+        if coalescing_stats:
+            summary['llm_request_coalescing'] = coalescing_stats
+            logger.info(f"🔗 合并的重复LLM请求: {sum(coalescing_stats.values())} 次")
+        
+        # 统一重试策略的预算与熔断状态
+        from utils.retry_policy import get_retry_policy
+        summary['retry_policy'] = get_retry_policy().get_stats()
+        
+        # LLM调用遥测（延迟直方图、token、重试次数），单独保存在摘要旁
+        from config.data_processing.workflow.workflow_config import get_workflow_config
+        if get_workflow_config().get_telemetry_config()['save_metrics']:
+            from utils.llm_metrics import get_llm_metrics
+            llm_metrics = get_llm_metrics()
+            metrics_file = llm_metrics.save(self.workflow_dir / "llm_metrics.json")
+            totals = llm_metrics.to_dict()['totals']
+            summary['llm_metrics_file'] = str(metrics_file)
+            summary['llm_metrics_totals'] = totals
+            logger.info(f"📈 LLM调用遥测已保存: {metrics_file} (请求 {totals['requests']}, "
+                        f"completion tokens {totals['completion_tokens']})")
+        
         summary_file = self.workflow_dir / "workflow_summary.json"
         with open(summary_file, 'w', encoding='utf-8') as f:
             json.dump(summary, f, ensure_ascii=False, indent=2)
@@ -1725,7 +2198,7 @@ class WorkflowManager:
         导出最终处理后的数据
         
         Args:
-            output_file: 输出文件名
+            output_file: 输出文件名（后缀按配置的输出格式替换为 .json / .jsonl / .jsonl.zst）
             
         Returns:
             输出文件路径
@@ -1733,9 +2206,9 @@ class WorkflowManager:
         if not self.current_data:
             raise ValueError("没有数据可导出")
         
-        export_path = self.workflow_dir / output_file
-        with open(export_path, 'w', encoding='utf-8') as f:
-            json.dump(self.current_data, f, ensure_ascii=False, indent=2)
+        export_path = output_path(self.workflow_dir / output_file)
+        write_records(export_path, self.current_data)
+        self._register_output(export_path, 'export_final_data', 'records', len(self.current_data), 'export')
         
         logger.info(f"最终数据已导出: {export_path}")
         return str(export_path)
@@ -1760,7 +2233,12 @@ class WorkflowManager:
             print(f"\n  {i}. {step['step_name']} ({step['step_type']})")
             print(f"     ⏰ 时间: {step['timestamp']}")
             
-            if step['step_type'] == 'data_loading':
+            if step.get('pipelined'):
+                # 流水线阶段：统计字段与逐步骤模式不同
+                print(f"     📊 处理记录: {step['processed_records']:,} | 跳过: {step['skipped_records']:,} | "
+                      f"异常: {step['error_records']:,}")
+                
+            elif step['step_type'] == 'data_loading':
                 print(f"     📊 加载记录: {step['total_records_loaded']:,}")
                 print(f"     💾 数据大小: {step['data_size_mb']:.2f} MB")
                 
@@ -1806,7 +2284,16 @@ class WorkflowManager:
                 print(f"     ❌ 验证错误: {step['incorrect_records']:,}")
                 print(f"     🔥 验证异常: {step['error_records']:,}")
                 print(f"     🔄 重新生成: {step.get('regenerated_records', 0):,}")
-        
+
+            profile = step.get('profile')
+            if profile:
+                written = profile.get('bytes_written')
+                written_text = f"{written / 1024 / 1024:.2f} MB" if written is not None else "N/A"
+                print(f"     ⏱️  耗时: {profile['wall_seconds']:.2f}s (CPU {profile['cpu_seconds']:.2f}s) | "
+                      f"🧠 峰值内存增量: {profile['peak_rss_delta_mb']:.1f} MB | "
+                      f"🤖 LLM调用: {profile['llm_calls']:,} ({profile['prompt_tokens'] + profile['completion_tokens']:,} tokens) | "
+                      f"💾 写盘: {written_text}")
+
         print(f"\n💾 输出文件:")
         for step in self.workflow_steps:
             if 'output_directory' in step and step['output_directory']:
@@ -1836,8 +2323,10 @@ class WorkflowManager:
         else:
             self.workflow_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # 设置工作流目录
+        # 设置工作流目录，并读取该目录的输出清单
         self.workflow_dir = workflow_path
+        from data_processing.workflow.workflow_manifest import WorkflowManifest
+        self.manifest = WorkflowManifest(workflow_path)
         
         # 尝试加载工作流摘要（如果存在）
         summary_file = workflow_path / "workflow_summary.json"
@@ -1874,6 +2363,17 @@ class WorkflowManager:
         Returns:
             是否成功加载数据
         """
+        # 优先按输出清单直接打开最新登记的数据文件
+        entry = self.manifest.latest()
+        if entry is not None:
+            data_file = self.manifest.resolve(entry)
+            logger.info(f"📋 按清单加载步骤 '{entry['step_name']}' 的输出: {data_file}"
+                        f"（{entry.get('records') or 0:,} 条记录）")
+            if self._try_load_file(data_file):
+                return True
+            logger.warning("⚠️ 清单中的数据文件无法加载，回退到按文件名查找")
+        
+        # 没有清单的旧工作流目录：按文件名模式查找
         logger.info(f"🔍 开始在目录 {self.workflow_dir} 中查找数据文件")
         
         # 按优先级查找数据文件，明确指定数据文件名
@@ -1897,17 +2397,20 @@ class WorkflowManager:
             "final_processed_dataset.json"
         ]
         
-        # 排除的统计文件和日志文件
+        # 排除的统计文件和日志文件（含步骤检查点日志 *.journal.jsonl）
         exclude_patterns = [
             "*statistics*",
             "*log*", 
             "*summary*",
-            "*unmatched*"
+            "*unmatched*",
+            "*journal*"
         ]
         
         for pattern in data_file_candidates:
             logger.debug(f"🔍 尝试模式: {pattern}")
-            data_files = list(self.workflow_dir.glob(pattern))
+            # 数据文件可能是任一输出格式（.json / .jsonl / .jsonl.zst）
+            data_files = [file for record_pattern in record_file_patterns(pattern)
+                          for file in self.workflow_dir.glob(record_pattern)]
             
             # 过滤掉统计文件
             filtered_files = []
@@ -1930,9 +2433,10 @@ class WorkflowManager:
                 if self._try_load_file(latest_file):
                     return True
         
-        # 如果上面的特定模式都没找到，尝试所有JSON文件
+        # 如果上面的特定模式都没找到，尝试所有JSON/JSONL文件
         logger.info("🔍 尝试加载所有JSON文件...")
-        all_json_files = list(self.workflow_dir.rglob("*.json"))
+        all_json_files = [file for record_pattern in record_file_patterns("*.json")
+                          for file in self.workflow_dir.rglob(record_pattern)]
         
         # 过滤掉统计文件和日志文件
         data_files = []
@@ -1968,21 +2472,27 @@ class WorkflowManager:
         Returns:
             是否成功加载
         """
+        from utils.json_stream import iter_json_records, is_jsonl_file, first_json_char
+        
         try:
+            # 顶层数组和JSONL流式读取：先只解析第一条，不是记录数据时不必解析整个文件
+            if is_jsonl_file(file_path) or first_json_char(file_path) == '[':
+                records_iter = iter_json_records(file_path)
+                first = next(records_iter, None)
+                if isinstance(first, dict) and 'function_name' in first:
+                    data = [first]
+                    data.extend(records_iter)
+                    self.current_data = data
+                    logger.info(f"✅ 成功加载列表格式数据，包含 {len(data)} 条记录")
+                    return True
+                logger.debug(f"❌ 列表格式但不是记录数据: {file_path}")
+                return False
+            
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             
             # 根据文件内容确定数据类型
-            if isinstance(data, list) and len(data) > 0:
-                # 检查是否是记录列表
-                if isinstance(data[0], dict) and 'function_name' in data[0]:
-                    self.current_data = data
-                    logger.info(f"✅ 成功加载列表格式数据，包含 {len(data)} 条记录")
-                    return True
-                else:
-                    logger.debug(f"❌ 列表格式但不是记录数据: {file_path}")
-                    
-            elif isinstance(data, dict):
+            if isinstance(data, dict):
                 # 尝试多个可能的数据字段
                 data_keys = ['records', 'data', 'items', 'results']
                 for key in data_keys:
@@ -2040,16 +2550,25 @@ class WorkflowManager:
             logger.error(f"❌ 步骤 '{step_name}' 执行失败: {e}")
             raise
     
+    def _run_async(self, coro) -> Any:
+        """在独立事件循环中运行协程，并在循环结束前关闭其上的共享连接池"""
+        async def runner():
+            try:
+                return await coro
+            finally:
+                await self.close()
+        return asyncio.run(runner())
+    
     def _execute_remove_no_sql_records(self, reanalyze_no_sql: bool = True, **kwargs) -> Dict[str, Any]:
         """执行删除NO SQL记录步骤"""
-        return asyncio.run(self.remove_no_sql_records(
+        return self._run_async(self.remove_no_sql_records(
             step_name="remove_no_sql_records_step", 
             reanalyze_no_sql=reanalyze_no_sql
         ))
     
     def _execute_redundant_sql_validation(self, apply_fix: bool = True, **kwargs) -> Dict[str, Any]:
         """执行冗余SQL验证步骤"""
-        return asyncio.run(self.run_redundant_sql_validation(
+        return self._run_async(self.run_redundant_sql_validation(
             apply_fix=apply_fix,
             step_name="redundant_sql_validation_with_fix"
         ))
@@ -2058,12 +2577,14 @@ class WorkflowManager:
         """执行SQL清洗步骤"""
         return self.run_sql_cleaning(step_name)
     
-    def _execute_keyword_extraction(self, keywords: Optional[List[str]] = None, use_llm: bool = True, **kwargs) -> Dict[str, Any]:
+    def _execute_keyword_extraction(self, keywords: Optional[List[str]] = None, use_llm: bool = True,
+                                    save_report: bool = True, **kwargs) -> Dict[str, Any]:
         """执行关键词提取步骤"""
-        return asyncio.run(self.extract_keyword_data(
+        return self._run_async(self.extract_keyword_data(
             keywords=keywords, 
             step_name="keyword_extraction_resume", 
-            use_llm=use_llm
+            use_llm=use_llm,
+            save_report=save_report
         ))
     
     def _execute_export_final_data(self, output_file: str = "final_processed_dataset.json", **kwargs) -> Dict[str, Any]:
@@ -2078,6 +2599,7 @@ class WorkflowManager:
             'workflow_directory': str(self.workflow_dir)
         }
 
+    @profile_step
     async def remove_no_sql_records(self, step_name: str = "remove_no_sql_records_step", 
                              reanalyze_no_sql: bool = False,
                              validator_config_path: str = "config/data_processing/validation/rerun_config.yaml") -> Dict[str, Any]:
@@ -2147,6 +2669,10 @@ class WorkflowManager:
             else:
                 non_no_sql_records.append(record)
         
+        remove_output_dir = self.workflow_dir / "remove_no_sql_records"
+        remove_output_dir.mkdir(exist_ok=True)
+        journal = None
+        
         # 初始化结果列表
         filtered_records = non_no_sql_records.copy()  # 非<NO SQL GENERATE>记录直接保留
         removed_records = []
@@ -2193,13 +2719,30 @@ class WorkflowManager:
             
             # 设置并发控制
             concurrency = 10  # 降低并发数以避免服务器过载
-            semaphore = asyncio.Semaphore(concurrency)
+            limiter = validator.client.get_concurrency_limiter('remove_no_sql_records', concurrency)
+            
+            # 检查点日志：已完成重新分析的记录在中断重跑时直接复用
+            from config.data_processing.validation.validation_prompts import (
+                ANALYSIS_PROMPT_TEMPLATE, VERIFICATION_PROMPT_TEMPLATE, FORMATTING_PROMPT_TEMPLATE
+            )
+            journal = self._open_step_journal(
+                remove_output_dir, step_name, step_type='remove_no_sql_records',
+                prompts=[ANALYSIS_PROMPT_TEMPLATE, VERIFICATION_PROMPT_TEMPLATE, FORMATTING_PROMPT_TEMPLATE],
+                validator_config={k: v for k, v in validator.config.items() if k != 'output_dir'},
+                model=validator.client.config.model_name
+            )
+            pending_records = journal.pending(no_sql_records)
+            if journal.resumed_count:
+                logger.info(f"已从检查点恢复 {journal.resumed_count:,} 条记录，剩余 {len(pending_records):,} 条待重新分析")
             
             async def process_with_semaphore(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
-                async with semaphore:
+                async with limiter:
                     # 添加小延迟避免请求过快
                     await asyncio.sleep(0.1)
-                    return await reanalyze_single_record(session, record)
+                    result = await reanalyze_single_record(session, record)
+                if result.get('status') != 'exception':
+                    journal.append(record, result)
+                return result
             
             # 执行并发重新分析
             try:
@@ -2207,24 +2750,28 @@ class WorkflowManager:
                 
                 processed_results = []
                 with tqdm_asyncio(
-                    total=len(no_sql_records), 
+                    total=len(pending_records), 
                     desc=f"🔄 重新分析 <NO SQL GENERATE> 记录 (并发数: {concurrency})",
                     unit="条记录",
                     colour="green",
                     dynamic_ncols=True
                 ) as pbar:
-                    async with aiohttp.ClientSession() as session:
-                        tasks = []
-                        for record in no_sql_records:
-                            task = asyncio.ensure_future(process_with_semaphore(session, record))
-                            
-                            def update_progress(fut, pbar=pbar):
-                                pbar.update(1)
-                            
-                            task.add_done_callback(update_progress)
-                            tasks.append(task)
+                    session = validator.client.get_session()
+                    tasks = []
+                    for record in pending_records:
+                        task = asyncio.ensure_future(process_with_semaphore(session, record))
+                        
+                        def update_progress(fut, pbar=pbar):
+                            pbar.update(1)
                         
+                        task.add_done_callback(update_progress)
+                        tasks.append(task)
+                        
+                    try:
                         processed_results = await asyncio.gather(*tasks, return_exceptions=True)
+                    finally:
+                        journal.close()
+                processed_results = journal.merge(no_sql_records, processed_results)
                 
                 # 处理并发结果
                 for result in processed_results:
@@ -2280,12 +2827,11 @@ class WorkflowManager:
             logger.info(f"从 {original_count:,} 条记录中删除了 {len(removed_records):,} 条 '<NO SQL GENERATE>' 记录，保留了 {len(filtered_records):,} 条记录。")
 
         # 保存删除后的数据
-        remove_output_dir = self.workflow_dir / "remove_no_sql_records"
-        remove_output_dir.mkdir(exist_ok=True)
-        
-        remove_output_file = remove_output_dir / f"{step_name}.json"
-        with open(remove_output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.current_data, f, ensure_ascii=False, indent=2)
+        remove_output_file = output_path(remove_output_dir / f"{step_name}.json")
+        write_records(remove_output_file, self.current_data)
+        self._register_output(remove_output_file, step_name, 'records', len(self.current_data), 'remove_no_sql_records')
+        if journal is not None:
+            journal.finalize()
         
         # 记录工作流步骤
         step_info = {
@@ -2311,6 +2857,8 @@ class WorkflowManager:
                 'concurrency': concurrency,
                 'concurrent_processing_enabled': bool(validator and no_sql_records)
             })
+            if journal is not None and journal.resumed_count:
+                step_info['checkpoint'] = journal.get_stats()
         else: # 如果不是重分析模式，才计算正常的删除统计
             step_info['removed_records'] = len(removed_records)
             step_info['removal_rate'] = len(removed_records) / original_count * 100 if original_count > 0 else 0.0
@@ -2324,6 +2872,7 @@ class WorkflowManager:
             logger.info(f"删除完成 - 删除了 {len(removed_records):,} 条记录，保留了 {len(filtered_records):,} 条记录")
         return step_info
 
+    @profile_step
     async def validate_control_flow_records(self, step_name: str = "control_flow_validation_step") -> Dict[str, Any]:
         """
         验证包含控制流语句的记录
@@ -2356,11 +2905,27 @@ class WorkflowManager:
         
         # 动态获取并发数
         from config.data_processing.workflow.workflow_config import get_workflow_config
+        from config.data_processing.validation.control_flow_validation_prompt import (  # type: ignore
+            CONTROL_FLOW_VALIDATION_PROMPT, CONTROL_FLOW_SQL_REGENERATION_PROMPT
+        )
+        from utils.llm_client import LLMClient
         workflow_config = get_workflow_config()
         concurrency = workflow_config.get_concurrency('control_flow_validation')
         
+        # 检查点日志：已验证（及重新生成SQL）的记录在中断重跑、增量重跑时直接复用
+        journal = self._open_step_journal(
+            validation_output_dir, step_name, step_type='control_flow_validation',
+            prompts=[CONTROL_FLOW_VALIDATION_PROMPT, CONTROL_FLOW_SQL_REGENERATION_PROMPT],
+            server=validator.llm_server, model=LLMClient(validator.llm_server).config.model_name
+        )
+        
         # 执行验证
-        validation_result = await validator.validate_dataset(self.current_data, max_concurrent=concurrency)
+        try:
+            validation_result = await validator.validate_dataset(self.current_data, max_concurrent=concurrency,
+                                                                 journal=journal)
+        finally:
+            journal.close()
+        journal.finalize()
         
         # 记录工作流步骤
         step_info = {
@@ -2379,12 +2944,17 @@ class WorkflowManager:
             'problematic_file': validation_result.get('problematic_file'),
             'concurrent_requests': concurrency
         }
+        if journal.resumed_count:
+            step_info['checkpoint'] = journal.get_stats()
+        self._register_output(validation_result.get('validation_file'), step_name, 'report', step_type='control_flow_validation')
+        self._register_output(validation_result.get('problematic_file'), step_name, 'records_subset', step_type='control_flow_validation')
         
         self.workflow_steps.append(step_info)
         
         logger.info(f"控制流验证完成 - 检测到 {validation_result['control_flow_records']} 条控制流记录，验证正确: {validation_result['correct_records']}, 错误: {validation_result['incorrect_records']}")
         return step_info
 
+    @profile_step
     async def process_keyword_data_with_llm(self, step_name: str = "process_keyword_data_step") -> Dict[str, Any]:
         """
         使用LLM处理被识别为包含关键词的数据，根据指定prompt重新生成SQL。
@@ -2415,95 +2985,37 @@ class WorkflowManager:
         llm_server = workflow_config.get_llm_server("workflow", "keyword_processing")
         llm_client = LLMClient(llm_server)
         concurrency = workflow_config.get_concurrency('keyword_data_processing')
-        semaphore = asyncio.Semaphore(concurrency)
-
-        async def process_single_record(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
-            try:
-                keywords = record.get('llm_keyword_analysis', {}).get('matched_keywords', [])
-
-                # 1️⃣ 安全替换，仅替换我们预定义的占位符，避免模板中其他 JSON 花括号触发 KeyError
-                replacements = {
-                    '{function_name}': record.get('function_name', ''),
-                    '{orm_code}': record.get('orm_code', ''),
-                    '{keyword}': ', '.join(keywords),
-                    '{caller}': record.get('caller', ''),
-                    '{code_meta}': json.dumps(record.get('code_meta_data', []), ensure_ascii=False, indent=2),
-                }
-
-                prompt = prompt_template
-                for placeholder, value in replacements.items():
-                    prompt = prompt.replace(placeholder, value)
-
-                # 使用格式验证调用LLM
-                from utils.format_validators import validate_keyword_extraction_response
-                
-                response = await llm_client.call_async_with_format_validation(
-                    session, prompt,
-                    validator=validate_keyword_extraction_response,
-                    temperature=0.0,
-                    module="workflow", component="keyword_processing"
-                )
+        limiter = llm_client.get_concurrency_limiter('keyword_data_processing', concurrency)
 
-                # 使用新的、更健壮的解析器
-                from utils.response_parser import parse_model_response
-                new_sql_list = parse_model_response(response)
-                
-                # 检查解析结果是否有效（例如，不是原始字符串的回退）
-                is_successfully_parsed = True
-                if isinstance(new_sql_list, list) and len(new_sql_list) == 1 and isinstance(new_sql_list[0], str) and new_sql_list[0] == response.strip():
-                    is_successfully_parsed = False
-                    logger.warning(f"Failed to parse LLM response for {record.get('function_name')}. Response: {response[:200]}")
-                    # 🔧 修复：即使解析失败，也要添加处理信息确保记录完整性
-                    updated_record = record.copy()
-                    updated_record['keyword_processing_info'] = {
-                        'status': 'parse_failed',
-                        'timestamp': datetime.now().isoformat(),
-                        'original_sql_list': record.get('sql_statement_list'),
-                        'raw_response': response[:500],
-                        'error': 'LLM response parsing failed'
-                    }
-                    return updated_record
+        process_single_record = self._make_keyword_data_processor(llm_client, prompt_template)
 
-                updated_record = record.copy()
-                updated_record['sql_statement_list'] = new_sql_list
-                updated_record['keyword_processing_info'] = {
-                    'status': 'processed',
-                    'timestamp': datetime.now().isoformat(),
-                    'original_sql_list': record.get('sql_statement_list')
-                }
-                return updated_record
-            except Exception as e:
-                import traceback
-                tb = traceback.format_exc()
-                # Include raw response if available
-                raw_resp = locals().get('response', '<<no response captured>>')
-                logger.error(
-                    f"❌ 处理记录 {record.get('function_name')} 失败:\n"
-                    f"Exception: {e}\n"
-                    f"Traceback:\n{tb}\n"
-                    f"Raw LLM Response (first 500 chars):\n{str(raw_resp)[:500]}\n"
-                    f"Prompt (excerpt): {prompt[:200]} ..."
-                )
-                # 🔧 修复：即使出现异常，也要确保记录被保留并标记
-                error_record = record.copy()
-                error_record['keyword_processing_info'] = {
-                    'status': 'error',
-                    'timestamp': datetime.now().isoformat(),
-                    'original_sql_list': record.get('sql_statement_list'),
-                    'error': str(e),
-                    'traceback': tb
-                }
-                return error_record
+        # 检查点日志：已完成的记录在中断重跑时直接复用
+        output_dir = self.workflow_dir / "keyword_data_processing"
+        output_dir.mkdir(exist_ok=True)
+        journal = self._open_step_journal(
+            output_dir, step_name, step_type='keyword_data_processing',
+            prompt=prompt_template, server=llm_server, model=llm_client.config.model_name, max_tokens=2048
+        )
+        pending_records = journal.pending(self.extracted_data)
+        if journal.resumed_count:
+            logger.info(f"已从检查点恢复 {journal.resumed_count:,} 条记录，剩余 {len(pending_records):,} 条待处理")
 
         async def process_with_semaphore(session: aiohttp.ClientSession, record: Dict[str, Any]) -> Dict[str, Any]:
-            async with semaphore:
-                return await process_single_record(session, record)
+            async with limiter:
+                result = await process_single_record(session, record)
+            if result.get('keyword_processing_info', {}).get('status') != 'error':
+                journal.append(record, result)
+            return result
 
         tasks = []
-        async with aiohttp.ClientSession() as session:
-            for record in self.extracted_data:
-                tasks.append(process_with_semaphore(session, record))
+        session = llm_client.get_session()
+        for record in pending_records:
+            tasks.append(process_with_semaphore(session, record))
+        try:
             results = await tqdm_asyncio.gather(*tasks, desc="Processing keyword data with LLM")
+        finally:
+            journal.close()
+        results = journal.merge(self.extracted_data, results)
 
         # 🔍 记录输入数量，确保数据完整性
         input_record_count = len(self.extracted_data)
@@ -2531,11 +3043,10 @@ class WorkflowManager:
             
         self.extracted_data = processed_records
         
-        output_dir = self.workflow_dir / "keyword_data_processing"
-        output_dir.mkdir(exist_ok=True)
-        output_file = output_dir / f"{step_name}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.extracted_data, f, ensure_ascii=False, indent=2)
+        output_file = output_path(output_dir / f"{step_name}.json")
+        write_records(output_file, self.extracted_data)
+        journal.finalize()
+        self._register_output(output_file, step_name, 'keyword_records', len(self.extracted_data), 'keyword_data_processing')
 
         step_info = {
             'step_name': step_name,
@@ -2547,11 +3058,262 @@ class WorkflowManager:
             'processing_failed': failure_count,
             'output_file': str(output_file)
         }
+        if journal.resumed_count:
+            step_info['checkpoint'] = journal.get_stats()
         self.workflow_steps.append(step_info)
 
         logger.info(f"关键词数据处理完成 - 输入 {input_record_count} 条, 输出 {len(processed_records)} 条, 成功处理 {success_count} 条, 失败 {failure_count} 条.")
         return step_info
 
+    @profile_step
+    async def run_validation_pipeline(self, step_name: str = "validation_pipeline_step",
+                                      stages: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        流水线模式：SQL完整性检查、SQL正确性检查、关键词数据处理、控制流验证按记录串联执行
+        
+        与逐步骤执行不同，每条记录完成一个阶段后立即进入下一阶段，阶段之间通过有界队列衔接。
+        阶段顺序与逐步骤模式一致（PIPELINE_STAGE_ORDER）；各阶段使用所属LLM服务器共享的并发控制器，
+        workflow_settings.pipeline.concurrency 为其初始窗口，worker数取控制器的窗口上限，窗口可以自由增长。
+        每个阶段有自己的检查点日志，中断后在同一工作流目录重跑时已完成的记录直接复用。
+        
+        Args:
+            step_name: 步骤名称
+            stages: 阶段列表，为None时使用配置中的 pipeline.stages
+            
+        Returns:
+            流水线结果信息（含各阶段统计）
+        """
+        if self.current_data is None:
+            raise ValueError("请先加载并处理数据")
+        
+        from config.data_processing.workflow.workflow_config import get_workflow_config
+        from utils.llm_client import LLMClient
+        from utils.record_pipeline import PipelineStage, RecordPipeline
+        
+        workflow_config = get_workflow_config()
+        pipeline_config = workflow_config.get_pipeline_config()
+        stage_names = list(stages or pipeline_config['stages'])
+        unknown = [name for name in stage_names if name not in self.PIPELINE_STAGE_ORDER]
+        if unknown:
+            raise ValueError(f"未知的流水线阶段: {unknown}")
+        ordered = sorted(stage_names, key=self.PIPELINE_STAGE_ORDER.index)
+        if ordered != stage_names:
+            logger.warning(f"⚠️ 流水线阶段已按逐步骤模式的顺序调整: {' → '.join(ordered)}")
+            stage_names = ordered
+        logger.info(f"开始流水线处理 {len(self.current_data):,} 条记录: {' → '.join(stage_names)}")
+        
+        output_dir = self.workflow_dir / "validation_pipeline"
+        output_dir.mkdir(exist_ok=True)
+        journals = []
+        control_flow_validator = None
+        control_flow_details: List[Dict[str, Any]] = []
+        
+        def build_stage(name: str) -> PipelineStage:
+            concurrency = workflow_config.get_pipeline_concurrency(name)
+            # 默认：阶段输出即处理结果
+            emit = lambda record, result: result
+            
+            if name == 'sql_completeness_check':
+                from config.data_processing.cleaning.sql_completeness_check_prompt import SQL_COMPLETENESS_CHECK_PROMPT  # type: ignore
+                llm_server = workflow_config.get_llm_server("workflow", "sql_completeness_check")
+                llm_client = LLMClient(llm_server)
+                session = llm_client.get_session()
+                limiter = llm_client.get_concurrency_limiter(name, concurrency)
+                check = self._make_completeness_checker(llm_client)
+                fingerprint = dict(prompt=SQL_COMPLETENESS_CHECK_PROMPT, server=llm_server,
+                                   model=llm_client.config.model_name, max_tokens=100)
+                
+                async def compute(record: Dict[str, Any]) -> Dict[str, Any]:
+                    async with limiter:
+                        return await check(session, record)
+                
+                succeeded = lambda result: not result.get('completeness_check', {}).get('check_error')
+                
+                def tally(result: Dict[str, Any]) -> None:
+                    info = result.get('completeness_check', {})
+                    if info.get('check_error'):
+                        stage.count('check_errors')
+                    elif not info.get('is_complete', True):
+                        stage.count('lack_info_records')
+                
+                select = lambda r: not self._is_no_sql_generate(r)
+            
+            elif name == 'sql_correctness_check':
+                from config.data_processing.cleaning.sql_completeness_check_prompt import SQL_CORRECTNESS_CHECK_PROMPT  # type: ignore
+                llm_server = workflow_config.get_llm_server("workflow", "sql_correctness_check")
+                llm_client = LLMClient(llm_server)
+                session = llm_client.get_session()
+                limiter = llm_client.get_concurrency_limiter(name, concurrency)
+                check = self._make_correctness_checker(llm_client)
+                fingerprint = dict(prompt=SQL_CORRECTNESS_CHECK_PROMPT, server=llm_server,
+                                   model=llm_client.config.model_name, max_tokens=100)
+                
+                async def compute(record: Dict[str, Any]) -> Dict[str, Any]:
+                    async with limiter:
+                        return await check(session, record)
+                
+                succeeded = lambda result: not result.get('correctness_check', {}).get('check_error')
+                
+                def tally(result: Dict[str, Any]) -> None:
+                    info = result.get('correctness_check', {})
+                    if info.get('check_error'):
+                        stage.count('check_errors')
+                    elif not info.get('is_correct', True):
+                        stage.count('incorrect_records')
+                    if info.get('correction_override'):
+                        stage.count('overridden_as_correct')
+                
+                select = self._needs_correctness_check
+            
+            elif name == 'keyword_data_processing':
+                llm_server = workflow_config.get_llm_server("workflow", "keyword_processing")
+                llm_client = LLMClient(llm_server)
+                session = llm_client.get_session()
+                limiter = llm_client.get_concurrency_limiter(name, concurrency)
+                process_keyword = self._make_keyword_data_processor(llm_client)
+                fingerprint = dict(prompt=KEYWORD_PROCESSING_PROMPT, server=llm_server,
+                                   model=llm_client.config.model_name, max_tokens=2048)
+                
+                async def compute(record: Dict[str, Any]) -> Dict[str, Any]:
+                    async with limiter:
+                        return await process_keyword(session, record)
+                
+                succeeded = lambda result: result.get('keyword_processing_info', {}).get('status') != 'error'
+                
+                def tally(result: Dict[str, Any]) -> None:
+                    if result.get('keyword_processing_info', {}).get('status') == 'processed':
+                        stage.count('processed_successfully')
+                    else:
+                        stage.count('processing_failed')
+                
+                select = lambda r: r.get('llm_keyword_analysis', {}).get('has_special_keywords', False)
+            
+            else:  # control_flow_validation
+                nonlocal control_flow_validator
+                from data_processing.validation.control_flow_validator import ControlFlowValidator
+                from config.data_processing.validation.control_flow_validation_prompt import (  # type: ignore
+                    CONTROL_FLOW_VALIDATION_PROMPT, CONTROL_FLOW_SQL_REGENERATION_PROMPT
+                )
+                validator = control_flow_validator = ControlFlowValidator(str(self.workflow_dir / "control_flow_validation"))
+                llm_client = LLMClient(validator.llm_server)
+                session = llm_client.get_session()
+                limiter = llm_client.get_concurrency_limiter(name, concurrency)
+                regen_limiter = llm_client.get_concurrency_limiter('control_flow_regeneration', concurrency)
+                fingerprint = dict(prompts=[CONTROL_FLOW_VALIDATION_PROMPT, CONTROL_FLOW_SQL_REGENERATION_PROMPT],
+                                   server=validator.llm_server, model=llm_client.config.model_name)
+                
+                async def compute(record: Dict[str, Any]) -> Dict[str, Any]:
+                    async with limiter:
+                        detail = await validator.validate_record(session, record)
+                    validation_result = detail['validation_result']
+                    if not validation_result.get('error') and not validation_result.get('is_correct', True):
+                        async with regen_limiter:
+                            regenerated = await validator._regenerate_sql_for_incorrect_record(
+                                session, record, validation_result
+                            )
+                        if regenerated:
+                            detail['regenerated_sql'] = regenerated
+                    return detail
+                
+                succeeded = lambda detail: not detail['validation_result'].get('error')
+                
+                def tally(detail: Dict[str, Any]) -> None:
+                    validation_result = detail['validation_result']
+                    if validation_result.get('error'):
+                        stage.count('validation_errors')
+                    elif validation_result.get('is_correct', True):
+                        stage.count('correct_records')
+                    else:
+                        stage.count('incorrect_records')
+                        if detail.get('regenerated_sql'):
+                            stage.count('regenerated_records')
+                    control_flow_details.append(detail)
+                
+                # 与逐步骤模式一致：控制流验证只产出报告，不修改记录
+                emit = lambda record, detail: record
+                select = lambda r: validator._contains_control_flow(r.get('orm_code', ''))
+            
+            # 每个阶段一份检查点日志：已完成的记录直接复用日志中的结果
+            journal = self._open_step_journal(output_dir, f"{step_name}.{name}", step_type=name, **fingerprint)
+            journals.append(journal)
+            
+            async def process(record: Dict[str, Any]) -> Dict[str, Any]:
+                result = journal.lookup(record)
+                if result is None:
+                    result = await compute(record)
+                    if succeeded(result):
+                        journal.append(record, result)
+                else:
+                    stage.count('resumed_records')
+                tally(result)
+                return emit(record, result)
+            
+            # worker数取并发控制器的窗口上限，实际在途请求数由控制器的窗口决定
+            stage = PipelineStage(name, process, select=select, concurrency=limiter.max_limit)
+            return stage
+        
+        pipeline = RecordPipeline([build_stage(name) for name in stage_names],
+                                  queue_size=pipeline_config['queue_size'],
+                                  desc=f"流水线处理 ({step_name})")
+        input_count = len(self.current_data)
+        try:
+            self.current_data = await pipeline.run(self.current_data)
+        finally:
+            for journal in journals:
+                journal.close()
+        if 'keyword_data_processing' in stage_names:
+            self.extracted_data = [r for r in self.current_data
+                                   if r.get('llm_keyword_analysis', {}).get('has_special_keywords', False)]
+        
+        output_file = output_path(output_dir / f"{step_name}.json")
+        write_records(output_file, self.current_data)
+        for journal in journals:
+            journal.finalize()
+        self._register_output(output_file, step_name, 'records', len(self.current_data), 'validation_pipeline')
+        
+        # 按阶段汇总统计
+        pipeline_stats = pipeline.get_stats()
+        timestamp = datetime.now().isoformat()
+        for stage_stats in pipeline_stats['stages']:
+            stage_info = {
+                'step_name': f"{step_name}.{stage_stats['stage']}",
+                'step_type': stage_stats['stage'],
+                'timestamp': timestamp,
+                'pipelined': True,
+                **stage_stats
+            }
+            if stage_stats['stage'] == 'control_flow_validation' and control_flow_validator is not None:
+                validation_file, problematic_records, problematic_file = control_flow_validator.save_validation_reports(
+                    stage_stats['processed_records'] + stage_stats['error_records'], control_flow_details,
+                    stage_stats.get('correct_records', 0), stage_stats.get('incorrect_records', 0),
+                    stage_stats.get('validation_errors', 0)
+                )
+                stage_info['validation_file'] = str(validation_file) if validation_file else None
+                stage_info['problematic_file'] = str(problematic_file) if problematic_file else None
+                self._register_output(validation_file, stage_info['step_name'], 'report', step_type='control_flow_validation')
+                self._register_output(problematic_file, stage_info['step_name'], 'records_subset', step_type='control_flow_validation')
+            self.workflow_steps.append(stage_info)
+        
+        step_info = {
+            'step_name': step_name,
+            'step_type': 'validation_pipeline',
+            'timestamp': timestamp,
+            'input_records': input_count,
+            'output_records': len(self.current_data),
+            'stages': stage_names,
+            'queue_size': pipeline_stats['queue_size'],
+            'wall_seconds': pipeline_stats['wall_seconds'],
+            'output_file': str(output_file)
+        }
+        self.workflow_steps.append(step_info)
+        
+        logger.info(f"流水线处理完成 - {input_count:,} 条记录，耗时 {pipeline_stats['wall_seconds']:.1f} 秒")
+        for stage_stats in pipeline_stats['stages']:
+            logger.info(f"  - {stage_stats['stage']}: 处理 {stage_stats['processed_records']:,} 条，"
+                        f"跳过 {stage_stats['skipped_records']:,} 条，异常 {stage_stats['error_records']:,} 条")
+        return step_info
+
+    @profile_step
     async def generate_synthetic_data(self, 
                                scenarios: Optional[List[str]] = None,
                                count_per_scenario: int = 1,
@@ -2685,12 +3447,14 @@ class WorkflowManager:
             output_file = synthetic_output_dir / f"{step_name}.json"
             with open(output_file, 'w', encoding='utf-8') as f:
                 json.dump(generated_packs, f, ensure_ascii=False, indent=2)
+            self._register_output(output_file, step_name, 'generated_records', len(generated_packs), 'synthetic_data_generation')
         
             # 保存验证结果（如果进行了验证）
             if validate:
                 validation_file = synthetic_output_dir / f"{step_name}_validation.json"
                 with open(validation_file, 'w', encoding='utf-8') as f:
                     json.dump(validation_results, f, ensure_ascii=False, indent=2)
+                self._register_output(validation_file, step_name, 'report', step_type='synthetic_data_generation')
         
             # 记录工作流步骤
             step_info = {
@@ -2773,6 +3537,7 @@ class WorkflowManager:
                 self.workflow_steps.append(error_step_info)
                 return error_step_info
 
+    @profile_step
     async def generate_reverse_sql_data(self, 
                                scenarios: Optional[List[str]] = None,
                                count_per_scenario: int = 1,
@@ -2875,6 +3640,7 @@ class WorkflowManager:
             output_file = self.workflow_dir / f"{step_name}.json"
             with open(output_file, 'w', encoding='utf-8') as f:
                 json.dump(generated_cases, f, ensure_ascii=False, indent=2)
+            self._register_output(output_file, step_name, 'generated_records', len(generated_cases), 'reverse_sql_generation')
             
             logger.info(f"反向SQL数据已保存到: {output_file}")
             
@@ -2917,6 +3683,7 @@ class WorkflowManager:
                 "error": str(e)
             }
 
+    @profile_step
     async def generate_sql_from_synthetic_data(self, 
                                         input_file: str = None,
                                         concurrency: int = 10,
@@ -2989,6 +3756,9 @@ class WorkflowManager:
                 concurrency=concurrency
             )
             
+            self._register_output(output_file if output_file.exists() else None, step_name,
+                                  'generated_records', valid_count, 'sql_generation')
+            
             # 记录工作流步骤
             step_info = {
                 'step_name': step_name,
@@ -3038,33 +3808,40 @@ class WorkflowManager:
         """
         从指定文件加载数据，经过LLM关键词分析（含关键词和不含关键词的都保留），并导出所有分析后的数据。
         Args:
-            input_file: 输入数据文件（JSON，记录列表）
-            output_file: 输出文件名（默认final_processed_data.json）
+            input_file: 输入数据文件（JSON / JSONL / JSONL.zst，记录列表）
+            output_file: 输出文件名（默认final_processed_data.json，后缀按配置的输出格式替换）
         Returns:
             输出文件路径
         """
         import json
         from pathlib import Path
         # 1. 读取数据
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json_or_records(input_file)
         if not isinstance(data, list):
             raise ValueError(f"输入文件{input_file}内容不是记录列表")
         self.current_data = data
         # 2. LLM关键词分析
         await self.extract_keyword_data(keywords=None, step_name="keyword_extraction_llm_export", use_llm=True)
         # 3. 导出所有分析后的数据（含关键词和不含关键词）
-        export_path = self.workflow_dir / output_file
-        with open(export_path, 'w', encoding='utf-8') as f:
-            json.dump(self.current_data, f, ensure_ascii=False, indent=2)
+        export_path = output_path(self.workflow_dir / output_file)
+        write_records(export_path, self.current_data)
+        self._register_output(export_path, 'keyword_extraction_llm_export', 'records', len(self.current_data), 'export')
         logger.info(f"所有LLM分析后的数据已导出: {export_path}")
         return str(export_path)
 
     async def close(self):
         """关闭工作流管理器，清理资源"""
         logger.info("正在关闭工作流管理器...")
-        # 这里可以添加任何需要清理的资源
-        # 目前主要是日志记录
+        # 等待后台写文件任务完成
+        if self._background_tasks:
+            results = await asyncio.gather(*self._background_tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"后台任务失败: {result}")
+            self._background_tasks = []
+        # 关闭LLM共享连接池
+        from utils.llm_client import close_shared_sessions
+        await close_shared_sessions()
         logger.info("工作流管理器已关闭")
 
 
@@ -3111,17 +3888,43 @@ def run_new_workflow(args):
     """运行全新的工作流"""
     print("🚀 开始运行全新的关键词优先数据处理工作流")
     
-    workflow = WorkflowManager(args.output_dir)
+    # 指定 --resume 时在该目录中重跑，各LLM步骤从目录中的检查点日志继续
+    workflow = WorkflowManager(args.output_dir, previous_workflow_dir=getattr(args, 'previous_workflow', None),
+                               workflow_dir=getattr(args, 'resume', None))
+    # 所有异步步骤在同一个事件循环中执行，以便跨步骤复用LLM连接池
+    return asyncio.run(_run_new_workflow_async(workflow, args))
+
+
+async def _run_new_workflow_async(workflow: WorkflowManager, args) -> Dict[str, Any]:
+    """在单个事件循环中执行全新工作流的各个步骤
+
+    步骤按输入/输出声明为DAG：关键词分支（LLM处理关键词数据）与非关键词分支（SQL清洗、
+    无SQL记录处理、冗余SQL验证）在数据分离后并发运行，在合并步骤汇合。
+    每个步骤在自己的工作流分支视图（workflow.branch）上运行：输入显式传入、输出显式返回，
+    并行分支不共享 current_data / extracted_data。多个步骤同时运行时才启用全局LLM并发预算。
     
-    try:
-        # 步骤 1: 加载原始数据集
-        load_result = workflow.load_raw_dataset(args.data_dir)
-        
-        # 重要：立即保存原始完整数据集，确保数据完整性
-        original_complete_dataset = workflow.current_data.copy() if workflow.current_data else []
-        original_dataset_count = len(original_complete_dataset)
+    流水线模式（--pipeline 或 pipeline.enabled）下，合并后的数据由 run_validation_pipeline 逐条流经
+    pipeline.stages 中的阶段，这些阶段（关键词数据处理、控制流验证）不再作为单独的步骤执行。
+    """
+    from data_processing.workflow.step_dag import StepDAG
+    from utils.adaptive_limiter import set_global_llm_budget, get_global_llm_budget
+    from config.data_processing.workflow.workflow_config import get_workflow_config
+
+    dag = StepDAG("keyword_first_workflow")
+    
+    # 流水线模式：配置的阶段按逐步骤模式的顺序由流水线执行
+    pipeline_stages: List[str] = []
+    if getattr(args, 'pipeline', False) or get_workflow_config().get_pipeline_config()['enabled']:
+        pipeline_stages = get_workflow_config().get_pipeline_config()['stages']
+        logger.info(f"🔗 流水线模式：合并后按记录串联执行 {', '.join(pipeline_stages)}")
+
+    # 步骤 1: 加载原始数据集
+    async def load_step(inputs):
+        load_result = await asyncio.to_thread(workflow.load_raw_dataset, args.data_dir)
         
-        logger.info(f"原始数据集已保存，共 {original_dataset_count:,} 条记录")
+        # 各步骤都返回新列表、新记录而不原地修改输入，直接持有引用即可，不复制整个数据集
+        original_complete_dataset = workflow.current_data or []
+        logger.info(f"原始数据集已保存，共 {len(original_complete_dataset):,} 条记录")
         
         # 如果是测试模式，随机抽样数据
         if args.test:
@@ -3130,101 +3933,96 @@ def run_new_workflow(args):
             if workflow.current_data and len(workflow.current_data) > 100:
                 workflow.current_data = random.sample(workflow.current_data, 100)
                 # 同时更新保存的原始数据集
-                original_complete_dataset = workflow.current_data.copy()
-                original_dataset_count = len(original_complete_dataset)
-                logging.info(f"测试模式：数据已采样，剩余 {original_dataset_count} 条记录。")
+                original_complete_dataset = workflow.current_data
+                logging.info(f"测试模式：数据已采样，剩余 {len(original_complete_dataset)} 条记录。")
+        return {'load_result': load_result, 'original_dataset': original_complete_dataset}
 
-        # 步骤 2: 提取关键词数据（默认 GORM 关键词）
-        extraction_result = asyncio.run(workflow.extract_keyword_data(args.keywords, "keyword_extraction_step1", use_llm=True))
-        
+    # 步骤 2: 提取关键词数据（默认 GORM 关键词）
+    async def keyword_extraction_step(inputs):
+        branch = workflow.branch(current_data=inputs['original_dataset'])
+        extraction_result = await branch.extract_keyword_data(args.keywords, "keyword_extraction_step1", use_llm=True)
         # 重要：保存关键词提取后的数据集，用于后续分离
-        keyword_data_after_extraction = workflow.extracted_data.copy() if workflow.extracted_data else []
-        
-        # 使用更可靠的方式来标识记录
-        def get_record_id(record):
-            """生成记录的唯一标识 - 使用function_name:orm_code:caller三元组"""
-            orm_code = record.get('orm_code', '')
-            # 如果orm_code太长，取前100个字符作为标识的一部分
-            orm_code_short = orm_code[:100] if len(orm_code) > 100 else orm_code
-            return f"{record.get('function_name', '')}:{orm_code_short}:{record.get('caller', '')}"
-        
-        # 创建已匹配记录的ID集合
-        matched_record_ids = {get_record_id(rec) for rec in keyword_data_after_extraction}
-        
-        # 从原始数据集中分离非关键词数据
-        non_keyword_data = []
-        for rec in original_complete_dataset:
-            record_id = get_record_id(rec)
-            if record_id not in matched_record_ids:
-                non_keyword_data.append(rec)
-        
-        # 数据完整性验证（第一次）
-        # if len(keyword_data_after_extraction) + len(non_keyword_data) != original_dataset_count:
-        #     logger.error(f"❌ 关键词提取后数据分离不完整！原始: {original_dataset_count}, 关键词: {len(keyword_data_after_extraction)}, 非关键词: {len(non_keyword_data)}")
-        #     raise ValueError("数据完整性检查失败：关键词提取后数据分离不完整")
-        # else:
-        #     logger.info(f"✅ 关键词提取后数据完整性验证通过：{original_dataset_count} = {len(keyword_data_after_extraction)} + {len(non_keyword_data)}")
-
-        # 步骤 3: 使用LLM处理关键词数据
-        workflow.extracted_data = keyword_data_after_extraction  # 确保使用完整的关键词数据集
-        process_keyword_result = asyncio.run(workflow.process_keyword_data_with_llm(step_name="process_keyword_data_step2"))
+        keyword_records = branch.extracted_data or []
+        return {'extraction_result': extraction_result, 'keyword_records': keyword_records}
+
+    # 从原始数据集中分离非关键词数据
+    async def separation_step(inputs):
+        # 按 function_name/orm_code/caller 的64位内容哈希ID分离，一次遍历完成
+        from utils.record_store import RecordStore
+        non_keyword_data = RecordStore(inputs['original_dataset']).without(RecordStore(inputs['keyword_records']))
+        return {'non_keyword_records': non_keyword_data}
+
+    # 步骤 3: 使用LLM处理关键词数据（关键词分支）
+    async def keyword_processing_step(inputs):
+        branch = workflow.branch(extracted_data=inputs['keyword_records'])  # 确保使用完整的关键词数据集
+        process_keyword_result = await branch.process_keyword_data_with_llm(step_name="process_keyword_data_step2")
         
         # 获取关键词处理后的数据
-        keyword_data_after_processing = workflow.extracted_data.copy() if workflow.extracted_data else []
-        
-        # 记录关键词处理前后的数据变化
-        logger.info(f"关键词数据处理前后变化：提取 {len(keyword_data_after_extraction)} → 处理后 {len(keyword_data_after_processing)}")
-        
-        # 记录分离步骤信息
-        separation_step = {
-            "step_name": "data_separation_and_processing",
-            "step_type": "data_separation",
-            "timestamp": datetime.now().isoformat(),
-            "total_original_records": original_dataset_count,
-            "keyword_data": {
-                "extracted": len(keyword_data_after_extraction),
-                "processed": len(keyword_data_after_processing)
-            },
-            "non_keyword_records": len(non_keyword_data)
-        }
-        workflow.workflow_steps.append(separation_step)
-        
-        # 步骤 4: 对非关键词数据进行清洗（保留llm_keyword_analysis字段）
-        # 保存非关键词数据的llm_keyword_analysis字段
+        keyword_processed = branch.extracted_data or []
+        logger.info(f"关键词数据处理前后变化：提取 {len(inputs['keyword_records'])} → 处理后 {len(keyword_processed)}")
+        return {'process_keyword_result': process_keyword_result, 'keyword_processed': keyword_processed}
+
+    # 步骤 4: 对非关键词数据进行清洗（非关键词分支，保留llm_keyword_analysis字段）
+    async def sql_cleaning_step(inputs):
         non_keyword_data_with_analysis = []
-        for rec in non_keyword_data:
-            # 确保保留llm_keyword_analysis字段
+        for rec in inputs['non_keyword_records']:
+            # 确保保留llm_keyword_analysis字段；补字段时创建新记录，不修改与原始数据集共享的记录
             if 'llm_keyword_analysis' not in rec:
-                rec['llm_keyword_analysis'] = {
+                rec = {**rec, 'llm_keyword_analysis': {
                     'matched_keywords': [],
                     'llm_response': '"No"',
                     'analysis_timestamp': datetime.now().isoformat(),
                     'has_special_keywords': False
-                }
+                }}
             non_keyword_data_with_analysis.append(rec)
         
-        workflow.current_data = non_keyword_data_with_analysis  # 设置工作流数据为非关键词数据
-        cleaning_result = workflow.run_sql_cleaning("sql_cleaning_after_extraction")
-        no_sql_removal_result = asyncio.run(workflow.remove_no_sql_records("remove_no_sql_records_step", reanalyze_no_sql=True))
-        fix_result = asyncio.run(workflow.run_redundant_sql_validation(
+        branch = workflow.branch(current_data=non_keyword_data_with_analysis)  # 分支数据为非关键词数据
+        # SQL清洗是CPU密集的同步步骤，放到线程中执行，避免阻塞并行分支的LLM请求
+        cleaning_result = await asyncio.to_thread(branch.run_sql_cleaning, "sql_cleaning_after_extraction")
+        return {'cleaning_result': cleaning_result, 'cleaned_records': branch.current_data or []}
+
+    async def no_sql_removal_step(inputs):
+        branch = workflow.branch(current_data=inputs['cleaned_records'])
+        no_sql_removal_result = await branch.remove_no_sql_records("remove_no_sql_records_step", reanalyze_no_sql=True)
+        return {'no_sql_removal_result': no_sql_removal_result, 'sql_records': branch.current_data or []}
+
+    async def redundant_sql_validation_step(inputs):
+        branch = workflow.branch(current_data=inputs['sql_records'])
+        fix_result = await branch.run_redundant_sql_validation(
             apply_fix=True,
             step_name="redundant_sql_validation_with_fix",
-        ))
-        
+        )
         # 获取清洗后的非关键词数据
-        cleaned_non_keyword_data = workflow.current_data.copy() if workflow.current_data else []
-        logger.info(f"非关键词数据清洗前后变化：原始 {len(non_keyword_data)} → 清洗后 {len(cleaned_non_keyword_data)}")
+        cleaned_non_keyword_data = branch.current_data or []
+        logger.info(f"非关键词数据清洗前后变化：原始 {len(inputs['non_keyword_records'])} → 清洗后 {len(cleaned_non_keyword_data)}")
+        return {'fix_result': fix_result, 'non_keyword_processed': cleaned_non_keyword_data}
 
-        # 步骤 5: 合并所有处理过的数据
-        final_data = keyword_data_after_processing + cleaned_non_keyword_data
-        workflow.current_data = final_data
+    # 步骤 5: 合并所有处理过的数据
+    async def merge_step(inputs):
+        original_dataset_count = len(inputs['original_dataset'])
+        keyword_records = inputs['keyword_records']
+        # 流水线模式下关键词数据在合并后由流水线处理
+        keyword_processed = inputs.get('keyword_processed', keyword_records)
+        non_keyword_records = inputs['non_keyword_records']
+        non_keyword_processed = inputs['non_keyword_processed']
         
-        # 步骤 6: 控制流验证 - 检测包含switch、if等控制流语句的ORM代码
-        logger.info("开始执行控制流验证步骤...")
-        control_flow_validation_result = asyncio.run(workflow.validate_control_flow_records("control_flow_validation_step"))
+        # 记录分离步骤信息
+        separation_step_info = {
+            "step_name": "data_separation_and_processing",
+            "step_type": "data_separation",
+            "timestamp": datetime.now().isoformat(),
+            "total_original_records": original_dataset_count,
+            "keyword_data": {
+                "extracted": len(keyword_records),
+                "processed": len(keyword_processed)
+            },
+            "non_keyword_records": len(non_keyword_records)
+        }
+        workflow.workflow_steps.append(separation_step_info)
         
-        # 最终数据完整性检查
-        total_after_processing = len(final_data)
+        final_data = keyword_processed + non_keyword_processed
+        workflow.extracted_data = keyword_processed
+        workflow.current_data = final_data
         
         # 记录数据处理步骤
         data_processing_step = {
@@ -3233,18 +4031,76 @@ def run_new_workflow(args):
             "timestamp": datetime.now().isoformat(),
             "original_total": original_dataset_count,
             "keyword_data": {
-                "extracted": len(keyword_data_after_extraction),
-                "processed": len(keyword_data_after_processing)
+                "extracted": len(keyword_records),
+                "processed": len(keyword_processed)
             },
             "non_keyword_data": {
-                "original": len(non_keyword_data),
-                "cleaned": len(cleaned_non_keyword_data)
+                "original": len(non_keyword_records),
+                "cleaned": len(non_keyword_processed)
             },
-            "final_total": total_after_processing
+            "final_total": len(final_data)
         }
         workflow.workflow_steps.append(data_processing_step)
+        return {'final_data': final_data, 'data_processing_summary': data_processing_step}
+
+    # 步骤 6: 控制流验证 - 检测包含switch、if等控制流语句的ORM代码
+    async def control_flow_validation_step(inputs):
+        logger.info("开始执行控制流验证步骤...")
+        workflow.current_data = inputs.get('pipelined_data', inputs.get('final_data'))
+        control_flow_validation_result = await workflow.validate_control_flow_records("control_flow_validation_step")
+        return {'control_flow_validation_result': control_flow_validation_result}
+
+    # 流水线模式：合并后的数据逐条流经各阶段
+    async def validation_pipeline_step(inputs):
+        branch = workflow.branch(current_data=inputs['final_data'], extracted_data=workflow.extracted_data)
+        pipeline_result = await branch.run_validation_pipeline("validation_pipeline_step", stages=pipeline_stages)
+        workflow.current_data = branch.current_data
+        workflow.extracted_data = branch.extracted_data
+        return {'validation_pipeline_result': pipeline_result, 'pipelined_data': branch.current_data}
+
+    dag.add_step('load_raw_dataset', load_step, outputs=['load_result', 'original_dataset'])
+    dag.add_step('keyword_extraction', keyword_extraction_step,
+                 inputs=['original_dataset'], outputs=['extraction_result', 'keyword_records'])
+    dag.add_step('data_separation', separation_step,
+                 inputs=['original_dataset', 'keyword_records'], outputs=['non_keyword_records'])
+    if 'keyword_data_processing' not in pipeline_stages:
+        dag.add_step('keyword_processing', keyword_processing_step,
+                     inputs=['keyword_records'], outputs=['process_keyword_result', 'keyword_processed'])
+    dag.add_step('sql_cleaning', sql_cleaning_step,
+                 inputs=['non_keyword_records'], outputs=['cleaning_result', 'cleaned_records'])
+    dag.add_step('remove_no_sql_records', no_sql_removal_step,
+                 inputs=['cleaned_records'], outputs=['no_sql_removal_result', 'sql_records'])
+    dag.add_step('redundant_sql_validation', redundant_sql_validation_step,
+                 inputs=['sql_records', 'non_keyword_records'], outputs=['fix_result', 'non_keyword_processed'])
+    dag.add_step('merge', merge_step,
+                 inputs=['original_dataset', 'keyword_records', 'non_keyword_records', 'non_keyword_processed']
+                        + ([] if 'keyword_data_processing' in pipeline_stages else ['keyword_processed']),
+                 outputs=['final_data', 'data_processing_summary'])
+    if pipeline_stages:
+        dag.add_step('validation_pipeline', validation_pipeline_step,
+                     inputs=['final_data'], outputs=['validation_pipeline_result', 'pipelined_data'])
+    if 'control_flow_validation' not in pipeline_stages:
+        dag.add_step('control_flow_validation', control_flow_validation_step,
+                     inputs=['pipelined_data' if pipeline_stages else 'final_data'],
+                     outputs=['control_flow_validation_result'])
+
+    global_llm_budget = get_workflow_config().get_global_llm_budget()
+
+    def apply_global_llm_budget(running: int) -> None:
+        # 只在多个步骤同时运行时共享全局预算，单独运行的步骤仅受自身并发窗口限制
+        budget = global_llm_budget if running > 1 else None
+        if (budget or 0) != get_global_llm_budget():
+            set_global_llm_budget(budget)
+            logger.info(f"🔀 同时运行 {running} 个步骤，全局LLM并发预算: {budget or '不限制'}")
+
+    try:
+        try:
+            values = await dag.run(on_running_change=apply_global_llm_budget)
+        finally:
+            workflow.step_graph = dag.get_graph()
+            set_global_llm_budget(None)
         
-        # 步骤 6: 导出最终数据和摘要
+        # 步骤 7: 导出最终数据和摘要
         final_data_path = workflow.export_final_data("final_processed_dataset.json")
         summary_path = workflow.save_workflow_summary()
         workflow.print_workflow_summary()
@@ -3254,14 +4110,15 @@ def run_new_workflow(args):
             "workflow_directory": str(workflow.workflow_dir),
             "final_data_path": final_data_path,
             "summary_path": summary_path,
-            "load_result": load_result,
-            "extraction_result": extraction_result,
-            "process_keyword_result": process_keyword_result,
-            "cleaning_result": cleaning_result,
-            "no_sql_removal_result": no_sql_removal_result,
-            "fix_result": fix_result,
-            "control_flow_validation_result": control_flow_validation_result,
-            "data_processing_summary": data_processing_step
+            "load_result": values['load_result'],
+            "extraction_result": values['extraction_result'],
+            "process_keyword_result": values.get('process_keyword_result'),
+            "cleaning_result": values['cleaning_result'],
+            "no_sql_removal_result": values['no_sql_removal_result'],
+            "fix_result": values['fix_result'],
+            "control_flow_validation_result": values.get('control_flow_validation_result'),
+            "validation_pipeline_result": values.get('validation_pipeline_result'),
+            "data_processing_summary": values['data_processing_summary']
         }
 
         print("\n✅ 工作流执行成功!")
@@ -3274,6 +4131,8 @@ def run_new_workflow(args):
     except Exception as e:
         logging.error(f"关键词优先工作流执行失败: {e}")
         raise
+    finally:
+        await workflow.close()
 
 
 def run_resume_workflow(args):
@@ -3450,6 +4309,8 @@ async def run_reverse_sql_generation_workflow(base_output_dir: str = "workflow_o
             "status": "error",
             "error": str(e)
         }
+    finally:
+        await workflow_manager.close()
 
 async def run_synthetic_data_generation_workflow(base_output_dir: str = "workflow_output",
                                          scenarios: Optional[List[str]] = None,
@@ -3530,4 +4391,6 @@ async def run_synthetic_data_generation_workflow(base_output_dir: str = "workflo
     except Exception as e:
         logger.error(f"合成数据生成工作流执行失败: {e}")
         raise
+    finally:
+        await workflow.close()
 
@@ -0,0 +1,167 @@
+"""
+工作流目录清单（manifest.json）
+
+每个步骤写出输出文件后在清单中登记：路径（相对工作流目录）、记录数、数据类型、格式、
+文件大小、sha256 和产出步骤。恢复/加载工作流时直接按清单打开最新的数据文件，
+不再逐个 glob 模式查找、按大小排序后逐个解析 JSON 文件。
+
+数据类型（kind）：
+- records: 当前完整工作数据集（WorkflowManager.current_data）的快照
+- keyword_records: 关键词数据（WorkflowManager.extracted_data）
+- records_subset: 部分记录（如未匹配记录、问题记录）
+- generated_records: 合成/反向生成的数据
+- report: 统计与验证报告
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union, Iterable
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+# 可以作为工作流数据集加载的类型，按优先级排列
+DATASET_KINDS = ('records', 'keyword_records')
+
+
+def file_sha256(file_path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """分块计算文件的sha256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_format(path: Path) -> str:
+    name = path.name
+    for suffix in ('.jsonl.zst', '.jsonl', '.json'):
+        if name.endswith(suffix):
+            return suffix[1:]
+    return path.suffix.lstrip('.') or 'unknown'
+
+
+class WorkflowManifest:
+    """工作流输出清单"""
+
+    def __init__(self, workflow_dir: Union[str, Path]):
+        """
+        初始化清单，已有 manifest.json 时读取其内容
+
+        Args:
+            workflow_dir: 工作流目录
+        """
+        self.workflow_dir = Path(workflow_dir)
+        self.manifest_file = self.workflow_dir / MANIFEST_FILE
+        self.outputs: Dict[str, Dict[str, Any]] = {}
+        self._sequence = 0
+        # 后台线程写出的报告也会登记，读写清单需要加锁
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.manifest_file.exists():
+            return
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            for entry in manifest.get('outputs', []):
+                self.outputs[entry['path']] = entry
+            self._sequence = max((entry.get('sequence', 0) for entry in self.outputs.values()), default=0)
+        except Exception as e:
+            logger.warning(f"读取工作流清单失败，将重新建立: {e}")
+            self.outputs = {}
+
+    def _save(self) -> None:
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'workflow_directory': str(self.workflow_dir),
+            'updated_at': datetime.now().isoformat(),
+            'outputs': sorted(self.outputs.values(), key=lambda entry: entry['sequence'])
+        }
+        tmp_file = self.manifest_file.with_name(self.manifest_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def register(self, file_path: Union[str, Path], step_name: str, kind: str = 'records',
+                 record_count: Optional[int] = None, step_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        登记一个输出文件（同一路径重复登记时覆盖旧条目）
+
+        Args:
+            file_path: 输出文件路径
+            step_name: 产出该文件的步骤名称
+            kind: 数据类型
+            record_count: 记录数
+            step_type: 步骤类型
+
+        Returns:
+            清单条目
+        """
+        path = Path(file_path)
+        try:
+            relative_path = str(path.resolve().relative_to(self.workflow_dir.resolve()))
+        except ValueError:
+            relative_path = str(path.resolve())
+        entry = {
+            'path': relative_path,
+            'kind': kind,
+            'format': _file_format(path),
+            'records': record_count,
+            'bytes': path.stat().st_size,
+            'sha256': file_sha256(path),
+            'step_name': step_name,
+            'step_type': step_type,
+            'created_at': datetime.now().isoformat()
+        }
+        with self._lock:
+            self._sequence += 1
+            entry['sequence'] = self._sequence
+            self.outputs[relative_path] = entry
+            self._save()
+        return entry
+
+    def resolve(self, entry: Dict[str, Any]) -> Path:
+        """条目对应的文件路径"""
+        path = Path(entry['path'])
+        return path if path.is_absolute() else self.workflow_dir / path
+
+    def is_intact(self, entry: Dict[str, Any], verify_sha: bool = False) -> bool:
+        """文件是否存在且与登记时一致（默认只比较大小，verify_sha=True 时校验sha256）"""
+        path = self.resolve(entry)
+        if not path.exists() or path.stat().st_size != entry.get('bytes'):
+            return False
+        return not verify_sha or file_sha256(path) == entry.get('sha256')
+
+    def latest(self, kinds: Iterable[str] = DATASET_KINDS, verify_sha: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        按 kinds 的优先级查找最新登记且文件完好的条目
+
+        Args:
+            kinds: 数据类型，前面的类型优先
+            verify_sha: 是否校验sha256
+
+        Returns:
+            清单条目，没有时返回None
+        """
+        for kind in kinds:
+            entries = sorted((e for e in self.outputs.values() if e.get('kind') == kind),
+                             key=lambda e: e['sequence'], reverse=True)
+            for entry in entries:
+                if self.is_intact(entry, verify_sha):
+                    return entry
+                logger.warning(f"⚠️ 清单中的文件缺失或已被修改，跳过: {entry['path']}")
+        return None
+
+    def entries(self, step_name: Optional[str] = None, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按登记顺序列出条目，可按步骤名称和数据类型过滤"""
+        return [e for e in sorted(self.outputs.values(), key=lambda e: e['sequence'])
+                if (step_name is None or e['step_name'] == step_name) and (kind is None or e['kind'] == kind)]
@@ -35,11 +35,14 @@ def parse_args():
     
     # Resume相关参数
     parser.add_argument('--resume', type=str, metavar='WORKFLOW_DIR',
-                        help='从指定的工作流目录继续执行')
+                        help='从指定的工作流目录继续执行：不指定--from-step时在该目录中重跑完整工作流，'
+                             '各LLM步骤复用目录中的检查点日志，只处理尚未完成的记录')
     parser.add_argument('--from-step', type=str, metavar='STEP_NAME',
                         choices=['remove_no_sql_records', 'redundant_sql_validation', 
                                 'sql_cleaning', 'keyword_extraction', 'export_final_data'],
-                        help='从指定步骤开始执行')
+                        help='配合--resume，加载该目录的最新数据后从指定步骤开始执行')
+    parser.add_argument('--previous-workflow', type=str, metavar='WORKFLOW_DIR',
+                        help='增量运行：按该工作流目录中各步骤的结果索引，复用输入与步骤配置都未变化的记录结果，只重新计算其余记录')
     
     # 控制标志
     parser.add_argument('--test', action='store_true',
@@ -48,6 +51,8 @@ def parse_args():
                         help='在remove_no_sql_records步骤中是否重新分析NO SQL记录 (默认: True)')
     parser.add_argument('--apply-fix', action='store_true', default=True,
                         help='在redundant_sql_validation步骤中是否应用修复 (默认: True)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='流水线模式：合并后按记录串联执行 pipeline.stages 中的阶段（默认: 配置中的 pipeline.enabled）')
     
     return parser.parse_args()
 
@@ -57,7 +62,7 @@ def main():
     args = parse_args()
     
     try:
-        if args.resume:
+        if args.resume and args.from_step:
             result = run_resume_workflow(args)
         else:
             result = run_new_workflow(args)
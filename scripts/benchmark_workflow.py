@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+工作流端到端吞吐基准
+
+在合成数据集（默认 1k / 10k / 100k 条记录）上依次运行 WorkflowManager 的各个步骤，
+LLM 请求全部指向本地模拟服务（scripts/mock_llm_server.py），统计每个步骤的：
+- 墙钟时间
+- 吞吐（records/s，按步骤输入记录数计算）
+- 峰值RSS及相对步骤开始时的增量
+
+用法:
+    python scripts/benchmark_workflow.py
+    python scripts/benchmark_workflow.py --sizes 1000 10000 --steps sql_cleaning sql_completeness_check
+    python scripts/benchmark_workflow.py --mock-url http://127.0.0.1:18081 --output benchmark_results.json
+
+未指定 --mock-url 时自动在子进程中启动模拟服务（--mock-latency 设置其延迟分布）。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parents[1]
+sys.path.insert(0, str(project_root))
+
+from data_processing.workflow.workflow_manager import WorkflowManager
+from utils.step_profiler import PeakRSSSampler
+
+# 步骤名称 -> 在工作流管理器上执行该步骤的协程工厂（按此顺序运行）
+STEPS: Dict[str, Callable[[WorkflowManager], Any]] = {
+    'sql_cleaning': lambda m: m.run_sql_cleaning(),
+    'sql_completeness_check': lambda m: m.tag_lack_information_data(),
+    'sql_correctness_check': lambda m: m.check_sql_correctness(),
+    'keyword_extraction': lambda m: m.extract_keyword_data(use_llm=True),
+    'control_flow_validation': lambda m: m.validate_control_flow_records(),
+    'redundant_sql_validation': lambda m: m.run_redundant_sql_validation(apply_fix=False),
+    'validation_pipeline': lambda m: m.run_validation_pipeline(stages=WorkflowManager.PIPELINE_STAGE_ORDER),
+}
+
+DEFAULT_STEPS = ['sql_cleaning', 'sql_completeness_check', 'sql_correctness_check',
+                 'keyword_extraction', 'control_flow_validation']
+
+_TABLES = ['users', 'orders', 'products', 'accounts', 'payments', 'sessions', 'devices', 'audit_logs']
+_FIELDS = ['id', 'name', 'status', 'created_at', 'owner_id', 'region', 'type', 'deleted_at']
+_KEYWORD_SNIPPETS = ['', '', '', '.Preload("Owner")', '.Scopes(ActiveScope)', '.Pluck("id", &ids)']
+
+
+def generate_synthetic_records(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """生成与原始数据集结构一致的合成记录
+
+    约三分之一的记录包含 if/switch 控制流，部分记录包含特殊GORM关键词，
+    少量记录为 <NO SQL GENERATE> 或参数依赖SQL。
+    """
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        table = rng.choice(_TABLES)
+        field_a, field_b = rng.sample(_FIELDS, 2)
+        struct_name = table.rstrip('s').capitalize()
+        keyword = rng.choice(_KEYWORD_SNIPPETS)
+        function_name = f"Query{struct_name}By{field_a.title().replace('_', '')}_{i}"
+        variant = rng.random()
+
+        if variant < 0.33:
+            orm_code = (
+                f"func (r *{struct_name}Repo) {function_name}(ctx context.Context, {field_a} string, {field_b} string) "
+                f"([]*{struct_name}, error) {{\n"
+                f"    var result []*{struct_name}\n"
+                f"    db := r.db.WithContext(ctx).Table(\"{table}\"){keyword}\n"
+                f"    if {field_b} != \"\" {{\n"
+                f"        db = db.Where(\"{field_b} = ?\", {field_b})\n"
+                f"    }}\n"
+                f"    err := db.Where(\"{field_a} = ?\", {field_a}).Find(&result).Error\n"
+                f"    return result, err\n"
+                f"}}"
+            )
+            sql_statement_list: List[Any] = [{
+                'type': 'param_dependent',
+                'variants': [
+                    {'scenario': f'{field_b} 为空', 'sql': f"SELECT * FROM {table} WHERE {field_a} = ?;"},
+                    {'scenario': f'{field_b} 不为空',
+                     'sql': f"SELECT * FROM {table} WHERE {field_b} = ? AND {field_a} = ?;"}
+                ]
+            }]
+        elif variant < 0.95:
+            orm_code = (
+                f"func (r *{struct_name}Repo) {function_name}(ctx context.Context, {field_a} string) "
+                f"(*{struct_name}, error) {{\n"
+                f"    var result {struct_name}\n"
+                f"    err := r.db.WithContext(ctx).Table(\"{table}\"){keyword}"
+                f".Where(\"{field_a} = ?\", {field_a}).First(&result).Error\n"
+                f"    return &result, err\n"
+                f"}}"
+            )
+            sql_statement_list = [f"SELECT * FROM {table} WHERE {field_a} = ? ORDER BY id LIMIT 1;"]
+        else:
+            orm_code = f"func (r *{struct_name}Repo) {function_name}() *gorm.DB {{\n    return r.db.Table(\"{table}\")\n}}"
+            sql_statement_list = ['<NO SQL GENERATE>']
+
+        records.append({
+            'function_name': function_name,
+            'orm_code': orm_code,
+            'caller': f"func Handle{struct_name}(c *gin.Context) {{\n    repo.{function_name}(c, c.Query(\"{field_a}\"))\n}}",
+            'sql_statement_list': sql_statement_list,
+            'sql_types': ['SELECT'],
+            'code_meta_data': [{
+                'code_file': f"internal/model/{table}.go",
+                'code_start_line': 10,
+                'code_end_line': 20,
+                'code_key': struct_name,
+                'code_value': f"type {struct_name} struct {{\n    ID int64 `gorm:\"column:id\"`\n}}",
+                'code_label': 1,
+                'code_type': 1,
+                'code_version': 'v1'
+            }],
+            'sql_pattern_cnt': len(sql_statement_list),
+            'source_file': f"synthetic_{i // 1000:04d}.json"
+        })
+    return records
+
+
+def point_llm_servers_to(url: str) -> None:
+    """把所有LLM服务器配置指向模拟服务，并关闭响应缓存（否则重复运行会全部命中缓存）"""
+    from config.llm.llm_config import get_llm_config
+    from config.data_processing.workflow.workflow_config import get_workflow_config
+
+    parsed = urlparse(url)
+    llm_config = get_llm_config()
+    for server_name in llm_config.list_servers():
+        server_config = llm_config.get_server_config(server_name)
+        server_config.host = parsed.hostname or '127.0.0.1'
+        server_config.port = parsed.port or 80
+        server_config.endpoints = []
+    get_workflow_config().config.response_cache.enabled = False
+
+
+def start_mock_server(port: int, latency: Optional[str], seed: int) -> subprocess.Popen:
+    """在子进程中启动模拟服务，等待其就绪"""
+    command = [sys.executable, str(project_root / 'scripts' / 'mock_llm_server.py'),
+               '--port', str(port), '--seed', str(seed)]
+    if latency:
+        command += ['--latency', latency]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/v1/models", timeout=1).read()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("模拟LLM服务启动失败")
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("等待模拟LLM服务就绪超时")
+
+
+async def run_benchmark(size: int, steps: List[str], output_root: Path, seed: int) -> Dict[str, Any]:
+    """在指定规模的合成数据集上依次运行各步骤"""
+    manager = WorkflowManager(str(output_root / f"size_{size}"))
+    manager.current_data = generate_synthetic_records(size, seed)
+    results = []
+    try:
+        for step in steps:
+            input_records = len(manager.current_data or [])
+            cpu_start = time.process_time()
+            start = time.perf_counter()
+            with PeakRSSSampler() as sampler:
+                outcome = STEPS[step](manager)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+            wall_time = time.perf_counter() - start
+            result = {
+                'step': step,
+                'input_records': input_records,
+                'output_records': len(manager.current_data or []),
+                'wall_time_seconds': round(wall_time, 3),
+                'cpu_time_seconds': round(time.process_time() - cpu_start, 3),
+                'records_per_second': round(input_records / wall_time, 2) if wall_time > 0 else 0.0,
+                'peak_rss_mb': round(sampler.peak / 1024 / 1024, 1),
+                'rss_delta_mb': round((sampler.peak - sampler.start_rss) / 1024 / 1024, 1)
+            }
+            results.append(result)
+            print(f"  {step:<26} {result['wall_time_seconds']:>9.2f}s {result['records_per_second']:>11.1f} rec/s "
+                  f"峰值RSS {result['peak_rss_mb']:>8.1f} MB (+{result['rss_delta_mb']:.1f})")
+    finally:
+        await manager.close()
+    return {'size': size, 'steps': results}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='工作流端到端吞吐基准（使用本地模拟LLM服务）')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='合成数据集规模')
+    parser.add_argument('--steps', nargs='+', default=DEFAULT_STEPS, choices=list(STEPS), help='要运行的步骤')
+    parser.add_argument('--mock-url', help='已运行的模拟服务地址，不指定时自动启动')
+    parser.add_argument('--mock-port', type=int, default=18081, help='自动启动模拟服务时使用的端口')
+    parser.add_argument('--mock-latency', default='lognormal:0.05:0.5', help='自动启动的模拟服务的延迟分布')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--output', default='benchmark_results.json', help='结果JSON文件')
+    parser.add_argument('--keep-outputs', action='store_true', help='保留各步骤的工作流输出目录')
+    args = parser.parse_args()
+
+    mock_process = None
+    mock_url = args.mock_url
+    if not mock_url:
+        mock_process = start_mock_server(args.mock_port, args.mock_latency, args.seed)
+        mock_url = f"http://127.0.0.1:{args.mock_port}"
+    point_llm_servers_to(mock_url)
+    print(f"🚀 工作流基准开始，模拟LLM服务: {mock_url}")
+
+    output_root = Path(tempfile.mkdtemp(prefix="workflow_benchmark_"))
+    all_results = []
+    try:
+        for size in args.sizes:
+            print(f"\n📊 数据规模: {size:,} 条记录")
+            all_results.append(asyncio.run(run_benchmark(size, args.steps, output_root, args.seed)))
+    finally:
+        if mock_process is not None:
+            mock_process.terminate()
+            mock_process.wait()
+        if args.keep_outputs:
+            print(f"📁 工作流输出保留在: {output_root}")
+        else:
+            shutil.rmtree(output_root, ignore_errors=True)
+
+    report = {
+        'mock_url': mock_url,
+        'mock_latency': None if args.mock_url else args.mock_latency,
+        'steps': args.steps,
+        'results': all_results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 基准结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
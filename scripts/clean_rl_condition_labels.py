@@ -21,10 +21,20 @@ import argparse
 import json
 import glob
 import os
+import sys
 from pathlib import Path
-from typing import List, Dict, Any, Set, Tuple
+from typing import List, Dict, Any
 import logging
 
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parents[1]
+sys.path.insert(0, str(project_root))
+
+from utils.record_store import RecordStore
+
+# 判断记录是否来自条件映射数据时使用的身份字段
+RECORD_KEY_FIELDS = ('function_name', 'orm_code', 'caller', 'sql_statement_list')
+
 # 设置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -81,39 +91,28 @@ def load_condition_mapping_data(mapping_dir: str) -> List[Dict[str, Any]]:
     return condition_data
 
 
-def create_record_identifier_set(data: List[Dict[str, Any]]) -> Set[Tuple]:
+def create_record_identifier_set(data: List[Dict[str, Any]]) -> RecordStore:
     """
-    为数据记录创建唯一标识符集合
+    为数据记录建立按64位内容哈希ID索引的记录存储
     
     Args:
         data: 数据记录列表
         
     Returns:
-        记录标识符集合
+        记录存储（支持 record in store 判断）
     """
-    identifier_set = set()
-    
-    for record in data:
-        # 使用多个字段组合作为唯一标识
-        record_id = (
-            record.get('function_name', ''),
-            record.get('orm_code', ''),
-            record.get('caller', ''),
-            str(record.get('sql_statement_list', []))
-        )
-        identifier_set.add(record_id)
-    
-    return identifier_set
+    # 使用多个字段组合的内容哈希作为唯一标识
+    return RecordStore(data, key_fields=RECORD_KEY_FIELDS)
 
 
 def clean_condition_labels(rl_data: List[Dict[str, Any]], 
-                          condition_mapping_ids: Set[Tuple]) -> tuple[List[Dict[str, Any]], Dict[str, int]]:
+                          condition_mapping_ids: RecordStore) -> tuple[List[Dict[str, Any]], Dict[str, int]]:
     """
     清理RL数据中的condition标签
     
     Args:
         rl_data: RL数据列表
-        condition_mapping_ids: workflow_mutual_exclusive_conditions记录标识符集合
+        condition_mapping_ids: workflow_mutual_exclusive_conditions记录存储
         
     Returns:
         (清理后的数据, 统计信息)
@@ -129,14 +128,7 @@ def clean_condition_labels(rl_data: List[Dict[str, Any]],
     
     for record in rl_data:
         # 检查是否来自workflow_mutual_exclusive_conditions
-        record_id = (
-            record.get('function_name', ''),
-            record.get('orm_code', ''),
-            record.get('caller', ''),
-            str(record.get('sql_statement_list', []))
-        )
-        
-        is_from_condition_mapping = record_id in condition_mapping_ids
+        is_from_condition_mapping = record in condition_mapping_ids
         current_condition = record.get('condition', [])
         new_condition = []
         
@@ -191,7 +183,7 @@ def main():
     
     # 2. 创建标识符集合
     condition_mapping_ids = create_record_identifier_set(condition_mapping_data)
-    logger.info(f"创建了 {len(condition_mapping_ids)} 个workflow_mutual_exclusive_conditions记录标识符")
+    logger.info(f"创建了 {condition_mapping_ids.unique_count} 个workflow_mutual_exclusive_conditions记录标识符")
     
     # 3. 加载RL数据
     try:
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+本地 OpenAI 兼容的模拟LLM服务
+
+实现 LLMClient 使用的 /v1/chat/completions（含 SSE 流式）和 /v1/models，用于在不占用真实模型的情况下
+测量工作流性能：
+- 按提示词类型（完整性/正确性检查、关键词、控制流、冗余SQL、修复审核等）返回预设或录制的响应
+- 可配置延迟分布（固定/均匀/正态/对数正态）和按token的生成耗时
+- 错误注入：429、503、超时、空响应、格式错误响应
+- 批量提示词（PromptBatcher）按编号槽位逐条作答
+
+用法:
+    python scripts/mock_llm_server.py --port 18081
+    python scripts/mock_llm_server.py --port 18081 --config mock_llm.yaml
+    python scripts/mock_llm_server.py --port 18081 --record-file recorded_responses.jsonl
+
+配置文件（YAML/JSON）中的每个提示词类型可覆盖 responses / latency / errors，未识别的提示词使用 default：
+    latency: {distribution: lognormal, median: 0.8, sigma: 0.5, per_token: 0.01}
+    errors: {rate_429: 0.01, rate_503: 0.01, rate_timeout: 0.0, rate_empty: 0.01, rate_malformed: 0.02}
+    types:
+      completeness:
+        responses: [{text: "是", weight: 0.9}, {text: "否，缺少WHERE条件", weight: 0.1}]
+        latency: {distribution: uniform, low: 0.2, high: 0.6}
+
+录制文件为JSONL，每行 {"type": "<提示词类型>", "response": "<响应内容>"}，替换对应类型的预设响应池。
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from aiohttp import web
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parents[1]
+sys.path.insert(0, str(project_root))
+
+# 提示词类型识别规则（按顺序匹配，首个命中的类型生效）
+# 注：完整性检查与正确性检查目前共用同一份提示词文本，统一归为 completeness
+PROMPT_TYPE_MARKERS: List[Tuple[str, str]] = [
+    ('control_flow_regeneration', '根据控制流验证结果重新生成'),
+    ('control_flow', '控制流语句'),
+    ('fix_review', '"accepted"'),
+    ('new_fingerprint', '"is_valid_new"'),
+    ('missing_sql', '"is_truly_missing"'),
+    ('redundant', '冗余'),
+    ('keyword_processing', '直接输出GORM代码对应的SQL语句JSON'),
+    ('keyword', '特殊关键词'),
+    ('completeness', '是否完善'),
+]
+
+# 批量提示词的槽位数（见 utils/prompt_batcher.build_batch_prompt）
+BATCH_MARKER = '**批量作答要求：**'
+BATCH_COUNT_PATTERN = re.compile(r'编号为 \[1\] 到 \[(\d+)\]')
+
+DEFAULT_RESPONSES: Dict[str, List[Dict[str, Any]]] = {
+    'completeness': [
+        {'text': '是', 'weight': 0.9},
+        {'text': '否，缺少WHERE条件分支', 'weight': 0.1},
+    ],
+    'keyword': [
+        {'text': '"No"', 'weight': 0.8},
+        {'text': '["Preload"]', 'weight': 0.15},
+        {'text': '["Transaction", "Scopes"]', 'weight': 0.05},
+    ],
+    'keyword_processing': [
+        {'text': '["SELECT * FROM users WHERE id = ?;"]', 'weight': 1.0},
+    ],
+    'control_flow': [
+        {'text': json.dumps({
+            'control_flow_analysis': {'has_control_flow': True, 'switch_statements': [], 'if_statements': []},
+            'sql_variants_analysis': {'expected_count': '2', 'actual_count': '2', 'is_reasonable': True,
+                                      'issues': [], 'recommendations': []},
+            'final_judgment': {'is_correct': True, 'reason': '合理'}
+        }, ensure_ascii=False), 'weight': 0.9},
+        {'text': json.dumps({
+            'control_flow_analysis': {'has_control_flow': True, 'switch_statements': [], 'if_statements': []},
+            'sql_variants_analysis': {'expected_count': '3', 'actual_count': '2', 'is_reasonable': False,
+                                      'issues': ['缺少一个分支的SQL'], 'recommendations': ['补充缺失分支']},
+            'final_judgment': {'is_correct': False, 'reason': '不合理，缺少分支'}
+        }, ensure_ascii=False), 'weight': 0.1},
+    ],
+    'control_flow_regeneration': [
+        {'text': '["SELECT * FROM users WHERE id = ?;", "SELECT * FROM users WHERE name = ?;"]', 'weight': 1.0},
+    ],
+    'redundant': [
+        {'text': '{"is_redundant": false, "reasoning": "不同分支的必要查询"}', 'weight': 0.9},
+        {'text': '{"is_redundant": true, "reasoning": "与参考SQL重复"}', 'weight': 0.1},
+    ],
+    'new_fingerprint': [
+        {'text': '{"is_valid_new": true, "reasoning": "新业务分支的必要查询"}', 'weight': 1.0},
+    ],
+    'missing_sql': [
+        {'text': '{"is_truly_missing": false, "reasoning": "该SQL在当前调用路径下不会执行"}', 'weight': 1.0},
+    ],
+    'fix_review': [
+        {'text': '{"accepted": true, "replacement": ""}', 'weight': 1.0},
+    ],
+    'default': [
+        {'text': '是', 'weight': 1.0},
+    ],
+}
+
+# 格式错误响应（用于测试格式验证重试）
+MALFORMED_RESPONSE = '抱歉，我无法按要求的格式回答这个问题。'
+
+
+class LatencyModel:
+    """响应延迟模型：首字节延迟 + 按completion token的生成耗时"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.distribution = config.get('distribution', 'lognormal')
+        self.config = config
+        self.per_token = float(config.get('per_token', 0.0))
+
+    def sample_ttfb(self) -> float:
+        c = self.config
+        if self.distribution == 'constant':
+            value = float(c.get('value', 0.5))
+        elif self.distribution == 'uniform':
+            value = random.uniform(float(c.get('low', 0.1)), float(c.get('high', 1.0)))
+        elif self.distribution == 'normal':
+            value = random.gauss(float(c.get('mean', 0.5)), float(c.get('stddev', 0.1)))
+        else:
+            value = random.lognormvariate(math.log(float(c.get('median', 0.5))), float(c.get('sigma', 0.5)))
+        return max(0.0, min(value, float(c.get('max', 300.0))))
+
+
+class MockLLMServer:
+    """模拟LLM服务"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, record_file: Optional[str] = None,
+                 seed: Optional[int] = None):
+        config = config or {}
+        self.random = random.Random(seed)
+        self.default_latency = LatencyModel(config.get('latency'))
+        self.default_errors: Dict[str, float] = config.get('errors', {}) or {}
+        self.types: Dict[str, Dict[str, Any]] = {}
+
+        type_configs = config.get('types', {}) or {}
+        for prompt_type in set(DEFAULT_RESPONSES) | set(type_configs):
+            type_config = type_configs.get(prompt_type, {}) or {}
+            self.types[prompt_type] = {
+                'responses': list(type_config.get('responses') or DEFAULT_RESPONSES.get(prompt_type, DEFAULT_RESPONSES['default'])),
+                'latency': LatencyModel(type_config['latency']) if 'latency' in type_config else self.default_latency,
+                'errors': {**self.default_errors, **(type_config.get('errors') or {})},
+            }
+        if record_file:
+            self._load_recorded(record_file)
+
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.start_time = time.time()
+
+    def _load_recorded(self, record_file: str) -> None:
+        """加载录制的响应（替换对应类型的预设响应池）"""
+        recorded: Dict[str, List[Dict[str, Any]]] = {}
+        with open(record_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                recorded.setdefault(item.get('type', 'default'), []).append({'text': item['response'], 'weight': 1.0})
+        for prompt_type, responses in recorded.items():
+            self.types.setdefault(prompt_type, {
+                'latency': self.default_latency, 'errors': dict(self.default_errors)
+            })['responses'] = responses
+        print(f"📼 已加载录制响应: {', '.join(f'{k}={len(v)}' for k, v in recorded.items())}")
+
+    @staticmethod
+    def classify(prompt: str) -> str:
+        """识别提示词类型"""
+        for prompt_type, marker in PROMPT_TYPE_MARKERS:
+            if marker in prompt:
+                return prompt_type
+        return 'default'
+
+    def _pick(self, prompt_type: str) -> str:
+        responses = self.types[prompt_type]['responses']
+        weights = [float(r.get('weight', 1.0)) for r in responses]
+        return self.random.choices(responses, weights=weights)[0]['text']
+
+    def _count(self, prompt_type: str, key: str) -> None:
+        type_stats = self.stats.setdefault(prompt_type, {})
+        type_stats[key] = type_stats.get(key, 0) + 1
+
+    def build_response(self, prompt: str) -> Tuple[str, str]:
+        """生成 (提示词类型, 响应内容)，批量提示词按槽位逐条作答"""
+        prompt_type = self.classify(prompt)
+        if BATCH_MARKER in prompt:
+            match = BATCH_COUNT_PATTERN.search(prompt)
+            count = int(match.group(1)) if match else 1
+            return prompt_type, "\n".join(f"[{i}] {self._pick(prompt_type)}" for i in range(1, count + 1))
+        return prompt_type, self._pick(prompt_type)
+
+    async def handle_models(self, request: web.Request) -> web.Response:
+        return web.json_response({'object': 'list', 'data': [{'id': 'mock', 'object': 'model'}]})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({'uptime': time.time() - self.start_time, 'types': self.stats})
+
+    async def handle_chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        messages = body.get('messages') or []
+        # 格式重试时最后一条为重试提示，按首条用户消息识别类型
+        prompt = next((m.get('content', '') for m in messages if m.get('role') == 'user'), '')
+        prompt_type, content = self.build_response(prompt)
+        self._count(prompt_type, 'requests')
+        type_config = self.types.get(prompt_type, self.types['default'])
+        errors = type_config['errors']
+        latency: LatencyModel = type_config['latency']
+
+        # 错误注入
+        roll = self.random.random()
+        threshold = 0.0
+        for key, status in (('rate_429', 429), ('rate_503', 503)):
+            threshold += float(errors.get(key, 0.0))
+            if roll < threshold:
+                self._count(prompt_type, f'error_{status}')
+                await asyncio.sleep(latency.sample_ttfb() * 0.1)
+                return web.json_response({'error': {'message': 'injected error', 'code': status}}, status=status)
+        threshold += float(errors.get('rate_timeout', 0.0))
+        if roll < threshold:
+            self._count(prompt_type, 'error_timeout')
+            await asyncio.sleep(float(errors.get('timeout_seconds', 600)))
+        threshold += float(errors.get('rate_empty', 0.0))
+        if roll < threshold:
+            self._count(prompt_type, 'empty')
+            content = ''
+        elif roll < threshold + float(errors.get('rate_malformed', 0.0)):
+            self._count(prompt_type, 'malformed')
+            content = MALFORMED_RESPONSE
+
+        prompt_tokens = max(1, len(prompt) // 2)
+        completion_tokens = max(1, len(content) // 2) if content else 0
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens}
+        generation_time = latency.per_token * completion_tokens
+
+        await asyncio.sleep(latency.sample_ttfb())
+        created = int(time.time())
+        if not body.get('stream'):
+            await asyncio.sleep(generation_time)
+            return web.json_response({
+                'id': f'chatcmpl-mock-{created}',
+                'object': 'chat.completion',
+                'created': created,
+                'model': body.get('model', 'mock'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': usage
+            })
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        chunks = [content[i:i + 8] for i in range(0, len(content), 8)] or ['']
+        for chunk in chunks:
+            event = {'object': 'chat.completion.chunk', 'created': created,
+                     'choices': [{'index': 0, 'delta': {'content': chunk}, 'finish_reason': None}]}
+            await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+            if generation_time:
+                await asyncio.sleep(generation_time / len(chunks))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            event = {'object': 'chat.completion.chunk', 'created': created, 'choices': [], 'usage': usage}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/v1/chat/completions', self.handle_chat)
+        app.router.add_get('/v1/models', self.handle_models)
+        app.router.add_get('/mock/stats', self.handle_stats)
+        return app
+
+
+def load_mock_config(config_file: Optional[str]) -> Dict[str, Any]:
+    """加载模拟服务配置（YAML或JSON）"""
+    if not config_file:
+        return {}
+    with open(config_file, 'r', encoding='utf-8') as f:
+        if config_file.endswith('.json'):
+            return json.load(f)
+        return yaml.safe_load(f) or {}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='本地 OpenAI 兼容的模拟LLM服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=18081, help='监听端口')
+    parser.add_argument('--config', help='模拟配置文件（YAML/JSON）')
+    parser.add_argument('--record-file', help='录制响应文件（JSONL）')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--latency', help='快捷设置默认延迟分布，如 constant:0.2 / lognormal:0.8:0.5 / uniform:0.1:1.0')
+    args = parser.parse_args()
+
+    config = load_mock_config(args.config)
+    if args.latency:
+        name, *params = args.latency.split(':')
+        keys = {'constant': ['value'], 'lognormal': ['median', 'sigma'], 'uniform': ['low', 'high'],
+                'normal': ['mean', 'stddev']}.get(name, [])
+        config['latency'] = {'distribution': name, **{k: float(v) for k, v in zip(keys, params)}}
+
+    server = MockLLMServer(config, record_file=args.record_file, seed=args.seed)
+    print(f"🚀 模拟LLM服务启动: http://{args.host}:{args.port}/v1/chat/completions")
+    web.run_app(server.create_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+自适应并发控制器测试脚本
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from utils.adaptive_limiter import (
+    AdaptiveConcurrencyLimiter, create_concurrency_limiter, get_current_limiter,
+    get_request_slots, request_slots, set_global_llm_budget
+)
+
+
+async def _run_tasks(limiter: AdaptiveConcurrencyLimiter, count: int, hold: float = 0.01) -> int:
+    """并发运行 count 个任务，返回观测到的最大在途数"""
+    state = {'current': 0, 'peak': 0}
+
+    async def worker():
+        async with limiter:
+            state['current'] += 1
+            state['peak'] = max(state['peak'], state['current'])
+            await asyncio.sleep(hold)
+            state['current'] -= 1
+
+    await asyncio.gather(*(worker() for _ in range(count)))
+    return state['peak']
+
+
+def test_window_caps_in_flight():
+    """在途数不超过并发窗口，全部完成后槽位归还"""
+    limiter = AdaptiveConcurrencyLimiter("test_cap", initial_limit=3, max_limit=3)
+    peak = asyncio.run(_run_tasks(limiter, 20))
+    assert peak == 3
+    assert limiter.in_flight == 0
+    assert limiter.peak_in_flight == 3
+
+
+def test_additive_increase_when_healthy():
+    """健康的成功请求让窗口每轮约 +1，且不超过上限"""
+    limiter = AdaptiveConcurrencyLimiter("test_increase", initial_limit=4, max_limit=6)
+    for _ in range(5):
+        limiter.record_success(0.1)
+    assert limiter.limit == 5
+    for _ in range(100):
+        limiter.record_success(0.1)
+    assert limiter.limit == 6
+
+
+def test_no_increase_above_latency_target():
+    """p95延迟超过目标时窗口不再增长"""
+    limiter = AdaptiveConcurrencyLimiter("test_slow", initial_limit=4, max_limit=16, latency_target_p95=1.0)
+    # 样本不足10个时不判断延迟
+    for _ in range(10):
+        limiter.record_success(5.0)
+    window = limiter.window
+    for _ in range(50):
+        limiter.record_success(5.0)
+    assert limiter.window == window
+
+
+def test_multiplicative_decrease_once_per_cooldown():
+    """过载时窗口乘性收缩，同一冷却期内的并发失败只收缩一次；非过载错误不收缩"""
+    limiter = AdaptiveConcurrencyLimiter("test_decrease", initial_limit=16, max_limit=16, backoff_ratio=0.5)
+    limiter.record_failure(overload=False, reason="ValueError")
+    assert limiter.limit == 16
+    for _ in range(5):
+        limiter.record_failure(overload=True, reason="TimeoutError")
+    assert limiter.limit == 8
+    assert limiter.total_overloads == 5
+    assert limiter.get_stats()['window_history'][-1]['reason'] == "decrease:TimeoutError"
+
+
+def test_fixed_window_when_not_adaptive():
+    """adaptive=False 时窗口固定，等价于信号量"""
+    limiter = AdaptiveConcurrencyLimiter("test_fixed", initial_limit=4, max_limit=16, adaptive=False)
+    for _ in range(50):
+        limiter.record_success(0.1)
+    limiter.record_failure(overload=True)
+    assert limiter.limit == 4
+
+
+def test_reentry_in_same_task_does_not_deadlock():
+    """同一任务重复进入同一控制器不占用新槽位，子任务仍正常占用槽位"""
+    limiter = AdaptiveConcurrencyLimiter("test_reentry", initial_limit=1, max_limit=1)
+
+    async def main():
+        async with limiter:
+            assert limiter.in_flight == 1
+            async with limiter:
+                assert limiter.in_flight == 1
+                assert get_current_limiter() is limiter
+            assert get_current_limiter() is limiter
+            child = asyncio.create_task(_run_tasks(limiter, 1))
+            await asyncio.sleep(0.05)
+            # 子任务在等待外层释放槽位
+            assert not child.done()
+        await asyncio.wait_for(child, 1.0)
+        assert get_current_limiter() is None
+
+    asyncio.run(main())
+    assert limiter.in_flight == 0
+
+
+def test_global_budget_caps_parallel_limiters():
+    """全局预算限制多个控制器合计的在途数"""
+    first = AdaptiveConcurrencyLimiter("test_budget_a", initial_limit=4, max_limit=4)
+    second = AdaptiveConcurrencyLimiter("test_budget_b", initial_limit=4, max_limit=4)
+    state = {'current': 0, 'peak': 0}
+
+    async def worker(limiter):
+        async with limiter:
+            state['current'] += 1
+            state['peak'] = max(state['peak'], state['current'])
+            await asyncio.sleep(0.01)
+            state['current'] -= 1
+
+    async def main():
+        set_global_llm_budget(3)
+        try:
+            await asyncio.gather(*(worker(first) for _ in range(10)), *(worker(second) for _ in range(10)))
+        finally:
+            set_global_llm_budget(None)
+
+    asyncio.run(main())
+    assert state['peak'] == 3
+
+
+def test_request_slots_context():
+    """request_slots 只在上下文内生效，且至少为1"""
+    assert get_request_slots() == 1
+    with request_slots(4):
+        assert get_request_slots() == 4
+        with request_slots(0):
+            assert get_request_slots() == 1
+    assert get_request_slots() == 1
+
+
+def test_endpoint_limiter_shared_across_steps():
+    """同一端点的各步骤复用同一个控制器，沿用已学到的窗口"""
+    first = create_concurrency_limiter("sql_completeness_check", initial_limit=4, endpoint="test_endpoint")
+    first.window = 7.0
+    second = create_concurrency_limiter("keyword_data_processing", initial_limit=2, endpoint="test_endpoint")
+    assert second is first
+    assert second.limit == 7
+    assert second.step_types == ["sql_completeness_check", "keyword_data_processing"]
+    other = create_concurrency_limiter("keyword_data_processing", initial_limit=2, endpoint="test_endpoint_other")
+    assert other is not first
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
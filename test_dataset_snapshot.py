@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+原始数据集快照缓存测试脚本（命中、过期失效、重建）
+"""
+import json
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from data_processing.dataset_snapshot import DatasetSnapshotCache, snapshot_key
+
+RECORDS = [{'function_name': 'f0', 'orm_code': 'db.Find(&u)'}, {'function_name': 'f1', 'orm_code': ''}]
+FILE_STATS = {'a.json': {'total_records': 2}}
+
+
+def _make_dataset(root: Path):
+    data_dir = root / "data"
+    data_dir.mkdir()
+    files = []
+    for name in ("a.json", "b.json"):
+        path = data_dir / name
+        path.write_text(json.dumps(RECORDS), encoding='utf-8')
+        files.append(path)
+    return data_dir, files, DatasetSnapshotCache(root / "snapshots")
+
+
+def _snapshots(cache: DatasetSnapshotCache):
+    return sorted(cache.cache_dir.glob("*.pkl"))
+
+
+def test_hit_when_inputs_unchanged():
+    """输入文件未变化时读回保存的记录和文件统计"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, files, cache = _make_dataset(Path(tmp))
+        key = snapshot_key(files)
+        assert cache.load(data_dir, key) is None
+        assert cache.save(data_dir, files, key, RECORDS, FILE_STATS) is not None
+        assert cache.load(data_dir, snapshot_key(files)) == (RECORDS, FILE_STATS)
+
+
+def test_modified_file_invalidates_snapshot():
+    """文件内容或修改时间变化时快照键改变，旧快照不再命中"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, files, cache = _make_dataset(Path(tmp))
+        key = snapshot_key(files)
+        cache.save(data_dir, files, key, RECORDS, FILE_STATS)
+
+        # 只改修改时间，大小不变
+        stat = files[0].stat()
+        os.utime(files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        touched_key = snapshot_key(files)
+        assert touched_key != key
+        assert cache.load(data_dir, touched_key) is None
+
+        # 改内容（大小变化）
+        files[1].write_text(json.dumps(RECORDS[:1]), encoding='utf-8')
+        assert snapshot_key(files) not in (key, touched_key)
+
+
+def test_added_or_removed_file_invalidates_snapshot():
+    """新增或删除输入文件都会使快照失效"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, files, cache = _make_dataset(Path(tmp))
+        key = snapshot_key(files)
+        cache.save(data_dir, files, key, RECORDS, FILE_STATS)
+
+        extra = data_dir / "c.json"
+        extra.write_text("[]", encoding='utf-8')
+        assert cache.load(data_dir, snapshot_key(files + [extra])) is None
+        assert cache.load(data_dir, snapshot_key(files[:1])) is None
+        assert cache.load(data_dir, key) is not None
+
+
+def test_rebuild_replaces_old_snapshot():
+    """重建快照时删除同一数据目录的旧快照，其他数据目录的快照保留"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, files, cache = _make_dataset(Path(tmp))
+        old_path = cache.save(data_dir, files, snapshot_key(files), RECORDS, FILE_STATS)
+
+        other_dir = Path(tmp) / "other"
+        other_dir.mkdir()
+        other_file = other_dir / "x.json"
+        other_file.write_text("[]", encoding='utf-8')
+        other_path = cache.save(other_dir, [other_file], snapshot_key([other_file]), [], {})
+
+        files[0].write_text(json.dumps(RECORDS * 2), encoding='utf-8')
+        new_key = snapshot_key(files)
+        new_path = cache.save(data_dir, files, new_key, RECORDS * 2, FILE_STATS)
+        assert new_path != old_path and not old_path.exists()
+        assert _snapshots(cache) == sorted([new_path, other_path])
+        assert cache.load(data_dir, new_key)[0] == RECORDS * 2
+
+
+def test_no_snapshot_when_inputs_change_during_parse():
+    """解析期间输入文件变化时不写快照"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, files, cache = _make_dataset(Path(tmp))
+        key = snapshot_key(files)
+        files[0].write_text(json.dumps(RECORDS * 3), encoding='utf-8')
+        assert cache.save(data_dir, files, key, RECORDS, FILE_STATS) is None
+        assert not cache.cache_dir.exists() or _snapshots(cache) == []
+
+
+def test_stale_or_corrupt_snapshot_file_rejected():
+    """快照文件内容的版本或键不一致、文件损坏时视为未命中"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, files, cache = _make_dataset(Path(tmp))
+        key = snapshot_key(files)
+        path = cache.save(data_dir, files, key, RECORDS, FILE_STATS)
+
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+        snapshot['version'] = -1
+        with open(path, 'wb') as f:
+            pickle.dump(snapshot, f)
+        assert cache.load(data_dir, key) is None
+
+        path.write_bytes(b"not a pickle")
+        assert cache.load(data_dir, key) is None
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
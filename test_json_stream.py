@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+JSON记录文件流式读取测试脚本（顶层数组、JSONL、截断输入）
+"""
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+import utils.json_stream as json_stream
+from utils.json_stream import (
+    detect_format, find_record_file, iter_json_records, load_json_or_records, open_text, output_path,
+    record_file_patterns, with_format
+)
+from utils.step_journal import write_records
+
+RECORDS = [
+    {'function_name': 'f0', 'orm_code': 'db.Where("a = ?", 1).Find(&u)', 'sql_pattern_cnt': 12345},
+    {'function_name': '中文', 'sql_statement_list': ['SELECT 1', {'description': 'd', 'scenarios': []}]},
+    [1, 2.5, None, True],
+    "plain string with ] and , inside",
+    67890,
+    {},
+]
+
+
+def _write(directory: str, name: str, content: str) -> Path:
+    path = Path(directory) / name
+    path.write_text(content, encoding='utf-8')
+    return path
+
+
+def _with_chunk_size(size: int, func):
+    """用很小的读取块运行 func，让元素跨越块边界"""
+    original = json_stream.CHUNK_SIZE
+    json_stream.CHUNK_SIZE = size
+    try:
+        return func()
+    finally:
+        json_stream.CHUNK_SIZE = original
+
+
+def test_array_parsing_across_chunk_boundaries():
+    """顶层数组逐个产出元素，与 json.load 结果一致（含跨块的数字与字符串）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for indent in (None, 2):
+            path = _write(tmp, "records.json", json.dumps(RECORDS, ensure_ascii=False, indent=indent))
+            for chunk_size in (1, 3, 7, 1 << 20):
+                parsed = _with_chunk_size(chunk_size, lambda: list(iter_json_records(path)))
+                assert parsed == RECORDS, f"chunk_size={chunk_size}, indent={indent}"
+
+
+def test_empty_array_and_whitespace():
+    """空数组与前后空白"""
+    with tempfile.TemporaryDirectory() as tmp:
+        assert list(iter_json_records(_write(tmp, "empty.json", "[]"))) == []
+        assert list(iter_json_records(_write(tmp, "spaced.json", "\n  [ 1 ,\n 2 ]  \n"))) == [1, 2]
+
+
+def test_non_array_rejected():
+    """顶层不是数组时在开始迭代时抛出 ValueError"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, content in (("object.json", '{"a": 1}'), ("blank.json", "  ")):
+            records = iter_json_records(_write(tmp, name, content))
+            try:
+                next(records)
+                assert False, f"{name} 应当抛出 ValueError"
+            except ValueError:
+                pass
+
+
+def test_truncated_array_raises():
+    """截断的数组（元素不完整或缺少结尾的 ]）抛出 ValueError，截断前的完整元素正常产出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        full = json.dumps(RECORDS[:2], ensure_ascii=False, indent=2)
+        for content in (full[:-1], full[:-10], '[1, 2', '[{"a": 1}, {"b"', '[1,'):
+            path = _write(tmp, "truncated.json", content)
+            for chunk_size in (2, 1 << 20):
+                produced = []
+
+                def consume():
+                    for record in iter_json_records(path):
+                        produced.append(record)
+
+                try:
+                    _with_chunk_size(chunk_size, consume)
+                    assert False, f"{content!r} 应当抛出 ValueError"
+                except ValueError:
+                    pass
+                assert all(record in RECORDS + [1, 2, {'a': 1}] for record in produced)
+
+
+def test_jsonl_parsing_skips_blank_lines():
+    """JSONL 逐行解析，空行跳过"""
+    with tempfile.TemporaryDirectory() as tmp:
+        lines = "\n".join(json.dumps(r, ensure_ascii=False) for r in RECORDS)
+        path = _write(tmp, "records.jsonl", "\n" + lines.replace("\n", "\n\n", 1) + "\n\n")
+        assert list(iter_json_records(path)) == RECORDS
+        assert load_json_or_records(path) == RECORDS
+
+
+def test_truncated_jsonl_reports_line():
+    """JSONL 最后一行被截断时抛出带行号的 ValueError"""
+    with tempfile.TemporaryDirectory() as tmp:
+        content = json.dumps(RECORDS[0]) + "\n" + json.dumps(RECORDS[1])[:-3]
+        path = _write(tmp, "truncated.jsonl", content)
+        produced = []
+        try:
+            for record in iter_json_records(path):
+                produced.append(record)
+            assert False, "应当抛出 ValueError"
+        except ValueError as e:
+            assert "第 2 行" in str(e)
+        assert produced == [RECORDS[0]]
+
+
+def test_write_records_round_trip():
+    """write_records 按后缀写出，iter_json_records 读回相同的记录"""
+    formats = ['json', 'jsonl'] + (['jsonl.zst'] if json_stream.ZSTD_AVAILABLE else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        for record_format in formats:
+            path = with_format(Path(tmp) / "out.json", record_format)
+            assert write_records(path, RECORDS) == len(RECORDS)
+            assert list(iter_json_records(path)) == RECORDS
+            assert not path.with_name(path.name + '.tmp').exists()
+
+
+def _round_trip(record_format: str) -> None:
+    """按格式写出、按基础文件名找回、用 open_text 读回原始内容，三种读取方式得到相同的记录"""
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp) / "records.json"
+        path = with_format(base, record_format)
+        assert detect_format(path) == record_format
+        assert find_record_file(base) is None
+        assert write_records(path, RECORDS) == len(RECORDS)
+        assert not path.with_name(path.name + '.tmp').exists()
+
+        # 只存在该格式的文件时，按 .json 基础文件名可以找回
+        assert find_record_file(base) == path
+        with open_text(path) as f:
+            content = f.read()
+        if record_format == 'json':
+            assert json.loads(content) == RECORDS
+        else:
+            assert [json.loads(line) for line in content.splitlines()] == RECORDS
+        if record_format.endswith('.zst'):
+            # 磁盘上是zstd帧（魔数 28 B5 2F FD），不是明文
+            assert path.read_bytes()[:4] == b'\x28\xb5\x2f\xfd'
+        assert list(iter_json_records(path)) == RECORDS
+        assert load_json_or_records(path) == RECORDS
+
+
+def test_round_trip_json():
+    """json 格式往返"""
+    _round_trip('json')
+
+
+def test_round_trip_jsonl():
+    """jsonl 格式往返"""
+    _round_trip('jsonl')
+
+
+def test_round_trip_jsonl_zst():
+    """jsonl.zst 格式往返（没有zstd实现时跳过，并确认 open_text 给出明确的错误）"""
+    if not json_stream.ZSTD_AVAILABLE:
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                open_text(Path(tmp) / "records.jsonl.zst", 'w')
+                assert False, "没有zstd实现时应当抛出 RuntimeError"
+            except RuntimeError:
+                pass
+        print("⏭️ 跳过 jsonl.zst 往返：没有zstd实现")
+        return
+    _round_trip('jsonl.zst')
+
+
+def test_find_record_file_prefers_json():
+    """多种格式同时存在时 find_record_file 按 json → jsonl → jsonl.zst 的顺序返回"""
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp) / "records.json"
+        write_records(with_format(base, 'jsonl'), RECORDS)
+        assert find_record_file(base) == with_format(base, 'jsonl')
+        assert find_record_file(with_format(base, 'jsonl.zst')) == with_format(base, 'jsonl')
+        write_records(base, RECORDS)
+        assert find_record_file(with_format(base, 'jsonl')) == base
+
+
+def test_output_path_follows_config():
+    """output_path 按配置的输出格式替换后缀；配置 jsonl.zst 但没有zstd实现时退化为 jsonl"""
+    from config.data_processing.workflow.workflow_config import get_workflow_config
+    output_config = get_workflow_config().config.output
+    original = output_config.format
+    try:
+        for record_format in json_stream.OUTPUT_FORMATS:
+            output_config.format = record_format
+            expected = record_format if record_format != 'jsonl.zst' or json_stream.ZSTD_AVAILABLE else 'jsonl'
+            assert output_path("out/step.json") == with_format("out/step.json", expected)
+    finally:
+        output_config.format = original
+
+
+def test_with_format_compound_suffixes():
+    """替换后缀时整体识别复合后缀 .jsonl.zst，文件名中的其他点号保持不变"""
+    cases = [
+        ("a/b.json", 'jsonl', "a/b.jsonl"),
+        ("a/b.jsonl", 'jsonl.zst', "a/b.jsonl.zst"),
+        ("a/b.jsonl.zst", 'jsonl', "a/b.jsonl"),
+        ("a/b.jsonl.zst", 'jsonl.zst', "a/b.jsonl.zst"),
+        ("a/step.v2.json", 'jsonl.zst', "a/step.v2.jsonl.zst"),
+        ("a.d/records.jsonl", 'json', "a.d/records.json"),
+        ("a/b.zst", 'json', "a/b.zst.json"),
+        ("a/b.txt", 'jsonl', "a/b.txt.jsonl"),
+    ]
+    for source, record_format, expected in cases:
+        assert with_format(source, record_format) == Path(expected), source
+        assert detect_format(expected) == record_format
+    # 替换是幂等的，来回转换回到原名
+    for record_format in json_stream.OUTPUT_FORMATS:
+        assert with_format(with_format("x/y.json", record_format), 'json') == Path("x/y.json")
+
+
+def test_format_helpers():
+    """按后缀识别格式与替换后缀"""
+    assert detect_format("a/b.json") == 'json'
+    assert detect_format("a/b.jsonl") == 'jsonl'
+    assert detect_format("a/b.jsonl.zst") == 'jsonl.zst'
+    assert with_format("a/b.json", 'jsonl.zst') == Path("a/b.jsonl.zst")
+    assert with_format("a/b.jsonl.zst", 'json') == Path("a/b.json")
+    assert record_file_patterns("*.json") == ["*.json", "*.jsonl", "*.jsonl.zst"]
+    assert record_file_patterns("*.txt") == ["*.txt"]
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+多关键词匹配器测试脚本（纯Python自动机、子串查找与逐个子串搜索结果一致）
+"""
+import random
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+import utils.keyword_matcher as keyword_matcher
+from utils.keyword_matcher import AUTOMATON_MIN_KEYWORDS, KeywordMatcher, get_keyword_matcher
+
+# 相互重叠、嵌套的关键词（经典 Aho–Corasick 用例，外加前后缀共享与完全包含）
+NESTED_KEYWORDS = ['he', 'she', 'his', 'hers', 'e', 'hershey', 'sheh', '中文', '文本']
+NESTED_TEXTS = ['ushers', 'hishershey', 'sheshe', 'h', 'xyz', '中文文本', '文中', 'hhhhers']
+
+
+def _expected(keywords, text):
+    """逐个关键词做子串查找的参考结果（按关键词顺序，去重，忽略空关键词）"""
+    return [keyword for keyword in dict.fromkeys(keywords) if keyword and keyword in text]
+
+
+def _build(keywords, backend: str) -> KeywordMatcher:
+    """强制使用指定后端构建匹配器（不经过缓存）"""
+    original = keyword_matcher.AHOCORASICK_AVAILABLE, keyword_matcher.AUTOMATON_MIN_KEYWORDS
+    try:
+        if backend != 'pyahocorasick':
+            keyword_matcher.AHOCORASICK_AVAILABLE = False
+        keyword_matcher.AUTOMATON_MIN_KEYWORDS = 0 if backend == 'automaton' else 10 ** 9
+        matcher = KeywordMatcher(keywords)
+    finally:
+        keyword_matcher.AHOCORASICK_AVAILABLE, keyword_matcher.AUTOMATON_MIN_KEYWORDS = original
+    assert matcher.backend == backend
+    return matcher
+
+
+def _backends():
+    return ['substring', 'automaton'] + (['pyahocorasick'] if keyword_matcher.AHOCORASICK_AVAILABLE else [])
+
+
+def _assert_matches_reference(keywords, texts):
+    for backend in _backends():
+        matcher = _build(keywords, backend)
+        for text in texts:
+            expected = _expected(keywords, text)
+            assert matcher.find_all(text) == expected, f"{backend}: {text!r}"
+            assert matcher.contains_any(text) == bool(expected), f"{backend}: {text!r}"
+
+
+def test_overlapping_and_nested_keywords():
+    """重叠、嵌套（一个关键词是另一个的前缀/后缀/子串）的关键词全部找到"""
+    _assert_matches_reference(NESTED_KEYWORDS, NESTED_TEXTS + [''])
+
+
+def test_random_keywords_match_substring_search():
+    """小字母表上随机生成的关键词与文本（大量重叠和失败指针跳转），各后端与子串查找一致"""
+    rng = random.Random(0)
+    for _ in range(30):
+        keywords = [''.join(rng.choice('abc') for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 12))]
+        texts = [''.join(rng.choice('abcd') for _ in range(rng.randint(0, 30))) for _ in range(20)]
+        _assert_matches_reference(keywords, texts)
+
+
+def test_automaton_selected_for_many_keywords():
+    """未安装 pyahocorasick 时，关键词达到阈值才使用纯Python自动机，结果与子串查找一致"""
+    keywords = [f"kw{i:03d}" for i in range(AUTOMATON_MIN_KEYWORDS)]
+    matcher = KeywordMatcher(keywords)
+    few = KeywordMatcher(keywords[:AUTOMATON_MIN_KEYWORDS - 1])
+    if not keyword_matcher.AHOCORASICK_AVAILABLE:
+        assert matcher.backend == 'automaton'
+        assert few.backend == 'substring'
+    text = "prefix kw007 kw12 kw127kw000 suffix"
+    assert matcher.find_all(text) == _expected(keywords, text) == ['kw000', 'kw007', 'kw127']
+    assert few.find_all(text) == _expected(keywords[:AUTOMATON_MIN_KEYWORDS - 1], text)
+
+
+def test_duplicate_and_empty_keywords_ignored():
+    """重复关键词只保留第一次出现的位置，空关键词被忽略（空关键词不会匹配任意文本）"""
+    keywords = ['b', '', 'a', 'b', 'ab']
+    for backend in _backends():
+        matcher = _build(keywords, backend)
+        assert matcher.keywords == ('b', 'a', 'ab')
+        assert matcher.find_all('xaby') == ['b', 'a', 'ab']
+        assert not matcher.contains_any('xyz')
+    empty = _build([''], 'automaton')
+    assert empty.find_all('anything') == [] and not empty.contains_any('anything')
+
+
+def test_matcher_cached_per_keyword_set():
+    """同一组关键词只编译一次"""
+    assert get_keyword_matcher(['if', 'else']) is get_keyword_matcher(('if', 'else'))
+    assert get_keyword_matcher(['if', 'else']) is not get_keyword_matcher(['else', 'if'])
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
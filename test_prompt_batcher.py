@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+多记录提示词批处理测试脚本（编号槽位拆分、逐槽位验证、只重新请求失败槽位）
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from utils.adaptive_limiter import get_request_slots
+from utils.format_validators import validate_sql_completeness_response
+from utils.prompt_batcher import PromptBatcher, build_batch_prompt, parse_numbered_slots
+
+MATERIALS = ["材料一", "材料二", "材料三"]
+
+
+class CannedClient:
+    """按顺序返回预设响应的LLM客户端；批量验证不通过时与重试耗尽一样抛出异常"""
+
+    def __init__(self, *responses: str):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def call_async_with_format_validation(self, session, prompt, validator, max_tokens, temperature,
+                                                module=None, component=None):
+        self.calls.append({'prompt': prompt, 'max_tokens': max_tokens, 'slots': get_request_slots()})
+        response = self.responses.pop(0)
+        result = validator(response)
+        if result is not True:
+            raise Exception(f"格式验证失败: {result['error']}")
+        return response
+
+
+def _run(client: CannedClient, materials=MATERIALS, batch_size: int = 3):
+    batcher = PromptBatcher(client, "判断SQL是否完整。", slot_validator=validate_sql_completeness_response,
+                            batch_size=batch_size, max_tokens_per_slot=100, module="workflow",
+                            component="sql_completeness_check")
+    answers = asyncio.run(batcher.run_batch(None, materials))
+    return batcher, answers
+
+
+def test_build_batch_prompt():
+    """共享指令只出现一次，每条材料按编号排列，并给出逐条作答的格式"""
+    prompt = build_batch_prompt("共享指令\n", MATERIALS)
+    assert prompt.count("共享指令") == 1
+    assert "编号为 [1] 到 [3]" in prompt
+    for i, material in enumerate(MATERIALS, start=1):
+        assert f"[{i}] <第{i}条材料的回答>" in prompt
+        assert f"=== 分析材料 [{i}] ===\n{material}" in prompt
+
+
+def test_parse_numbered_slots():
+    """支持 [1] / **[1]** / [1]: / [1]： 几种写法，跨行回答合并，前导说明忽略，重复编号的槽位丢弃"""
+    response = "\n".join([
+        "以下是逐条回答：",
+        "[1] 是，完整",
+        "**[2]** 否，缺少WHERE",
+        "  补充说明",
+        "[3]: 是",
+        "[4]：否",
+    ])
+    assert parse_numbered_slots(response, 4) == {1: "是，完整", 2: "否，缺少WHERE\n补充说明", 3: "是", 4: "否"}
+    assert parse_numbered_slots("[1] 是\n[1] 否\n[2] 是", 2) == {2: "是"}
+    assert parse_numbered_slots("没有编号的回答", 2) == {}
+
+
+def test_extra_slot_dropped():
+    """多答的槽位（编号超出范围）被丢弃，不会并入上一个槽位的回答"""
+    assert parse_numbered_slots("[1] 是\n[2] 否\n[3] 是，c\n[4] 否，多余\n多余续行", 3) == {1: "是", 2: "否", 3: "是，c"}
+    client = CannedClient("[1] 是\n[2] 否\n[3] 是，c\n[4] 否，多余")
+    batcher, answers = _run(client)
+    assert answers == ["是", "否", "是，c"]
+    assert batcher.get_stats()['slots_requeued'] == 0
+
+
+def test_all_slots_accepted():
+    """一次批量请求回答全部槽位：max_tokens 按槽位数放大，请求按槽位数计入并发控制器"""
+    client = CannedClient("[1] 是\n[2] 否，缺少条件\n[3] 是")
+    batcher, answers = _run(client)
+    assert answers == ["是", "否，缺少条件", "是"]
+    assert len(client.calls) == 1
+    assert client.calls[0]['max_tokens'] == 100 * 3 + 32
+    assert client.calls[0]['slots'] == 3
+    assert get_request_slots() == 1
+    stats = batcher.get_stats()
+    assert (stats['batch_requests'], stats['slots_total'], stats['slots_accepted'], stats['slots_requeued']) == (1, 3, 3, 0)
+    assert stats['acceptance_rate'] == 1.0
+
+
+def test_missing_slot_requeued_alone():
+    """缺失的槽位返回None（由调用方单条重新请求），其余槽位照常使用"""
+    batcher, answers = _run(CannedClient("[1] 是\n[3] 否"))
+    assert answers == ["是", None, "否"]
+    assert batcher.get_stats()['slots_requeued'] == 1
+
+
+def test_malformed_slot_requeued_alone():
+    """未通过单条验证器的槽位返回None，只有该槽位需要重新请求"""
+    batcher, answers = _run(CannedClient("[1] 可能吧\n[2] 否\n[3] 是"))
+    assert answers == [None, "否", "是"]
+    stats = batcher.get_stats()
+    assert stats['slots_accepted'] == 2 and stats['slots_requeued'] == 1
+
+
+def test_unparseable_response_requeues_whole_batch():
+    """整个响应没有任何编号槽位（批量验证失败）或请求异常时，整批记录都转为单条请求"""
+    batcher, answers = _run(CannedClient("无法按格式回答"))
+    assert answers == [None, None, None]
+    assert batcher.get_stats()['slots_requeued'] == 3
+
+
+def test_requeue_across_batches():
+    """多批请求时统计累计，只有失败的槽位计入重新请求"""
+    records = [f"材料{i}" for i in range(5)]
+    client = CannedClient("[1] 是\n[2] 否", "[1] 是\n[3] 否，x", "[1] 是")
+    batcher = PromptBatcher(client, "指令", slot_validator=validate_sql_completeness_response,
+                            batch_size=2, max_tokens_per_slot=10)
+    batches = batcher.split(records)
+    assert batches == [records[0:2], records[2:4], records[4:5]]
+
+    async def run_all():
+        return [await batcher.run_batch(None, batch) for batch in batches]
+
+    answers = asyncio.run(run_all())
+    assert answers == [["是", "否"], ["是", None], ["是"]]
+    failed = [record for batch, batch_answers in zip(batches, answers)
+              for record, answer in zip(batch, batch_answers) if answer is None]
+    assert failed == ["材料3"]
+    stats = batcher.get_stats()
+    assert (stats['batch_requests'], stats['slots_total'], stats['slots_accepted'], stats['slots_requeued']) == (3, 5, 4, 1)
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
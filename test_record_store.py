@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+记录存储测试脚本（64位内容哈希ID、索引、拆分合并）
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from utils.record_store import RecordStore, record_key, text_hash
+
+
+def test_none_and_empty_string_differ():
+    """缺失字段（None）与空字符串得到不同的ID"""
+    assert record_key({'function_name': 'f', 'caller': None}) != record_key({'function_name': 'f', 'caller': ''})
+    assert record_key({'function_name': 'f'}) == record_key({'function_name': 'f', 'caller': None})
+    assert text_hash(None) != text_hash('')
+
+
+def test_string_and_json_value_differ():
+    """字符串 '["a"]' 与列表 ["a"]、字符串 '1' 与整数 1 不冲突"""
+    assert record_key({'orm_code': '["a"]'}) != record_key({'orm_code': ['a']})
+    assert record_key({'orm_code': '1'}) != record_key({'orm_code': 1})
+    assert record_key({'orm_code': 'null'}) != record_key({'orm_code': None})
+
+
+def test_adjacent_fields_do_not_shift():
+    """字段内容中含分隔字符时，相邻字段不会错位拼接成同一ID"""
+    assert record_key({'function_name': 'a\x1f', 'orm_code': 'b'}) != record_key({'function_name': 'a', 'orm_code': '\x1fb'})
+    assert record_key({'function_name': 'ab', 'orm_code': ''}) != record_key({'function_name': 'a', 'orm_code': 'b'})
+
+
+def test_key_is_stable_and_uses_identity_fields_only():
+    """ID只取决于身份字段，字典顺序和其他字段不影响"""
+    record = {'function_name': 'f', 'orm_code': 'db.Find()', 'caller': 'c'}
+    reordered = {'caller': 'c', 'orm_code': 'db.Find()', 'function_name': 'f', 'sql_statement_list': ['x']}
+    assert record_key(record) == record_key(reordered)
+    assert 0 <= record_key(record) < 2 ** 64
+    assert record_key({'meta': {'b': 1, 'a': 2}}, ('meta',)) == record_key({'meta': {'a': 2, 'b': 1}}, ('meta',))
+
+
+def test_store_lookup_and_secondary_indexes():
+    """主索引与二级索引查找，重复身份的记录都保留"""
+    records = [
+        {'function_name': 'f1', 'orm_code': 'A', 'caller': 'c1', 'source_file': 'x.json'},
+        {'function_name': 'f2', 'orm_code': 'B', 'caller': 'c1', 'source_file': 'y.json'},
+        {'function_name': 'f1', 'orm_code': 'A', 'caller': 'c1', 'source_file': 'z.json'},
+    ]
+    store = RecordStore(records)
+    assert len(store) == 3 and store.unique_count == 2
+    assert {'function_name': 'f1', 'orm_code': 'A', 'caller': 'c1'} in store
+    assert {'function_name': 'f1', 'orm_code': 'A', 'caller': ''} not in store
+    assert store.get(records[0]) is records[2]
+    assert store.find_by_orm_code('A') == [records[0], records[2]]
+    assert store.find_by_caller('c1') == records
+    store.add({'function_name': 'f3', 'orm_code': 'C', 'caller': 'c2', 'source_file': 'x.json'})
+    assert [r['function_name'] for r in store.find_by_source_file('x.json')] == ['f1', 'f3']
+
+
+def test_partition_and_without_keep_order():
+    """按另一组记录的身份拆分，保持原顺序"""
+    records = [{'function_name': f'f{i}', 'orm_code': f'o{i}', 'caller': ''} for i in range(5)]
+    subset = [dict(records[3]), dict(records[1])]
+    store = RecordStore(records)
+    matched, rest = store.partition(subset)
+    assert matched == [records[1], records[3]]
+    assert rest == [records[0], records[2], records[4]]
+    assert store.without(RecordStore(subset)) == rest
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
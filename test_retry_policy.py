@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+统一重试策略测试脚本（退避抖动、重试预算、熔断器）
+"""
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from utils.retry_policy import CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy, is_endpoint_failure
+
+
+class _StatusError(Exception):
+    """带HTTP状态码的异常"""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def _no_sleep_policy(**kwargs) -> RetryPolicy:
+    """退避时间极短的策略，测试不实际等待"""
+    return RetryPolicy(base_delay=0.001, max_delay=0.001, **kwargs)
+
+
+def test_jitter_within_bounds():
+    """decorrelated jitter：延迟落在 [base, min(cap, previous*3)] 内，且各次不同"""
+    random.seed(1)
+    policy = RetryPolicy(base_delay=1.0, max_delay=10.0)
+    delays = []
+    previous = None
+    for _ in range(200):
+        delay = policy.next_delay(previous)
+        upper = min(10.0, max(1.0, (previous or 1.0) * 3))
+        assert 1.0 <= delay <= upper
+        delays.append(delay)
+        previous = delay
+    assert len(set(delays)) > 100
+    assert max(delays) <= 10.0
+
+
+def test_delay_for_attempt_grows_with_attempt():
+    """无状态退避的上限随尝试序号增长"""
+    random.seed(2)
+    policy = RetryPolicy(base_delay=1.0, max_delay=1000.0)
+    assert 1.0 <= policy.delay_for_attempt(0) <= 3.0
+    assert 1.0 <= policy.delay_for_attempt(3) <= 81.0
+    assert max(policy.delay_for_attempt(4) for _ in range(50)) > 27.0
+
+
+def test_budget_limits_retries():
+    """重试预算：令牌耗尽后拒绝重试，请求按比例补充令牌"""
+    budget = RetryBudget(ratio=0.5, min_tokens=2, max_tokens=3)
+    assert budget.try_acquire()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_acquire()
+    for _ in range(100):
+        budget.record_request()
+    assert budget.tokens == 3
+    stats = budget.get_stats()
+    assert stats['retries'] == 3 and stats['rejected_retries'] == 1 and stats['requests'] == 102
+
+
+def test_run_stops_when_budget_exhausted():
+    """预算耗尽时 run 不再重试，直接抛出最后一次的异常"""
+    policy = _no_sleep_policy(max_retries=10, budget=RetryBudget(ratio=0.0, min_tokens=2, max_tokens=2))
+    calls = []
+
+    async def always_fail():
+        calls.append(1)
+        raise ValueError("bad output")
+
+    try:
+        asyncio.run(policy.run(always_fail, on_retry=lambda *args: None))
+        assert False, "应当抛出异常"
+    except ValueError:
+        pass
+    # 首次尝试 + 预算允许的2次重试
+    assert len(calls) == 3
+
+
+def test_run_retries_until_success():
+    """可重试的失败在次数内恢复后返回结果，is_retryable 为False时立即抛出"""
+    policy = _no_sleep_policy(max_retries=5)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _StatusError(503)
+        return "ok"
+
+    assert asyncio.run(policy.run(flaky, on_retry=lambda *args: None)) == "ok"
+    assert len(attempts) == 3
+
+    async def fatal():
+        attempts.append(1)
+        raise KeyError("fatal")
+
+    attempts.clear()
+    try:
+        asyncio.run(policy.run(fatal, is_retryable=lambda e: not isinstance(e, KeyError)))
+        assert False, "应当抛出异常"
+    except KeyError:
+        pass
+    assert len(attempts) == 1
+
+
+def test_endpoint_failure_classification():
+    """只有连接错误、超时、429、5xx 计入熔断"""
+    assert is_endpoint_failure(asyncio.TimeoutError())
+    assert is_endpoint_failure(ConnectionError())
+    assert is_endpoint_failure(_StatusError(429))
+    assert is_endpoint_failure(_StatusError(502))
+    assert not is_endpoint_failure(_StatusError(400))
+    assert not is_endpoint_failure(ValueError("json"))
+
+
+def test_breaker_state_transitions():
+    """closed -> open -> half_open（只放行一个探测）-> closed / 再次 open"""
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open and not breaker.allow_request()
+    assert breaker.retry_after() > 0
+
+    time.sleep(0.06)
+    assert not breaker.is_open
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 探测进行中，其余请求被拒绝
+    assert not breaker.allow_request()
+    assert breaker.is_open
+
+    # 探测失败：立即重新打开
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.open_count == 2
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    # 探测未得出结论：允许下一个请求继续探测
+    breaker.cancel_probe()
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.consecutive_failures == 0
+    assert breaker.get_stats()['rejected'] == 2
+
+
+def test_content_errors_do_not_open_breaker():
+    """模型输出内容的问题不计入熔断"""
+    policy = _no_sleep_policy(max_retries=5, failure_threshold=2)
+
+    async def bad_content():
+        raise ValueError("json")
+
+    try:
+        asyncio.run(policy.run(bad_content, endpoint="test_content", on_retry=lambda *args: None))
+    except ValueError:
+        pass
+    assert policy.get_breaker("test_content").state == CircuitBreaker.CLOSED
+
+
+def test_run_waits_for_open_circuit():
+    """熔断打开时 run 等待探测恢复，不占用重试次数；等待超过上限时抛出 CircuitOpenError"""
+    policy = _no_sleep_policy(max_retries=0, failure_threshold=1, recovery_timeout=0.1, max_circuit_wait=5.0)
+    policy.get_breaker("test_wait").record_failure()
+
+    async def succeed():
+        return "recovered"
+
+    assert asyncio.run(policy.run(succeed, endpoint="test_wait")) == "recovered"
+    assert policy.get_breaker("test_wait").state == CircuitBreaker.CLOSED
+
+    impatient = _no_sleep_policy(max_retries=0, failure_threshold=1, recovery_timeout=60.0, max_circuit_wait=0.1)
+    impatient.get_breaker("test_wait").record_failure()
+    try:
+        asyncio.run(impatient.run(succeed, endpoint="test_wait"))
+        assert False, "应当抛出 CircuitOpenError"
+    except CircuitOpenError:
+        pass
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+工作流步骤DAG调度器测试脚本（并发分支、失败取消、环与缺失输入检测）
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from data_processing.workflow.step_dag import StepDAG
+
+
+def _diamond(b_func, c_func) -> StepDAG:
+    """a → (b, c) → d 的菱形图"""
+    dag = StepDAG("test")
+
+    async def a(inputs):
+        return {'x': inputs['seed'] + 1}
+
+    async def d(inputs):
+        return {'total': inputs['y'] + inputs['z']}
+
+    dag.add_step('a', a, inputs=['seed'], outputs=['x'])
+    dag.add_step('b', b_func, inputs=['x'], outputs=['y'])
+    dag.add_step('c', c_func, inputs=['x'], outputs=['z'])
+    dag.add_step('d', d, inputs=['y', 'z'], outputs=['total'])
+    return dag
+
+
+def test_independent_branches_run_concurrently():
+    """相互独立的分支同时运行：b 与 c 互相等待对方开始，串行执行会超时"""
+    async def scenario():
+        b_started, c_started = asyncio.Event(), asyncio.Event()
+
+        async def b(inputs):
+            b_started.set()
+            await asyncio.wait_for(c_started.wait(), timeout=1)
+            return {'y': inputs['x'] * 10}
+
+        async def c(inputs):
+            c_started.set()
+            await asyncio.wait_for(b_started.wait(), timeout=1)
+            return {'z': inputs['x'] * 100}
+
+        dag = _diamond(b, c)
+        values = await dag.run({'seed': 1})
+        return dag, values
+
+    dag, values = asyncio.run(scenario())
+    assert values == {'seed': 1, 'x': 2, 'y': 20, 'z': 200, 'total': 220}
+    assert all(step.status == 'completed' for step in dag.steps.values())
+
+    graph = dag.get_graph()
+    nodes = {node['name']: node for node in graph['nodes']}
+    assert nodes['d']['depends_on'] == ['b', 'c']
+    assert {'from': 'a', 'to': 'b'} in graph['edges'] and {'from': 'c', 'to': 'd'} in graph['edges']
+    # 两个分支的运行区间重叠，d 在两者都结束后才开始
+    assert nodes['b']['start_offset'] <= nodes['c']['end_offset']
+    assert nodes['c']['start_offset'] <= nodes['b']['end_offset']
+    assert nodes['d']['start_offset'] >= max(nodes['b']['end_offset'], nodes['c']['end_offset'])
+
+
+def test_failed_step_cancels_running_siblings():
+    """一个步骤失败时取消仍在运行的兄弟步骤并重新抛出异常，下游步骤不会启动"""
+    state = {'c_cancelled': False}
+
+    async def b(inputs):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("b failed")
+
+    async def c(inputs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state['c_cancelled'] = True
+            raise
+        return {'z': 0}
+
+    dag = _diamond(b, c)
+    try:
+        asyncio.run(dag.run({'seed': 1}))
+        assert False, "应当抛出 RuntimeError"
+    except RuntimeError as e:
+        assert str(e) == "b failed"
+    assert state['c_cancelled']
+    assert dag.steps['b'].status == 'failed' and dag.steps['b'].error == "b failed"
+    assert dag.steps['c'].status == 'cancelled'
+    assert dag.steps['d'].status == 'pending' and dag.steps['d'].start_time is None
+    assert dag.get_graph()['wall_seconds'] is not None
+
+
+def test_cycle_detected_before_running():
+    """图中有环时在运行任何步骤之前抛出 ValueError"""
+    started = []
+
+    def make(name, output):
+        async def func(inputs):
+            started.append(name)
+            return {output: 1}
+        return func
+
+    dag = StepDAG()
+    dag.add_step('a', make('a', 'x'), inputs=['seed'], outputs=['x'])
+    dag.add_step('b', make('b', 'y'), inputs=['x', 'z'], outputs=['y'])
+    dag.add_step('c', make('c', 'z'), inputs=['y'], outputs=['z'])
+    try:
+        asyncio.run(dag.run({'seed': 0}))
+        assert False, "应当抛出 ValueError"
+    except ValueError as e:
+        assert "环" in str(e)
+    assert started == []
+
+
+def test_missing_input_detected_before_running():
+    """步骤输入既不是初始输入也没有步骤产出时抛出 ValueError"""
+    started = []
+
+    async def a(inputs):
+        started.append('a')
+        return {'x': 1}
+
+    dag = StepDAG()
+    dag.add_step('a', a, inputs=['seed', 'unknown'], outputs=['x'])
+    try:
+        asyncio.run(dag.run({'seed': 0}))
+        assert False, "应当抛出 ValueError"
+    except ValueError as e:
+        assert "unknown" in str(e)
+    assert started == []
+
+
+def test_duplicate_step_or_output_rejected():
+    """重复的步骤名称或重复产出同一输出时 add_step 抛出 ValueError"""
+    async def noop(inputs):
+        return {}
+
+    dag = StepDAG()
+    dag.add_step('a', noop, outputs=['x'])
+    for name, outputs in (('a', ['y']), ('b', ['x'])):
+        try:
+            dag.add_step(name, noop, outputs=outputs)
+            assert False, f"{name} 应当抛出 ValueError"
+        except ValueError:
+            pass
+
+
+def test_missing_declared_output_fails_step():
+    """步骤返回值缺少声明的输出时步骤失败，抛出 ValueError"""
+    async def b(inputs):
+        return {}
+
+    async def c(inputs):
+        return {'z': 0}
+
+    dag = _diamond(b, c)
+    try:
+        asyncio.run(dag.run({'seed': 1}))
+        assert False, "应当抛出 ValueError"
+    except ValueError as e:
+        assert "未产出声明的输出" in str(e) and "'y'" in str(e)
+    assert dag.steps['b'].status == 'failed'
+    assert dag.steps['d'].status == 'pending'
+
+
+def test_on_running_change_counts():
+    """运行中的步骤数变化时回调：a 单独运行，b、c 并发，b 先结束后只剩 c，d 单独运行（数量不变不回调）"""
+    async def b(inputs):
+        return {'y': 1}
+
+    async def c(inputs):
+        await asyncio.sleep(0.02)
+        return {'z': 2}
+
+    counts = []
+    values = asyncio.run(_diamond(b, c).run({'seed': 0}, on_running_change=counts.append))
+    assert values['total'] == 3
+    assert counts == [1, 2, 1]
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
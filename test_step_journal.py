@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+步骤检查点日志测试脚本（断点恢复、指纹校验、增量重跑）
+"""
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from utils.step_journal import (
+    StepJournal, _previous_journal_path, has_reusable_results, journal_path, record_content_id,
+    result_index_path, step_fingerprint, write_json_array
+)
+
+
+def _records(count: int):
+    return [{'function_name': f'f{i}', 'orm_code': f'db.Find(&u{i})', 'caller': '', 'source_file': 'a.json'}
+            for i in range(count)]
+
+
+def test_resume_after_crash():
+    """崩溃后重跑：已完成记录直接复用，截断的半行被忽略并截掉，结果按原顺序合并"""
+    with tempfile.TemporaryDirectory() as tmp:
+        records = _records(5)
+        fingerprint = step_fingerprint(prompt="p", server="v3")
+        path = journal_path(tmp, "step")
+
+        journal = StepJournal(path, fingerprint=fingerprint)
+        assert journal.pending(records) == records
+        journal.append(records[0], "r0")
+        journal.append(records[2], "r2")
+        journal.close()
+        valid_size = path.stat().st_size
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"id": "half')
+
+        resumed = StepJournal(path, fingerprint=fingerprint)
+        assert resumed.resumed_count == 2
+        assert path.stat().st_size == valid_size
+        pending = resumed.pending(records)
+        assert pending == [records[1], records[3], records[4]]
+        assert resumed.lookup(records[2]) == "r2"
+        assert resumed.lookup(records[1]) is None
+        merged = resumed.merge(records, ["r1", "r3", "r4"])
+        assert merged == ["r0", "r1", "r2", "r3", "r4"]
+        resumed.close()
+
+
+def test_fingerprint_mismatch_discards_results():
+    """步骤配置变化（或日志没有指纹头）时不复用旧结果，旧日志被删除"""
+    with tempfile.TemporaryDirectory() as tmp:
+        records = _records(3)
+        path = journal_path(tmp, "step")
+        journal = StepJournal(path, fingerprint=step_fingerprint(prompt="old"))
+        for i, record in enumerate(records):
+            journal.append(record, f"r{i}")
+        journal.close()
+
+        changed = StepJournal(path, fingerprint=step_fingerprint(prompt="new"))
+        assert changed.resumed_count == 0
+        assert changed.pending(records) == records
+        assert not path.exists()
+
+        # 没有指纹头的日志无法确认配置
+        path.write_text(json.dumps({'id': record_content_id(records[0]), 'result': 'r0'}) + '\n', encoding='utf-8')
+        headerless = StepJournal(path, fingerprint=step_fingerprint(prompt="new"))
+        assert headerless.resumed_count == 0
+
+
+def test_previous_workflow_results_copied_forward():
+    """增量重跑：上次日志中输入未变化的记录复制进本次日志，变化的记录重新计算"""
+    with tempfile.TemporaryDirectory() as tmp:
+        records = _records(3)
+        fingerprint = step_fingerprint(prompt="p")
+        previous_path = journal_path(Path(tmp) / "previous", "step")
+        previous = StepJournal(previous_path, fingerprint=fingerprint)
+        for i, record in enumerate(records):
+            previous.append(record, f"old{i}")
+        previous.close()
+
+        changed_records = [records[0], dict(records[1], orm_code='db.First(&u1)'), records[2]]
+        current_path = journal_path(Path(tmp) / "current", "step")
+        journal = StepJournal(current_path, fingerprint=fingerprint, previous_journal_file=previous_path)
+        assert journal.pending(changed_records) == [changed_records[1]]
+        assert journal.copied_forward == 2
+        journal.append(changed_records[1], "new1")
+        assert journal.merge(changed_records, ["new1"]) == ["old0", "new1", "old2"]
+        journal.close()
+
+        # 复制过来的结果已写入本次日志，本目录重跑时直接恢复
+        rerun = StepJournal(current_path, fingerprint=fingerprint)
+        assert rerun.resumed_count == 3
+
+
+def test_previous_journal_with_other_fingerprint_ignored():
+    """上次工作流的步骤配置不同时，不复制其结果"""
+    with tempfile.TemporaryDirectory() as tmp:
+        records = _records(2)
+        previous_path = journal_path(Path(tmp) / "previous", "step")
+        previous = StepJournal(previous_path, fingerprint=step_fingerprint(prompt="old"))
+        previous.append(records[0], "old0")
+        previous.close()
+
+        journal = StepJournal(journal_path(Path(tmp) / "current", "step"), fingerprint=step_fingerprint(prompt="new"),
+                              previous_journal_file=previous_path)
+        assert journal.lookup(records[0]) is None
+        assert journal.pending(records) == records
+
+
+def test_finalize_deletes_journal_unless_kept():
+    """finalize 默认删除日志，keep_journal 为True时保留"""
+    with tempfile.TemporaryDirectory() as tmp:
+        record = _records(1)[0]
+        removed = StepJournal(journal_path(tmp, "removed"))
+        removed.append(record, "r")
+        removed.finalize()
+        assert not removed.journal_file.exists()
+
+        kept = StepJournal(journal_path(tmp, "kept"), keep_journal=True)
+        kept.append(record, "r")
+        kept.finalize()
+        assert kept.journal_file.exists()
+
+
+def test_result_index_survives_finalize_for_incremental_rerun():
+    """默认删除日志后，结果索引仍然保留，下一次增量重跑从结果索引复制未变化记录的结果"""
+    with tempfile.TemporaryDirectory() as tmp:
+        records = _records(3)
+        fingerprint = step_fingerprint(prompt="p")
+        previous_dir = Path(tmp) / "previous"
+        previous = StepJournal(journal_path(previous_dir, "step"), fingerprint=fingerprint)
+        previous.pending(records)
+        for i, record in enumerate(records):
+            previous.append(record, f"old{i}")
+        # 重复追加的记录在结果索引中只保留一条
+        previous.append(records[0], "old0")
+        previous.finalize()
+        assert not previous.journal_file.exists()
+        assert result_index_path(previous_dir, "step").exists()
+        assert has_reusable_results(previous_dir)
+        assert _previous_journal_path(previous_dir, "step") == result_index_path(previous_dir, "step")
+
+        current_dir = Path(tmp) / "current"
+        journal = StepJournal(journal_path(current_dir, "step"), fingerprint=fingerprint,
+                              previous_journal_file=_previous_journal_path(previous_dir, "step"))
+        changed_records = [records[0], records[1], dict(records[2], orm_code='db.First(&u2)')]
+        assert journal.pending(changed_records) == [changed_records[2]]
+        assert journal.copied_forward == 2
+        journal.append(changed_records[2], "new2")
+        journal.finalize()
+
+        # 本次的结果索引包含复制过来的和新计算的结果
+        again = StepJournal(journal_path(Path(tmp) / "third", "step"), fingerprint=fingerprint,
+                            previous_journal_file=result_index_path(current_dir, "step"))
+        assert again.pending(changed_records) == []
+        assert again.merge(changed_records, []) == ["old0", "old1", "new2"]
+
+
+def test_rerun_in_same_directory_uses_result_index():
+    """同一目录重跑已完成的步骤（日志已删除）时从结果索引复用结果；指纹变化时不复用"""
+    with tempfile.TemporaryDirectory() as tmp:
+        records = _records(2)
+        fingerprint = step_fingerprint(prompt="p")
+        path = journal_path(tmp, "step")
+        journal = StepJournal(path, fingerprint=fingerprint)
+        for i, record in enumerate(records):
+            journal.append(record, f"r{i}")
+        journal.finalize()
+
+        rerun = StepJournal(path, fingerprint=fingerprint)
+        assert rerun.pending(records) == []
+        assert rerun.merge(records, []) == ["r0", "r1"]
+        rerun.finalize()
+        assert result_index_path(tmp, "step").exists()
+
+        changed = StepJournal(path, fingerprint=step_fingerprint(prompt="new"))
+        assert changed.pending(records) == records
+
+
+def test_no_reusable_results():
+    """没有结果索引和日志的目录不能作为增量重跑的基准"""
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "step" / "output.json").parent.mkdir()
+        (Path(tmp) / "step" / "output.json").write_text("[]", encoding='utf-8')
+        assert not has_reusable_results(tmp)
+
+
+def test_record_id_ignores_position_and_unrelated_fields():
+    """记录ID只取决于输入内容和身份字段"""
+    record = _records(1)[0]
+    assert record_content_id(record) == record_content_id(dict(record, llm_keyword_analysis={'x': 1}))
+    assert record_content_id(record) != record_content_id(dict(record, caller='other'))
+
+
+def test_custom_id_fields():
+    """输入不是数据集记录的步骤（如修复审核请求）按自己的输入字段计算ID，默认字段相同的请求不会冲突"""
+    with tempfile.TemporaryDirectory() as tmp:
+        id_fields = ('action', 'orm_code', 'caller', 'target_sql')
+        requests = [{'action': action, 'orm_code': 'o', 'caller': 'c', 'target_sql': 'SELECT 1'}
+                    for action in ('remove', 'add')]
+        assert record_content_id(requests[0]) == record_content_id(requests[1])
+        assert record_content_id(requests[0], id_fields) != record_content_id(requests[1], id_fields)
+
+        path = journal_path(tmp, "step.fix_review")
+        journal = StepJournal(path, id_fields=id_fields)
+        journal.append(requests[0], {'accepted': False})
+        journal.close()
+        resumed = StepJournal(path, id_fields=id_fields)
+        assert resumed.pending(requests) == [requests[1]]
+        assert resumed.merge(requests, [{'accepted': True}]) == [{'accepted': False}, {'accepted': True}]
+
+
+def test_write_json_array_matches_json_dump():
+    """逐条写出的JSON数组与 json.dump(indent=2) 一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for records in ([], _records(3)):
+            output = Path(tmp) / "out.json"
+            assert write_json_array(output, records) == len(records)
+            assert output.read_text(encoding='utf-8') == json.dumps(records, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+工作流输出清单测试脚本（登记、按类型优先级查找最新文件、损坏清单、按清单加载数据）
+"""
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from data_processing.workflow.workflow_manifest import MANIFEST_FILE, WorkflowManifest, file_sha256
+
+
+def _records(tag: str, count: int = 2):
+    return [{'function_name': f'{tag}{i}', 'orm_code': f'db.Find(&{tag}{i})', 'caller': ''} for i in range(count)]
+
+
+def _write(path: Path, content) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content if isinstance(content, str) else json.dumps(content), encoding='utf-8')
+    return path
+
+
+def test_register_and_reload():
+    """登记写入相对路径、格式、大小、sha256；重新打开清单后条目保留，序号继续递增；同一路径重复登记覆盖旧条目"""
+    with tempfile.TemporaryDirectory() as tmp:
+        workflow_dir = Path(tmp)
+        data_file = _write(workflow_dir / "step" / "out.json", _records('a'))
+        report_file = _write(workflow_dir / "step" / "stats.jsonl.zst", "x")
+
+        manifest = WorkflowManifest(workflow_dir)
+        entry = manifest.register(data_file, 'step1', 'records', 2, 'cleaning')
+        assert entry['path'] == str(Path("step") / "out.json")
+        assert entry['format'] == 'json' and entry['records'] == 2 and entry['step_type'] == 'cleaning'
+        assert entry['bytes'] == data_file.stat().st_size and entry['sha256'] == file_sha256(data_file)
+        assert entry['sequence'] == 1
+        assert manifest.register(report_file, 'step1', 'report')['format'] == 'jsonl.zst'
+        assert manifest.resolve(entry) == workflow_dir / "step" / "out.json"
+
+        reopened = WorkflowManifest(workflow_dir)
+        assert [e['path'] for e in reopened.entries()] == [entry['path'], str(Path("step") / "stats.jsonl.zst")]
+        assert reopened.entries(kind='report')[0]['step_name'] == 'step1'
+        again = reopened.register(data_file, 'step2', 'records', 2)
+        assert again['sequence'] == 3
+        assert [e['step_name'] for e in reopened.entries(kind='records')] == ['step2']
+        assert json.loads((workflow_dir / MANIFEST_FILE).read_text(encoding='utf-8'))['outputs'][-1]['step_name'] == 'step2'
+
+
+def test_latest_prefers_kind_then_newest():
+    """latest 先按类型优先级（records 优先于 keyword_records），同一类型取最新登记的条目"""
+    with tempfile.TemporaryDirectory() as tmp:
+        workflow_dir = Path(tmp)
+        manifest = WorkflowManifest(workflow_dir)
+        manifest.register(_write(workflow_dir / "a.json", _records('a')), 'a', 'records')
+        manifest.register(_write(workflow_dir / "b.json", _records('b')), 'b', 'records')
+        manifest.register(_write(workflow_dir / "k.json", _records('k')), 'k', 'keyword_records')
+        manifest.register(_write(workflow_dir / "r.json", {}), 'r', 'report')
+
+        assert manifest.latest()['step_name'] == 'b'
+        assert manifest.latest(kinds=('keyword_records', 'records'))['step_name'] == 'k'
+        assert manifest.latest(kinds=('generated_records',)) is None
+
+
+def test_latest_skips_missing_or_resized_files():
+    """登记后被删除或大小变化的文件被跳过；大小不变的修改只有 verify_sha 时才能发现"""
+    with tempfile.TemporaryDirectory() as tmp:
+        workflow_dir = Path(tmp)
+        manifest = WorkflowManifest(workflow_dir)
+        older = _write(workflow_dir / "older.json", _records('o'))
+        newer = _write(workflow_dir / "newer.json", _records('n'))
+        keyword = _write(workflow_dir / "keyword.json", _records('k'))
+        manifest.register(older, 'older', 'records')
+        manifest.register(newer, 'newer', 'records')
+        manifest.register(keyword, 'keyword', 'keyword_records')
+
+        # 同样大小的内容修改
+        newer.write_text(json.dumps(_records('m')), encoding='utf-8')
+        assert manifest.latest()['step_name'] == 'newer'
+        assert manifest.latest(verify_sha=True)['step_name'] == 'older'
+
+        newer.write_text(json.dumps(_records('n', 3)), encoding='utf-8')
+        assert manifest.latest()['step_name'] == 'older'
+
+        older.unlink()
+        assert manifest.latest()['step_name'] == 'keyword'
+        keyword.unlink()
+        assert manifest.latest() is None
+
+
+def test_corrupt_manifest_is_rebuilt():
+    """清单文件损坏（非JSON、条目缺少字段）时视为空清单，后续登记重新写出有效清单"""
+    with tempfile.TemporaryDirectory() as tmp:
+        workflow_dir = Path(tmp)
+        for content in ('{"outputs": [', json.dumps({'outputs': [{'kind': 'records'}]})):
+            _write(workflow_dir / MANIFEST_FILE, content)
+            manifest = WorkflowManifest(workflow_dir)
+            assert manifest.outputs == {} and manifest.latest() is None
+
+            entry = manifest.register(_write(workflow_dir / "out.json", _records('a')), 'step', 'records')
+            assert entry['sequence'] == 1
+            assert WorkflowManifest(workflow_dir).latest()['path'] == 'out.json'
+
+
+def test_load_latest_data_prefers_manifest():
+    """恢复工作流时按清单打开最新登记的数据文件，而不是按文件名模式找到的文件；清单文件失效时回退到文件名查找"""
+    from data_processing.workflow.workflow_manager import WorkflowManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workflow_dir = Path(tmp) / "workflow_test"
+        legacy = _write(workflow_dir / "remove_no_sql_records" / "remove_no_sql_records_step.json", _records('legacy', 5))
+        registered = _write(workflow_dir / "validation_pipeline" / "pipeline.json", _records('manifest'))
+
+        manager = WorkflowManager(workflow_dir=str(workflow_dir))
+        manager.manifest.register(registered, 'pipeline', 'records', 2, 'validation_pipeline')
+        assert manager._load_latest_data()
+        assert [r['function_name'] for r in manager.current_data] == ['manifest0', 'manifest1']
+
+        # 清单中的文件被改动（大小变化）后不再使用，按文件名模式加载
+        registered.write_text(json.dumps(_records('manifest', 3)), encoding='utf-8')
+        resumed = WorkflowManager(workflow_dir=str(workflow_dir))
+        assert resumed._load_latest_data()
+        assert len(resumed.current_data) == 5 and resumed.current_data[0]['function_name'] == 'legacy0'
+        assert legacy.exists()
+
+
+if __name__ == "__main__":
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+    print(f"\n{'🎉 全部通过' if not failed else f'⚠️ {failed} 个测试失败'} ({len(tests) - failed}/{len(tests)})")
+    sys.exit(1 if failed else 0)
@@ -1,4 +1,4 @@
 """工具模块"""
-from .llm_client import LLMClient
+from .llm_client import LLMClient, get_shared_session, close_shared_sessions
 
-__all__ = ["LLMClient"] 
\ No newline at end of file
+__all__ = ["LLMClient", "get_shared_session", "close_shared_sessions"] 
\ No newline at end of file
@@ -0,0 +1,339 @@
+"""自适应并发控制器 - AIMD（加性增、乘性减）
+
+替代固定大小的 asyncio.Semaphore：
+- 请求成功且 p95 延迟、错误率都健康时，窗口每轮加性增长（约每个窗口的请求数 +1）
+- 遇到超时、429、5xx 时窗口乘性收缩（同一冷却期内只收缩一次，避免并发失败把窗口打到底）
+
+用法与信号量一致（``async with limiter:``）。进入上下文后，LLMClient 会把该任务内
+每次HTTP请求的延迟和结果回报给当前控制器。批量请求（request_slots）的延迟按槽位数折算，
+避免一条批量请求的长延迟拉高p95、阻止窗口增长。
+
+指定端点（LLM服务器名）创建的控制器按端点共享：同一端点的各步骤复用同一个控制器，
+后续步骤直接沿用前面步骤已学到的并发窗口，同时运行的步骤合计不超过该端点的窗口。
+同一任务内重复进入同一个控制器时不再占用新槽位。
+
+设置全局LLM并发预算（set_global_llm_budget）后，所有控制器在自身窗口之外还要共享这一预算，
+并行运行的多个步骤合计的在途请求数不超过预算。
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 当前任务所属的并发控制器，LLMClient 据此回报请求结果
+_current_limiter: contextvars.ContextVar[Optional["AdaptiveConcurrencyLimiter"]] = contextvars.ContextVar(
+    "current_concurrency_limiter", default=None
+)
+
+# 按LLM端点共享的控制器: endpoint -> limiter，跨步骤复用
+_endpoint_limiters: Dict[str, "AdaptiveConcurrencyLimiter"] = {}
+
+# 当前请求包含的记录槽位数（批量请求大于1），延迟样本按槽位折算
+_request_slots: contextvars.ContextVar[int] = contextvars.ContextVar("request_slots", default=1)
+
+# 本进程创建过的控制器: name -> limiter，用于导出到工作流摘要
+_limiter_registry: Dict[str, "AdaptiveConcurrencyLimiter"] = {}
+
+
+# 跨步骤共享的全局LLM并发预算，为None时不限制
+_global_budget: Optional[asyncio.Semaphore] = None
+_global_budget_limit = 0
+
+
+def get_current_limiter() -> Optional["AdaptiveConcurrencyLimiter"]:
+    """获取当前任务上下文中的并发控制器"""
+    return _current_limiter.get()
+
+
+def get_request_slots() -> int:
+    """获取当前请求包含的记录槽位数"""
+    return _request_slots.get()
+
+
+@contextmanager
+def request_slots(count: int):
+    """标记上下文内的LLM请求为包含 count 条记录的批量请求"""
+    token = _request_slots.set(max(1, count))
+    try:
+        yield
+    finally:
+        _request_slots.reset(token)
+
+
+def set_global_llm_budget(limit: Optional[int]) -> None:
+    """设置全局LLM并发预算（所有并发控制器共享），limit 为空或不大于0时取消限制"""
+    global _global_budget, _global_budget_limit
+    if limit and limit > 0:
+        _global_budget = asyncio.Semaphore(limit)
+        _global_budget_limit = limit
+    else:
+        _global_budget = None
+        _global_budget_limit = 0
+
+
+def get_global_llm_budget() -> int:
+    """当前的全局LLM并发预算，0表示不限制"""
+    return _global_budget_limit
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD自适应并发控制器"""
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int = 1, max_limit: int = 64,
+                 latency_target_p95: float = 30.0, error_rate_threshold: float = 0.05,
+                 backoff_ratio: float = 0.5, sample_size: int = 200, adaptive: bool = True):
+        """初始化控制器
+
+        Args:
+            name: 控制器名称（通常为步骤类型）
+            initial_limit: 初始并发窗口
+            min_limit: 窗口下限
+            max_limit: 窗口上限
+            latency_target_p95: p95延迟目标（秒），超过后停止增长
+            error_rate_threshold: 最近样本错误率阈值，超过后停止增长
+            backoff_ratio: 过载时窗口的收缩系数
+            sample_size: 保留的最近样本数
+            adaptive: 为False时窗口固定为 initial_limit，等价于信号量
+        """
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.window = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.latency_target_p95 = latency_target_p95
+        self.error_rate_threshold = error_rate_threshold
+        self.backoff_ratio = backoff_ratio
+        self.adaptive = adaptive
+
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._latencies: deque = deque(maxlen=sample_size)
+        self._outcomes: deque = deque(maxlen=sample_size)  # True=成功, False=失败
+        self._last_decrease = 0.0
+        self._history: deque = deque(maxlen=500)
+        # 任务 -> 进入记录栈（进入前的控制器, 占用的全局预算, 是否占用了槽位），支持同一任务嵌套进入
+        self._previous: Dict[Any, List[Tuple[Optional["AdaptiveConcurrencyLimiter"], Optional[asyncio.Semaphore], bool]]] = {}
+        self.step_types: List[str] = [name]
+
+        self.total_requests = 0
+        self.total_errors = 0
+        self.total_overloads = 0
+        self.peak_window = self.window
+        self.peak_in_flight = 0
+
+        self._record_history("init")
+        _limiter_registry[name] = self
+
+    @property
+    def limit(self) -> int:
+        """当前允许的在途数"""
+        return max(self.min_limit, int(self.window))
+
+    async def acquire(self) -> None:
+        """获取一个并发槽位"""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # 已经分配到槽位但被取消，归还
+                    self.release()
+                else:
+                    try:
+                        self._waiters.remove(future)
+                    except ValueError:
+                        pass
+                raise
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self) -> None:
+        """释放一个并发槽位，并唤醒等待者"""
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    async def __aenter__(self):
+        previous = _current_limiter.get()
+        # 同一任务已持有本控制器的槽位（共享端点控制器的嵌套使用），不重复占用，避免自身死锁
+        acquired = not self._previous.get(asyncio.current_task())
+        if acquired:
+            await self.acquire()
+        # 已在外层控制器内的任务已占用全局预算，不重复占用
+        budget = _global_budget if previous is None else None
+        if budget is not None:
+            try:
+                await budget.acquire()
+            except asyncio.CancelledError:
+                self.release()
+                raise
+        # 每个任务有独立的上下文，按任务记录进入前的控制器以便退出时还原
+        self._previous.setdefault(asyncio.current_task(), []).append((previous, budget, acquired))
+        _current_limiter.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        task = asyncio.current_task()
+        entries = self._previous.get(task)
+        previous, budget, acquired = entries.pop() if entries else (None, None, True)
+        if not entries:
+            self._previous.pop(task, None)
+        _current_limiter.set(previous)
+        if budget is not None:
+            budget.release()
+        if acquired:
+            self.release()
+        return False
+
+    def record_success(self, latency: float) -> None:
+        """记录一次成功请求"""
+        self.total_requests += 1
+        self._latencies.append(latency)
+        self._outcomes.append(True)
+        if not self.adaptive:
+            return
+        if self._is_healthy() and self.window < self.max_limit:
+            # 加性增长：每个窗口的成功请求合计让窗口 +1
+            old_limit = self.limit
+            self.window = min(float(self.max_limit), self.window + 1.0 / self.window)
+            self.peak_window = max(self.peak_window, self.window)
+            if self.limit > old_limit:
+                self._record_history("increase")
+                self._wake_waiters()
+
+    def record_failure(self, overload: bool, reason: str = "") -> None:
+        """记录一次失败请求
+
+        Args:
+            overload: 是否为过载信号（超时、429、5xx），过载时窗口乘性收缩
+            reason: 失败原因，记录在窗口变化历史中
+        """
+        self.total_requests += 1
+        self.total_errors += 1
+        self._outcomes.append(False)
+        if not overload:
+            return
+        self.total_overloads += 1
+        if not self.adaptive:
+            return
+        now = time.monotonic()
+        # 冷却期取最近p50延迟，保证同一批并发失败只触发一次收缩
+        cooldown = max(1.0, self._percentile(0.5))
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        new_window = max(float(self.min_limit), self.window * self.backoff_ratio)
+        if new_window < self.window:
+            self.window = new_window
+            self._record_history(f"decrease:{reason}" if reason else "decrease")
+            logger.warning(f"⚠️ 并发控制器 {self.name} 检测到过载({reason})，并发窗口收缩为 {self.limit}")
+
+    def _is_healthy(self) -> bool:
+        if len(self._latencies) >= 10 and self._percentile(0.95) > self.latency_target_p95:
+            return False
+        return self._error_rate() <= self.error_rate_threshold
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def _percentile(self, q: float) -> float:
+        if not self._latencies:
+            return 0.0
+        samples = sorted(self._latencies)
+        index = min(len(samples) - 1, int(q * len(samples)))
+        return samples[index]
+
+    def _record_history(self, reason: str) -> None:
+        self._history.append({
+            'time': time.time(),
+            'window': self.limit,
+            'in_flight': self.in_flight,
+            'reason': reason
+        })
+
+    def get_stats(self) -> Dict[str, Any]:
+        """导出当前窗口、延迟样本和窗口变化历史"""
+        return {
+            'name': self.name,
+            'step_types': list(self.step_types),
+            'adaptive': self.adaptive,
+            'window': self.limit,
+            'min_limit': self.min_limit,
+            'max_limit': self.max_limit,
+            'peak_window': int(self.peak_window),
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'total_requests': self.total_requests,
+            'total_errors': self.total_errors,
+            'total_overloads': self.total_overloads,
+            'error_rate': round(self._error_rate(), 4),
+            'latency_p50': round(self._percentile(0.5), 3),
+            'latency_p95': round(self._percentile(0.95), 3),
+            'latency_samples': [round(x, 3) for x in self._latencies],
+            'window_history': list(self._history)
+        }
+
+
+def create_concurrency_limiter(step_type: str, initial_limit: Optional[int] = None,
+                               endpoint: Optional[str] = None) -> AdaptiveConcurrencyLimiter:
+    """按工作流配置创建指定步骤的并发控制器
+
+    Args:
+        step_type: 步骤类型（与 get_concurrency 的参数一致）
+        initial_limit: 初始窗口，为None时使用 get_concurrency(step_type)
+        endpoint: LLM端点（服务器名），指定时返回该端点共享的控制器，
+            已存在时沿用其当前窗口，initial_limit 只用于放宽窗口上限
+
+    Returns:
+        并发控制器
+    """
+    from config.data_processing.workflow.workflow_config import get_workflow_config
+    workflow_config = get_workflow_config()
+    if initial_limit is None:
+        initial_limit = workflow_config.get_concurrency(step_type)
+    adaptive_config = workflow_config.get_adaptive_concurrency_config()
+    max_limit = max(initial_limit, adaptive_config['max_limit'])
+
+    if endpoint is not None and endpoint in _endpoint_limiters:
+        limiter = _endpoint_limiters[endpoint]
+        limiter.max_limit = max(limiter.max_limit, max_limit)
+        if step_type not in limiter.step_types:
+            limiter.step_types.append(step_type)
+        logger.debug(f"步骤 {step_type} 复用端点 {endpoint} 的并发控制器，当前窗口 {limiter.limit}")
+        return limiter
+
+    limiter = AdaptiveConcurrencyLimiter(
+        name=endpoint or step_type,
+        initial_limit=initial_limit,
+        min_limit=adaptive_config['min_limit'],
+        max_limit=max_limit,
+        latency_target_p95=adaptive_config['latency_target_p95'],
+        error_rate_threshold=adaptive_config['error_rate_threshold'],
+        backoff_ratio=adaptive_config['backoff_ratio'],
+        sample_size=adaptive_config['sample_size'],
+        adaptive=adaptive_config['enabled']
+    )
+    if endpoint is not None:
+        limiter.step_types = [step_type]
+        _endpoint_limiters[endpoint] = limiter
+    return limiter
+
+
+def get_all_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """获取本进程所有并发控制器的统计信息"""
+    return {name: limiter.get_stats() for name, limiter in _limiter_registry.items()}
@@ -0,0 +1,204 @@
+"""多副本负载均衡 - 最少在途请求路由 + 被动/主动健康检查
+
+同一个服务器名（如 v3）可以在 servers.yaml 中配置多个 endpoints。
+- 路由：每次请求选择在途请求数最少的健康副本
+- 被动健康检查：请求连续失败达到阈值后临时摘除副本，反复摘除时摘除时长按倍数增长
+- 主动健康检查：后台定期探测各副本（GET health_check_path），探测成功的摘除副本提前恢复
+- 全部副本都被摘除时不拒绝请求，选择最早恢复的副本继续尝试
+"""
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, Any, List, Set
+
+import aiohttp
+
+from config.llm.llm_config import get_llm_config, ServerConfig, EndpointConfig
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointState:
+    """单个副本的运行状态"""
+
+    def __init__(self, endpoint: EndpointConfig):
+        self.endpoint = endpoint
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejection_count = 0
+        self.ejected_until = 0.0
+        self.total_requests = 0
+        self.total_failures = 0
+
+    @property
+    def url(self) -> str:
+        return self.endpoint.full_url
+
+    @property
+    def chat_completions_url(self) -> str:
+        return self.endpoint.chat_completions_url
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'outstanding': self.outstanding,
+            'ejected': not self.is_available(time.monotonic()),
+            'ejection_count': self.ejection_count,
+            'total_requests': self.total_requests,
+            'total_failures': self.total_failures
+        }
+
+
+class EndpointBalancer:
+    """单个服务器的多副本负载均衡器"""
+
+    def __init__(self, server_name: str, config: ServerConfig):
+        self.server_name = server_name
+        self.config = config
+        self.endpoints: List[EndpointState] = [EndpointState(ep) for ep in config.all_endpoints]
+        self._health_task: Optional[asyncio.Task] = None
+        self._health_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def is_multi_endpoint(self) -> bool:
+        return len(self.endpoints) > 1
+
+    def acquire(self, exclude: Optional[Set[str]] = None) -> EndpointState:
+        """选择一个副本并计入在途请求
+
+        Args:
+            exclude: 本次请求已失败过的副本URL，重试时优先换到其他副本
+
+        Returns:
+            选中的副本
+        """
+        if self.is_multi_endpoint:
+            self._ensure_health_checks()
+
+        now = time.monotonic()
+        exclude = exclude or set()
+        candidates = [ep for ep in self.endpoints if ep.is_available(now) and ep.url not in exclude]
+        if not candidates:
+            candidates = [ep for ep in self.endpoints if ep.is_available(now)]
+        if not candidates:
+            # 全部副本都被摘除：选择最早恢复的副本，不直接拒绝请求
+            candidates = [min(self.endpoints, key=lambda ep: ep.ejected_until)]
+
+        endpoint = min(candidates, key=lambda ep: (ep.outstanding, ep.total_requests))
+        endpoint.outstanding += 1
+        endpoint.total_requests += 1
+        return endpoint
+
+    def has_available(self, exclude: Optional[Set[str]] = None) -> bool:
+        """是否还有未被摘除、且不在排除列表中的副本"""
+        now = time.monotonic()
+        exclude = exclude or set()
+        return any(ep.is_available(now) and ep.url not in exclude for ep in self.endpoints)
+
+    def release(self, endpoint: EndpointState, success: Optional[bool]) -> None:
+        """请求结束，更新在途数和被动健康状态（success为None时只归还在途数）"""
+        endpoint.outstanding = max(0, endpoint.outstanding - 1)
+        if success is None:
+            return
+        if success:
+            self._mark_success(endpoint)
+        else:
+            self._mark_failure(endpoint)
+
+    def _mark_success(self, endpoint: EndpointState) -> None:
+        endpoint.consecutive_failures = 0
+        if endpoint.ejection_count and endpoint.is_available(time.monotonic()):
+            endpoint.ejection_count = 0
+
+    def _mark_failure(self, endpoint: EndpointState) -> None:
+        endpoint.total_failures += 1
+        endpoint.consecutive_failures += 1
+        if not self.is_multi_endpoint:
+            return
+        if endpoint.consecutive_failures >= self.config.failure_threshold and endpoint.is_available(time.monotonic()):
+            endpoint.ejection_count += 1
+            ejection_time = self.config.ejection_time * min(2 ** (endpoint.ejection_count - 1), 8)
+            endpoint.ejected_until = time.monotonic() + ejection_time
+            endpoint.consecutive_failures = 0
+            logger.warning(f"⚠️ {self.server_name.upper()} 副本 {endpoint.url} 连续失败，临时摘除 {ejection_time:.0f} 秒")
+
+    def _ensure_health_checks(self) -> None:
+        """在当前事件循环上启动主动健康检查任务"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._health_task is not None and self._health_loop is loop and not self._health_task.done():
+            return
+        self._health_loop = loop
+        self._health_task = loop.create_task(self._health_check_loop())
+
+    async def _health_check_loop(self) -> None:
+        from utils.llm_client import get_shared_session
+        while True:
+            await asyncio.sleep(self.config.health_check_interval)
+            session = get_shared_session(self.server_name)
+            await asyncio.gather(*(self._probe(session, ep) for ep in self.endpoints), return_exceptions=True)
+
+    async def _probe(self, session: aiohttp.ClientSession, endpoint: EndpointState) -> None:
+        url = f"{endpoint.url}{self.config.health_check_path}"
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                healthy = response.status < 500
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            healthy = False
+
+        now = time.monotonic()
+        if healthy:
+            if not endpoint.is_available(now):
+                endpoint.ejected_until = 0.0
+                logger.info(f"✅ {self.server_name.upper()} 副本 {endpoint.url} 主动探测恢复，重新加入路由")
+            endpoint.consecutive_failures = 0
+        else:
+            self._mark_failure(endpoint)
+
+    async def stop_health_checks(self) -> None:
+        """停止当前事件循环上的健康检查任务"""
+        task = self._health_task
+        self._health_task = None
+        if task is None or task.done():
+            return
+        try:
+            if self._health_loop is not asyncio.get_running_loop():
+                return
+        except RuntimeError:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各副本的路由与健康统计"""
+        return {
+            'server_name': self.server_name,
+            'endpoints': [ep.to_dict() for ep in self.endpoints]
+        }
+
+
+# 全局均衡器实例: server_name -> EndpointBalancer
+_balancers: Dict[str, EndpointBalancer] = {}
+
+
+def get_endpoint_balancer(server_name: str) -> EndpointBalancer:
+    """获取指定服务器的负载均衡器（单例）"""
+    balancer = _balancers.get(server_name)
+    if balancer is None:
+        balancer = EndpointBalancer(server_name, get_llm_config().get_server_config(server_name))
+        _balancers[server_name] = balancer
+    return balancer
+
+
+async def stop_all_health_checks() -> None:
+    """停止所有均衡器的健康检查任务"""
+    for balancer in _balancers.values():
+        await balancer.stop_health_checks()
@@ -1257,4 +1257,68 @@ def get_validator(validator_type: str, **kwargs) -> Callable:
             return validator(response, **kwargs)
         return wrapped_validator
     
-    return validator 
\ No newline at end of file
+    return validator 
+
+# ---------------------------------------------------------------------------
+# 增量验证器（流式模式使用）
+#
+# 输入为目前已收到的部分响应，返回:
+#   None  - 尚无法判断，继续接收
+#   True  - 前缀已确认合法，后续不再做增量检查，完整响应仍由完整验证器验证
+#   Dict  - 已确定格式错误（{'valid': False, 'error': ...}），可以提前断开连接
+# 增量验证器不能比对应的完整验证器更严格。
+# ---------------------------------------------------------------------------
+
+def incremental_json_array(partial: str) -> Optional[Union[bool, Dict[str, Any]]]:
+    """JSON数组增量验证：第一个非空白字符必须是 '['（允许 ```json 代码块）"""
+    stripped = partial.lstrip()
+    if not stripped:
+        return None
+    if stripped[0] in ('[', '`'):
+        return True
+    return {
+        'valid': False,
+        'error': f'响应不是以 [ 开头的JSON数组: {stripped[:50]}'
+    }
+
+
+def incremental_yes_no(partial: str) -> Optional[Union[bool, Dict[str, Any]]]:
+    """是/否判断增量验证：首个token为"是"或"否"时即可确认格式
+
+    完整验证器对带原因说明的其他回答也放行，因此这里只做提前确认，不做提前拒绝。
+    """
+    stripped = partial.lstrip()
+    if not stripped:
+        return None
+    if stripped[0] in ('是', '否'):
+        return True
+    return None
+
+
+def incremental_keyword_extraction(partial: str) -> Optional[Union[bool, Dict[str, Any]]]:
+    """关键词提取增量验证：只能是 "No" 或以 '[' 开头的JSON数组"""
+    stripped = partial.strip()
+    if not stripped:
+        return None
+    if stripped[0] == '[':
+        return True
+    if any(variant.startswith(stripped) for variant in ('"No"', "'No'", 'No')):
+        return None
+    return {
+        'valid': False,
+        'error': f'响应格式不符合要求，只能是"No"或JSON关键词数组: {stripped[:50]}'
+    }
+
+
+# 完整验证器 -> 增量验证器
+INCREMENTAL_VALIDATORS = {
+    validate_sql_completeness_response: incremental_yes_no,
+    validate_sql_correctness_response: incremental_yes_no,
+    validate_keyword_extraction_response: incremental_keyword_extraction,
+    validate_control_flow_sql_regeneration_response: incremental_json_array,
+}
+
+
+def get_incremental_validator(validator: Callable) -> Optional[Callable]:
+    """获取完整验证器对应的增量验证器，没有时返回None"""
+    return INCREMENTAL_VALIDATORS.get(validator)
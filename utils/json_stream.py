@@ -0,0 +1,297 @@
+"""JSON记录文件的格式与流式读取
+
+记录文件（记录列表）支持三种格式，按文件名后缀区分：
+- json: 顶层JSON数组（.json）
+- jsonl: 每行一条记录（.jsonl）
+- jsonl.zst: zstd压缩的JSONL（.jsonl.zst，需要 Python 3.14 的 compression.zstd 或 zstandard 包）
+
+工作流写出记录文件时使用配置 output.format 指定的格式（见 output_format / with_format），
+读取方按后缀自动识别格式。
+
+流式读取逐条产出记录，内存占用与单条记录大小相当，而不是整个文件：
+- 安装了 ijson 时使用其C实现的增量解析器
+- 否则按块读取文件，用标准库 json.JSONDecoder.raw_decode 逐个解析数组元素
+- JSONL 文件逐行解析（空行跳过）
+
+与 write_json_array 写出的文件（以及 json.dump 写出的任意顶层数组）兼容。
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Union, IO
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    ijson = None
+    IJSON_AVAILABLE = False
+
+try:
+    from compression import zstd  # Python 3.14+
+    ZSTD_BACKEND = 'compression.zstd'
+except ImportError:
+    try:
+        import zstandard as zstd
+        ZSTD_BACKEND = 'zstandard'
+    except ImportError:
+        zstd = None
+        ZSTD_BACKEND = None
+ZSTD_AVAILABLE = ZSTD_BACKEND is not None
+
+logger = logging.getLogger(__name__)
+
+# 格式 -> 文件名后缀
+FORMAT_SUFFIXES = {
+    'json': '.json',
+    'jsonl': '.jsonl',
+    'jsonl.zst': '.jsonl.zst',
+}
+OUTPUT_FORMATS = tuple(FORMAT_SUFFIXES)
+
+_warned_zstd_unavailable = False
+
+# 每次从文件读取的字符数
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = ' \t\r\n'
+
+
+def detect_format(file_path: Union[str, Path]) -> str:
+    """按文件名后缀识别记录文件格式（json | jsonl | jsonl.zst）"""
+    name = Path(file_path).name
+    if name.endswith('.jsonl.zst'):
+        return 'jsonl.zst'
+    if name.endswith('.jsonl'):
+        return 'jsonl'
+    return 'json'
+
+
+def is_jsonl_file(file_path: Union[str, Path]) -> bool:
+    """是否按JSONL（每行一条记录，可能经过zstd压缩）格式读取"""
+    return detect_format(file_path) != 'json'
+
+
+def with_format(file_path: Union[str, Path], output_format: str) -> Path:
+    """把文件路径的记录文件后缀替换为指定格式的后缀，如 a.json -> a.jsonl.zst"""
+    path = Path(file_path)
+    name = path.name
+    for suffix in sorted(FORMAT_SUFFIXES.values(), key=len, reverse=True):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return path.with_name(name + FORMAT_SUFFIXES[output_format])
+
+
+def record_file_patterns(pattern: str) -> list:
+    """把以 .json 结尾的glob模式扩展为所有记录文件格式的模式"""
+    if not pattern.endswith('.json'):
+        return [pattern]
+    stem = pattern[:-len('.json')]
+    return [stem + suffix for suffix in FORMAT_SUFFIXES.values()]
+
+
+def _output_config() -> Dict[str, Any]:
+    try:
+        from config.data_processing.workflow.workflow_config import get_workflow_config
+        return get_workflow_config().get_output_config()
+    except Exception as e:
+        logger.debug(f"读取输出格式配置失败，使用默认值: {e}")
+        return {}
+
+
+def zstd_level() -> int:
+    """工作流配置的zstd压缩级别（output.zstd_level）"""
+    return _output_config().get('zstd_level', 3)
+
+
+def find_record_file(file_path: Union[str, Path]) -> Optional[Path]:
+    """查找以任一记录文件格式存在的文件，如 a.json 不存在时依次尝试 a.jsonl、a.jsonl.zst"""
+    for record_format in OUTPUT_FORMATS:
+        candidate = with_format(file_path, record_format)
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def output_format() -> str:
+    """工作流配置的记录文件输出格式（output.format）
+
+    配置为 jsonl.zst 但当前环境没有zstd实现时，退化为 jsonl 并给出一次警告。
+    """
+    global _warned_zstd_unavailable
+    configured = _output_config().get('format', 'json')
+    if configured == 'jsonl.zst' and not ZSTD_AVAILABLE:
+        if not _warned_zstd_unavailable:
+            logger.warning("⚠️ 输出格式配置为 jsonl.zst，但未安装 zstandard（或 Python < 3.14），改用 jsonl")
+            _warned_zstd_unavailable = True
+        return 'jsonl'
+    return configured
+
+
+def output_path(file_path: Union[str, Path]) -> Path:
+    """按配置的输出格式确定记录文件的实际路径"""
+    return with_format(file_path, output_format())
+
+
+def open_text(file_path: Union[str, Path], mode: str = 'r', level: int = 3,
+              compressed: Optional[bool] = None) -> IO[str]:
+    """以文本方式打开记录文件，.zst 文件透明解压/压缩
+
+    Args:
+        file_path: 文件路径
+        mode: 'r' 或 'w'
+        level: zstd压缩级别（仅写压缩文件时使用）
+        compressed: 是否zstd压缩，默认按 .zst 后缀判断（写临时文件时显式指定）
+    """
+    if compressed is None:
+        compressed = Path(file_path).name.endswith('.zst')
+    if not compressed:
+        return open(file_path, mode, encoding='utf-8')
+    if not ZSTD_AVAILABLE:
+        raise RuntimeError(f"读写 {file_path} 需要 zstd 支持（pip install zstandard 或使用 Python 3.14+）")
+    text_mode = mode[0] + 't'
+    if ZSTD_BACKEND == 'zstandard':
+        if text_mode == 'wt':
+            return zstd.open(file_path, text_mode, cctx=zstd.ZstdCompressor(level=level), encoding='utf-8')
+        return zstd.open(file_path, text_mode, encoding='utf-8')
+    if text_mode == 'wt':
+        return zstd.open(file_path, text_mode, level=level, encoding='utf-8')
+    return zstd.open(file_path, text_mode, encoding='utf-8')
+
+
+def write_jsonl(f: IO[str], records: Iterable[Any], default=None) -> int:
+    """向已打开的文本文件逐行写出记录，返回写出的记录数"""
+    count = 0
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False, default=default))
+        f.write('\n')
+        count += 1
+    return count
+
+
+def iter_jsonl(file_path: Union[str, Path]) -> Iterator[Any]:
+    """逐行产出JSONL文件（可以是 .jsonl.zst）中的记录"""
+    with open_text(file_path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{file_path} 第 {line_number} 行不是有效的JSON: {e}") from e
+
+
+def _iter_array_stdlib(f, file_path: Union[str, Path]) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        """丢弃已解析的部分并读入下一块，文件结束时返回False"""
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = f.read(CHUNK_SIZE)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = not chunk
+        return bool(chunk)
+
+    def skip_whitespace() -> bool:
+        """跳过空白，缓冲区内没有更多内容且文件结束时返回False"""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return True
+            if not fill():
+                return False
+
+    if not skip_whitespace() or buffer[pos] != '[':
+        raise ValueError(f"{file_path} 不是顶层JSON数组")
+    pos += 1
+
+    expect_value = True
+    while True:
+        if not skip_whitespace():
+            raise ValueError(f"{file_path} 的JSON数组不完整")
+        char = buffer[pos]
+        if char == ']':
+            return
+        if char == ',' and not expect_value:
+            pos += 1
+            expect_value = True
+            continue
+        # 解析一个元素；元素被块边界截断时读入更多内容再试
+        # （数字等标量在缓冲区末尾可能被截断后仍能解析，所以要求其后还有字符或文件已结束）
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+        pos = end
+        expect_value = False
+        yield value
+
+
+def first_json_char(file_path: Union[str, Path]) -> str:
+    """文件中第一个非空白字符（空文件返回空字符串），用于区分顶层数组与对象"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                return ''
+            stripped = chunk.lstrip(_WHITESPACE)
+            if stripped:
+                return stripped[0]
+
+
+def iter_json_array(file_path: Union[str, Path]) -> Iterator[Any]:
+    """逐个产出顶层JSON数组的元素"""
+    if IJSON_AVAILABLE:
+        if first_json_char(file_path) != '[':
+            raise ValueError(f"{file_path} 不是顶层JSON数组")
+        with open(file_path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+        return
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield from _iter_array_stdlib(f, file_path)
+
+
+def iter_json_records(file_path: Union[str, Path]) -> Iterator[Any]:
+    """
+    流式产出记录文件中的记录
+
+    Args:
+        file_path: .jsonl / .jsonl.zst 文件，或内容为顶层数组的JSON文件
+
+    Returns:
+        记录迭代器；顶层不是数组时在开始迭代时抛出 ValueError
+    """
+    if is_jsonl_file(file_path):
+        return iter_jsonl(file_path)
+    return iter_json_array(file_path)
+
+
+def load_json_or_records(file_path: Union[str, Path]) -> Any:
+    """
+    读取JSON文件或记录文件（自动识别格式）
+
+    Args:
+        file_path: .json 文件（返回其中的任意JSON值），或 .jsonl / .jsonl.zst 文件（返回记录列表）
+
+    Returns:
+        文件内容
+    """
+    if is_jsonl_file(file_path):
+        return list(iter_jsonl(file_path))
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,131 @@
+"""多关键词匹配器 - Aho–Corasick 自动机
+
+同一组关键词在每条记录的多个文本上反复匹配（GORM关键词提取、控制流检测、SQL关键词判断）。
+KeywordMatcher 按关键词集合编译一次（get_keyword_matcher 缓存），一次扫描找出文本中出现的全部关键词：
+- 安装了 pyahocorasick 时使用其C实现的自动机
+- 否则关键词较多时使用纯Python的 Aho–Corasick 自动机
+- 关键词较少时逐个做C实现的子串查找（纯Python自动机逐字符推进，关键词少于约一百个时反而更慢）
+
+匹配区分大小写，需要忽略大小写时由调用方先统一文本大小写（如 text.lower()）。
+"""
+import logging
+from collections import deque
+from functools import lru_cache
+from typing import List, Dict, Iterable, Tuple, Set
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    ahocorasick = None
+    AHOCORASICK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 关键词数达到该值时纯Python自动机快于逐个子串查找
+AUTOMATON_MIN_KEYWORDS = 128
+
+
+class KeywordMatcher:
+    """编译后的多关键词匹配器"""
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        编译匹配器
+
+        Args:
+            keywords: 关键词列表，find_all 按此顺序返回匹配结果
+        """
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k for k in keywords if k))
+        self._automaton = None
+        self._goto: List[Dict[str, int]] = []
+        self._fail: List[int] = []
+        self._output: List[Tuple[int, ...]] = []
+
+        if AHOCORASICK_AVAILABLE and self.keywords:
+            self.backend = 'pyahocorasick'
+            self._automaton = ahocorasick.Automaton()
+            for index, keyword in enumerate(self.keywords):
+                self._automaton.add_word(keyword, index)
+            self._automaton.make_automaton()
+        elif len(self.keywords) >= AUTOMATON_MIN_KEYWORDS:
+            self.backend = 'automaton'
+            self._build_automaton()
+        else:
+            self.backend = 'substring'
+
+    def _build_automaton(self) -> None:
+        """构建goto表、失败指针，并沿失败指针合并输出"""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[int]] = [set()]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    outputs.append(set())
+                    goto[state][char] = next_state
+                state = next_state
+            outputs[state].add(index)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state] |= outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = [tuple(sorted(output)) for output in outputs]
+
+    def _scan(self, text: str) -> Iterable[int]:
+        """依次产出匹配到的关键词下标（可能重复）"""
+        if self._automaton is not None:
+            for _, index in self._automaton.iter(text):
+                yield index
+            return
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                yield from output[state]
+
+    def find_all(self, text: str) -> List[str]:
+        """文本中出现的全部关键词（按关键词列表顺序，去重）"""
+        if not text:
+            return []
+        if self.backend == 'substring':
+            return [keyword for keyword in self.keywords if keyword in text]
+        found = set(self._scan(text))
+        return [self.keywords[index] for index in sorted(found)]
+
+    def contains_any(self, text: str) -> bool:
+        """文本中是否出现任一关键词（找到第一个即返回）"""
+        if not text:
+            return False
+        if self.backend == 'substring':
+            return any(keyword in text for keyword in self.keywords)
+        for _ in self._scan(text):
+            return True
+        return False
+
+
+@lru_cache(maxsize=64)
+def _cached_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+def get_keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """获取关键词集合对应的匹配器（同一组关键词只编译一次）"""
+    return _cached_matcher(tuple(keywords))
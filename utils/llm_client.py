@@ -1,16 +1,113 @@
 """LLM客户端 - 负责实际的API调用"""
 import asyncio
+import copy
 import aiohttp
 import requests
 import re
 import logging
 import json
-from typing import Optional, Dict, Any, Callable, Union, List
+import time
+import weakref
+from typing import Optional, Dict, Any, Callable, Union, List, Tuple, Set
 from openai import OpenAI
 from config.llm.llm_config import get_llm_config, ServerConfig
+from utils.llm_response_cache import get_response_cache, get_validator_name, make_cache_key
+from utils.adaptive_limiter import (
+    AdaptiveConcurrencyLimiter, create_concurrency_limiter, get_current_limiter, get_request_slots
+)
+from utils.endpoint_balancer import get_endpoint_balancer, stop_all_health_checks
+from utils.llm_metrics import get_llm_metrics
+from utils.retry_policy import get_retry_policy, CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
+# 进程级共享会话池: 事件循环 -> {server_name: ClientSession}
+# aiohttp会话绑定在创建它的事件循环上，因此按事件循环分别保存；事件循环被回收后对应条目自动消失
+_loop_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, aiohttp.ClientSession]]" = weakref.WeakKeyDictionary()
+# 每个事件循环上的常驻任务，事件循环结束（asyncio.run 取消剩余任务）时关闭该循环上的共享会话
+_session_keepers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task]" = weakref.WeakKeyDictionary()
+
+
+async def _close_sessions(sessions: Dict[str, aiohttp.ClientSession]) -> None:
+    for server_name, session in list(sessions.items()):
+        if not session.closed:
+            await session.close()
+            logger.debug(f"已关闭 {server_name} 的共享连接池")
+    sessions.clear()
+
+
+async def _close_sessions_on_shutdown(sessions: Dict[str, aiohttp.ClientSession]) -> None:
+    """等待到事件循环结束时被取消，随后关闭该循环上尚未关闭的共享会话"""
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await _close_sessions(sessions)
+
+
+def get_shared_session(server_name: str) -> aiohttp.ClientSession:
+    """获取指定服务器的进程级共享会话（长连接池）
+    
+    同一事件循环内所有模块复用同一个连接池（keep-alive、DNS缓存、单host连接上限），
+    避免每个步骤重复建立TCP连接。每个事件循环有自己的会话，事件循环结束时自动关闭。
+    必须在事件循环内调用。
+    
+    Args:
+        server_name: 服务器名称 (v3 或 r1)
+        
+    Returns:
+        共享的aiohttp会话
+    """
+    loop = asyncio.get_running_loop()
+    sessions = _loop_sessions.get(loop)
+    if sessions is None:
+        sessions = _loop_sessions[loop] = {}
+        keeper = loop.create_task(_close_sessions_on_shutdown(sessions))
+        _session_keepers[loop] = keeper
+        # 常驻任务结束后释放引用，避免条目引用事件循环导致其无法回收
+        keeper.add_done_callback(lambda task, loop=loop: _session_keepers.pop(loop, None))
+    
+    session = sessions.get(server_name)
+    if session is not None and not session.closed:
+        return session
+    
+    config = get_llm_config().get_server_config(server_name)
+    connector = aiohttp.TCPConnector(
+        limit=config.pool_limit,
+        limit_per_host=config.pool_limit_per_host,
+        keepalive_timeout=config.keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=config.dns_cache_ttl
+    )
+    session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=config.timeout)
+    )
+    sessions[server_name] = session
+    logger.debug(f"为 {server_name} 创建共享连接池 (limit={config.pool_limit}, limit_per_host={config.pool_limit_per_host})")
+    return session
+
+
+async def close_shared_sessions() -> None:
+    """关闭当前事件循环上的所有共享会话（同时停止副本健康检查）"""
+    await stop_all_health_checks()
+    loop = asyncio.get_running_loop()
+    sessions = _loop_sessions.pop(loop, None)
+    if sessions:
+        await _close_sessions(sessions)
+    keeper = _session_keepers.pop(loop, None)
+    if keeper is not None and keeper is not asyncio.current_task():
+        keeper.cancel()
+
+
+# 在途请求表（single-flight）: (事件循环id, 服务器名, 请求键) -> [实际发请求的独立任务, 等待者数]
+# 请求在独立任务中执行，不属于任何调用方：某个调用方被取消不会取消其他等待同一结果的调用方
+_inflight_requests: Dict[Tuple[int, str, str], List[Any]] = {}
+
+
+def get_coalescing_stats() -> Dict[str, int]:
+    """获取各模块/组件被合并（未实际发出）的重复请求次数"""
+    return get_llm_metrics().get_counter('coalesced')
+
 
 class FormatValidationError(Exception):
     """格式验证错误"""
@@ -42,6 +139,96 @@ class LLMClient:
             )
         return self._openai_client
     
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取该服务器的共享会话（所有模块统一通过此方法获取连接池）"""
+        return get_shared_session(self.server_name)
+    
+    def get_concurrency_limiter(self, step_type: str, initial_limit: Optional[int] = None) -> AdaptiveConcurrencyLimiter:
+        """获取该服务器共享的自适应并发控制器（各步骤复用同一个窗口）
+        
+        Args:
+            step_type: 步骤类型，控制器首次创建时决定初始窗口
+            initial_limit: 初始窗口，为None时使用 get_concurrency(step_type)
+        """
+        return create_concurrency_limiter(step_type, initial_limit, endpoint=self.server_name)
+    
+    async def _read_stream(
+        self,
+        response: aiohttp.ClientResponse,
+        incremental_validator: Callable[[str], Optional[Union[bool, Dict[str, Any]]]],
+        stream_info: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """读取SSE流式响应，边接收边做增量格式验证
+        
+        Args:
+            response: 流式HTTP响应
+            incremental_validator: 增量验证器
+            stream_info: 可选，写入首个token的到达时间(first_token_time)和末尾事件中的usage
+            
+        Returns:
+            (已接收的响应内容, 提前判定的验证失败结果；正常读完时为None)
+        """
+        content = ""
+        decided = False
+        async for raw_line in response.content:
+            line = raw_line.decode('utf-8', errors='ignore').strip()
+            if not line.startswith('data:'):
+                continue
+            payload = line[5:].strip()
+            if payload == '[DONE]':
+                break
+            try:
+                event = json.loads(payload)
+            except json.JSONDecodeError:
+                continue
+            if stream_info is not None and event.get('usage'):
+                stream_info['usage'] = event['usage']
+            choices = event.get('choices') or []
+            if not choices:
+                continue
+            piece = (choices[0].get('delta') or {}).get('content')
+            if not piece:
+                continue
+            if stream_info is not None and 'first_token_time' not in stream_info:
+                stream_info['first_token_time'] = time.monotonic()
+            content += piece
+            
+            if not decided:
+                verdict = incremental_validator(content)
+                if verdict is True:
+                    decided = True
+                elif verdict is not None:
+                    # 格式已经跑偏：断开连接，不再等待剩余token
+                    response.close()
+                    if not isinstance(verdict, dict):
+                        verdict = {'valid': False, 'error': '流式增量验证失败'}
+                    return content, verdict
+        return content, None
+    
+    @staticmethod
+    def _is_overload_error(e: Exception) -> bool:
+        """判断是否为服务端过载信号（超时、429、5xx）"""
+        if isinstance(e, (asyncio.TimeoutError, aiohttp.ServerTimeoutError)):
+            return True
+        if isinstance(e, aiohttp.ClientResponseError):
+            return e.status == 429 or e.status >= 500
+        return False
+    
+    @classmethod
+    def _is_replica_failure(cls, e: Exception) -> bool:
+        """判断是否应计为副本故障（连接错误或过载），4xx等请求本身的问题不计入"""
+        if isinstance(e, aiohttp.ClientResponseError):
+            return cls._is_overload_error(e)
+        return True
+    
+    @staticmethod
+    def _acquire_retry(retry_policy, metrics, module: Optional[str], component: Optional[str]) -> bool:
+        """向全局重试预算申请一次重试（网络错误、空响应），预算耗尽时放弃重试"""
+        if retry_policy.budget.try_acquire():
+            return True
+        metrics.increment(module, component, 'budget_exhausted')
+        logger.warning("⚠️ 全局重试预算已耗尽，不再重试")
+        return False
     
     def _format_error_details(self, e: Exception) -> str:
         """格式化错误详情"""
@@ -63,7 +250,7 @@ class LLMClient:
     
     async def call_async_with_format_validation(
         self, 
-        session: aiohttp.ClientSession, 
+        session: Optional[aiohttp.ClientSession], 
         prompt: str, 
         validator: Callable[[str], Union[bool, Dict[str, Any]]],
         max_tokens: int = 2048, 
@@ -72,12 +259,17 @@ class LLMClient:
         retry_delay: Optional[float] = None,
         format_retry_prompt: Optional[str] = None,
         module: Optional[str] = None,
-        component: Optional[str] = None
+        component: Optional[str] = None,
+        stream: Optional[bool] = None
     ) -> Union[str, Dict[str, Any]]:
         """异步调用LLM API，带格式验证和重试
         
+        温度为0时，同一事件循环内并发的相同请求（服务器、模型、消息、max_tokens、验证器均相同）
+        只会真正发出一次，其余调用等待同一个结果（single-flight）。请求在独立任务中执行，
+        某个调用方被取消不影响其他调用方；所有调用方都被取消时才取消该请求。
+        
         Args:
-            session: aiohttp会话
+            session: aiohttp会话，为None时使用该服务器的共享连接池
             prompt: 输入提示
             validator: 格式验证函数，返回True/False或验证结果字典
             max_tokens: 最大token数
@@ -85,10 +277,83 @@ class LLMClient:
             max_retries: 最大重试次数
             retry_delay: 重试间隔（秒）
             format_retry_prompt: 格式重试提示词模板，如果为None则使用默认提示
+            module: 模块名称，用于读取格式验证与流式配置
+            component: 组件名称，用于读取格式验证与流式配置
+            stream: 是否使用流式响应并做增量格式验证，为None时按工作流配置决定
             
         Returns:
             LLM的响应内容或验证结果
         """
+        call_args = (session, prompt, validator, max_tokens, temperature, max_retries,
+                     retry_delay, format_retry_prompt, module, component, stream)
+        if temperature != 0.0:
+            return await self._call_with_format_validation(*call_args)
+        
+        loop = asyncio.get_running_loop()
+        flight_key = (
+            id(loop),
+            self.server_name,
+            make_cache_key(self.config.model_name, [{"role": "user", "content": prompt}],
+                           temperature, max_tokens, get_validator_name(validator))
+        )
+        flight = _inflight_requests.get(flight_key)
+        is_leader = flight is None
+        if is_leader:
+            # 独立任务复制当前上下文（并发控制器等），请求结束后才从在途表中移除
+            task = loop.create_task(self._call_with_format_validation(*call_args))
+            flight = _inflight_requests[flight_key] = [task, 0]
+            
+            def on_flight_done(done_task: asyncio.Task, flight=flight) -> None:
+                if _inflight_requests.get(flight_key) is flight:
+                    del _inflight_requests[flight_key]
+                # 没有等待者时也不产生 "exception was never retrieved" 警告
+                if done_task.cancelled() or done_task.exception() is not None:
+                    return
+                # 在任何等待者恢复执行之前为跟随者保存结果快照，领头者之后修改结果不会影响跟随者
+                result = done_task.result()
+                if flight[1] > 1 and isinstance(result, dict):
+                    flight.append(copy.deepcopy(result))
+            
+            task.add_done_callback(on_flight_done)
+        else:
+            # 已有相同请求在途，等待其结果
+            get_llm_metrics().increment(module, component, 'coalesced')
+        
+        task = flight[0]
+        flight[1] += 1
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and flight[1] == 1:
+                # 最后一个等待者被取消，不再需要这个请求
+                task.cancel()
+            raise
+        finally:
+            flight[1] -= 1
+        if is_leader or not isinstance(result, dict):
+            return result
+        # 每个跟随者从快照复制一份，彼此之间也互不影响；
+        # 没有快照说明完成时只剩这一个等待者（领头者已取消），结果没有被其他调用方持有
+        return copy.deepcopy(flight[2]) if len(flight) > 2 else result
+    
+    async def _call_with_format_validation(
+        self,
+        session: Optional[aiohttp.ClientSession],
+        prompt: str,
+        validator: Callable[[str], Union[bool, Dict[str, Any]]],
+        max_tokens: int,
+        temperature: float,
+        max_retries: Optional[int],
+        retry_delay: Optional[float],
+        format_retry_prompt: Optional[str],
+        module: Optional[str],
+        component: Optional[str],
+        stream: Optional[bool]
+    ) -> Union[str, Dict[str, Any]]:
+        """实际发起请求（参数含义同 call_async_with_format_validation）"""
+        if session is None:
+            session = self.get_session()
+        
         headers = {"Content-Type": "application/json"}
         
         data = {
@@ -120,6 +385,19 @@ class LLMClient:
         max_retries = max_retries or 3
         retry_delay = retry_delay or 1.0
         
+        # 流式模式：只有存在增量验证器时才有提前终止的意义
+        incremental_validator = None
+        if stream is None:
+            try:
+                from config.data_processing.workflow.workflow_config import get_workflow_config
+                stream = get_workflow_config().is_streaming_enabled(module, component)
+            except Exception:
+                stream = False
+        if stream:
+            from utils.format_validators import get_incremental_validator
+            incremental_validator = get_incremental_validator(validator)
+        use_stream = incremental_validator is not None
+        
         # 默认格式重试提示
         if format_retry_prompt is None:
             format_retry_prompt = """您的回答格式不正确，请严格按照要求的格式重新回答。
@@ -134,37 +412,112 @@ class LLMClient:
 
         请重新回答："""
         
+        # 按 (module, component) 记录遥测
+        metrics = get_llm_metrics()
+        metrics.increment(module, component, 'calls')
+        
+        # 查询持久化响应缓存（键基于首轮消息，只有首轮即通过验证的响应才写入该键）
+        cache = get_response_cache()
+        cache_key = None
+        if cache is not None and cache.is_cacheable(temperature):
+            validator_name = get_validator_name(validator)
+            cache_key = make_cache_key(self.config.model_name, data["messages"], temperature, max_tokens, validator_name)
+            cached_content = await cache.aget(cache_key)
+            if cached_content is not None:
+                validation_result = validator(cached_content)
+                if validation_result is True or (isinstance(validation_result, dict) and validation_result.get('valid', False)):
+                    metrics.increment(module, component, 'cache_hits')
+                    return cached_content if validation_result is True else validation_result
+                # 验证规则已变化，缓存内容失效
+                await cache.ainvalidate(cache_key)
+        
+        # 当前任务所属的自适应并发控制器（若有），用于回报延迟与过载信号
+        limiter = get_current_limiter()
+        
+        # 多副本路由：每次尝试选择在途请求最少的副本，失败过的副本在重试时被排除
+        balancer = get_endpoint_balancer(self.server_name)
+        failed_endpoints: Set[str] = set()
+        
+        # 统一重试策略：退避抖动、全局重试预算、按副本熔断
+        retry_policy = get_retry_policy()
+        backoff = None
+        
+        circuit_waited = 0.0
+        
         for attempt in range(max_retries):
+            while True:
+                open_endpoints = {ep.url for ep in balancer.endpoints if retry_policy.get_breaker(ep.url).is_open}
+                endpoint = balancer.acquire(exclude=failed_endpoints | open_endpoints)
+                breaker = retry_policy.get_breaker(endpoint.url)
+                if breaker.allow_request():
+                    break
+                # 所有副本都在熔断中：等待半开探测的结果，不占用重试次数，也不向后端发请求
+                balancer.release(endpoint, success=None)
+                metrics.increment(module, component, 'circuit_waits')
+                try:
+                    circuit_waited += await retry_policy.wait_for_circuit(
+                        [ep.url for ep in balancer.endpoints], circuit_waited, self.server_name.upper())
+                except CircuitOpenError:
+                    metrics.increment(module, component, 'circuit_rejections')
+                    raise
+            retry_policy.budget.record_request()
+            request_start = time.monotonic()
             try:
                 async with session.post(
-                    self.config.chat_completions_url,
+                    endpoint.chat_completions_url,
                     headers=headers,
-                    json=data,
+                    json={**data, "stream": True, "stream_options": {"include_usage": True}} if use_stream else data,
                     timeout=aiohttp.ClientTimeout(total=self.config.timeout)
                 ) as response:
                     response.raise_for_status()
-                    result = await response.json()
-                    response_content = result['choices'][0]['message']['content']
+                    early_result = None
+                    if use_stream:
+                        stream_info: Dict[str, Any] = {}
+                        response_content, early_result = await self._read_stream(response, incremental_validator, stream_info)
+                        first_byte_time = stream_info.get('first_token_time')
+                        usage = stream_info.get('usage')
+                    else:
+                        first_byte_time = time.monotonic()
+                        result = await response.json()
+                        response_content = result['choices'][0]['message']['content']
+                        usage = result.get('usage')
+                    balancer.release(endpoint, success=True)
+                    breaker.record_success()
+                    endpoint = None
+                    request_latency = time.monotonic() - request_start
+                    if limiter is not None:
+                        # 批量请求的延迟按槽位折算为单条延迟，与单条请求的p95可比
+                        limiter.record_success(request_latency / get_request_slots())
+                    metrics.record_request(
+                        module, component, request_latency,
+                        ttfb=first_byte_time - request_start if first_byte_time is not None else None,
+                        usage=usage
+                    )
                     
                     # 检查响应内容是否为空
                     if not response_content or not response_content.strip():
                         logger.warning(f"⚠️ {self.server_name.upper()} 返回空响应内容")
-                        if attempt < max_retries - 1:
-                            logger.warning(f"   即将重试，等待 {retry_delay * (attempt + 1):.1f} 秒...")
-                            await asyncio.sleep(retry_delay * (attempt + 1))
+                        metrics.increment(module, component, 'empty_responses')
+                        if attempt < max_retries - 1 and self._acquire_retry(retry_policy, metrics, module, component):
+                            backoff = retry_policy.next_delay(backoff, retry_delay)
+                            logger.warning(f"   即将重试，等待 {backoff:.1f} 秒...")
+                            await asyncio.sleep(backoff)
                             continue
                         else:
                             raise Exception(f"{self.server_name.upper()} 返回空响应内容，已达到最大重试次数")
                     
-                    # 验证格式
-                    validation_result = validator(response_content)
+                    # 验证格式（流式增量验证已判定失败时直接使用其结果）
+                    validation_result = early_result if early_result is not None else validator(response_content)
                     
                     if validation_result is True or (isinstance(validation_result, dict) and validation_result.get('valid', False)):
-                        # 格式验证通过
+                        # 格式验证通过（格式重试后的响应依赖前一轮的错误回答，不对应首轮键，不写入缓存）
+                        if cache_key is not None and len(data["messages"]) == 1:
+                            await cache.aput(cache_key, response_content, self.config.model_name, validator_name)
                         return response_content if validation_result is True else validation_result
                     else:
                         # 格式验证失败，需要重试
                         if attempt < max_retries - 1:
+                            metrics.increment(module, component, 'format_retries')
                             logger.warning(f"❌ {self.server_name.upper()} 格式验证失败 (尝试 {attempt + 1}/{max_retries})")
                             logger.warning(f"   响应内容: {response_content[:200]}...")
                             
@@ -180,21 +533,44 @@ class LLMClient:
                                 {"role": "user", "content": retry_prompt}
                             ]
                             
-                            logger.warning(f"   即将重试，等待 {retry_delay * (attempt + 1):.1f} 秒...")
-                            await asyncio.sleep(retry_delay * (attempt + 1))
+                            if early_result is not None:
+                                # 流式提前终止的请求没有占满服务端，立即重试
+                                logger.warning(f"   流式增量验证提前终止，立即重试")
+                                continue
+                            backoff = retry_policy.next_delay(backoff, retry_delay)
+                            logger.warning(f"   即将重试，等待 {backoff:.1f} 秒...")
+                            await asyncio.sleep(backoff)
                             continue
                         else:
                             # 最后一次尝试也失败
                             logger.error(f"❌ {self.server_name.upper()} 格式验证失败，已达到最大重试次数")
                             logger.error(f"   最终响应内容: {response_content}")
+                            metrics.increment(module, component, 'format_failures')
                             return response_content  # 返回最后一次的响应
                             
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                if attempt < max_retries - 1:
+                if limiter is not None:
+                    limiter.record_failure(self._is_overload_error(e), e.__class__.__name__)
+                if endpoint is not None:
+                    # 副本尚未释放说明失败发生在HTTP请求阶段，计入失败请求
+                    metrics.record_request(module, component, time.monotonic() - request_start, success=False)
+                    replica_failure = self._is_replica_failure(e)
+                    balancer.release(endpoint, success=not replica_failure)
+                    if replica_failure:
+                        failed_endpoints.add(endpoint.url)
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    endpoint = None
+                if attempt < max_retries - 1 and self._acquire_retry(retry_policy, metrics, module, component):
+                    metrics.increment(module, component, 'network_retries')
                     error_details = self._format_error_details(e)
                     logger.warning(f"❌ {self.server_name.upper()} 异步API调用失败 (尝试 {attempt + 1}/{max_retries})")
                     logger.warning(f"   错误详情: {error_details}")
-                    await asyncio.sleep(retry_delay * (attempt + 1))
+                    # 还有其他健康副本时立即换副本重试（请求幂等），否则按退避间隔等待
+                    if not (failed_endpoints and balancer.has_available(failed_endpoints)):
+                        backoff = retry_policy.next_delay(backoff, retry_delay)
+                        await asyncio.sleep(backoff)
                     continue
                 else:
                     error_details = self._format_error_details(e)
@@ -206,6 +582,10 @@ class LLMClient:
                 logger.error(f"❌ {self.server_name.upper()} 异步API调用遇到非网络错误")
                 logger.error(f"   错误详情: {error_details}")
                 raise e  # 抛出异常而不是返回空字符串
+            finally:
+                if endpoint is not None:
+                    balancer.release(endpoint, success=None)
+                    breaker.cancel_probe()
         
         # 如果所有重试都失败，抛出异常
         raise Exception(f"{self.server_name.upper()} 异步API调用失败，已达到最大重试次数")
@@ -0,0 +1,276 @@
+"""LLM调用遥测 - 按 (module, component) 统计延迟、token 与重试
+
+LLMClient 在每次调用时把数据记录到进程级的 LLMMetrics：
+- 请求延迟与首字节时间（TTFB）直方图
+- 响应 usage 字段中的 prompt/completion token 数
+- 格式验证重试、网络重试、空响应、缓存命中、请求合并次数
+
+工作流结束时导出为 workflow_summary.json 旁边的 llm_metrics.json，
+也可以通过可选的 Prometheus 文本端点实时抓取。
+"""
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Union
+
+from utils.step_profiler import get_current_profiler
+
+logger = logging.getLogger(__name__)
+
+# 直方图桶上界（秒），与 Prometheus 直方图一致为累积计数
+LATENCY_BUCKETS: List[float] = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0]
+
+# 计数器名称 -> 说明（也用作 Prometheus 的 HELP）
+COUNTERS: Dict[str, str] = {
+    'calls': '逻辑调用次数（一次调用可能包含多次HTTP请求）',
+    'requests': 'HTTP请求次数',
+    'request_errors': '失败的HTTP请求次数',
+    'format_retries': '格式验证失败后的重试次数',
+    'network_retries': '网络错误后的重试次数',
+    'empty_responses': '空响应次数',
+    'format_failures': '用尽重试仍未通过格式验证的调用次数',
+    'cache_hits': '命中持久化响应缓存的调用次数',
+    'coalesced': '与在途相同请求合并的调用次数',
+    'circuit_waits': '所有副本熔断时等待半开探测的次数',
+    'circuit_rejections': '熔断等待超时后失败的调用次数',
+    'budget_exhausted': '因全局重试预算耗尽而放弃重试的次数',
+    'prompt_tokens': 'prompt token 总数',
+    'completion_tokens': 'completion token 总数',
+}
+
+
+def metrics_key(module: Optional[str], component: Optional[str]) -> str:
+    """统计维度键: module.component"""
+    return f"{module or 'default'}.{component or 'default'}"
+
+
+class Histogram:
+    """固定桶的累积直方图"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q: float) -> float:
+        """按桶估算分位数（返回所在桶的上界）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, bound in enumerate(self.buckets):
+            cumulative += self.counts[i]
+            if cumulative >= target:
+                return bound
+        return float('inf')
+
+    def cumulative_counts(self) -> List[int]:
+        result, total = [], 0
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'mean': round(self.sum / self.count, 3) if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ['+Inf'], self.cumulative_counts())}
+        }
+
+
+class ComponentMetrics:
+    """单个 (module, component) 的统计"""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {name: 0 for name in COUNTERS}
+        self.latency = Histogram()
+        self.ttfb = Histogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = dict(self.counters)
+        result['latency_seconds'] = self.latency.to_dict()
+        result['ttfb_seconds'] = self.ttfb.to_dict()
+        busy_time = self.latency.sum
+        result['completion_tokens_per_second'] = (
+            round(self.counters['completion_tokens'] / busy_time, 2) if busy_time else 0.0
+        )
+        return result
+
+
+class LLMMetrics:
+    """进程级LLM调用遥测"""
+
+    def __init__(self):
+        self._components: Dict[str, ComponentMetrics] = {}
+        self._lock = threading.Lock()
+        self.start_time = time.time()
+
+    def _get(self, module: Optional[str], component: Optional[str]) -> ComponentMetrics:
+        key = metrics_key(module, component)
+        metrics = self._components.get(key)
+        if metrics is None:
+            metrics = self._components[key] = ComponentMetrics()
+        return metrics
+
+    def increment(self, module: Optional[str], component: Optional[str], name: str, value: int = 1) -> None:
+        """累加计数器"""
+        with self._lock:
+            self._get(module, component).counters[name] += value
+        if name == 'calls':
+            # 同时计入当前正在执行的工作流步骤
+            profiler = get_current_profiler()
+            if profiler is not None:
+                profiler.add_llm(calls=value)
+
+    def record_request(self, module: Optional[str], component: Optional[str], latency: float,
+                       ttfb: Optional[float] = None, usage: Optional[Dict[str, Any]] = None,
+                       success: bool = True) -> None:
+        """记录一次HTTP请求
+
+        Args:
+            module: 模块名称
+            component: 组件名称
+            latency: 请求总耗时（秒）
+            ttfb: 首字节时间（秒），非流式为收到响应头的时间，流式为收到首个token的时间
+            usage: 响应中的 usage 字段
+            success: 请求是否成功（HTTP层面）
+        """
+        with self._lock:
+            metrics = self._get(module, component)
+            metrics.counters['requests'] += 1
+            if not success:
+                metrics.counters['request_errors'] += 1
+            metrics.latency.observe(latency)
+            if ttfb is not None:
+                metrics.ttfb.observe(ttfb)
+            if usage:
+                metrics.counters['prompt_tokens'] += int(usage.get('prompt_tokens') or 0)
+                metrics.counters['completion_tokens'] += int(usage.get('completion_tokens') or 0)
+        profiler = get_current_profiler()
+        if profiler is not None:
+            profiler.add_llm(requests=1,
+                             prompt_tokens=int((usage or {}).get('prompt_tokens') or 0),
+                             completion_tokens=int((usage or {}).get('completion_tokens') or 0))
+
+    def get_counter(self, name: str) -> Dict[str, int]:
+        """获取某个计数器在各维度上的非零值"""
+        with self._lock:
+            return {key: m.counters[name] for key, m in self._components.items() if m.counters[name]}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出全部统计"""
+        with self._lock:
+            components = {key: m.to_dict() for key, m in sorted(self._components.items())}
+        totals = {name: sum(c[name] for c in components.values()) for name in COUNTERS}
+        return {
+            'start_time': self.start_time,
+            'end_time': time.time(),
+            'totals': totals,
+            'components': components
+        }
+
+    def save(self, output_file: Union[str, Path]) -> Path:
+        """保存为JSON文件"""
+        output_file = Path(output_file)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return output_file
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines: List[str] = []
+        with self._lock:
+            items = sorted(self._components.items())
+            for name, help_text in COUNTERS.items():
+                metric = f"code2sql_llm_{name}_total"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for key, m in items:
+                    lines.append(f'{metric}{{{self._labels(key)}}} {m.counters[name]}')
+            for attr, help_text in (('latency', 'LLM请求延迟（秒）'), ('ttfb', 'LLM请求首字节时间（秒）')):
+                metric = f"code2sql_llm_{attr}_seconds"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for key, m in items:
+                    histogram: Histogram = getattr(m, attr)
+                    labels = self._labels(key)
+                    for bound, count in zip(histogram.buckets + ['+Inf'], histogram.cumulative_counts()):
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{metric}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(key: str) -> str:
+        module, _, component = key.partition('.')
+        return f'module="{module}",component="{component}"'
+
+    def reset(self) -> None:
+        """清空统计（新工作流开始时调用）"""
+        with self._lock:
+            self._components.clear()
+            self.start_time = time.time()
+
+
+# 全局遥测实例
+_global_llm_metrics: Optional[LLMMetrics] = None
+_prometheus_server: Optional[ThreadingHTTPServer] = None
+
+
+def get_llm_metrics() -> LLMMetrics:
+    """获取全局LLM遥测实例（单例模式）"""
+    global _global_llm_metrics
+    if _global_llm_metrics is None:
+        _global_llm_metrics = LLMMetrics()
+    return _global_llm_metrics
+
+
+def start_prometheus_endpoint(port: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """在后台线程启动 Prometheus 文本端点（GET /metrics），重复调用只启动一次"""
+    global _prometheus_server
+    if _prometheus_server is not None:
+        return _prometheus_server
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') not in ('', '/metrics'):
+                self.send_error(404)
+                return
+            body = get_llm_metrics().to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logger.warning(f"⚠️ Prometheus 指标端点启动失败 (端口 {port}): {e}")
+        return None
+    thread = threading.Thread(target=server.serve_forever, name="llm-metrics-endpoint", daemon=True)
+    thread.start()
+    _prometheus_server = server
+    logger.info(f"📈 Prometheus 指标端点已启动: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,218 @@
+"""LLM响应持久化缓存 - 基于SQLite的内容寻址缓存
+
+缓存键为 (model_name, messages, temperature, max_tokens, validator名称) 的SHA256哈希，
+只缓存首轮即通过格式验证的响应（经过格式重试的响应不写入），按总字节数上限进行LRU淘汰。
+SQLite读写在线程池中执行（aget/aput/ainvalidate），不阻塞事件循环。
+重跑工作流或从中间步骤恢复时，相同的提示词直接从本地返回，无需再次请求LLM服务器。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def get_validator_name(validator: Callable) -> str:
+    """获取验证函数的稳定名称（模块名 + 限定名），用于区分不同验证规则下的缓存"""
+    module = getattr(validator, '__module__', '') or ''
+    qualname = getattr(validator, '__qualname__', None) or getattr(validator, '__name__', None)
+    if qualname is None:
+        qualname = validator.__class__.__qualname__
+    return f"{module}.{qualname}" if module else qualname
+
+
+def make_cache_key(model_name: str, messages: List[Dict[str, str]], temperature: float,
+                   max_tokens: int, validator_name: str) -> str:
+    """计算缓存键"""
+    payload = json.dumps(
+        {
+            'model': model_name,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'validator': validator_name,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite实现的LLM响应缓存（带LRU淘汰）"""
+
+    def __init__(self, db_path: str, max_size_mb: float = 1024, max_temperature: float = 0.0):
+        """初始化缓存
+
+        Args:
+            db_path: SQLite数据库文件路径
+            max_size_mb: 缓存内容总大小上限（MB），超出后按最近访问时间淘汰
+            max_temperature: 允许缓存的最高温度，高于该温度的请求不读写缓存
+        """
+        self.db_path = Path(db_path)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_temperature = max_temperature
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                validator TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses").fetchone()
+        self._total_size = int(row[0])
+
+        # 本进程内的统计
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        logger.info(f"💾 LLM响应缓存已加载: {self.db_path} ({row[1]} 条, {self._total_size / 1024 / 1024:.1f}MB)")
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """判断该温度下的请求是否参与缓存"""
+        return temperature <= self.max_temperature
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，命中时刷新访问时间"""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def invalidate(self, key: str) -> None:
+        """删除一条缓存（例如缓存内容已不再通过当前验证规则）"""
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_size -= int(row[0])
+
+    def put(self, key: str, response: str, model: str = "", validator: str = "") -> None:
+        """写入一条已通过验证的响应"""
+        size = len(response.encode('utf-8'))
+        if size > self.max_size_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, validator, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, validator, response, size, now, now)
+            )
+            self._total_size += size - (int(old[0]) if old else 0)
+            self.stores += 1
+            if self._total_size > self.max_size_bytes:
+                self._evict()
+
+    async def aget(self, key: str) -> Optional[str]:
+        """异步读取缓存（在线程池中执行数据库I/O）"""
+        return await asyncio.to_thread(self.get, key)
+
+    async def ainvalidate(self, key: str) -> None:
+        """异步删除一条缓存（在线程池中执行数据库I/O）"""
+        await asyncio.to_thread(self.invalidate, key)
+
+    async def aput(self, key: str, response: str, model: str = "", validator: str = "") -> None:
+        """异步写入一条响应（在线程池中执行数据库I/O）"""
+        await asyncio.to_thread(self.put, key, response, model, validator)
+
+    def _evict(self) -> None:
+        """按最近访问时间淘汰，直到总大小降到上限的90%（调用方需持有锁）"""
+        target = int(self.max_size_bytes * 0.9)
+        while self._total_size > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._total_size = 0
+                break
+            removed_keys = []
+            for key, size in rows:
+                if self._total_size <= target:
+                    break
+                removed_keys.append((key,))
+                self._total_size -= int(size)
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", removed_keys)
+            self.evictions += len(removed_keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'db_path': str(self.db_path),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'entries': entries,
+            'size_mb': round(self._total_size / 1024 / 1024, 3),
+            'max_size_mb': round(self.max_size_bytes / 1024 / 1024, 3)
+        }
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+# 全局缓存实例
+_global_response_cache: Optional[LLMResponseCache] = None
+_global_response_cache_loaded = False
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """获取全局LLM响应缓存实例（单例模式），未启用时返回None"""
+    global _global_response_cache, _global_response_cache_loaded
+    if _global_response_cache_loaded:
+        return _global_response_cache
+    _global_response_cache_loaded = True
+
+    try:
+        from config.data_processing.workflow.workflow_config import get_workflow_config
+        cache_config = get_workflow_config().get_response_cache_config()
+    except Exception as e:
+        logger.warning(f"获取LLM响应缓存配置失败，缓存不启用: {e}")
+        return None
+
+    if not cache_config.get('enabled', False):
+        return None
+
+    try:
+        _global_response_cache = LLMResponseCache(
+            db_path=cache_config['path'],
+            max_size_mb=cache_config['max_size_mb'],
+            max_temperature=cache_config['max_temperature']
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ 打开LLM响应缓存失败，缓存不启用: {e}")
+        _global_response_cache = None
+    return _global_response_cache
@@ -0,0 +1,165 @@
+"""多记录提示词批处理 - 用于短输出的分类步骤
+
+把N条记录打包进同一个提示词（共享的指令只发送一次），要求LLM按编号槽位逐条作答：
+
+    [1] <第1条的回答>
+    [2] <第2条的回答>
+
+每个槽位的回答单独用原有的单条验证器验证，未通过或缺失的槽位返回None，
+由调用方按单条模式重新请求。
+"""
+import logging
+import re
+from typing import Optional, Dict, Any, List, Callable, Union
+
+import aiohttp
+
+from utils.adaptive_limiter import request_slots
+
+logger = logging.getLogger(__name__)
+
+# 槽位行：[1] 回答 / **[1]** 回答 / [1]: 回答
+_SLOT_PATTERN = re.compile(r'^\s*\**\s*\[(\d+)\]\s*\**\s*[:：]?\s*(.*)$')
+
+
+def build_batch_prompt(instructions: str, materials: List[str]) -> str:
+    """构造批量提示词
+
+    Args:
+        instructions: 共享的判断指令（不含单条分析材料）
+        materials: 每条记录格式化后的分析材料
+
+    Returns:
+        批量提示词
+    """
+    count = len(materials)
+    parts = [
+        instructions.rstrip(),
+        "",
+        "**批量作答要求：**",
+        f"下面共有 {count} 条相互独立的分析材料，编号为 [1] 到 [{count}]。"
+        f"请对每条材料分别按上述输出要求作答，每条回答单独占一行，以对应编号开头，不要输出任何其他内容：",
+    ]
+    parts.extend(f"[{i}] <第{i}条材料的回答>" for i in range(1, count + 1))
+    for i, material in enumerate(materials, start=1):
+        parts.append("")
+        parts.append(f"=== 分析材料 [{i}] ===")
+        parts.append(material.strip())
+    return "\n".join(parts)
+
+
+def parse_numbered_slots(response: str, slot_count: int) -> Dict[int, str]:
+    """按编号解析批量响应，回答跨多行时合并到对应槽位"""
+    slots: Dict[int, List[str]] = {}
+    current = None
+    for line in response.splitlines():
+        match = _SLOT_PATTERN.match(line)
+        if match and not 1 <= int(match.group(1)) <= slot_count:
+            # 超出范围的编号（多答的槽位）丢弃，不能并入上一个槽位的回答
+            current = None
+        elif match:
+            current = int(match.group(1))
+            if current in slots:
+                # 重复编号视为格式不可靠，丢弃该槽位
+                slots[current] = []
+                current = None
+                continue
+            slots[current] = [match.group(2)]
+        elif current is not None and line.strip():
+            slots[current].append(line.strip())
+    return {index: "\n".join(lines).strip() for index, lines in slots.items() if lines}
+
+
+class PromptBatcher:
+    """批量提示词执行器"""
+
+    def __init__(self, llm_client, instructions: str, slot_validator: Callable[[str], Union[bool, Dict[str, Any]]],
+                 batch_size: int, max_tokens_per_slot: int, module: Optional[str] = None,
+                 component: Optional[str] = None, temperature: float = 0.0):
+        """初始化批处理器
+
+        Args:
+            llm_client: LLM客户端
+            instructions: 共享的判断指令
+            slot_validator: 单条回答的验证器（与单条模式使用的验证器相同）
+            batch_size: 每批记录数
+            max_tokens_per_slot: 单条回答的max_tokens，批量请求按槽位数放大
+            module: 模块名称
+            component: 组件名称
+            temperature: 温度参数
+        """
+        self.llm_client = llm_client
+        self.instructions = instructions
+        self.slot_validator = slot_validator
+        self.batch_size = max(1, batch_size)
+        self.max_tokens_per_slot = max_tokens_per_slot
+        self.module = module
+        self.component = component
+        self.temperature = temperature
+
+        self.batch_requests = 0
+        self.slots_total = 0
+        self.slots_accepted = 0
+        self.slots_requeued = 0
+
+    def split(self, items: List[Any]) -> List[List[Any]]:
+        """按批大小切分"""
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+    async def run_batch(self, session: Optional[aiohttp.ClientSession], materials: List[str]) -> List[Optional[str]]:
+        """对一批材料发起一次批量请求
+
+        Args:
+            session: aiohttp会话
+            materials: 每条记录格式化后的分析材料
+
+        Returns:
+            与materials一一对应的回答，未通过验证或缺失的槽位为None（需单条重试）
+        """
+        count = len(materials)
+        self.slots_total += count
+        prompt = build_batch_prompt(self.instructions, materials)
+
+        def validate_batch_response(response: str) -> Union[bool, Dict[str, Any]]:
+            # 批量层面只要求至少解析出一个槽位，逐槽位的验证在后面进行
+            if parse_numbered_slots(response or "", count):
+                return True
+            return {'valid': False, 'error': '未找到以 [编号] 开头的逐条回答'}
+
+        answers: List[Optional[str]] = [None] * count
+        try:
+            self.batch_requests += 1
+            with request_slots(count):
+                response = await self.llm_client.call_async_with_format_validation(
+                    session, prompt,
+                    validator=validate_batch_response,
+                    max_tokens=self.max_tokens_per_slot * count + 32,
+                    temperature=self.temperature,
+                    module=self.module, component=self.component
+                )
+        except Exception as e:
+            logger.warning(f"批量请求失败，{count} 条记录转为单条请求: {e}")
+            self.slots_requeued += count
+            return answers
+
+        slots = parse_numbered_slots(response if isinstance(response, str) else "", count)
+        for index, answer in slots.items():
+            result = self.slot_validator(answer)
+            if result is True or (isinstance(result, dict) and result.get('valid', False)):
+                answers[index - 1] = answer
+
+        accepted = sum(1 for answer in answers if answer is not None)
+        self.slots_accepted += accepted
+        self.slots_requeued += count - accepted
+        return answers
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取批处理统计信息"""
+        return {
+            'batch_size': self.batch_size,
+            'batch_requests': self.batch_requests,
+            'slots_total': self.slots_total,
+            'slots_accepted': self.slots_accepted,
+            'slots_requeued': self.slots_requeued,
+            'acceptance_rate': self.slots_accepted / self.slots_total if self.slots_total else 0.0
+        }
@@ -0,0 +1,156 @@
+"""记录级流水线 - 多个LLM阶段通过有界队列串联
+
+逐步骤执行时，每个步骤都要等自己的 asyncio.gather 全部完成才开始下一步，
+每一步的长尾延迟串行累加，步骤之间LLM服务处于空闲状态。流水线模式下：
+- 每条记录完成一个阶段后立即进入下一个阶段的队列
+- 阶段之间的队列有界，下游变慢时上游自动等待（背压），在途记录数有上限
+- 每个阶段有独立的 worker 数（并发预算），不需要处理的记录直接透传
+- 输出保持输入顺序，各阶段的统计在结束后汇总
+"""
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+from tqdm.asyncio import tqdm_asyncio
+
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_DONE = object()
+
+
+class PipelineStage:
+    """流水线中的一个阶段"""
+
+    def __init__(self, name: str, process: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 select: Optional[Callable[[Dict[str, Any]], bool]] = None, concurrency: int = 10):
+        """初始化阶段
+
+        Args:
+            name: 阶段名称（通常为步骤类型）
+            process: 处理单条记录的协程函数，返回处理后的记录
+            select: 判断记录是否需要本阶段处理，为None时处理所有记录
+            concurrency: 本阶段的 worker 数
+        """
+        self.name = name
+        self.process = process
+        self.select = select
+        self.concurrency = max(1, concurrency)
+        self.counters: Dict[str, int] = {}
+        self.input_records = 0
+        self.processed_records = 0
+        self.skipped_records = 0
+        self.error_records = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+
+    def count(self, name: str, value: int = 1) -> None:
+        """累加阶段自定义计数（如 lack_info_records）"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_stats(self, pipeline_start: float) -> Dict[str, Any]:
+        return {
+            'stage': self.name,
+            'concurrency': self.concurrency,
+            'input_records': self.input_records,
+            'processed_records': self.processed_records,
+            'skipped_records': self.skipped_records,
+            'error_records': self.error_records,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'first_start_offset': round(self.first_start - pipeline_start, 3) if self.first_start else None,
+            'last_end_offset': round(self.last_end - pipeline_start, 3) if self.last_end else None,
+            'max_queue_depth': self.max_queue_depth,
+            **self.counters
+        }
+
+
+class RecordPipeline:
+    """按顺序串联多个阶段的记录流水线"""
+
+    def __init__(self, stages: List[PipelineStage], queue_size: int = 200, desc: str = "流水线处理"):
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.desc = desc
+        self.start_time = 0.0
+        self.wall_seconds = 0.0
+
+    async def _run_stage(self, stage: PipelineStage, in_queue: asyncio.Queue, out_queue: asyncio.Queue,
+                         downstream_workers: int) -> None:
+        async def worker():
+            while True:
+                item = await in_queue.get()
+                if item is _DONE:
+                    return
+                index, record = item
+                stage.input_records += 1
+                if stage.select is not None and not stage.select(record):
+                    stage.skipped_records += 1
+                else:
+                    started = time.monotonic()
+                    if stage.first_start is None:
+                        stage.first_start = started
+                    try:
+                        record = await stage.process(record)
+                        stage.processed_records += 1
+                    except Exception as e:
+                        stage.error_records += 1
+                        logger.warning(f"流水线阶段 {stage.name} 处理记录失败，原样传给下一阶段: {e}")
+                    stage.last_end = time.monotonic()
+                    stage.busy_seconds += stage.last_end - started
+                await out_queue.put((index, record))
+                stage.max_queue_depth = max(stage.max_queue_depth, in_queue.qsize())
+
+        await asyncio.gather(*(worker() for _ in range(stage.concurrency)))
+        for _ in range(downstream_workers):
+            await out_queue.put(_DONE)
+
+    async def run(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """让所有记录流经各阶段
+
+        Returns:
+            处理后的记录，顺序与输入一致
+        """
+        self.start_time = time.monotonic()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        results: List[Any] = [None] * len(records)
+
+        async def feed():
+            for item in enumerate(records):
+                await queues[0].put(item)
+            for _ in range(self.stages[0].concurrency if self.stages else 1):
+                await queues[0].put(_DONE)
+
+        async def collect(pbar):
+            while True:
+                item = await queues[-1].get()
+                if item is _DONE:
+                    return
+                index, record = item
+                results[index] = record
+                pbar.update(1)
+
+        with tqdm_asyncio(total=len(records), desc=self.desc) as pbar:
+            tasks = [asyncio.ensure_future(feed()), asyncio.ensure_future(collect(pbar))]
+            for i, stage in enumerate(self.stages):
+                downstream = self.stages[i + 1].concurrency if i + 1 < len(self.stages) else 1
+                tasks.append(asyncio.ensure_future(self._run_stage(stage, queues[i], queues[i + 1], downstream)))
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        self.wall_seconds = time.monotonic() - self.start_time
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各阶段统计及流水线总耗时"""
+        return {
+            'queue_size': self.queue_size,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'stages': [stage.get_stats(self.start_time) for stage in self.stages]
+        }
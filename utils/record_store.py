@@ -0,0 +1,160 @@
+"""记录存储 - 64位内容哈希ID + 字典索引
+
+工作流中多处需要按记录身份做拆分与合并（关键词数据与非关键词数据分离、处理结果合并回原数据集、
+RL数据与条件映射数据比对）。RecordStore 为每条记录计算稳定的64位内容哈希ID：
+- 主索引：记录ID → 记录位置，成员判断与按ID查找为 O(1)，键是一个整数而不是拼接的长字符串
+- 二级索引（首次查询时构建）：orm_code哈希、caller、source_file → 记录位置列表
+- 拆分/合并都只遍历一次数据，不复制整个数据集
+"""
+import hashlib
+import json
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple, Union
+
+# 默认身份字段：同一函数、同一段ORM代码、同一调用者视为同一条记录
+DEFAULT_KEY_FIELDS = ('function_name', 'orm_code', 'caller')
+
+# 类型标记字节：None、字符串与其他JSON值编码到互不相交的字节空间
+_TAG_NONE = b'N'
+_TAG_STR = b'S'
+_TAG_JSON = b'J'
+
+
+def _encode_value(value: Any) -> bytes:
+    """编码单个字段值：类型标记 + 8字节长度 + 内容
+
+    None 与 ''、字符串 '["a"]' 与列表 ["a"] 得到不同的字节；长度前缀保证相邻字段之间不会错位拼接。
+    """
+    if value is None:
+        return _TAG_NONE
+    if isinstance(value, str):
+        tag, payload = _TAG_STR, value.encode('utf-8')
+    else:
+        tag, payload = _TAG_JSON, json.dumps(value, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8')
+    return tag + len(payload).to_bytes(8, 'big') + payload
+
+
+def text_hash(text: Optional[str]) -> int:
+    """字符串的64位哈希（用于 orm_code 等大字段的索引键）"""
+    return int.from_bytes(hashlib.blake2b(_encode_value(text), digest_size=8).digest(), 'big')
+
+
+def record_key(record: Dict[str, Any], key_fields: Tuple[str, ...] = DEFAULT_KEY_FIELDS) -> int:
+    """按身份字段计算记录的64位内容哈希ID"""
+    hasher = hashlib.blake2b(digest_size=8)
+    for field in key_fields:
+        hasher.update(_encode_value(record.get(field)))
+    return int.from_bytes(hasher.digest(), 'big')
+
+
+class RecordStore:
+    """带主索引和二级索引的记录集合（保持插入顺序）"""
+
+    def __init__(self, records: Optional[Iterable[Dict[str, Any]]] = None,
+                 key_fields: Tuple[str, ...] = DEFAULT_KEY_FIELDS):
+        """
+        初始化记录存储
+
+        Args:
+            records: 初始记录，存储持有记录对象本身，不做复制
+            key_fields: 参与记录ID计算的身份字段
+        """
+        self.key_fields = tuple(key_fields)
+        self.records: List[Dict[str, Any]] = []
+        self.ids: List[int] = []
+        self._by_id: Dict[int, List[int]] = {}
+        self._secondary: Dict[str, Dict[Any, List[int]]] = {}
+        if records is not None:
+            self.extend(records)
+
+    def key(self, record: Dict[str, Any]) -> int:
+        """计算记录ID"""
+        return record_key(record, self.key_fields)
+
+    def add(self, record: Dict[str, Any]) -> int:
+        """添加一条记录，返回记录ID（身份相同的重复记录都会保留）"""
+        record_id = self.key(record)
+        position = len(self.records)
+        self.records.append(record)
+        self.ids.append(record_id)
+        self._by_id.setdefault(record_id, []).append(position)
+        for name, index in self._secondary.items():
+            index.setdefault(self._secondary_key(name, record), []).append(position)
+        return record_id
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.add(record)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def unique_count(self) -> int:
+        """不同记录ID的数量"""
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.records)
+
+    def __contains__(self, item: Union[int, Dict[str, Any]]) -> bool:
+        record_id = item if isinstance(item, int) else self.key(item)
+        return record_id in self._by_id
+
+    def get(self, item: Union[int, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """按记录ID（或身份相同的记录）查找，存在重复时返回最后添加的一条"""
+        record_id = item if isinstance(item, int) else self.key(item)
+        positions = self._by_id.get(record_id)
+        return self.records[positions[-1]] if positions else None
+
+    def items(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """按插入顺序遍历 (记录ID, 记录)"""
+        return zip(self.ids, self.records)
+
+    # ---------- 二级索引 ----------
+
+    @staticmethod
+    def _secondary_key(name: str, record: Dict[str, Any]) -> Any:
+        if name == 'orm_code':
+            return text_hash(record.get('orm_code'))
+        return record.get(name)
+
+    def _index(self, name: str) -> Dict[Any, List[int]]:
+        index = self._secondary.get(name)
+        if index is None:
+            index = {}
+            for position, record in enumerate(self.records):
+                index.setdefault(self._secondary_key(name, record), []).append(position)
+            self._secondary[name] = index
+        return index
+
+    def find_by_orm_code(self, orm_code: str) -> List[Dict[str, Any]]:
+        """查找 orm_code 相同的记录"""
+        return [self.records[p] for p in self._index('orm_code').get(text_hash(orm_code), [])
+                if self.records[p].get('orm_code') == orm_code]
+
+    def find_by_caller(self, caller: str) -> List[Dict[str, Any]]:
+        """查找 caller 相同的记录"""
+        return [self.records[p] for p in self._index('caller').get(caller, [])]
+
+    def find_by_source_file(self, source_file: str) -> List[Dict[str, Any]]:
+        """查找来自同一源文件的记录"""
+        return [self.records[p] for p in self._index('source_file').get(source_file, [])]
+
+    # ---------- 拆分与合并 ----------
+
+    def partition(self, other: Union["RecordStore", Iterable[Dict[str, Any]]]
+                  ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """按 other 中的记录身份拆分本存储
+
+        Returns:
+            (身份出现在 other 中的记录, 其余记录)，均保持原顺序
+        """
+        other_ids = other._by_id if isinstance(other, RecordStore) else {self.key(r) for r in other}
+        matched, rest = [], []
+        for record_id, record in zip(self.ids, self.records):
+            (matched if record_id in other_ids else rest).append(record)
+        return matched, rest
+
+    def without(self, other: Union["RecordStore", Iterable[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """身份不在 other 中的记录（保持原顺序）"""
+        return self.partition(other)[1]
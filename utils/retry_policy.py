@@ -0,0 +1,354 @@
+"""统一重试策略 - 退避抖动 + 全局重试预算 + 按端点熔断
+
+- 退避：decorrelated jitter，``delay = min(max_delay, uniform(base_delay, previous_delay * 3))``，
+  各请求的重试时间点相互错开，避免一次故障后所有请求同步重试
+- 重试预算：每次请求向全局预算存入 ``budget_ratio`` 个令牌，每次重试取出一个令牌；
+  令牌耗尽时不再重试，重试流量最多约为正常请求的 ``budget_ratio`` 倍
+- 熔断器：同一端点连续失败达到阈值后打开，恢复时间过后放行一个探测请求（半开），成功则关闭。
+  打开期间请求不发往该端点，而是等待探测结果（wait_for_circuit），累计等待超过 max_circuit_wait
+  仍未恢复时才抛出 CircuitOpenError。只有端点故障（连接错误、超时、429/5xx）
+  计入熔断，模型输出内容的问题（空响应、JSON解析失败等）说明端点本身是正常的
+- 请求计数只在最内层（真正发出HTTP请求的一层）记入预算：包装 LLMClient 的外层重试
+  传入 record_requests=False，避免同一次尝试被计数两次
+
+LLMClient、get_sql.retry_with_exponential_backoff 和 ReverseSQLGenerator._retry_with_backoff
+共用同一个全局策略实例（get_retry_policy）。
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable, Iterable, TypeVar
+
+import aiohttp
+
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    openai = None
+    OPENAI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求被快速拒绝"""
+    pass
+
+
+def is_endpoint_failure(e: BaseException) -> bool:
+    """是否为端点故障（连接错误、超时、429、5xx），只有这类失败计入熔断"""
+    if isinstance(e, (asyncio.TimeoutError, TimeoutError, ConnectionError, aiohttp.ClientConnectionError,
+                      aiohttp.ClientPayloadError)):
+        return True
+    if OPENAI_AVAILABLE and isinstance(e, openai.APIConnectionError):
+        return True
+    status = getattr(e, 'status', None)
+    if not isinstance(status, int):
+        status = getattr(e, 'status_code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return False
+
+
+class CircuitBreaker:
+    """单个端点的熔断器（closed -> open -> half_open -> closed）"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    # 半开状态下等待探测结果时的轮询间隔（秒）
+    PROBE_POLL_INTERVAL = 0.5
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.open_count = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于拒绝请求的状态（不改变状态，可用于路由时跳过该端点）"""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at < self.recovery_timeout
+        return self.state == self.HALF_OPEN and self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        """是否放行本次请求；恢复时间过后只放行一个探测请求"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def retry_after(self) -> float:
+        """距离该端点可能放行下一个请求的秒数（关闭状态为0）"""
+        if self.state == self.OPEN:
+            return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+        if self.state == self.HALF_OPEN and self._probe_in_flight:
+            return min(self.PROBE_POLL_INTERVAL, self.recovery_timeout)
+        return 0.0
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"✅ 熔断器 {self.name} 探测成功，恢复请求")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.open_count += 1
+            self._probe_in_flight = False
+            logger.warning(f"⚠️ 熔断器 {self.name} 打开: 连续失败 {self.consecutive_failures} 次，"
+                           f"{self.recovery_timeout:.0f} 秒内不再向该端点发送请求")
+
+    def cancel_probe(self) -> None:
+        """探测请求未得出结论（被取消或非网络错误）时，允许下一个请求继续探测"""
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'open_count': self.open_count,
+            'rejected': self.rejected
+        }
+
+
+class RetryBudget:
+    """全局重试预算（令牌桶）"""
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 10.0, max_tokens: float = 100.0):
+        """初始化重试预算
+
+        Args:
+            ratio: 每次请求存入的令牌数，即允许的重试/请求比例
+            min_tokens: 初始令牌数，保证低流量时也能少量重试
+            max_tokens: 令牌上限，避免长时间空闲后积累过多重试额度
+        """
+        self.ratio = ratio
+        self.max_tokens = max(max_tokens, min_tokens)
+        self.tokens = float(min_tokens)
+        self.requests = 0
+        self.retries = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        """申请一次重试，预算不足时返回False"""
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                self.retries += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'ratio': self.ratio,
+            'tokens': round(self.tokens, 2),
+            'requests': self.requests,
+            'retries': self.retries,
+            'rejected_retries': self.rejected
+        }
+
+
+class RetryPolicy:
+    """可复用的重试策略"""
+
+    def __init__(self, max_retries: int = 10, base_delay: float = 1.0, max_delay: float = 60.0,
+                 budget: Optional[RetryBudget] = None, failure_threshold: int = 5,
+                 recovery_timeout: float = 30.0, max_circuit_wait: float = 300.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_circuit_wait = max_circuit_wait
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get_breaker(self, endpoint: str) -> CircuitBreaker:
+        """获取指定端点的熔断器"""
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(endpoint, self.failure_threshold, self.recovery_timeout)
+            self._breakers[endpoint] = breaker
+        return breaker
+
+    async def wait_for_circuit(self, endpoints: Iterable[str], waited: float, name: str = "") -> float:
+        """所有可用端点都熔断时，等待最早可能恢复的端点（半开探测）
+
+        Args:
+            endpoints: 端点标识
+            waited: 本次请求已经等待熔断恢复的累计秒数
+            name: 用于错误信息的名称
+
+        Returns:
+            本次等待的秒数
+
+        Raises:
+            CircuitOpenError: 累计等待达到 max_circuit_wait 仍未恢复
+        """
+        if waited >= self.max_circuit_wait:
+            raise CircuitOpenError(f"{name} 熔断中，已等待 {waited:.1f} 秒仍未恢复")
+        delay = min((self.get_breaker(endpoint).retry_after() for endpoint in endpoints), default=0.0)
+        # 稍加抖动，避免等待者在同一时刻一起轮询
+        delay = min(max(delay, 0.05) * random.uniform(1.0, 1.2), self.max_circuit_wait - waited)
+        await asyncio.sleep(delay)
+        return delay
+
+    def next_delay(self, previous_delay: Optional[float] = None, base_delay: Optional[float] = None,
+                   max_delay: Optional[float] = None) -> float:
+        """decorrelated jitter 退避时间
+
+        Args:
+            previous_delay: 上一次的退避时间，首次重试为None
+            base_delay: 基础延迟，为None时使用策略默认值
+            max_delay: 最大延迟，为None时使用策略默认值
+        """
+        base = self.base_delay if base_delay is None else base_delay
+        cap = self.max_delay if max_delay is None else max_delay
+        upper = max(base, (previous_delay or base) * 3)
+        return min(cap, random.uniform(base, upper))
+
+    def delay_for_attempt(self, attempt: int, base_delay: Optional[float] = None,
+                          max_delay: Optional[float] = None) -> float:
+        """无状态调用方使用：按尝试序号（从0开始）计算退避时间"""
+        base = self.base_delay if base_delay is None else base_delay
+        return self.next_delay(base * (3 ** (attempt - 1)) if attempt > 0 else None, base, max_delay)
+
+    async def run(self, operation: Callable[[], Awaitable[T]], operation_name: str = "",
+                  endpoint: Optional[str] = None, max_retries: Optional[int] = None,
+                  base_delay: Optional[float] = None, max_delay: Optional[float] = None,
+                  is_retryable: Optional[Callable[[Exception], bool]] = None,
+                  on_retry: Optional[Callable[[int, Exception, float], None]] = None,
+                  record_requests: bool = True) -> T:
+        """按策略执行异步操作
+
+        Args:
+            operation: 无参异步函数
+            operation_name: 操作名称（用于日志）
+            endpoint: 端点标识，提供时启用该端点的熔断器（只有端点故障计入熔断）
+            max_retries: 最大重试次数（不含首次尝试），为None时使用策略默认值
+            base_delay: 基础退避时间
+            max_delay: 最大退避时间
+            is_retryable: 判断异常是否可重试，默认除熔断外都重试
+            on_retry: 每次重试前的回调 (尝试序号, 异常, 退避时间)
+            record_requests: 是否把每次尝试记入重试预算的请求数；operation 内部已经记录
+                （如调用 LLMClient）时传入False
+
+        Returns:
+            操作结果
+
+        Raises:
+            最后一次的异常；熔断打开且等待 max_circuit_wait 后仍未恢复时为 CircuitOpenError
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        breaker = self.get_breaker(endpoint) if endpoint else None
+        delay = None
+        circuit_waited = 0.0
+
+        for attempt in range(max_retries + 1):
+            # 熔断打开时等待探测恢复，不占用重试次数
+            while breaker is not None and not breaker.allow_request():
+                circuit_waited += await self.wait_for_circuit([endpoint], circuit_waited, endpoint)
+            if record_requests:
+                self.budget.record_request()
+            try:
+                result = await operation()
+            except asyncio.CancelledError:
+                if breaker is not None:
+                    breaker.cancel_probe()
+                raise
+            except Exception as e:
+                if breaker is not None:
+                    if is_endpoint_failure(e):
+                        breaker.record_failure()
+                    elif isinstance(e, CircuitOpenError):
+                        breaker.cancel_probe()
+                    else:
+                        # 端点正常返回，只是内容有问题
+                        breaker.record_success()
+                if isinstance(e, CircuitOpenError) or (is_retryable is not None and not is_retryable(e)):
+                    raise
+                if attempt >= max_retries:
+                    raise
+                if not self.budget.try_acquire():
+                    logger.warning(f"⚠️ 全局重试预算已耗尽，{operation_name or '操作'} 不再重试")
+                    raise
+                delay = self.next_delay(delay, base_delay, max_delay)
+                if on_retry is not None:
+                    on_retry(attempt, e, delay)
+                else:
+                    logger.warning(f"❌ {operation_name or '操作'} 第 {attempt + 1} 次尝试失败，"
+                                   f"{delay:.2f}秒后重试: {str(e)[:100]}")
+                await asyncio.sleep(delay)
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
+        raise RuntimeError("unreachable")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """导出预算与熔断器状态"""
+        return {
+            'budget': self.budget.get_stats(),
+            'circuit_breakers': {name: b.get_stats() for name, b in self._breakers.items()}
+        }
+
+
+# 全局策略实例
+_global_retry_policy: Optional[RetryPolicy] = None
+
+
+def get_retry_policy() -> RetryPolicy:
+    """获取全局重试策略（单例模式，参数来自 workflow_settings.retry）"""
+    global _global_retry_policy
+    if _global_retry_policy is None:
+        try:
+            from config.data_processing.workflow.workflow_config import get_workflow_config
+            config = get_workflow_config().get_retry_policy_config()
+        except Exception as e:
+            logger.warning(f"获取重试策略配置失败，使用默认值: {e}")
+            config = {}
+        _global_retry_policy = RetryPolicy(
+            max_retries=config.get('max_retries', 10),
+            base_delay=config.get('retry_delay', 1.0),
+            max_delay=config.get('max_delay', 60.0),
+            budget=RetryBudget(
+                ratio=config.get('budget_ratio', 0.2),
+                min_tokens=config.get('budget_min_retries', 10),
+                max_tokens=config.get('budget_max_retries', 100)
+            ),
+            failure_threshold=config.get('breaker_failure_threshold', 5),
+            recovery_timeout=config.get('breaker_recovery_timeout', 30.0),
+            max_circuit_wait=config.get('breaker_max_wait', 300.0)
+        )
+    return _global_retry_policy
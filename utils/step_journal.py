@@ -0,0 +1,410 @@
+"""工作流步骤检查点 - 追加写的JSONL日志 + 流式写出最终文件
+
+LLM步骤每完成一条记录就向 ``<step_name>.journal.jsonl`` 追加一行 ``{"id": 记录ID, "result": 处理结果}``，
+并按时间/条数周期性fsync。步骤中途崩溃后在同一工作流目录重跑该步骤时：
+- 读取日志，已完成的记录直接复用日志中的结果，只把剩余记录发给LLM
+- 日志末尾被截断的半行会被忽略并截掉
+
+增量重跑：
+- 记录ID是记录输入内容（orm_code、caller、code_meta_data、sql_statement_list 及记录身份字段）的哈希
+- 日志首行记录步骤指纹（提示词模板哈希、服务器、max_tokens 等），指纹变化时旧结果全部作废
+- 指定上一次的工作流目录时，输入哈希与步骤指纹都未变化的记录直接从上次的日志复制过来，
+  只有新增或变化的记录会重新计算
+
+步骤结束后用 write_records 按配置的输出格式逐条写出最终的 ``<step_name>.json``（或 .jsonl / .jsonl.zst，先写临时文件再原子替换），
+随后 finalize 把日志压缩为去重的结果索引 ``<step_name>.result_index.jsonl.gz``（``{"id": 记录ID, "result": 处理结果}``，
+首行同样是步骤指纹），日志默认删除（keep_journal 为True时保留）。结果索引在日志删除后仍然保留，
+下一次增量重跑（--previous-workflow）以及在同一目录重跑已完成的步骤（--resume）都从结果索引复用结果。
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from collections.abc import Mapping
+from typing import Optional, Dict, Any, List, Iterable, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# 参与记录ID计算的字段：LLM步骤的输入，加上记录身份字段（复用的结果中带有这些字段，不能张冠李戴）
+RECORD_ID_FIELDS = ('orm_code', 'caller', 'code_meta_data', 'sql_statement_list', 'function_name', 'source_file')
+
+JOURNAL_SUFFIX = '.journal.jsonl'
+RESULT_INDEX_SUFFIX = '.result_index.jsonl.gz'
+
+
+def _stable_hash(value: Any) -> str:
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def record_content_id(record: Dict[str, Any], id_fields: Sequence[str] = RECORD_ID_FIELDS) -> str:
+    """按记录输入内容计算稳定的记录ID（与记录在列表中的位置无关）
+
+    Args:
+        record: 步骤的输入记录
+        id_fields: 参与计算的字段，输入不是数据集记录的步骤（如冗余SQL候选项、修复审核请求）传入自己的输入字段
+    """
+    return _stable_hash({field: record.get(field) for field in id_fields})
+
+
+def step_fingerprint(**config: Any) -> str:
+    """计算步骤配置指纹，如 step_fingerprint(prompt=模板, server=服务器, max_tokens=100)
+
+    字符串类的大段配置（提示词模板）同样直接传入，按内容参与哈希。
+    """
+    return _stable_hash(config)
+
+
+def _json_default(value: Any) -> Any:
+    """json序列化普通字典以外的映射（如 FunctionRecordView）"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_json_array(output_file: Union[str, Path], records: Iterable[Any], indent: int = 2) -> int:
+    """逐条写出JSON数组，格式与 json.dump(records, indent=indent) 一致（记录可以是 FunctionRecordView 等映射）
+
+    先写入同目录的临时文件，完成后原子替换目标文件，中途失败不会留下半个文件。
+
+    Returns:
+        写出的记录数
+    """
+    output_file = Path(output_file)
+    tmp_file = output_file.with_name(output_file.name + '.tmp')
+    pad = ' ' * indent
+    count = 0
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(',\n' if count else '[\n')
+            f.write(pad + json.dumps(record, ensure_ascii=False, indent=indent, default=_json_default).replace('\n', '\n' + pad))
+            count += 1
+        f.write('\n]' if count else '[]')
+    os.replace(tmp_file, output_file)
+    return count
+
+
+def write_records(output_file: Union[str, Path], records: Iterable[Any], indent: int = 2) -> int:
+    """按文件名后缀的格式写出记录文件（.json / .jsonl / .jsonl.zst）
+
+    .json 与 write_json_array 相同；JSONL 格式每行一条紧凑记录，.zst 按配置的压缩级别压缩。
+    同样先写临时文件再原子替换。
+
+    Returns:
+        写出的记录数
+    """
+    from utils.json_stream import detect_format, is_jsonl_file, open_text, write_jsonl, zstd_level
+
+    output_file = Path(output_file)
+    if not is_jsonl_file(output_file):
+        return write_json_array(output_file, records, indent=indent)
+    tmp_file = output_file.with_name(output_file.name + '.tmp')
+    try:
+        with open_text(tmp_file, 'w', level=zstd_level(),
+                       compressed=detect_format(output_file) == 'jsonl.zst') as f:
+            count = write_jsonl(f, records, default=_json_default)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_file, output_file)
+    return count
+
+
+class StepJournal:
+    """单个步骤的追加写检查点日志"""
+
+    def __init__(self, journal_file: Union[str, Path], fsync_interval: float = 5.0,
+                 fsync_every: int = 1000, keep_journal: bool = False, enabled: bool = True,
+                 fingerprint: Optional[str] = None,
+                 previous_journal_file: Optional[Union[str, Path]] = None,
+                 result_index_file: Optional[Union[str, Path]] = None,
+                 id_fields: Sequence[str] = RECORD_ID_FIELDS):
+        """初始化步骤日志
+
+        Args:
+            journal_file: 日志文件路径（<step_name>.journal.jsonl）
+            fsync_interval: 距上次fsync超过该秒数时fsync
+            fsync_every: 累计写入该条数时fsync
+            keep_journal: finalize 后是否保留日志文件
+            enabled: 为False时不读写日志，所有记录都重新处理
+            fingerprint: 步骤配置指纹，与日志中记录的不一致时不复用旧结果
+            previous_journal_file: 上一次工作流中同一步骤的结果索引或日志，用于增量重跑
+            result_index_file: finalize 时写出的结果索引，默认与日志同目录的 <step_name>.result_index.jsonl.gz
+            id_fields: 计算记录ID的字段，见 record_content_id
+        """
+        self.journal_file = Path(journal_file)
+        self.fsync_interval = fsync_interval
+        self.fsync_every = max(1, fsync_every)
+        self.keep_journal = keep_journal
+        self.enabled = enabled
+        self.fingerprint = fingerprint
+        self.id_fields = tuple(id_fields)
+        self.result_index_file = Path(result_index_file) if result_index_file else _index_path_for(self.journal_file)
+        self._resumed: Dict[str, Any] = {}
+        self._previous: Dict[str, Any] = {}
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.appended = 0
+        self.copied_forward = 0
+        if enabled:
+            if not self._load(self.journal_file, self._resumed, truncate=True):
+                self.journal_file.unlink()
+            if previous_journal_file and Path(previous_journal_file).resolve() != self.journal_file.resolve():
+                if Path(previous_journal_file).exists():
+                    self._load(Path(previous_journal_file), self._previous, truncate=False)
+                else:
+                    logger.warning(f"⚠️ 上次工作流中没有该步骤的结果索引或日志，全部记录重新计算: "
+                                   f"{previous_journal_file}")
+                if self._previous:
+                    logger.info(f"♻️ 上次工作流中有 {len(self._previous):,} 条可复用结果: {previous_journal_file}")
+            if not self.journal_file.exists() and self.result_index_file.exists():
+                # 本目录中该步骤已完成过（日志已随 finalize 删除），按结果索引复用，用到的结果复制进新日志
+                index_entries: Dict[str, Any] = {}
+                self._load(self.result_index_file, index_entries, truncate=False)
+                if index_entries:
+                    logger.info(f"♻️ 从结果索引恢复 {len(index_entries):,} 条已完成记录: {self.result_index_file}")
+                self._previous.update(index_entries)
+            if self._resumed:
+                logger.info(f"♻️ 从检查点日志恢复 {len(self._resumed):,} 条已完成记录: {self.journal_file}")
+
+    def _load(self, journal_file: Path, entries: Dict[str, Any], truncate: bool) -> bool:
+        """读取日志到 entries
+
+        Returns:
+            日志是否可用；步骤指纹不一致时返回False且不读取任何结果
+        """
+        if not journal_file.exists():
+            return True
+        valid_size = 0
+        header = None
+        opener = gzip.open if journal_file.name.endswith('.gz') else open
+        with opener(journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if valid_size == 0 and 'fingerprint' in entry:
+                        header = entry
+                    else:
+                        entries[entry['id']] = entry['result']
+                except (ValueError, KeyError, TypeError):
+                    break
+                valid_size += len(line)
+        if self.fingerprint is not None and (header or {}).get('fingerprint') != self.fingerprint:
+            # 配置变化，或日志没有指纹头无法确认配置，不复用
+            if entries:
+                logger.info(f"🔄 步骤配置已变化，不复用日志中的结果: {journal_file}")
+            entries.clear()
+            return False
+        if truncate and valid_size < journal_file.stat().st_size:
+            logger.warning(f"⚠️ 检查点日志末尾不完整，已截断: {journal_file}")
+            with open(journal_file, 'r+b') as f:
+                f.truncate(valid_size)
+        return True
+
+    @property
+    def resumed_count(self) -> int:
+        """复用的结果数（本目录日志恢复的 + 从上次工作流复制过来的）"""
+        return len(self._resumed)
+
+    def pending(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """筛选出尚未完成的记录（保持原顺序）
+
+        上次工作流日志中存在的记录会被复制进本次日志，不再计入待处理记录。
+        """
+        if not self._resumed and not self._previous:
+            return list(records)
+        pending_records = []
+        for record in records:
+            record_id = record_content_id(record, self.id_fields)
+            if record_id in self._resumed:
+                continue
+            if record_id in self._previous:
+                result = self._previous.pop(record_id)
+                self._resumed[record_id] = result
+                self._write(record_id, result)
+                self.copied_forward += 1
+                continue
+            pending_records.append(record)
+        self._previous.clear()
+        if self.copied_forward:
+            logger.info(f"♻️ 从上次工作流复制 {self.copied_forward:,} 条未变化记录的结果，"
+                        f"需要重新计算 {len(pending_records):,} 条")
+        return pending_records
+
+    def lookup(self, record: Dict[str, Any]) -> Optional[Any]:
+        """查找单条记录在日志中的结果（逐条处理的流水线使用），未找到时返回None
+
+        上次工作流日志中的结果会被复制进本次日志。
+        """
+        record_id = record_content_id(record, self.id_fields)
+        if record_id in self._resumed:
+            return self._resumed[record_id]
+        if record_id in self._previous:
+            result = self._previous.pop(record_id)
+            self._resumed[record_id] = result
+            self._write(record_id, result)
+            self.copied_forward += 1
+            return result
+        return None
+
+    def merge(self, records: List[Dict[str, Any]], pending_results: List[Any]) -> List[Any]:
+        """把日志中的结果与本次处理结果按 records 的原顺序合并
+
+        Args:
+            records: 步骤的全部输入记录
+            pending_results: pending(records) 中各记录的处理结果（顺序一致）
+        """
+        if not self._resumed:
+            return list(pending_results)
+        results = iter(pending_results)
+        merged = []
+        for record in records:
+            record_id = record_content_id(record, self.id_fields)
+            merged.append(self._resumed[record_id] if record_id in self._resumed else next(results))
+        return merged
+
+    def append(self, record: Dict[str, Any], result: Any) -> None:
+        """追加一条已完成记录的结果"""
+        if not self.enabled:
+            return
+        self._write(record_content_id(record, self.id_fields), result)
+        self.appended += 1
+
+    def _write(self, record_id: str, result: Any) -> None:
+        if self._file is None:
+            self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+            is_new = not self.journal_file.exists() or self.journal_file.stat().st_size == 0
+            self._file = open(self.journal_file, 'a', encoding='utf-8')
+            if is_new and self.fingerprint is not None:
+                self._file.write(json.dumps({'fingerprint': self.fingerprint}) + '\n')
+        self._file.write(json.dumps({'id': record_id, 'result': result}, ensure_ascii=False, default=str) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync()
+
+    def _sync(self) -> None:
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """fsync并关闭日志（保留文件，便于下次恢复）"""
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def finalize(self) -> None:
+        """步骤的最终文件已写出：关闭日志并写出结果索引，按配置删除日志"""
+        self.close()
+        if not self.enabled:
+            return
+        if self.journal_file.exists():
+            self._write_result_index()
+        if not self.keep_journal and self.journal_file.exists():
+            self.journal_file.unlink()
+
+    def _write_result_index(self) -> None:
+        """把日志压缩为去重的结果索引（先写临时文件再原子替换）"""
+        tmp_file = self.result_index_file.with_name(self.result_index_file.name + '.tmp')
+        seen = set()
+        count = 0
+        try:
+            with open(self.journal_file, 'rb') as src, gzip.open(tmp_file, 'wb', compresslevel=6) as dst:
+                if self.fingerprint is not None:
+                    dst.write(json.dumps({'fingerprint': self.fingerprint}).encode('utf-8') + b'\n')
+                for line in src:
+                    try:
+                        entry = json.loads(line)
+                        record_id = entry['id']
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    if record_id in seen:
+                        continue
+                    seen.add(record_id)
+                    dst.write(line if line.endswith(b'\n') else line + b'\n')
+                    count += 1
+            os.replace(tmp_file, self.result_index_file)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
+        logger.debug(f"结果索引已写出: {self.result_index_file}（{count:,} 条）")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'journal_file': str(self.journal_file),
+            'fingerprint': self.fingerprint,
+            'resumed_records': len(self._resumed) - self.copied_forward,
+            'copied_forward_records': self.copied_forward,
+            'appended_records': self.appended
+        }
+
+
+def journal_path(output_dir: Union[str, Path], step_name: str) -> Path:
+    """步骤日志文件路径（与 jsonl 格式的步骤输出 <step_name>.jsonl 区分开）"""
+    return Path(output_dir) / f"{step_name}{JOURNAL_SUFFIX}"
+
+
+def result_index_path(output_dir: Union[str, Path], step_name: str) -> Path:
+    """步骤结果索引文件路径"""
+    return Path(output_dir) / f"{step_name}{RESULT_INDEX_SUFFIX}"
+
+
+def _index_path_for(journal_file: Path) -> Path:
+    name = journal_file.name
+    step_name = name[:-len(JOURNAL_SUFFIX)] if name.endswith(JOURNAL_SUFFIX) else journal_file.stem
+    return journal_file.with_name(step_name + RESULT_INDEX_SUFFIX)
+
+
+def _previous_journal_path(previous_output_dir: Union[str, Path], step_name: str) -> Path:
+    """上次工作流的步骤结果：优先结果索引，其次（中断的步骤留下的）日志；
+    旧版本工作流目录中日志名为 <step_name>.jsonl"""
+    for path in (result_index_path(previous_output_dir, step_name),
+                 journal_path(previous_output_dir, step_name),
+                 Path(previous_output_dir) / f"{step_name}.jsonl"):
+        if path.exists():
+            return path
+    return result_index_path(previous_output_dir, step_name)
+
+
+def has_reusable_results(workflow_dir: Union[str, Path]) -> bool:
+    """工作流目录中是否有可供增量重跑复用的步骤结果（结果索引或检查点日志）"""
+    workflow_dir = Path(workflow_dir)
+    return any(next(workflow_dir.glob(pattern), None) is not None
+               for pattern in (f"**/*{RESULT_INDEX_SUFFIX}", f"**/*{JOURNAL_SUFFIX}"))
+
+
+def open_step_journal(output_dir: Union[str, Path], step_name: str, fingerprint: Optional[str] = None,
+                      previous_output_dir: Optional[Union[str, Path]] = None,
+                      id_fields: Sequence[str] = RECORD_ID_FIELDS) -> StepJournal:
+    """按 workflow_settings.checkpoint 配置打开 output_dir/<step_name>.journal.jsonl
+
+    Args:
+        output_dir: 步骤输出目录
+        step_name: 步骤名称
+        fingerprint: 步骤配置指纹（step_fingerprint 的结果）
+        previous_output_dir: 上一次工作流中该步骤的输出目录，提供时复用其中未变化记录的结果
+        id_fields: 计算记录ID的字段，见 record_content_id
+    """
+    try:
+        from config.data_processing.workflow.workflow_config import get_workflow_config
+        config = get_workflow_config().get_checkpoint_config()
+    except Exception as e:
+        logger.warning(f"获取检查点配置失败，使用默认值: {e}")
+        config = {}
+    return StepJournal(
+        journal_path(output_dir, step_name),
+        fsync_interval=config.get('fsync_interval', 5.0),
+        fsync_every=config.get('fsync_every', 1000),
+        keep_journal=config.get('keep_journal', False),
+        enabled=config.get('enabled', True),
+        fingerprint=fingerprint,
+        previous_journal_file=_previous_journal_path(previous_output_dir, step_name) if previous_output_dir else None,
+        id_fields=id_fields
+    )
@@ -0,0 +1,221 @@
+"""工作流步骤资源剖析
+
+WorkflowManager 的步骤方法用 profile_step 装饰后，每次执行都会记录：
+- 墙钟时间与进程CPU时间
+- 峰值RSS相对步骤开始时的增量（后台线程定期采样）
+- LLM调用次数、HTTP请求数与 token 数（LLMMetrics 按当前任务上下文回报给所属步骤）
+- 写入磁盘的字节数（Linux 读取 /proc/self/io 的 wchar）
+
+结果写入步骤返回的 step_info['profile']，随 workflow_steps 保存到工作流摘要。
+LLM 计数按任务上下文归属，并发运行的步骤互不干扰；CPU时间、RSS 和写入字节是进程级的，
+与其他步骤并发运行时会包含对方的消耗。
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# 当前任务上下文所属的步骤剖析器
+_current_profiler: contextvars.ContextVar[Optional["StepProfiler"]] = contextvars.ContextVar(
+    'current_step_profiler', default=None
+)
+
+
+def current_rss_bytes() -> int:
+    """当前进程RSS（Linux读取 /proc，其他平台退化为历史峰值）"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def bytes_written() -> Optional[int]:
+    """进程累计写出的字节数（/proc/self/io 的 wchar），不可用时返回None"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class PeakRSSSampler:
+    """后台线程定期采样RSS，记录期间的峰值"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start_rss = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start_rss = current_rss_bytes()
+        self.peak = self.start_rss
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+
+class StepProfiler:
+    """单次步骤执行的资源剖析"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.parent: Optional["StepProfiler"] = None
+        self.llm_calls = 0
+        self.llm_requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+        self._sampler = PeakRSSSampler()
+        self._token = None
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.bytes_written: Optional[int] = None
+
+    def start(self) -> None:
+        self.parent = _current_profiler.get()
+        self._token = _current_profiler.set(self)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._written_start = bytes_written()
+        self._sampler.__enter__()
+
+    def stop(self) -> None:
+        self._sampler.__exit__(None, None, None)
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.cpu_seconds = time.process_time() - self._cpu_start
+        written_end = bytes_written()
+        if written_end is not None and self._written_start is not None:
+            self.bytes_written = written_end - self._written_start
+        if self._token is not None:
+            _current_profiler.reset(self._token)
+            self._token = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.stop()
+        return False
+
+    def add_llm(self, calls: int = 0, requests: int = 0, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        """累加LLM计数（嵌套步骤同时计入外层步骤）"""
+        profiler = self
+        while profiler is not None:
+            with profiler._lock:
+                profiler.llm_calls += calls
+                profiler.llm_requests += requests
+                profiler.prompt_tokens += prompt_tokens
+                profiler.completion_tokens += completion_tokens
+            profiler = profiler.parent
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'wall_seconds': round(self.wall_seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            'peak_rss_delta_mb': round((self._sampler.peak - self._sampler.start_rss) / 1024 / 1024, 1),
+            'peak_rss_mb': round(self._sampler.peak / 1024 / 1024, 1),
+            'llm_calls': self.llm_calls,
+            'llm_requests': self.llm_requests,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'bytes_written': self.bytes_written
+        }
+
+
+def get_current_profiler() -> Optional[StepProfiler]:
+    """当前任务上下文所属的步骤剖析器"""
+    return _current_profiler.get()
+
+
+def _step_name(func: Callable, args: tuple, kwargs: Dict[str, Any]) -> str:
+    """调用时的 step_name 参数（方法没有该参数时使用方法名）"""
+    try:
+        bound = inspect.signature(func).bind(None, *args, **kwargs)
+    except TypeError:
+        return func.__name__
+    bound.apply_defaults()
+    step_name = bound.arguments.get('step_name')
+    return step_name if isinstance(step_name, str) else func.__name__
+
+
+def _attach_profile(manager: Any, result: Any, profiler: StepProfiler, steps_before: int) -> None:
+    """把剖析结果写入本次调用追加到 workflow_steps 的 step_info
+
+    优先使用返回值本身；返回值不是 step_info 时（如 run_sql_cleaning 返回清洗结果），
+    按 step_name 在本次调用期间新增的步骤中查找（并发运行的其他步骤也可能在此期间追加）。
+    """
+    stats = profiler.get_stats()
+    steps = getattr(manager, 'workflow_steps', None) or []
+    target = None
+    if isinstance(result, dict) and any(step is result for step in steps):
+        target = result
+    else:
+        for step in reversed(steps[steps_before:]):
+            if isinstance(step, dict) and step.get('step_name') == profiler.name:
+                target = step
+                break
+    if target is not None:
+        target['profile'] = stats
+    else:
+        logger.debug(f"步骤 {profiler.name} 未找到对应的 step_info，剖析结果未保存: {stats}")
+
+
+def profile_step(func: Callable) -> Callable:
+    """装饰 WorkflowManager 的步骤方法（同步或异步），把资源剖析写入该步骤的 step_info"""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            profiler = StepProfiler(_step_name(func, args, kwargs))
+            steps_before = len(getattr(self, 'workflow_steps', None) or [])
+            async with profiler:
+                result = await func(self, *args, **kwargs)
+            _attach_profile(self, result, profiler, steps_before)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        profiler = StepProfiler(_step_name(func, args, kwargs))
+        steps_before = len(getattr(self, 'workflow_steps', None) or [])
+        with profiler:
+            result = func(self, *args, **kwargs)
+        _attach_profile(self, result, profiler, steps_before)
+        return result
+    return wrapper
@@ -114,7 +114,8 @@ class WorkflowVisualizer:
                 'validation_stats': step.get('validation_stats', {}),
                 'keyword_statistics': step.get('keyword_statistics', {}),
                 'non_keyword_records': step.get('non_keyword_records', 0),
-                'keyword_data': step.get('keyword_data', {})
+                'keyword_data': step.get('keyword_data', {}),
+                'profile': step.get('profile', {})
             }
             
             stats['steps'].append(step_data)
@@ -750,6 +751,80 @@ class WorkflowVisualizer:
         logger.info(f"Performance analysis chart saved: {filepath}")
         return str(filepath)
     
+    def create_resource_profile_chart(self, stats: Dict[str, Any], title: str = "Workflow Resource Profile") -> str:
+        """
+        创建按步骤的耗时与成本图表（墙钟/CPU时间、LLM调用与token、峰值内存增量、写盘字节）
+        
+        Args:
+            stats: 统计数据
+            title: 图表标题
+            
+        Returns:
+            保存的文件路径
+        """
+        steps = [step for step in stats.get('steps', []) if step.get('profile')]
+        if not steps:
+            logger.warning("No step profile data, skipping resource profile chart generation")
+            return ""
+        
+        profiles = [step['profile'] for step in steps]
+        step_names = [step.get('name', 'Unknown') for step in steps]
+        y = np.arange(len(step_names))
+        height = 0.4
+        
+        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(18, max(8, len(steps) * 1.2)))
+        fig.suptitle(title, fontsize=16, fontweight='bold')
+        
+        # 1. 墙钟时间与CPU时间
+        wall = [p.get('wall_seconds', 0) or 0 for p in profiles]
+        cpu = [p.get('cpu_seconds', 0) or 0 for p in profiles]
+        ax1.barh(y - height/2, wall, height, label='Wall', color='#2196F3')
+        ax1.barh(y + height/2, cpu, height, label='CPU', color='#FF9800')
+        ax1.set_title('Time by Step')
+        ax1.set_xlabel('Seconds')
+        ax1.legend()
+        
+        # 2. LLM调用次数与token数
+        calls = [p.get('llm_calls', 0) or 0 for p in profiles]
+        tokens = [(p.get('prompt_tokens', 0) or 0) + (p.get('completion_tokens', 0) or 0) for p in profiles]
+        ax2.barh(y - height/2, calls, height, label='LLM Calls', color='#4CAF50')
+        ax2.set_title('LLM Cost by Step')
+        ax2.set_xlabel('Calls')
+        ax2_tokens = ax2.twiny()
+        ax2_tokens.barh(y + height/2, tokens, height, label='Tokens', color='#9C27B0')
+        ax2_tokens.set_xlabel('Tokens (prompt + completion)')
+        handles = ax2.get_legend_handles_labels()[0] + ax2_tokens.get_legend_handles_labels()[0]
+        ax2.legend(handles, ['LLM Calls', 'Tokens'], loc='lower right')
+        
+        # 3. 峰值内存增量
+        rss = [p.get('peak_rss_delta_mb', 0) or 0 for p in profiles]
+        ax3.barh(y, rss, height * 2, color='#F44336')
+        ax3.set_title('Peak RSS Delta by Step')
+        ax3.set_xlabel('MB')
+        
+        # 4. 写盘字节数
+        written = [(p.get('bytes_written') or 0) / 1024 / 1024 for p in profiles]
+        ax4.barh(y, written, height * 2, color='#795548')
+        ax4.set_title('Bytes Written by Step')
+        ax4.set_xlabel('MB')
+        
+        for ax in (ax1, ax2, ax3, ax4):
+            ax.set_yticks(y)
+            ax.set_yticklabels(step_names)
+            ax.invert_yaxis()
+        
+        plt.tight_layout()
+        
+        # 保存图片
+        timestamp = stats.get('workflow_id', 'workflow')
+        filename = f"resource_profile_{timestamp}.png"
+        filepath = self.output_dir / filename
+        plt.savefig(filepath, dpi=300, bbox_inches='tight', facecolor='white')
+        plt.close()
+        
+        logger.info(f"Resource profile chart saved: {filepath}")
+        return str(filepath)
+    
     def generate_workflow_visualization(self, workflow_summary_path: str, timestamp: Optional[str] = None) -> Dict[str, str]:
         """
         生成完整的工作流可视化
@@ -774,6 +849,7 @@ class WorkflowVisualizer:
             # 生成可视化图表
             flow_diagram_path = self.create_data_flow_diagram(stats)
             performance_chart_path = self.create_performance_chart(stats)
+            resource_profile_path = self.create_resource_profile_chart(stats)
             
             # 保存统计数据
             stats_file = self.output_dir / f"workflow_stats_{stats.get('workflow_id', 'workflow')}.json"
@@ -783,6 +859,7 @@ class WorkflowVisualizer:
             return {
                 'flow_diagram': flow_diagram_path,
                 'performance_chart': performance_chart_path,
+                'resource_profile_chart': resource_profile_path,
                 'stats_file': str(stats_file)
             }
             
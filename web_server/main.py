@@ -21,6 +21,11 @@ from datetime import datetime
 from bs4 import BeautifulSoup
 from bs4.element import NavigableString
 from jinja2 import Environment, FileSystemLoader, select_autoescape
+import sys
+
+# 直接运行本文件时也能导入项目模块
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.json_stream import load_json_or_records, record_file_patterns
 
 # --- 日志配置 ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -45,6 +50,10 @@ def load_json_file(file_path: Path) -> dict:
     with open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
+def find_dataset_files(data_dir: Path) -> list:
+    """查找目录下的数据集文件（.json / .jsonl / .jsonl.zst）"""
+    return sorted(file for pattern in record_file_patterns('*.json') for file in data_dir.glob(pattern))
+
 # --- 路径配置 ---
 BASE_DIR = Path(__file__).parent.parent
 EVALUATION_ROOT_DIR = BASE_DIR / "model" / "evaluation"
@@ -1519,7 +1528,7 @@ async def get_comparative_report(request: Request, timestamp: str):
 async def dataset_viewer(request: Request, path: str = "datasets/claude_output"):
     """数据集查看器页面"""
     try:
-        # 读取指定路径下的所有JSON文件
+        # 读取指定路径下的所有JSON/JSONL文件（按后缀自动识别格式）
         data_dir = Path(path)
         if not data_dir.exists():
             return templates.TemplateResponse("error.html", {
@@ -1528,7 +1537,7 @@ async def dataset_viewer(request: Request, path: str = "datasets/claude_output")
             })
         
         # 查找所有JSON文件
-        json_files = list(data_dir.glob('*.json'))
+        json_files = find_dataset_files(data_dir)
         if not json_files:
             return templates.TemplateResponse("error.html", {
                 "request": request,
@@ -1547,8 +1556,7 @@ async def dataset_viewer(request: Request, path: str = "datasets/claude_output")
         
         for json_file in json_files:
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    file_data = json.load(f)
+                file_data = load_json_or_records(json_file)
                 
                 # 确保数据是列表格式
                 if isinstance(file_data, list):
@@ -1667,13 +1675,12 @@ async def api_dataset_info(path: str = "datasets/claude_output"):
         if not data_dir.exists():
             raise HTTPException(status_code=404, detail=f"数据路径不存在: {path}")
         
-        json_files = list(data_dir.glob('*.json'))
+        json_files = find_dataset_files(data_dir)
         file_info = []
         
         for json_file in json_files:
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    file_data = json.load(f)
+                file_data = load_json_or_records(json_file)
                 
                 if isinstance(file_data, list):
                     record_count = len(file_data)
@@ -1711,13 +1718,13 @@ async def export_dataset_html(path: str = "datasets/claude_output"):
     try:
         logger.info(f"开始导出数据集HTML: {path}")
         
-        # 读取指定路径下的所有JSON文件
+        # 读取指定路径下的所有JSON/JSONL文件（按后缀自动识别格式）
         data_dir = Path(path)
         if not data_dir.exists():
             raise HTTPException(status_code=404, detail=f"数据路径不存在: {path}")
         
         # 查找所有JSON文件
-        json_files = list(data_dir.glob('*.json'))
+        json_files = find_dataset_files(data_dir)
         if not json_files:
             raise HTTPException(status_code=404, detail=f"在 {path} 中未找到JSON文件")
         
@@ -1733,8 +1740,7 @@ async def export_dataset_html(path: str = "datasets/claude_output"):
         
         for json_file in json_files:
             try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    file_data = json.load(f)
+                file_data = load_json_or_records(json_file)
                 
                 # 确保数据是列表格式
                 if isinstance(file_data, list):